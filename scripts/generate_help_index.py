@@ -0,0 +1,29 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# Compiles the help of all installed command modules and extensions into the help index of the config dir, so that
+# the first `-h` doesn't have to. Run it after installing or updating the CLI, e.g. when building an image.
+
+import argparse
+import sys
+
+from azure.cli.core import get_default_cli
+from azure.cli.core._help_index import build_help_index
+
+parser = argparse.ArgumentParser(description='Build the help index')
+parser.add_argument('--output', help='Path of the index. Default: helpIndex.jsonl in the config dir.')
+args = parser.parse_args()
+
+# ignore the params passed in now so they aren't used by the cli
+sys.argv = sys.argv[:1]
+az_cli = get_default_cli()
+invoker = az_cli.invocation_cls(cli_ctx=az_cli, commands_loader_cls=az_cli.commands_loader_cls,
+                                parser_cls=az_cli.parser_cls, help_cls=az_cli.help_cls)
+az_cli.invocation = invoker
+invoker.commands_loader.load_command_table(None)
+
+if build_help_index(az_cli, args.output) is None:
+    sys.exit('Unable to compile the help. Run `az -h --debug` for details.')
+print('Built the help index.')
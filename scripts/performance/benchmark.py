@@ -0,0 +1,339 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""End-to-end performance benchmarks of the CLI, replaying the recordings of scenario tests.
+
+The commands of a fixed matrix of scenarios run against a local stand-in for ARM (see replay_server.py), with a
+logged-in account mocked like in the scenario tests:
+
+    start   cold: a new process for every run; warm: repeated runs in one process, after a first unmeasured one
+    items   the number of items the recorded lists are scaled to: 1, 100 or 10000
+    output  table, json or tsv
+
+The wall time, CPU time, peak RSS and number of HTTP requests of every scenario are written to a JSON report and
+compared with a baseline, a report of an earlier run:
+
+    python benchmark.py --save-baseline baseline.json
+    python benchmark.py --baseline baseline.json --report report.json --latency 20
+
+A scenario regresses if its median wall or CPU time grows by more than the tolerance and the difference of the means is
+significant by Welch's t-test, if its peak RSS grows by more than the tolerance, or if it makes more HTTP requests.
+
+The benchmarks run on Python 3. The peak RSS is only measured where the resource module is available.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+RESOURCE_RECORDINGS = os.path.join(REPO_ROOT, 'src', 'command_modules', 'azure-cli-resource', 'azure', 'cli',
+                                   'command_modules', 'resource', 'tests', 'latest', 'recordings')
+RECORDINGS = [os.path.join(RESOURCE_RECORDINGS, name)
+              for name in ['test_resource_group.yaml', 'test_resource_move.yaml']]
+MOCKED_SUBSCRIPTION_ID = '00000000-0000-0000-0000-000000000000'
+RESOURCE_GROUP = 'cli_test_rg_scenario000001'
+# the network security groups moved by test_resource_move
+NSG_IDS = ['/subscriptions/{}/resourceGroups/cli_test_resource_move_dest000001/providers/Microsoft.Network/'
+           'networkSecurityGroups/{}'.format(MOCKED_SUBSCRIPTION_ID, name)
+           for name in ['nsg-move000003', 'nsg-move000004']]
+
+STARTS = ['cold', 'warm']
+ITEMS = [1, 100, 10000]
+OUTPUTS = ['table', 'json', 'tsv']
+
+# name: (arguments, the item counts and the outputs it runs with)
+COMMANDS = {
+    # paging and output formatting of long lists
+    'group-list': (['group', 'list'], ITEMS, OUTPUTS),
+    # the overhead of a command that makes a single request
+    'group-show': (['group', 'show', '-n', RESOURCE_GROUP], [1], OUTPUTS),
+    # polling of a long-running operation
+    'group-delete': (['group', 'delete', '-n', RESOURCE_GROUP, '--yes'], [1], ['json']),
+    # the expansion of --ids into a command per resource
+    'nsg-show-ids': (['network', 'nsg', 'show', '--ids'] + NSG_IDS, [1], OUTPUTS),
+}
+
+
+def get_scenarios(name_filter=None):
+    scenarios = []
+    for name in sorted(COMMANDS):
+        arguments, items_list, outputs = COMMANDS[name]
+        for start in STARTS:
+            for items in items_list:
+                for output in outputs:
+                    scenario_id = '{}/{}/{}/{}'.format(name, start, items, output)
+                    if name_filter and name_filter not in scenario_id:
+                        continue
+                    scenarios.append({'id': scenario_id, 'command': name, 'start': start, 'items': items,
+                                      'output': output, 'args': arguments + ['-o', output]})
+    return scenarios
+
+
+def mean(data):
+    return sum(data) / float(len(data))
+
+
+def median(data):
+    data = sorted(data)
+    middle = len(data) // 2
+    return data[middle] if len(data) % 2 else (data[middle - 1] + data[middle]) / 2.0
+
+
+def stdev(data):
+    """ The sample standard deviation. """
+    if len(data) < 2:
+        return 0.0
+    center = mean(data)
+    return math.sqrt(sum((x - center) ** 2 for x in data) / (len(data) - 1))
+
+
+def welch_t(current, baseline):
+    """ Returns Welch's t statistic of the difference of the means of two samples, positive if `current` is larger. """
+    if len(current) < 2 or len(baseline) < 2:
+        return 0.0
+    error = math.sqrt(stdev(current) ** 2 / len(current) + stdev(baseline) ** 2 / len(baseline))
+    if not error:
+        return float('inf') if mean(current) > mean(baseline) else 0.0
+    return (mean(current) - mean(baseline)) / error
+
+
+def summarize(data):
+    return {'median': round(median(data), 4), 'mean': round(mean(data), 4), 'stdev': round(stdev(data), 4),
+            'min': round(min(data), 4), 'max': round(max(data), 4)}
+
+
+def _get_peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, and in kilobytes elsewhere
+    return peak_rss // 1024 if sys.platform == 'darwin' else peak_rss
+
+
+def _run_driver(scenario, server, config_dir, runs, warm_up, poll_interval):
+    """ Runs the driver in a new process. Returns its wall time, the measurements it reports and the number of HTTP
+    requests of every run. """
+    results_file = os.path.join(config_dir, 'results.json')
+    env = dict(os.environ)
+    env['AZURE_CONFIG_DIR'] = config_dir
+    env['AZURE_CORE_COLLECT_TELEMETRY'] = 'no'
+    command = [sys.executable, os.path.abspath(__file__), '--driver', server.url, str(runs), str(int(warm_up)),
+               str(poll_interval), results_file, '--'] + scenario['args']
+
+    server.reset_counters()
+    start = time.time()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = process.communicate()[0]
+    wall = time.time() - start
+    if process.returncode:
+        raise RuntimeError('`az {}` failed:\n{}'.format(' '.join(scenario['args']), output.decode('utf-8')))
+    if server.unmatched:
+        raise RuntimeError('`az {}` made requests without a recording: {}'.format(
+            ' '.join(scenario['args']), server.unmatched[:3]))
+    with open(results_file, 'r') as f:
+        results = json.load(f)
+    return wall, results, server.request_count // (runs + int(warm_up))
+
+
+def run_scenario(scenario, server, repeat, poll_interval):
+    """ Returns the samples of a scenario. The first run is not measured, to warm up the disk caches or the process. """
+    config_dir = tempfile.mkdtemp(prefix='az_benchmark_')
+    try:
+        if scenario['start'] == 'cold':
+            _run_driver(scenario, server, config_dir, 1, False, poll_interval)
+            wall, cpu, rss = [], [], []
+            for _ in range(repeat):
+                elapsed, results, requests = _run_driver(scenario, server, config_dir, 1, False, poll_interval)
+                wall.append(elapsed)
+                # the CPU time of the whole process, including the start of the interpreter
+                cpu.append(results['processCpu'])
+                rss.append(results['peakRssKb'])
+            peak_rss = None if None in rss else max(rss)
+        else:
+            _, results, requests = _run_driver(scenario, server, config_dir, repeat, True, poll_interval)
+            wall, cpu = results['wall'], results['cpu']
+            peak_rss = results['peakRssKb']
+    finally:
+        shutil.rmtree(config_dir, ignore_errors=True)
+
+    return {
+        'id': scenario['id'],
+        'command': scenario['command'],
+        'start': scenario['start'],
+        'items': scenario['items'],
+        'output': scenario['output'],
+        'wall': [round(x, 4) for x in wall],
+        'cpu': [round(x, 4) for x in cpu],
+        'peakRssKb': peak_rss,
+        'requests': requests,
+        'summary': {'wall': summarize(wall), 'cpu': summarize(cpu)}
+    }
+
+
+def compare(result, baseline, tolerance, t_threshold):
+    """ Compares the samples of a scenario with those of the baseline. Returns the comparison and the regressions. """
+    comparison = {}
+    regressions = []
+    for metric in ['wall', 'cpu']:
+        change = median(result[metric]) / median(baseline[metric]) - 1 if median(baseline[metric]) else 0.0
+        t = welch_t(result[metric], baseline[metric])
+        comparison[metric] = {'baseline': round(median(baseline[metric]), 4), 'change': round(change, 4),
+                              't': round(t, 2) if not math.isinf(t) else 'inf'}
+        if change > tolerance and t > t_threshold:
+            regressions.append(metric)
+
+    if result['peakRssKb'] and baseline['peakRssKb']:
+        rss_change = float(result['peakRssKb']) / baseline['peakRssKb'] - 1
+        comparison['peakRssKb'] = {'baseline': baseline['peakRssKb'], 'change': round(rss_change, 4)}
+        if rss_change > tolerance:
+            regressions.append('peakRssKb')
+
+    # the requests made are the same for every run, so any more are a regression
+    comparison['requests'] = {'baseline': baseline['requests']}
+    if result['requests'] > baseline['requests']:
+        regressions.append('requests')
+    return comparison, regressions
+
+
+def _get_environment():
+    from azure.cli.core import __version__ as core_version
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'core': core_version,
+            'cpus': os.cpu_count()}
+
+
+def run_benchmarks(args):
+    scenarios = get_scenarios(args.filter)
+    if not scenarios:
+        sys.exit('No scenario matches {}.'.format(args.filter))
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = {s['id']: s for s in json.load(f)['scenarios']}
+
+    results = []
+    regressed = []
+    for scenario in scenarios:
+        with ReplayServer(RECORDINGS + (args.recordings or []), latency=args.latency / 1000.0,
+                          items=scenario['items'], page_size=args.page_size) as server:
+            result = run_scenario(scenario, server, args.repeat, args.poll_interval)
+
+        line = '{:40} wall {:8.3f}s  cpu {:8.3f}s  rss {:>7}MB  requests {:5}'.format(
+            result['id'], result['summary']['wall']['median'], result['summary']['cpu']['median'],
+            '{:.1f}'.format(result['peakRssKb'] / 1024.0) if result['peakRssKb'] else '-', result['requests'])
+        if result['id'] in baseline:
+            result['comparison'], result['regressions'] = compare(result, baseline[result['id']], args.tolerance,
+                                                                  args.t_threshold)
+            line += '  wall {:+.1%}'.format(result['comparison']['wall']['change'])
+            if result['regressions']:
+                regressed.append(result['id'])
+                line += '  REGRESSED: {}'.format(', '.join(result['regressions']))
+        print(line)
+        sys.stdout.flush()
+        results.append(result)
+
+    report = {
+        'environment': _get_environment(),
+        'settings': {'repeat': args.repeat, 'latencyMs': args.latency, 'pageSize': args.page_size,
+                     'tolerance': args.tolerance, 'tThreshold': args.t_threshold, 'baseline': args.baseline},
+        'scenarios': results,
+        'regressions': regressed
+    }
+    for path in [args.report, args.save_baseline]:
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if regressed:
+        print('\n{} of {} scenarios regressed: {}'.format(len(regressed), len(results), ', '.join(regressed)))
+        sys.exit(1)
+
+
+def drive(server_url, runs, warm_up, poll_interval, results_file, args):
+    """ Runs a command `runs` times in this process, after a first unmeasured run with `warm_up`. """
+    import mock
+    from azure.cli.core import get_default_cli
+
+    def _load_cached_subscriptions(*_, **__):
+        return [{'id': MOCKED_SUBSCRIPTION_ID, 'user': {'name': 'example@example.com', 'type': 'user'},
+                 'state': 'Enabled', 'name': 'Example', 'tenantId': MOCKED_SUBSCRIPTION_ID, 'isDefault': True}]
+
+    def _retrieve_token_for_user(*args, **_):
+        token = 'top-secret-token-for-you'
+        return 'Bearer', token, {'tokenType': 'Bearer', 'expiresIn': 3600, 'resource': args[3],
+                                 'accessToken': token, 'refreshToken': token}
+
+    def _delay(*_):
+        time.sleep(max(poll_interval, 0.005))
+
+    patches = [
+        mock.patch('azure.cli.core._profile.Profile.load_cached_subscriptions', _load_cached_subscriptions),
+        mock.patch('azure.cli.core._profile.CredsCache.retrieve_token_for_user', _retrieve_token_for_user),
+        # the CLI checks whether a long-running operation is done every second
+        mock.patch('azure.cli.core.commands.LongRunningOperation._delay', _delay)
+    ]
+    for patch in patches:
+        patch.start()
+
+    az_cli = get_default_cli()
+    az_cli.cloud.endpoints.resource_manager = server_url
+
+    wall, cpu = [], []
+    with open(os.devnull, 'w') as out_file:
+        for i in range(runs + 1 if warm_up else runs):
+            start_wall, start_cpu = time.time(), time.process_time()
+            exit_code = az_cli.invoke(args, out_file=out_file)
+            if exit_code:
+                sys.exit(exit_code)
+            if i or not warm_up:
+                wall.append(time.time() - start_wall)
+                cpu.append(time.process_time() - start_cpu)
+
+    with open(results_file, 'w') as f:
+        json.dump({'wall': wall, 'cpu': cpu, 'processCpu': time.process_time(), 'peakRssKb': _get_peak_rss_kb()}, f)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--driver':
+        server_url, runs, warm_up, poll_interval, results_file = sys.argv[2:7]
+        drive(server_url, int(runs), warm_up == '1', float(poll_interval), results_file, sys.argv[8:])
+        return
+
+    parser = argparse.ArgumentParser(description='Run the end-to-end performance benchmarks of the CLI.')
+    parser.add_argument('--filter', help='Run only the scenarios whose id, e.g. group-list/warm/100/table, '
+                                         'contains this text.')
+    parser.add_argument('--repeat', type=int, default=5, help='Measured runs of every scenario.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Milliseconds every response is delayed by.')
+    parser.add_argument('--page-size', type=int, default=1000, help='Items in a page of a list.')
+    parser.add_argument('--poll-interval', type=float, default=0.0,
+                        help='Seconds between the polls of long-running operations.')
+    parser.add_argument('--recordings', nargs='+', help='More recordings to serve.')
+    parser.add_argument('--baseline', help='A report of an earlier run to compare with.')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='The relative growth of the median wall or CPU time, or of the peak RSS, which is a '
+                             'regression.')
+    parser.add_argument('--t-threshold', type=float, default=3.0,
+                        help="The Welch's t statistic above which a growth of the wall or CPU time is significant.")
+    parser.add_argument('--report', help='The JSON file to write the report to.')
+    parser.add_argument('--save-baseline', help='The JSON file to write the report to, as a baseline of later runs.')
+    run_benchmarks(parser.parse_args())
+
+
+sys.path.insert(0, SCRIPT_DIR)
+from replay_server import ReplayServer  # noqa: E402 pylint: disable=wrong-import-position
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""A local stand-in for Azure Resource Manager that answers from the recordings of scenario tests.
+
+Requests are matched to the recorded interactions by method, path and query, or by method and path if the query
+doesn't match. The responses recorded for a request are returned in turn. Every request can be delayed by a fixed
+latency, and lists can be scaled to any number of items, which are returned in pages.
+
+    python replay_server.py src/command_modules/azure-cli-resource/.../recordings/*.yaml --latency 20 --items 500
+"""
+
+from __future__ import print_function
+
+import argparse
+import copy
+import json
+import threading
+import time
+
+try:
+    # Python 3.x
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qsl, urlencode, urlsplit
+except ImportError:
+    # Python 2.x
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import urlencode
+    from urlparse import parse_qsl, urlsplit
+
+RECORDED_HOST = 'https://management.azure.com'
+SKIP_TOKEN = '$skiptoken'
+# hop-by-hop and encoding headers of the recording, which don't apply to the response sent
+IGNORED_HEADERS = ['content-length', 'content-encoding', 'transfer-encoding', 'connection', 'date']
+
+
+def _split_uri(uri):
+    parts = urlsplit(uri)
+    query = sorted((k.lower(), v) for k, v in parse_qsl(parts.query, keep_blank_values=True))
+    return parts.path.lower().rstrip('/'), query
+
+
+def _to_text(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class _Interaction(object):
+    def __init__(self, response):
+        self.status = response['status']['code']
+        self.reason = response['status'].get('message') or ''
+        self.headers = [(k, _to_text(v)) for k, values in response.get('headers', {}).items()
+                        for v in (values if isinstance(values, list) else [values])
+                        if k.lower() not in IGNORED_HEADERS]
+        self.body = _to_text((response.get('body') or {}).get('string')) or ''
+
+    def get_list(self):
+        """ Returns the parsed body if it is a list of items that isn't paged, else None. """
+        if self.status != 200 or not self.body.startswith('{'):
+            return None
+        try:
+            body = json.loads(self.body)
+        except ValueError:
+            return None
+        if isinstance(body.get('value'), list) and body['value'] and not body.get('nextLink'):
+            return body
+        return None
+
+
+class ReplayServer(object):
+    """ Serves recorded interactions on a local port until it is closed.
+
+    :param recordings: paths of the YAML recordings of scenario tests
+    :param latency: seconds every response is delayed by
+    :param items: the number of items lists are scaled to, or None to return them as recorded
+    :param page_size: the number of items in a page of a scaled list
+    :param retry_after: the value of the Retry-After header of accepted long-running operations, in seconds
+    """
+
+    def __init__(self, recordings, latency=0.0, items=None, page_size=1000, retry_after=0, port=0):
+        self.latency = latency
+        self.items = items
+        self.page_size = page_size
+        self.retry_after = retry_after
+        self.request_count = 0
+        self.unmatched = []
+        self._lock = threading.Lock()
+        self._by_query = {}
+        self._by_path = {}
+        self._cursors = {}
+        self._pages = {}
+        for path in recordings:
+            self.load(path)
+
+        self._server = _ThreadingHTTPServer(('127.0.0.1', port), self._create_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self._server.server_address[1])
+
+    def load(self, path):
+        import yaml
+        with open(path, 'r') as f:
+            recording = yaml.safe_load(f) or {}
+        for each in recording.get('interactions', []):
+            method = each['request']['method'].upper()
+            uri_path, query = _split_uri(each['request']['uri'])
+            interaction = _Interaction(each['response'])
+            self._by_query.setdefault((method, uri_path, tuple(query)), []).append(interaction)
+            self._by_path.setdefault((method, uri_path), []).append(interaction)
+
+    def reset_counters(self):
+        with self._lock:
+            self.request_count = 0
+            self.unmatched = []
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _find(self, method, uri):
+        uri_path, query = _split_uri(uri)
+        page = 0
+        for key, value in query:
+            if key == SKIP_TOKEN:
+                page = int(value)
+        query = [(k, v) for k, v in query if k != SKIP_TOKEN]
+
+        key = (method, uri_path, tuple(query))
+        if key not in self._by_query:
+            key = (method, uri_path)
+        interactions = self._by_query.get(key) or self._by_path.get(key)
+        if not interactions:
+            return None, None
+
+        # the recorded responses to a request are returned in turn, and continue from the first again
+        with self._lock:
+            if page:
+                index = 0
+            else:
+                index = self._cursors.get(key, 0)
+                self._cursors[key] = (index + 1) % len(interactions)
+        interaction = interactions[index]
+
+        body = None
+        if self.items is not None:
+            body = self._get_page(key, interaction, uri_path, query, page)
+        return interaction, body
+
+    def _get_page(self, key, interaction, uri_path, query, page):
+        items = self._pages.get(key)
+        if items is None:
+            recorded = interaction.get_list()
+            if recorded is None:
+                return None
+            template = json.dumps(recorded['value'][0])
+            name = recorded['value'][0].get('name')
+            items = []
+            for i in range(self.items):
+                item = template.replace(name, '{}-{}'.format(name, i)) if name else template
+                items.append(json.loads(item))
+            self._pages[key] = items
+
+        start = page * self.page_size
+        result = {'value': copy.deepcopy(items[start:start + self.page_size])}
+        if start + self.page_size < len(items):
+            next_query = urlencode(query + [(SKIP_TOKEN, str(page + 1))])
+            result['nextLink'] = '{}{}?{}'.format(RECORDED_HOST, uri_path, next_query)
+        return json.dumps(result)
+
+    def _create_handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _replay(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                with server._lock:  # pylint: disable=protected-access
+                    server.request_count += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                interaction, body = server._find(self.command, self.path)  # pylint: disable=protected-access
+                if interaction is None:
+                    with server._lock:  # pylint: disable=protected-access
+                        server.unmatched.append('{} {}'.format(self.command, self.path))
+                    self._send(404, 'Not Found', [('Content-Type', 'application/json')],
+                               json.dumps({'error': {'code': 'NoRecording',
+                                                     'message': 'No recording of {} {}'.format(self.command,
+                                                                                               self.path)}}))
+                    return
+
+                headers = []
+                for name, value in interaction.headers:
+                    if name.lower() == 'retry-after':
+                        continue
+                    headers.append((name, value.replace(RECORDED_HOST, server.url)))
+                if interaction.status in (201, 202):
+                    headers.append(('Retry-After', str(server.retry_after)))
+                body = interaction.body if body is None else body
+                self._send(interaction.status, interaction.reason, headers, body.replace(RECORDED_HOST, server.url))
+
+            def _send(self, status, reason, headers, body):
+                content = body.encode('utf-8')
+                self.send_response(status, reason)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(content)
+
+            do_GET = do_PUT = do_POST = do_PATCH = do_DELETE = do_HEAD = _replay
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        return _Handler
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve recordings of scenario tests as a local stand-in for ARM.')
+    parser.add_argument('recordings', nargs='+', help='YAML recordings of scenario tests.')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='Milliseconds every response is delayed by.')
+    parser.add_argument('--items', type=int, help='Scale the recorded lists to this many items.')
+    parser.add_argument('--page-size', type=int, default=1000, help='Items in a page of a scaled list.')
+    args = parser.parse_args()
+
+    server = ReplayServer(args.recordings, latency=args.latency / 1000.0, items=args.items,
+                          page_size=args.page_size, port=args.port)
+    print('Serving {} on {}. Press Ctrl+C to stop.'.format(', '.join(args.recordings), server.url))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
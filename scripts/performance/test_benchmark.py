@@ -0,0 +1,156 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchmark import compare, welch_t, NSG_IDS, RECORDINGS  # noqa: E402 pylint: disable=wrong-import-position
+from replay_server import ReplayServer  # noqa: E402 pylint: disable=wrong-import-position
+
+GROUPS_PATH = '/subscriptions/sub/resourcegroups'
+RECORDING = '''
+interactions:
+- request:
+    method: GET
+    uri: https://management.azure.com/subscriptions/sub/resourcegroups?api-version=2018-05-01
+  response:
+    status: {code: 200, message: OK}
+    headers:
+      content-type: [application/json; charset=utf-8]
+    body: {string: '{"value": [{"id": "/subscriptions/sub/resourceGroups/rg", "name": "rg"}]}'}
+- request:
+    method: GET
+    uri: https://management.azure.com/subscriptions/sub/resourcegroups?api-version=2018-05-01&%24filter=a
+  response:
+    status: {code: 200, message: OK}
+    headers: {}
+    body: {string: '{"value": [{"id": "/subscriptions/sub/resourceGroups/tagged", "name": "tagged"}]}'}
+- request:
+    method: GET
+    uri: https://management.azure.com/subscriptions/sub/operationresults/op?api-version=2018-05-01
+  response:
+    status: {code: 202, message: Accepted}
+    headers:
+      location: ['https://management.azure.com/subscriptions/sub/operationresults/op?api-version=2018-05-01']
+      retry-after: ['15']
+    body: {string: ''}
+- request:
+    method: GET
+    uri: https://management.azure.com/subscriptions/sub/operationresults/op?api-version=2018-05-01
+  response:
+    status: {code: 200, message: OK}
+    headers: {}
+    body: {string: ''}
+'''
+
+
+class TestReplayServer(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.recording = os.path.join(self.work_dir, 'recording.yaml')
+        with open(self.recording, 'w') as f:
+            f.write(RECORDING)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _get(self, url):
+        response = urlopen(Request(url))
+        return response.status, dict(response.headers), response.read().decode('utf-8')
+
+    def _names(self, body):
+        return [item['name'] for item in json.loads(body)['value']]
+
+    def test_replay_server_matching(self):
+        with ReplayServer([self.recording]) as server:
+            # matched by query, whatever its order, else by path
+            url = server.url + GROUPS_PATH
+            self.assertEqual(['tagged'], self._names(self._get(
+                url + '?%24filter=a&api-version=2018-05-01')[2]))
+            self.assertEqual(['rg'], self._names(self._get(url + '?api-version=2018-05-01')[2]))
+            self.assertEqual(['rg'], self._names(self._get(url + '?api-version=2020-01-01')[2]))
+
+            # the recorded responses are returned in turn, and with the host of the server
+            url = server.url + '/subscriptions/sub/operationresults/op?api-version=2018-05-01'
+            status, headers, _ = self._get(url)
+            self.assertEqual(202, status)
+            self.assertEqual(url, headers['location'])
+            self.assertEqual('0', headers['Retry-After'])
+            self.assertEqual(200, self._get(url)[0])
+            self.assertEqual(202, self._get(url)[0])
+
+            self.assertEqual(6, server.request_count)
+            self.assertEqual([], server.unmatched)
+
+            with self.assertRaises(HTTPError) as context:
+                self._get(server.url + '/subscriptions/sub/providers')
+            self.assertEqual(404, context.exception.code)
+            self.assertEqual(['GET /subscriptions/sub/providers'], server.unmatched)
+
+            server.reset_counters()
+            self.assertEqual((0, []), (server.request_count, server.unmatched))
+
+    def test_replay_server_paging(self):
+        with ReplayServer([self.recording], items=5, page_size=2) as server:
+            url = server.url + GROUPS_PATH + '?api-version=2018-05-01'
+            names = []
+            while url:
+                body = json.loads(self._get(url)[2])
+                names.extend(item['name'] for item in body['value'])
+                url = body.get('nextLink')
+                if url:
+                    self.assertTrue(url.startswith(server.url))
+                    self.assertIn('%24skiptoken=', url)
+
+            self.assertEqual(['rg-{}'.format(i) for i in range(5)], names)
+            self.assertEqual(3, server.request_count)
+
+    def test_replay_server_serves_ids_scenario(self):
+        # the resources of `network nsg show --ids` are in the recordings of the benchmarks
+        with ReplayServer(RECORDINGS, items=1) as server:
+            for resource_id in NSG_IDS:
+                body = json.loads(self._get(server.url + resource_id + '?api-version=2018-12-01')[2])
+                self.assertEqual(resource_id.rsplit('/', 1)[1], body['name'])
+            self.assertEqual([], server.unmatched)
+
+
+class TestBenchmarkComparison(unittest.TestCase):
+    def _result(self, wall, cpu=None, peak_rss=1000, requests=1):
+        return {'wall': wall, 'cpu': cpu or wall, 'peakRssKb': peak_rss, 'requests': requests}
+
+    def test_welch_t(self):
+        self.assertEqual(0.0, welch_t([1.0], [1.0, 2.0]))
+        self.assertEqual(0.0, welch_t([1.0, 1.0], [1.0, 1.0]))
+        self.assertEqual(float('inf'), welch_t([2.0, 2.0], [1.0, 1.0]))
+        # means 2 and 1, each with a variance of 2 / 3 over 4 samples: t = 1 / sqrt(1 / 6 + 1 / 6)
+        self.assertAlmostEqual(3 ** 0.5, welch_t([1.0, 2.0, 2.0, 3.0], [0.0, 1.0, 1.0, 2.0]))
+        self.assertAlmostEqual(-(3 ** 0.5), welch_t([0.0, 1.0, 1.0, 2.0], [1.0, 2.0, 2.0, 3.0]))
+
+    def test_compare(self):
+        baseline = self._result([1.0, 1.01, 0.99, 1.0, 1.02])
+
+        # a small change, or a large one that isn't significant, isn't a regression
+        self.assertEqual([], compare(self._result([1.05, 1.06, 1.04, 1.05, 1.05]), baseline, 0.1, 3.0)[1])
+        self.assertEqual([], compare(self._result([0.6, 2.2, 0.5, 2.5, 0.7]), baseline, 0.1, 3.0)[1])
+
+        comparison, regressions = compare(self._result([1.3, 1.31, 1.29, 1.3, 1.32], peak_rss=1200, requests=2),
+                                          baseline, 0.1, 3.0)
+        self.assertEqual(['wall', 'cpu', 'peakRssKb', 'requests'], regressions)
+        self.assertEqual(0.3, comparison['wall']['change'])
+        self.assertEqual(0.2, comparison['peakRssKb']['change'])
+
+        # a peak RSS that wasn't measured isn't compared
+        self.assertEqual([], compare(self._result(baseline['wall'], peak_rss=None), baseline, 0.1, 3.0)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
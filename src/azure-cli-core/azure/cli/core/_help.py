@@ -139,9 +139,12 @@ class AzCliHelp(CLIPrintMixin, CLIHelp):
 
         self._register_help_loaders()
         self._name_to_content = {}
+        self.help_index = None
 
     # override
     def show_help(self, cli_name, nouns, parser, is_group):
+        from azure.cli.core._help_index import get_help_index
+        self.help_index = get_help_index(self.cli_ctx)
         self.update_loaders_with_help_file_contents(nouns)
         super(AzCliHelp, self).show_help(cli_name, nouns, parser, is_group)
 
@@ -211,6 +214,15 @@ class CliHelpFile(KnackHelpFile):
 
         return True
 
+    # Reads the help registered in `helps` from the help index, if there is one, instead of parsing it.
+    def _load_from_file(self):
+        help_index = getattr(self.help_ctx, 'help_index', None)
+        entry = help_index.get(self.delimiters) if help_index is not None else None
+        if entry is None or 'help' not in entry:
+            super(CliHelpFile, self)._load_from_file()
+            return
+        self._load_from_data(entry['help'])
+
     # Needs to override base implementation to exclude unsupported examples.
     def _load_from_data(self, data):
         if not data:
@@ -0,0 +1,209 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Precompiled index of the help of all commands and groups, keyed by command path.
+
+Help comes from the YAML strings that modules and extensions register in `helps` and from the help.yaml files
+next to their command loaders. Parsing them is most of the cost of `-h`, as the help of a group loads the help of
+all of its children. The index holds the parsed help of every command path as one JSON line, after a header line
+with the offset of every entry, so that only the entries shown are read and parsed. It is built on first use, or
+with scripts/generate_help_index.py, and rebuilt when the CLI, an extension or the help of a module changes.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+HELP_INDEX_FORMAT = 1
+HELP_INDEX_FILE_NAME = 'helpIndex.jsonl'
+
+
+def _to_bytes(value):
+    return value if isinstance(value, bytes) else value.encode('utf-8')
+
+
+def get_help_index_path(cli_ctx):
+    return os.path.join(cli_ctx.config.config_dir, HELP_INDEX_FILE_NAME)
+
+
+def get_help_yaml_files(commands_loader):
+    """ Returns the help.yaml files next to the command loaders, like HelpLoaderV1 finds them. """
+    loader_classes = set(loader.__class__ for loaders in commands_loader.cmd_to_loader_map.values()
+                         for loader in loaders)
+    dir_names = set(os.path.dirname(inspect.getfile(cls)) for cls in loader_classes)
+    files = []
+    for dir_name in sorted(dir_names):
+        try:
+            names = os.listdir(dir_name)
+        except OSError:
+            continue
+        files.extend(os.path.join(dir_name, n) for n in sorted(names) if n.endswith(('help.yaml', 'help.yml')))
+    return files
+
+
+def get_help_index_stamp(help_yaml_files):
+    """ Returns what an index is valid for: the CLI and extension versions, a digest of the registered help and
+    the modification times of the help.yaml files. """
+    from knack.help_files import helps
+    from azure.cli.core import __version__ as core_version
+    from azure.cli.core.extension import get_extensions
+
+    digest = hashlib.sha1(b'\0'.join(_to_bytes(command) + b'\0' + _to_bytes(helps[command])
+                                     for command in sorted(helps)))
+    yaml_files = {}
+    for path in help_yaml_files:
+        try:
+            yaml_files[path] = os.stat(path).st_mtime
+        except OSError:
+            yaml_files[path] = None
+    return {
+        'format': HELP_INDEX_FORMAT,
+        'core': core_version,
+        'extensions': sorted([ext.name, ext.version] for ext in get_extensions()),
+        'helps': digest.hexdigest(),
+        'helpFiles': yaml_files
+    }
+
+
+def compile_help_entries(help_yaml_files):
+    """ Returns the parsed help of every command path: the entry registered in `helps` under 'help' and the
+    entry of the help.yaml files under 'yaml'. Returns None if a help.yaml file cannot be parsed, so that the
+    error is reported by the help loader when the help of its commands is shown. """
+    import yaml
+    from knack.help_files import helps
+    from knack.util import CLIError
+    from azure.cli.core._help_loaders import YamlLoaderMixin
+
+    # the same as yaml.safe_load, with libyaml if it is available
+    loader_cls = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    entries = {}
+    for command, text in helps.items():
+        try:
+            data = yaml.load(text, Loader=loader_cls)
+        except yaml.YAMLError:
+            # left out, so that the error is raised when the help is shown
+            logger.debug("Unable to parse the help of '%s'.", command)
+            continue
+        entries[command] = {'command': command, 'help': data}
+
+    for path in help_yaml_files:
+        try:
+            with open(path, 'r') as f:
+                data = YamlLoaderMixin._parse_yaml_from_string(f.read(), path)  # pylint: disable=protected-access
+        except (OSError, IOError, CLIError) as ex:
+            logger.debug("Unable to index the help file '%s': %s", path, ex)
+            return None
+        if not data or not data.get('content'):
+            continue
+        for elem in data['content']:
+            for value in elem.values():
+                name = value.get('name')
+                if name is None:
+                    continue
+                entry = entries.setdefault(name, {'command': name})
+                if 'yaml' not in entry:
+                    entry['yaml'] = dict(value, version=data.get('version'))
+    return entries
+
+
+class HelpIndex(object):
+    """ An index read from a file, or built in memory. Entries of a file are read when they are first used. """
+
+    def __init__(self, path=None, stamp=None, entries=None):
+        self.path = path
+        self.stamp = stamp
+        self._offsets = {}
+        self._body_start = 0
+        self._entries = entries if entries is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        """ Reads the header of an index file, or returns None if there is none or it cannot be read. """
+        try:
+            with open(path, 'rb') as f:
+                header_line = f.readline()
+            header = json.loads(header_line.decode('utf-8'))
+        except (OSError, IOError, ValueError):
+            return None
+        if not isinstance(header, dict) or header.get('format') != HELP_INDEX_FORMAT:
+            return None
+        index = cls(path, header.get('stamp'))
+        index._offsets = header.get('entries', {})  # pylint: disable=protected-access
+        index._body_start = len(header_line)  # pylint: disable=protected-access
+        return index
+
+    def save(self, path):
+        from azure.cli.core.util import write_file_atomic
+        body, offsets = [], {}
+        position = 0
+        for command in sorted(self._entries):
+            line = _to_bytes(json.dumps(self._entries[command], sort_keys=True)) + b'\n'
+            offsets[command] = [position, len(line)]
+            body.append(line)
+            position += len(line)
+        header = {'format': HELP_INDEX_FORMAT, 'stamp': self.stamp, 'entries': offsets}
+        write_file_atomic(path, _to_bytes(json.dumps(header, sort_keys=True)) + b'\n' + b''.join(body))
+
+    def _read_entry(self, command):
+        position, length = self._offsets[command]
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self._body_start + position)
+                entry = json.loads(f.read(length).decode('utf-8'))
+        except (OSError, IOError, ValueError):
+            return None
+        # the file may have been replaced since its header was read
+        return entry if isinstance(entry, dict) and entry.get('command') == command else None
+
+    def get(self, command):
+        """ Returns the entry of a command path, or None if it has none or it cannot be read. """
+        try:
+            return self._entries[command]
+        except KeyError:
+            pass
+        entry = self._read_entry(command) if command in self._offsets else None
+        self._entries[command] = entry
+        return entry
+
+
+def _build_help_index(path, help_yaml_files, stamp):
+    entries = compile_help_entries(help_yaml_files)
+    if entries is None:
+        return None
+    index = HelpIndex(stamp=stamp, entries=entries)
+    try:
+        index.save(path)
+        logger.debug("Saved the help index of %d command paths to '%s'.", len(entries), path)
+    except (OSError, IOError) as ex:
+        logger.debug("Unable to save the help index to '%s': %s", path, ex)
+    return index
+
+
+def build_help_index(cli_ctx, path=None):
+    """ Compiles the help of the loaded commands into an index and saves it. Returns the index, or None if the help
+    cannot be compiled. """
+    help_yaml_files = get_help_yaml_files(cli_ctx.invocation.commands_loader)
+    return _build_help_index(path or get_help_index_path(cli_ctx), help_yaml_files,
+                             get_help_index_stamp(help_yaml_files))
+
+
+def get_help_index(cli_ctx):
+    """ Returns the help index for the loaded commands, building it if there is none or it is out of date, or None
+    if the index is turned off with core.use_help_index. """
+    if not cli_ctx.config.getboolean('core', 'use_help_index', fallback=True):
+        return None
+    path = get_help_index_path(cli_ctx)
+    help_yaml_files = get_help_yaml_files(cli_ctx.invocation.commands_loader)
+    stamp = get_help_index_stamp(help_yaml_files)
+    index = HelpIndex.load(path)
+    if index is not None and index.stamp == stamp:
+        return index
+    logger.debug("Building the help index, as it is missing or out of date.")
+    return _build_help_index(path, help_yaml_files, stamp)
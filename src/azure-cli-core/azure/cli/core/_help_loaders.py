@@ -27,7 +27,7 @@ class BaseHelpLoader(ABC):
         self._file_content_dict = {}
 
     def versioned_load(self, help_obj, parser):
-        if not self._file_content_dict:
+        if not self._file_content_dict and self.help_index is None:
             return
         self._entry_data = None
         # Cycle through versioned_load helpers
@@ -41,6 +41,10 @@ class BaseHelpLoader(ABC):
     def update_file_contents(self, file_contents):
         self._file_content_dict.update(file_contents)
 
+    @property
+    def help_index(self):
+        return getattr(self.help_ctx, 'help_index', None)
+
     @abc.abstractmethod
     def get_noun_help_file_names(self, nouns):
         pass
@@ -177,6 +181,9 @@ class HelpLoaderV1(BaseHelpLoader, YamlLoaderMixin):
         return 1
 
     def get_noun_help_file_names(self, nouns):
+        if self.help_index is not None:
+            # the entries of the help files are read from the help index
+            return []
         cmd_loader_map_ref = self.help_ctx.cli_ctx.invocation.commands_loader.cmd_to_loader_map
         return self._get_yaml_help_files_list(nouns, cmd_loader_map_ref)
 
@@ -187,6 +194,10 @@ class HelpLoaderV1(BaseHelpLoader, YamlLoaderMixin):
                 self._file_content_dict.update(data_dict)
 
     def load_entry_data(self, help_obj, parser):
+        if self.help_index is not None:
+            entry = self.help_index.get(help_obj.command)
+            self._entry_data = entry.get('yaml') if entry else None
+            return
         prog = parser.prog if hasattr(parser, "prog") else parser._prog_prefix  # pylint: disable=protected-access
         command_nouns = prog.split()[1:]
         cmd_loader_map_ref = self.help_ctx.cli_ctx.invocation.commands_loader.cmd_to_loader_map
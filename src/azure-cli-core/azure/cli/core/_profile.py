@@ -817,30 +817,53 @@ class SubscriptionFinder(object):
         token_cache = self._adal_token_cache if use_token_cache else None
         return self._auth_context_factory(self.cli_ctx, tenant, token_cache)
 
+    def _get_allowed_tenants(self):
+        allowed = self.cli_ctx.config.get('core', 'allowed_tenants', None)
+        if not allowed:
+            return None
+        return set(t.lower() for t in re.split(r'[\s,]+', allowed) if t)
+
+    def _find_in_tenant(self, tenant_id, resource):
+        temp_context = self._create_auth_context(tenant_id)
+        temp_credentials = temp_context.acquire_token(resource, self.user_id, _CLIENT_ID)
+        return self._find_using_specific_tenant(tenant_id, temp_credentials[_ACCESS_TOKEN])
+
     def _find_using_common_tenant(self, access_token, resource):
         import adal
+        from concurrent.futures import ThreadPoolExecutor
         from msrest.authentication import BasicTokenAuthentication
 
-        all_subscriptions = []
         token_credential = BasicTokenAuthentication({'access_token': access_token})
         client = self._arm_client_factory(token_credential)
-        tenants = client.tenants.list()
-        for t in tenants:
-            tenant_id = t.tenant_id
-            temp_context = self._create_auth_context(tenant_id)
+        tenant_ids = [t.tenant_id for t in client.tenants.list()]
+
+        allowed_tenants = self._get_allowed_tenants()
+        if allowed_tenants is not None:
+            skipped = [t for t in tenant_ids if t.lower() not in allowed_tenants]
+            if skipped:
+                logger.info("Skipping tenants not in 'core.allowed_tenants': %s", ', '.join(skipped))
+            tenant_ids = [t for t in tenant_ids if t.lower() in allowed_tenants]
+
+        # every tenant needs its own token, so query them concurrently
+        max_workers = self.cli_ctx.config.getint('core', 'tenant_discovery_max_workers', fallback=10)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tenant_ids) or 1))) as executor:
+            tasks = [(t, executor.submit(self._find_in_tenant, t, resource)) for t in tenant_ids]
+
+        all_subscriptions, failures = [], []
+        for tenant_id, task in tasks:
             try:
-                temp_credentials = temp_context.acquire_token(resource, self.user_id, _CLIENT_ID)
+                all_subscriptions.extend(task.result())
             except adal.AdalError as ex:
                 # because user creds went through the 'common' tenant, the error here must be
                 # tenant specific, like the account was disabled. For such errors, we will continue
                 # with other tenants.
-                logger.warning("Failed to authenticate '%s' due to error '%s'", t, ex)
-                continue
-            subscriptions = self._find_using_specific_tenant(
-                tenant_id,
-                temp_credentials[_ACCESS_TOKEN])
-            all_subscriptions.extend(subscriptions)
+                failures.append((tenant_id, ex))
+        if failures:
+            logger.warning("Failed to authenticate to %s tenant(s), their subscriptions are not included:\n%s",
+                           len(failures), '\n'.join("    {}: {}".format(t, ex) for t, ex in failures))
 
+        # keep the tenants in the order the service returned them
+        self.tenants = [t for t in tenant_ids if t in self.tenants]
         return all_subscriptions
 
     def _find_using_specific_tenant(self, tenant, access_token):
@@ -0,0 +1,243 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Run many `az` commands inside a single CLI process.
+
+A batch script contains one command per line. Blank lines and lines starting with '#' are ignored and the
+leading 'az' of a command is optional. The result of a command can be captured into a variable with
+`name=$(az ...)` and referenced by later commands as `${name}` or `${name.<JMESPath>}`, e.g. `${vm.id}`.
+A line containing only `wait` is a barrier: no later command starts before every earlier one has finished.
+"""
+
+import copy
+import json
+import re
+import shlex
+import threading
+import timeit
+from collections import defaultdict
+
+import six
+
+from knack.events import EVENT_INVOKER_FILTER_RESULT
+from knack.log import get_logger
+from knack.util import CLIError
+
+logger = get_logger(__name__)
+
+BATCH_BARRIER = 'wait'
+
+STATUS_SUCCEEDED = 'Succeeded'
+STATUS_FAILED = 'Failed'
+STATUS_SKIPPED = 'Skipped'
+
+_CAPTURE_RE = re.compile(r'^(?P<name>[A-Za-z_]\w*)=\$\((?P<command>.*)\)$')
+_VARIABLE_RE = re.compile(r'\$\{(?P<name>[A-Za-z_]\w*)(?P<path>[^}]*)\}')
+
+
+class BatchCommand(object):  # pylint: disable=too-few-public-methods
+
+    def __init__(self, line_number, text, args, capture=None, dependencies=None):
+        self.line_number = line_number
+        self.text = text
+        self.args = args
+        self.capture = capture
+        # variable name -> the BatchCommand whose result it refers to
+        self.dependencies = dependencies or {}
+
+
+def _split_command(text):
+    import platform
+    args = shlex.split(text, posix=platform.system() != 'Windows')
+    if args and args[0] == 'az':
+        args = args[1:]
+    return args
+
+
+def parse_batch_script(lines):
+    """ Parse the lines of a batch script into BatchCommand objects and BATCH_BARRIER markers. """
+    items = []
+    producers = {}
+    for line_number, raw_line in enumerate(lines, 1):
+        line = raw_line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line == BATCH_BARRIER:
+            items.append(BATCH_BARRIER)
+            continue
+
+        capture = None
+        match = _CAPTURE_RE.match(line)
+        if match:
+            capture = match.group('name')
+            line = match.group('command').strip()
+
+        try:
+            args = _split_command(line)
+        except ValueError as ex:
+            raise CLIError('line {}: unable to parse command: {}'.format(line_number, ex))
+        if not args:
+            raise CLIError('line {}: no command specified.'.format(line_number))
+
+        dependencies = {}
+        for name in set(m.group('name') for m in _VARIABLE_RE.finditer(line)):
+            if name not in producers:
+                raise CLIError("line {}: variable '{}' is referenced before it is assigned.".format(
+                    line_number, name))
+            dependencies[name] = producers[name]
+
+        command = BatchCommand(line_number, line, args, capture=capture, dependencies=dependencies)
+        if capture:
+            producers[capture] = command
+        items.append(command)
+    return items
+
+
+def _render_value(value):
+    if isinstance(value, six.string_types):
+        return value
+    return json.dumps(value)
+
+
+def substitute_variables(arg, values):
+    """ Replace ${name} and ${name.<JMESPath>} references in a single argument with captured results. """
+    import jmespath
+
+    def _replace(match):
+        value = values[match.group('name')]
+        path = match.group('path')
+        if path:
+            value = jmespath.search(path.lstrip('.') if path.startswith('.') else '@' + path, value)
+        return _render_value(value)
+
+    return _VARIABLE_RE.sub(_replace, arg)
+
+
+class BatchRunner(object):
+    """Execute parsed batch commands with a single CLI instance.
+
+    Every command gets its own shallow copy of the CLI context with a private copy of `cli_ctx.data` and of
+    the per-invocation event handlers, so that arguments such as `--query` or `--subscription` of one command
+    never leak into another. Credentials and the loaded modules are shared by all commands.
+    """
+
+    def __init__(self, cli_ctx, max_parallel=1, stop_on_error=False):
+        if max_parallel < 1:
+            raise CLIError('--max-parallel must be greater than 0.')
+        self.cli_ctx = cli_ctx
+        self.max_parallel = max_parallel
+        self.stop_on_error = stop_on_error
+        self._initial_data = copy.deepcopy(cli_ctx.data)
+        self._initial_data['command'] = 'unknown'
+        self._initial_data['query_active'] = False
+        for key in ('subscription_id', 'safe_params', 'command_string'):
+            self._initial_data.pop(key, None)
+        self._results = {}
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def _create_context(self):
+        ctx = copy.copy(self.cli_ctx)
+        ctx.data = copy.deepcopy(self._initial_data)
+        handlers = defaultdict(list)
+        for event_name, funcs in self.cli_ctx._event_handlers.items():  # pylint: disable=protected-access
+            # query filters register themselves for the lifetime of one invocation only
+            if event_name != EVENT_INVOKER_FILTER_RESULT:
+                handlers[event_name] = list(funcs)
+        ctx._event_handlers = handlers  # pylint: disable=protected-access
+        ctx.invocation = ctx.invocation_cls(cli_ctx=ctx,
+                                            parser_cls=ctx.parser_cls,
+                                            commands_loader_cls=ctx.commands_loader_cls,
+                                            help_cls=ctx.help_cls)
+        return ctx
+
+    def _invoke(self, args):
+        """ Run a single command. Returns a tuple of (exit_code, result, error). """
+        ctx = self._create_context()
+        try:
+            cmd_result = ctx.invocation.execute(args)
+            return cmd_result.exit_code or 0, cmd_result.result, cmd_result.error
+        except SystemExit as ex:
+            # raised by argparse on invalid arguments or help requests
+            code = ex.code if isinstance(ex.code, int) else 1
+            return code, None, 'command exited with code {}'.format(code) if code else None
+        except Exception as ex:  # pylint: disable=broad-except
+            return self.cli_ctx.exception_handler(ex), None, ex
+
+    def _run_command(self, command):
+        with self._lock:
+            skip = self.stop_on_error and self._failed
+            failed_deps = [name for name, dep in command.dependencies.items()
+                           if self._results[dep.line_number]['status'] != STATUS_SUCCEEDED]
+            values = {name: self._results[dep.line_number]['result']
+                      for name, dep in command.dependencies.items()}
+
+        record = {
+            'line': command.line_number,
+            'command': command.text,
+            'status': STATUS_SKIPPED,
+            'exitCode': None,
+            'result': None,
+            'error': None,
+            'elapsedSeconds': 0.0
+        }
+        if skip:
+            record['error'] = 'skipped because an earlier command failed'
+        elif failed_deps:
+            record['error'] = 'skipped because variable(s) {} could not be resolved'.format(
+                ', '.join(sorted(failed_deps)))
+        else:
+            args = [substitute_variables(arg, values) for arg in command.args]
+            logger.info("Running line %s: az %s", command.line_number, ' '.join(args))
+            start_time = timeit.default_timer()
+            exit_code, result, error = self._invoke(args)
+            record['elapsedSeconds'] = round(timeit.default_timer() - start_time, 3)
+            record['exitCode'] = exit_code
+            record['result'] = result
+            record['status'] = STATUS_FAILED if exit_code else STATUS_SUCCEEDED
+            record['error'] = str(error) if error and exit_code else None
+
+        with self._lock:
+            self._results[command.line_number] = record
+            if record['status'] == STATUS_FAILED:
+                self._failed = True
+        return record
+
+    def _run_after(self, futures, command):
+        for future in futures:
+            future.result()
+        return self._run_command(command)
+
+    def run(self, items):
+        """ Run the parsed batch items and return one report entry per command in script order. """
+        commands = [i for i in items if i != BATCH_BARRIER]
+        if self.max_parallel == 1:
+            for command in commands:
+                self._run_command(command)
+        else:
+            from concurrent.futures import ThreadPoolExecutor, wait
+            futures = {}
+            with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+                for item in items:
+                    if item == BATCH_BARRIER:
+                        wait(list(futures.values()))
+                        continue
+                    # the executor starts tasks in submission order, so a command only ever waits on
+                    # commands that are already running or finished.
+                    deps = [futures[d.line_number] for d in item.dependencies.values()]
+                    futures[item.line_number] = executor.submit(self._run_after, deps, item)
+                for future in futures.values():
+                    future.result()
+        return [self._results[c.line_number] for c in commands]
+
+
+def run_batch_script(cli_ctx, lines, max_parallel=1, stop_on_error=False):
+    items = parse_batch_script(lines)
+    report = BatchRunner(cli_ctx, max_parallel=max_parallel, stop_on_error=stop_on_error).run(items)
+    failed = [r for r in report if r['status'] != STATUS_SUCCEEDED]
+    if failed:
+        logger.warning('%s of %s commands did not succeed: line(s) %s', len(failed), len(report),
+                       ', '.join(str(r['line']) for r in failed))
+    return report
@@ -317,7 +317,18 @@ class AzCliCommandInvoker(CommandInvoker):
             jobs.append((expanded_arg, cmd_copy))
 
         ids = getattr(parsed_args, '_ids', None) or [None] * len(jobs)
-        if self.cli_ctx.config.getboolean('core', 'disable_concurrent_ids', False) or len(ids) < 2:
+        exit_code = 0
+        serial = self.cli_ctx.config.getboolean('core', 'disable_concurrent_ids', False)
+        bulk_handler = cmd.command_kwargs.get('bulk_handler')
+        summary = None
+        if bulk_handler and len(jobs) > 1 and not serial:
+            # one handler call covers every resource, e.g. a wait command polling all of them on one schedule. The
+            # handler returns None to have the resources handled one by one.
+            summary = bulk_handler([self._filter_params(expanded_arg) for expanded_arg, _ in jobs], ids)
+        if summary is not None:
+            results, exceptions = [summary], []
+            exit_code = 1 if summary.get('failed') or summary.get('timedOut') else 0
+        elif serial or len(ids) < 2:
             results, exceptions = self._run_jobs_serially(jobs, ids)
         else:
             results, exceptions = self._run_jobs_concurrently(jobs, ids)
@@ -341,6 +352,7 @@ class AzCliCommandInvoker(CommandInvoker):
 
         return CommandResultItem(
             event_data['result'],
+            exit_code=exit_code,
             table_transformer=self.commands_loader.command_table[parsed_args.command].table_transformer,
             is_query_active=self.data['query_active'])
 
@@ -590,6 +590,7 @@ def _cli_wait_command(context, name, getter_op, custom_command=False, **kwargs):
         raise ValueError("Getter operation must be a string. Got '{}'".format(type(getter_op)))
 
     factory = _get_client_factory(name, custom_command=custom_command, **kwargs)
+    _NOT_FOUND = object()
 
     def generic_wait_arguments_loader():
         cmd_args = get_arguments_loader(context, getter_op, operation_group=kwargs.get('operation_group'))
@@ -625,6 +626,11 @@ def _cli_wait_command(context, name, getter_op, custom_command=False, **kwargs):
                  "provisioningState!='InProgress', "
                  "instanceView.statuses[?code=='PowerState/running']"
         )
+        cmd_args['bulk'] = CLICommandArgument(
+            'bulk', options_list=['--bulk'], action='store_true', arg_group=group_name,
+            help='With --ids, poll every resource on one schedule, report the progress of each and return a summary '
+                 'of the resources which succeeded, failed or timed out.'
+        )
         return [(k, v) for k, v in cmd_args.items()]
 
     def get_provisioning_state(instance):
@@ -636,11 +642,19 @@ def _cli_wait_command(context, name, getter_op, custom_command=False, **kwargs):
                 provisioning_state = getattr(properties, 'provisioning_state', None)
         return provisioning_state
 
-    def handler(args):
-        from azure.cli.core.commands.client_factory import resolve_client_arg_name
-        from msrest.exceptions import ClientException
-        import time
+    def pop_wait_conditions(args):
+        conditions = {k: args.pop(k) for k in ['timeout', 'interval', 'created', 'deleted', 'updated', 'exists',
+                                               'custom']}
+        conditions['bulk'] = args.pop('bulk', False)
+        if not any(conditions[k] for k in ['created', 'updated', 'deleted', 'exists', 'custom']):
+            raise CLIError(
+                "incorrect usage: --created | --updated | --deleted | --exists | --custom JMESPATH")
+        return conditions
 
+    def prepare_getter_args(args, clients=None):
+        """ Resolves the CLI context and the client of the getter. Clients of factories which do not take the
+        arguments are reused per subscription. """
+        from azure.cli.core.commands.client_factory import resolve_client_arg_name
         context_copy = copy.copy(context)
         getter_args = dict(extract_args_from_signature(context.get_op_handler(
             getter_op, operation_group=kwargs.get('operation_group')), excluded_params=EXCLUDED_NON_CLIENT_PARAMS))
@@ -648,64 +662,173 @@ def _cli_wait_command(context, name, getter_op, custom_command=False, **kwargs):
         context_copy.cli_ctx = cmd.cli_ctx
         operations_tmpl = _get_operations_tmpl(cmd, custom_command=custom_command)
         client_arg_name = resolve_client_arg_name(operations_tmpl, kwargs)
-        try:
-            client = factory(context_copy.cli_ctx) if factory else None
-        except TypeError:
-            client = factory(context_copy.cli_ctx, args) if factory else None
+        subscription = cmd.cli_ctx.data.get('subscription_id')
+        if clients is not None and subscription in clients:
+            client = clients[subscription]
+        else:
+            try:
+                client = factory(context_copy.cli_ctx) if factory else None
+            except TypeError:
+                # the client is built for these arguments only
+                client = factory(context_copy.cli_ctx, args) if factory else None
+            else:
+                if clients is not None:
+                    clients[subscription] = client
         if client and (client_arg_name in getter_args):
             args[client_arg_name] = client
+        return context_copy.cli_ctx, client, client_arg_name
 
-        getter = context_copy.get_op_handler(getter_op, operation_group=kwargs.get('operation_group'))
-
-        timeout = args.pop('timeout')
-        interval = args.pop('interval')
-        wait_for_created = args.pop('created')
-        wait_for_deleted = args.pop('deleted')
-        wait_for_updated = args.pop('updated')
-        wait_for_exists = args.pop('exists')
-        custom_condition = args.pop('custom')
-        if not any([wait_for_created, wait_for_updated, wait_for_deleted,
-                    wait_for_exists, custom_condition]):
-            raise CLIError(
-                "incorrect usage: --created | --updated | --deleted | --exists | --custom JMESPATH")
+    def is_not_found_expected(conditions):
+        return any(conditions[k] for k in ['deleted', 'created', 'exists', 'custom'])
 
-        progress_indicator = context_copy.cli_ctx.get_progress_controller()
-        progress_indicator.begin()
-        for _ in range(0, timeout, interval):
+    def get_instance(getter, args, conditions):
+        from msrest.exceptions import ClientException
+        try:
+            return getter(**args)
+        except ClientException as ex:
+            if getattr(ex, 'status_code', None) == 404 and is_not_found_expected(conditions):
+                return _NOT_FOUND
+            raise
+
+    def is_wait_done(instance, conditions):
+        if instance is _NOT_FOUND:
+            return conditions['deleted']
+        if conditions['exists']:
+            return True
+        provisioning_state = get_provisioning_state(instance)
+        # until we have any needs to wait for 'Failed', let us bail out on this
+        if provisioning_state == 'Failed':
+            raise CLIError('The operation failed')
+        return bool(((conditions['created'] or conditions['updated']) and provisioning_state == 'Succeeded') or
+                    conditions['custom'] and bool(verify_property(instance, conditions['custom'])))
+
+    def get_list_operation():
+        """ Returns the operation listing the resources of a resource group next to the getter, if any, and the
+        name of the getter parameter identifying a resource. """
+        if custom_command:
+            return None, None
+
+        def _required_params(op):
+            return [n for n, a in extract_args_from_signature(op, excluded_params=EXCLUDED_PARAMS)
+                    if a.type.settings.get('required')]
+
+        getter_params = _required_params(context.get_op_handler(
+            getter_op, operation_group=kwargs.get('operation_group')))
+        name_params = [p for p in getter_params if p != 'resource_group_name']
+        if 'resource_group_name' not in getter_params or len(name_params) != 1:
+            return None, None
+        for list_name in ['list_by_resource_group', 'list']:
             try:
-                progress_indicator.add(message='Waiting')
-                instance = getter(**args)
-                if wait_for_exists:
-                    progress_indicator.end()
-                    return None
-                provisioning_state = get_provisioning_state(instance)
-                # until we have any needs to wait for 'Failed', let us bail out on this
-                if provisioning_state == 'Failed':
-                    progress_indicator.stop()
-                    raise CLIError('The operation failed')
-                if ((wait_for_created or wait_for_updated) and provisioning_state == 'Succeeded') or \
-                        custom_condition and bool(verify_property(instance, custom_condition)):
-                    progress_indicator.end()
-                    return None
-            except ClientException as ex:
-                progress_indicator.stop()
-                if getattr(ex, 'status_code', None) == 404:
-                    if wait_for_deleted:
-                        return None
-                    if not any([wait_for_created, wait_for_exists, custom_condition]):
-                        raise
-                else:
-                    raise
-            except Exception:  # pylint: disable=broad-except
-                progress_indicator.stop()
-                raise
-
-            time.sleep(interval)
+                list_op = context.get_op_handler('{}.{}'.format(getter_op.rsplit('.', 1)[0], list_name),
+                                                 operation_group=kwargs.get('operation_group'))
+            except ValueError:
+                continue
+            if _required_params(list_op) == ['resource_group_name']:
+                return list_op, name_params[0]
+        return None, None
 
-        progress_indicator.end()
-        return CLIError('Wait operation timed-out after {} seconds'.format(timeout))
+    def handler(args):
+        from azure.cli.core.wait import wait_until, is_transient_error
+
+        conditions = pop_wait_conditions(args)
+        cli_ctx, _, _ = prepare_getter_args(args)
+        getter = context.get_op_handler(getter_op, operation_group=kwargs.get('operation_group'))
+        wait_until(lambda: get_instance(getter, args, conditions), lambda i: is_wait_done(i, conditions),
+                   interval=conditions['interval'], timeout=conditions['timeout'], retry_on=is_transient_error,
+                   cli_ctx=cli_ctx,
+                   timeout_message='Wait operation timed-out after {} seconds'.format(conditions['timeout']))
+        return None
+
+    def bulk_handler(args_list, ids):
+        """ Waits for many resources on one schedule with --bulk. Resources of a resource group are fetched with a
+        single list request where the getter has a list counterpart and the condition does not need a full GET.
+        Without --bulk, returns None to have the resources waited for one by one. """
+        from concurrent.futures import ThreadPoolExecutor
+        from azure.cli.core.wait import (wait_all, is_transient_error, WAIT_SUCCEEDED, WAIT_FAILED,
+                                         WAIT_TIMED_OUT)
+
+        if not args_list[0].get('bulk'):
+            return None
+        conditions = pop_wait_conditions(args_list[0])
+        for args in args_list[1:]:
+            pop_wait_conditions(args)
+        clients = {}
+        targets = OrderedDict()
+        cli_ctx = None
+        for index, args in enumerate(args_list):
+            cli_ctx, client, _ = prepare_getter_args(args, clients)
+            targets[ids[index] or str(index)] = (args, client, cli_ctx.data.get('subscription_id'))
+        getter = context.get_op_handler(getter_op, operation_group=kwargs.get('operation_group'))
+        list_op, name_param = get_list_operation() if not conditions['custom'] else (None, None)
+
+        def _check(target):
+            try:
+                return is_wait_done(get_instance(getter, targets[target][0], conditions), conditions)
+            except Exception as ex:  # pylint: disable=broad-except
+                return ex
 
-    context._cli_command(name, handler=handler, argument_loader=generic_wait_arguments_loader, **kwargs)  # pylint: disable=protected-access
+        def _check_group(group_targets):
+            args, client, _ = targets[group_targets[0]]
+            try:
+                instances = {i.name.lower(): i for i in list_op(client, resource_group_name=args[
+                    'resource_group_name'])}
+            except Exception as ex:  # pylint: disable=broad-except
+                return {t: ex for t in group_targets}
+            outcomes = {}
+            for target in group_targets:
+                try:
+                    name = str(targets[target][0][name_param])
+                    instance = instances.get(name.lower(), _NOT_FOUND)
+                    if instance is _NOT_FOUND and not is_not_found_expected(conditions):
+                        # as the GET of a single resource fails with a 404
+                        raise CLIError("Resource '{}' not found.".format(name))
+                    outcomes[target] = is_wait_done(instance, conditions)
+                except Exception as ex:  # pylint: disable=broad-except
+                    outcomes[target] = ex
+            return outcomes
+
+        def _poll(pending):
+            groups = OrderedDict()
+            singles = []
+            for target in pending:
+                args, _, subscription = targets[target]
+                if list_op and args.get('resource_group_name'):
+                    groups.setdefault((subscription, args['resource_group_name'].lower()), []).append(target)
+                else:
+                    singles.append(target)
+            # a list request only pays off for more than one resource
+            singles.extend(t for g in [g for g in groups.values() if len(g) == 1] for t in g)
+            groups = [g for g in groups.values() if len(g) > 1]
+            outcomes = {}
+            with ThreadPoolExecutor(max_workers=10) as executor:
+                group_futures = [executor.submit(_check_group, g) for g in groups]
+                single_futures = {t: executor.submit(_check, t) for t in singles}
+                for future in group_futures:
+                    outcomes.update(future.result())
+                for target, future in single_futures.items():
+                    outcomes[target] = future.result()
+            return outcomes
+
+        counts = {'settled': 0}
+
+        def _report(target, status, error):
+            counts['settled'] += 1
+            if status == WAIT_FAILED:
+                logger.warning("%s: %s (%d/%d)", target, error, counts['settled'], len(targets))
+            else:
+                logger.warning("%s: %s (%d/%d)", target, status, counts['settled'], len(targets))
+
+        results = wait_all(list(targets), _poll, interval=conditions['interval'], timeout=conditions['timeout'],
+                           retry_on=is_transient_error, cli_ctx=cli_ctx, on_result=_report)
+        return OrderedDict([
+            ('succeeded', [t for t, (status, _) in results.items() if status == WAIT_SUCCEEDED]),
+            ('failed', [OrderedDict([('id', t), ('error', str(error))])
+                        for t, (status, error) in results.items() if status == WAIT_FAILED]),
+            ('timedOut', [t for t, (status, _) in results.items() if status == WAIT_TIMED_OUT])
+        ])
+
+    context._cli_command(name, handler=handler, argument_loader=generic_wait_arguments_loader,  # pylint: disable=protected-access
+                         bulk_handler=bulk_handler, **kwargs)
 
 
 def _cli_show_command(context, name, getter_op, custom_command=False, **kwargs):
@@ -21,6 +21,9 @@ DEV_EXTENSION_SOURCES = _DEV_EXTENSION_SOURCES.split(',') if _DEV_EXTENSION_SOUR
 
 EXTENSIONS_MOD_PREFIX = 'azext_'
 
+# Metadata of all installed wheel extensions, so that starting the CLI doesn't have to walk every dist-info
+WHEEL_METADATA_CACHE_PATH = os.path.join(GLOBAL_CONFIG_DIR, 'extensionMetadataCache.json')
+
 WHL_METADATA_FILENAME = 'metadata.json'
 EGG_INFO_METADATA_FILE_NAME = 'PKG-INFO'  # used for dev packages
 AZEXT_METADATA_FILENAME = 'azext_metadata.json'
@@ -108,12 +111,15 @@ class WheelExtension(Extension):
         return self.metadata.get('version')
 
     def get_metadata(self):
-        from wheel.install import WHEEL_INFO_RE
-        from glob import glob
         if not extension_exists(self.name):
             return None
+        return WheelExtension.read_metadata(self.name, self.path or get_extension_path(self.name))
+
+    @staticmethod
+    def read_metadata(ext_name, ext_dir):
+        from wheel.install import WHEEL_INFO_RE
+        from glob import glob
         metadata = {}
-        ext_dir = self.path or get_extension_path(self.name)
         info_dirs = glob(os.path.join(ext_dir, '*.*-info'))
         azext_metadata = WheelExtension.get_azext_metadata(ext_dir)
         if azext_metadata:
@@ -124,7 +130,7 @@ class WheelExtension(Extension):
             if parsed_dist_info_dir:
                 parsed_dist_info_dir = parsed_dist_info_dir.groupdict().get('name')
 
-            if os.path.split(parsed_dist_info_dir)[-1] == self.name.replace('-', '_'):
+            if os.path.split(parsed_dist_info_dir)[-1] == ext_name.replace('-', '_'):
                 whl_metadata_filepath = os.path.join(dist_info_dirname, WHL_METADATA_FILENAME)
                 if os.path.isfile(whl_metadata_filepath):
                     with open(whl_metadata_filepath) as f:
@@ -147,17 +153,91 @@ class WheelExtension(Extension):
         """
         Returns all wheel-based extensions.
         """
+        if not os.path.isdir(EXTENSIONS_DIR):
+            return []
+        dir_entries = sorted(os.listdir(EXTENSIONS_DIR))
+        cached = _load_wheel_metadata_cache(dir_entries)
+        if cached is not None:
+            exts = []
+            for ext_name, entry in cached.items():
+                ext = WheelExtension(ext_name, entry['path'])
+                ext._metadata = entry['metadata']  # pylint: disable=protected-access
+                exts.append(ext)
+            return exts
+
+        exts = WheelExtension._find_all(dir_entries)
+        _save_wheel_metadata_cache(exts, dir_entries)
+        return exts
+
+    @staticmethod
+    def _find_all(dir_entries):
         from glob import glob
         exts = []
-        if os.path.isdir(EXTENSIONS_DIR):
-            for ext_name in os.listdir(EXTENSIONS_DIR):
-                ext_path = os.path.join(EXTENSIONS_DIR, ext_name)
-                pattern = os.path.join(ext_path, '*.*-info')
-                if os.path.isdir(ext_path) and glob(pattern):
-                    exts.append(WheelExtension(ext_name, ext_path))
+        for ext_name in dir_entries:
+            ext_path = os.path.join(EXTENSIONS_DIR, ext_name)
+            pattern = os.path.join(ext_path, '*.*-info')
+            if os.path.isdir(ext_path) and glob(pattern):
+                exts.append(WheelExtension(ext_name, ext_path))
         return exts
 
 
+def _get_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _load_wheel_metadata_cache(dir_entries):
+    """
+    Returns a dict of extension name to {'path', 'mtime', 'metadata'} if the cache is still valid for the
+    current content of the extensions directory, otherwise None.
+    """
+    try:
+        with open(WHEEL_METADATA_CACHE_PATH) as f:
+            cache = json.load(f)
+    except (OSError, IOError, ValueError):
+        return None
+    if cache.get('extensionsDir') != EXTENSIONS_DIR or cache.get('entries') != dir_entries or \
+            cache.get('mtime') != _get_mtime(EXTENSIONS_DIR):
+        return None
+    extensions = cache.get('extensions', {})
+    for entry in extensions.values():
+        if entry.get('mtime') != _get_mtime(entry.get('path')):
+            return None
+    return extensions
+
+
+def _save_wheel_metadata_cache(exts, dir_entries):
+    extensions = {}
+    for ext in exts:
+        try:
+            metadata = WheelExtension.read_metadata(ext.name, ext.path)
+        except Exception:  # pylint: disable=broad-except
+            logger.debug("Unable to get extension metadata: %s", traceback.format_exc())
+            return
+        ext._metadata = metadata  # pylint: disable=protected-access
+        extensions[ext.name] = {'path': ext.path, 'mtime': _get_mtime(ext.path), 'metadata': metadata}
+    cache = {
+        'extensionsDir': EXTENSIONS_DIR,
+        'mtime': _get_mtime(EXTENSIONS_DIR),
+        'entries': dir_entries,
+        'extensions': extensions
+    }
+    try:
+        from azure.cli.core.util import write_json_atomic
+        write_json_atomic(WHEEL_METADATA_CACHE_PATH, cache)
+    except (OSError, IOError):
+        logger.debug("Unable to save the extension metadata cache: %s", traceback.format_exc())
+
+
+def invalidate_wheel_metadata_cache():
+    try:
+        os.remove(WHEEL_METADATA_CACHE_PATH)
+    except OSError:
+        pass
+
+
 class DevExtension(Extension):
     def __init__(self, name, path):
         super(DevExtension, self).__init__(name, 'dev', path)
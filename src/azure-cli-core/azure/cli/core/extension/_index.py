@@ -2,37 +2,132 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
+import hashlib
+import json
+import os
+import time
+
 import requests
 
 from knack.log import get_logger
 from knack.util import CLIError
 
+from azure.cli.core._config import GLOBAL_CONFIG_DIR
+
 logger = get_logger(__name__)
 
 DEFAULT_INDEX_URL = "https://aka.ms/azure-cli-extension-index-v1"
 
+# The index is cached per URL and revalidated with ETag/Last-Modified once it is older than the max age.
+INDEX_CACHE_DIR = os.path.join(GLOBAL_CONFIG_DIR, 'extensionIndexCache')
+DEFAULT_INDEX_MAX_AGE = 3600
+
 ERR_TMPL_EXT_INDEX = 'Unable to get extension index.\n'
 ERR_TMPL_NON_200 = '{}Server returned status code {{}} for {{}}'.format(ERR_TMPL_EXT_INDEX)
 ERR_TMPL_NO_NETWORK = '{}Please ensure you have network connection. Error detail: {{}}'.format(ERR_TMPL_EXT_INDEX)
 ERR_TMPL_BAD_JSON = '{}Response body does not contain valid json. Error detail: {{}}'.format(ERR_TMPL_EXT_INDEX)
+ERR_TMPL_BAD_FILE = '{}Unable to read index file {{}}. Error detail: {{}}'.format(ERR_TMPL_EXT_INDEX)
 
 ERR_UNABLE_TO_GET_EXTENSIONS = 'Unable to get extensions from index. Improper index format.'
 TRIES = 3
 
 
+def _get_config(option, fallback=None):
+    from azure.cli.core.extension import az_config
+    return az_config.get('extension', option, fallback)
+
+
+def _get_index_max_age():
+    try:
+        return int(_get_config('index_max_age', DEFAULT_INDEX_MAX_AGE))
+    except ValueError:
+        return DEFAULT_INDEX_MAX_AGE
+
+
+def _get_local_index_path(index_url):
+    """ An index can be mirrored to a local file for hosts without internet access. """
+    if index_url.startswith('file://'):
+        from six.moves.urllib.request import url2pathname  # pylint: disable=import-error
+        return url2pathname(index_url[len('file://'):])
+    path = os.path.expanduser(index_url)
+    return path if os.path.isfile(path) else None
+
+
+def _get_cache_path(index_url):
+    return os.path.join(INDEX_CACHE_DIR, hashlib.sha256(index_url.encode('utf-8')).hexdigest() + '.json')
+
+
+def _load_cached_index(index_url):
+    try:
+        with open(_get_cache_path(index_url)) as f:
+            cache = json.load(f)
+        return cache if cache.get('url') == index_url and 'index' in cache else None
+    except (OSError, IOError, ValueError):
+        return None
+
+
+def _save_cached_index(index_url, index, etag=None, last_modified=None):
+    from azure.cli.core.util import write_json_atomic
+    try:
+        write_json_atomic(_get_cache_path(index_url), {
+            'url': index_url,
+            'etag': etag,
+            'lastModified': last_modified,
+            'retrieved': time.time(),
+            'index': index
+        })
+    except (OSError, IOError, TypeError, ValueError) as ex:
+        logger.debug("Unable to cache the extension index: %s", ex)
+
+
+def _get_revalidation_headers(cache):
+    headers = {}
+    if cache.get('etag'):
+        headers['If-None-Match'] = cache['etag']
+    if cache.get('lastModified'):
+        headers['If-Modified-Since'] = cache['lastModified']
+    return headers
+
+
 # pylint: disable=inconsistent-return-statements
 def get_index(index_url=None):
     from azure.cli.core.util import should_disable_connection_verify
-    index_url = index_url or DEFAULT_INDEX_URL
+    index_url = index_url or _get_config('index_url') or DEFAULT_INDEX_URL
+
+    local_path = _get_local_index_path(index_url)
+    if local_path:
+        try:
+            with open(local_path) as f:
+                return json.load(f)
+        except (OSError, IOError, ValueError) as err:
+            raise CLIError(ERR_TMPL_BAD_FILE.format(local_path, str(err)))
+
+    cache = _load_cached_index(index_url)
+    if cache and time.time() - cache.get('retrieved', 0) < _get_index_max_age():
+        logger.debug("Using the cached extension index for %s", index_url)
+        return cache['index']
+    headers = _get_revalidation_headers(cache) if cache else {}
 
     for try_number in range(TRIES):
         try:
-            response = requests.get(index_url, verify=(not should_disable_connection_verify()))
+            response = requests.get(index_url, headers=headers, verify=(not should_disable_connection_verify()))
+            if response.status_code == 304 and cache:
+                logger.debug("The cached extension index for %s is up-to-date", index_url)
+                _save_cached_index(index_url, cache['index'], cache.get('etag'), cache.get('lastModified'))
+                return cache['index']
             if response.status_code == 200:
-                return response.json()
+                index = response.json()
+                _save_cached_index(index_url, index, response.headers.get('ETag'),
+                                   response.headers.get('Last-Modified'))
+                return index
             msg = ERR_TMPL_NON_200.format(response.status_code, index_url)
             raise CLIError(msg)
         except (requests.exceptions.ConnectionError, requests.exceptions.HTTPError) as err:
+            if cache:
+                logger.warning("Unable to refresh the extension index, using the copy retrieved on %s.",
+                               time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(cache.get('retrieved', 0))))
+                logger.debug(err)
+                return cache['index']
             msg = ERR_TMPL_NO_NETWORK.format(str(err))
             raise CLIError(msg)
         except ValueError as err:
@@ -40,7 +135,6 @@ def get_index(index_url=None):
             if try_number == TRIES - 1:
                 msg = ERR_TMPL_BAD_JSON.format(str(err))
                 raise CLIError(msg)
-            import time
             time.sleep(0.5)
             continue
 
@@ -22,7 +22,8 @@ from knack.log import get_logger
 from azure.cli.core.util import CLIError, reload_module
 from azure.cli.core.extension import (extension_exists, get_extension_path, get_extensions, get_extension_modname,
                                       get_extension, ext_compat_with_cli, EXT_METADATA_ISPREVIEW,
-                                      WheelExtension, DevExtension, ExtensionNotInstalledException)
+                                      WheelExtension, DevExtension, ExtensionNotInstalledException,
+                                      invalidate_wheel_metadata_cache)
 from azure.cli.core.telemetry import set_extension_management_detail
 
 from ._homebrew_patch import HomebrewPipPatch
@@ -167,6 +168,7 @@ def _add_whl_ext(source, ext_sha256=None, pip_extra_index_urls=None, pip_proxy=N
     dst = os.path.join(extension_path, whl_filename)
     shutil.copyfile(ext_file, dst)
     logger.debug('Saved the whl to %s', dst)
+    invalidate_wheel_metadata_cache()
 
 
 def is_valid_sha256sum(a_file, expected_sum):
@@ -233,6 +235,7 @@ def remove_extension(extension_name):
         # We call this just before we remove the extension so we can get the metadata before it is gone
         _augment_telemetry_with_ext_info(extension_name)
         shutil.rmtree(get_extension_path(extension_name), onerror=log_err)
+        invalidate_wheel_metadata_cache()
     except ExtensionNotInstalledException as e:
         raise CLIError(e)
 
@@ -269,6 +272,7 @@ def update_extension(extension_name, index_url=None, pip_extra_index_urls=None,
         shutil.copytree(extension_path, backup_dir)
         # Remove current version of the extension
         shutil.rmtree(extension_path)
+        invalidate_wheel_metadata_cache()
         # Install newer version
         try:
             _add_whl_ext(download_url, ext_sha256=ext_sha256,
@@ -282,6 +286,7 @@ def update_extension(extension_name, index_url=None, pip_extra_index_urls=None,
             logger.error(err)
             logger.debug('Copying %s to %s', backup_dir, extension_path)
             shutil.copytree(backup_dir, extension_path)
+            invalidate_wheel_metadata_cache()
             raise CLIError('Failed to update. Rolled {} back to {}.'.format(extension_name, cur_version))
     except ExtensionNotInstalledException as e:
         raise CLIError(e)
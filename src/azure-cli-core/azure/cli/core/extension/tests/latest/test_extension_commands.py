@@ -40,10 +40,16 @@ class TestExtensionCommands(unittest.TestCase):
         self.ext_dir = tempfile.mkdtemp()
         self.patcher = mock.patch('azure.cli.core.extension.EXTENSIONS_DIR', self.ext_dir)
         self.patcher.start()
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_patcher = mock.patch('azure.cli.core.extension.WHEEL_METADATA_CACHE_PATH',
+                                        os.path.join(self.cache_dir, 'extensionMetadataCache.json'))
+        self.cache_patcher.start()
 
     def tearDown(self):
         self.patcher.stop()
+        self.cache_patcher.stop()
         shutil.rmtree(self.ext_dir, ignore_errors=True)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
 
     def test_no_extensions_dir(self):
         shutil.rmtree(self.ext_dir)
@@ -76,6 +82,20 @@ class TestExtensionCommands(unittest.TestCase):
         num_exts = len(list_extensions())
         self.assertEqual(num_exts, 0)
 
+    def test_list_extensions_uses_metadata_cache(self):
+        from azure.cli.core.extension import WheelExtension
+        add_extension(MY_EXT_SOURCE)
+        self.assertEqual(list_extensions()[0][OUT_KEY_VERSION], '0.0.3+dev')
+        with mock.patch.object(WheelExtension, 'read_metadata', side_effect=AssertionError('cache not used')):
+            actual = list_extensions()
+        self.assertEqual(actual[0][OUT_KEY_NAME], MY_EXT_NAME)
+        self.assertEqual(actual[0][OUT_KEY_VERSION], '0.0.3+dev')
+        # installing another extension invalidates the cache
+        add_extension(MY_SECOND_EXT_SOURCE_DASHES)
+        self.assertEqual(sorted(e[OUT_KEY_NAME] for e in list_extensions()), [MY_SECOND_EXT_NAME_DASHES, MY_EXT_NAME])
+        remove_extension(MY_EXT_NAME)
+        self.assertEqual([e[OUT_KEY_NAME] for e in list_extensions()], [MY_SECOND_EXT_NAME_DASHES])
+
     def test_add_extension_twice(self):
         add_extension(MY_EXT_SOURCE)
         num_exts = len(list_extensions())
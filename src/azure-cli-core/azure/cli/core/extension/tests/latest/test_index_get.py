@@ -2,7 +2,10 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
+import json
 import os
+import shutil
+import tempfile
 import mock
 import unittest
 from requests.exceptions import ConnectionError, HTTPError
@@ -13,9 +16,10 @@ from azure.cli.core.extension._index import (get_index, get_index_extensions, DE
 
 
 class MockResponse(object):
-    def __init__(self, status_code, data):
+    def __init__(self, status_code, data, headers=None):
         self.status_code = status_code
         self.data = data
+        self.headers = headers or {}
 
     def json(self):
         if isinstance(self.data, Exception):
@@ -24,7 +28,7 @@ class MockResponse(object):
 
 
 def mock_index_get_generator(index_url, index_data):
-    def mock_req_get(url, verify):
+    def mock_req_get(url, verify, headers=None):
         if url == index_url:
             return MockResponse(200, index_data)
         return MockResponse(404, None)
@@ -33,6 +37,15 @@ def mock_index_get_generator(index_url, index_data):
 
 class TestExtensionIndexGet(unittest.TestCase):
 
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.patcher = mock.patch('azure.cli.core.extension._index.INDEX_CACHE_DIR', self.cache_dir)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
     def test_get_index(self):
         with mock.patch('requests.get', side_effect=mock_index_get_generator(DEFAULT_INDEX_URL, {})):
             self.assertEqual(get_index(), {})
@@ -65,7 +78,8 @@ class TestExtensionIndexGet(unittest.TestCase):
                 get_index()
             self.assertEqual(str(err.exception), ERR_TMPL_BAD_JSON.format(err_msg))
 
-    def test_get_index_extensions(self):
+    @mock.patch('azure.cli.core.extension._index._get_index_max_age', return_value=0)
+    def test_get_index_extensions(self, _):
         data = {'extensions': {}}
         with mock.patch('requests.get', side_effect=mock_index_get_generator(DEFAULT_INDEX_URL, data)):
             self.assertEqual(get_index_extensions(), {})
@@ -85,6 +99,35 @@ class TestExtensionIndexGet(unittest.TestCase):
                 self.assertEqual(get_index_extensions(), None)
                 logger_mock.assert_called_once_with(ERR_UNABLE_TO_GET_EXTENSIONS)
 
+    def test_get_index_uses_cache_within_max_age(self):
+        data = {'extensions': {'myext': []}}
+        with mock.patch('requests.get', side_effect=mock_index_get_generator(DEFAULT_INDEX_URL, data)) as req_mock:
+            self.assertEqual(get_index(), data)
+            self.assertEqual(get_index(), data)
+            self.assertEqual(req_mock.call_count, 1)
+
+    def test_get_index_revalidates_expired_cache(self):
+        data = {'extensions': {'myext': []}}
+        responses = [MockResponse(200, data, {'ETag': '"v1"'}), MockResponse(304, None)]
+        with mock.patch('azure.cli.core.extension._index._get_index_max_age', return_value=0):
+            with mock.patch('requests.get', side_effect=responses) as req_mock:
+                self.assertEqual(get_index(), data)
+                self.assertEqual(get_index(), data)
+            self.assertEqual(req_mock.call_args[1]['headers'], {'If-None-Match': '"v1"'})
+
+            # the stale copy is used when the index can't be refreshed
+            with mock.patch('requests.get', side_effect=ConnectionError('no network')):
+                self.assertEqual(get_index(), data)
+
+    def test_get_index_from_local_file(self):
+        data = {'extensions': {'myext': []}}
+        index_file = os.path.join(self.cache_dir, 'index.json')
+        with open(index_file, 'w') as f:
+            json.dump(data, f)
+        with mock.patch('requests.get', side_effect=AssertionError('requests.get should not be called')):
+            self.assertEqual(get_index(index_url=index_file), data)
+            self.assertEqual(get_index_extensions(index_url='file://' + index_file), data['extensions'])
+
 
 if __name__ == '__main__':
     unittest.main()
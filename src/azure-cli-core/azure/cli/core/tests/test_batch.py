@@ -0,0 +1,127 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import unittest
+
+import mock
+
+from knack.util import CLIError
+
+from azure.cli.core.batch import (BatchRunner, parse_batch_script, substitute_variables, BATCH_BARRIER,
+                                  STATUS_SUCCEEDED, STATUS_FAILED, STATUS_SKIPPED)
+from azure.cli.core.mock import DummyCli
+
+
+class TestBatchScriptParsing(unittest.TestCase):
+
+    def test_parse_batch_script(self):
+        items = parse_batch_script([
+            '# create the group',
+            'rg=$(az group create -n myrg -l westus)',
+            '',
+            'wait',
+            'az vm list -g ${rg.name} --query "[].id"',
+            'network vnet list'
+        ])
+        self.assertEqual(len(items), 4)
+        self.assertEqual(items[0].capture, 'rg')
+        self.assertEqual(items[0].args, ['group', 'create', '-n', 'myrg', '-l', 'westus'])
+        self.assertEqual(items[1], BATCH_BARRIER)
+        self.assertEqual(items[2].line_number, 5)
+        self.assertEqual(items[2].args, ['vm', 'list', '-g', '${rg.name}', '--query', '[].id'])
+        self.assertIs(items[2].dependencies['rg'], items[0])
+        self.assertEqual(items[3].dependencies, {})
+
+    def test_parse_batch_script_unknown_variable(self):
+        with self.assertRaisesRegexp(CLIError, "line 1: variable 'rg'"):
+            parse_batch_script(['vm list -g ${rg}'])
+
+    def test_substitute_variables(self):
+        values = {'rg': {'name': 'myrg', 'tags': ['a', 'b']}, 'name': 'vm1'}
+        self.assertEqual(substitute_variables('${rg.name}', values), 'myrg')
+        self.assertEqual(substitute_variables('${name}-nic', values), 'vm1-nic')
+        self.assertEqual(substitute_variables('${rg.tags[1]}', values), 'b')
+        self.assertEqual(substitute_variables('${rg.tags}', values), '["a", "b"]')
+        self.assertEqual(substitute_variables('plain', values), 'plain')
+
+
+class TestBatchRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.cli_ctx = DummyCli()
+
+    def _runner(self, outcomes, **kwargs):
+        runner = BatchRunner(self.cli_ctx, **kwargs)
+        calls = []
+
+        def _invoke(args):
+            calls.append(args)
+            return outcomes[args[0]]
+
+        runner._invoke = _invoke
+        return runner, calls
+
+    def test_batch_run_passes_captured_values(self):
+        runner, calls = self._runner({
+            'create': (0, {'id': '/subscriptions/sub/resourceGroups/myrg'}, None),
+            'show': (0, 'done', None)
+        })
+        report = runner.run(parse_batch_script(['rg=$(create)', 'show --ids ${rg.id}']))
+        self.assertEqual(calls[1], ['show', '--ids', '/subscriptions/sub/resourceGroups/myrg'])
+        self.assertEqual([r['status'] for r in report], [STATUS_SUCCEEDED, STATUS_SUCCEEDED])
+        self.assertEqual(report[1]['result'], 'done')
+        self.assertEqual(report[1]['exitCode'], 0)
+
+    def test_batch_run_skips_dependents_of_failures(self):
+        runner, calls = self._runner({
+            'create': (1, None, CLIError('boom')),
+            'show': (0, 'done', None),
+            'list': (0, [], None)
+        })
+        report = runner.run(parse_batch_script(['rg=$(create)', 'show --ids ${rg.id}', 'list']))
+        self.assertEqual([r['status'] for r in report], [STATUS_FAILED, STATUS_SKIPPED, STATUS_SUCCEEDED])
+        self.assertEqual(report[0]['error'], 'boom')
+        self.assertEqual(len(calls), 2)
+
+    def test_batch_run_stop_on_error(self):
+        runner, calls = self._runner({'fail': (2, None, CLIError('boom')), 'list': (0, [], None)},
+                                     stop_on_error=True)
+        report = runner.run(parse_batch_script(['fail', 'list']))
+        self.assertEqual([r['status'] for r in report], [STATUS_FAILED, STATUS_SKIPPED])
+        self.assertEqual(report[0]['exitCode'], 2)
+        self.assertEqual(len(calls), 1)
+
+    def test_batch_run_parallel_respects_barrier(self):
+        runner = BatchRunner(self.cli_ctx, max_parallel=4)
+        finished = []
+        lock = threading.Lock()
+
+        def _invoke(args):
+            with lock:
+                if args[0] == 'after':
+                    # every command before the barrier must have completed
+                    self.assertEqual(sorted(finished), ['one', 'two'])
+                finished.append(args[0])
+            return 0, args[0], None
+
+        runner._invoke = _invoke
+        report = runner.run(parse_batch_script(['one', 'two', 'wait', 'after']))
+        self.assertEqual([r['result'] for r in report], ['one', 'two', 'after'])
+
+    def test_batch_run_isolates_invocation_data(self):
+        self.cli_ctx.data['subscription_id'] = 'outer'
+        runner = BatchRunner(self.cli_ctx)
+        contexts = [runner._create_context(), runner._create_context()]
+        contexts[0].data['subscription_id'] = 'inner'
+        contexts[0].register_event('custom.event', mock.MagicMock())
+        self.assertNotIn('subscription_id', contexts[1].data)
+        self.assertNotIn('custom.event', contexts[1]._event_handlers)
+        self.assertEqual(self.cli_ctx.data['subscription_id'], 'outer')
+        self.assertIsNot(contexts[0].invocation, contexts[1].invocation)
+
+
+if __name__ == '__main__':
+    unittest.main()
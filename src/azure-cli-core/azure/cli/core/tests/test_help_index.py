@@ -0,0 +1,113 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+import mock
+
+from knack.help_files import helps
+
+from azure.cli.core._help_index import (HelpIndex, build_help_index, get_help_index, get_help_index_path,
+                                        get_help_yaml_files)
+
+HELP_YAML = """
+version: 1
+content:
+- command:
+    name: test alpha
+    summary: Alpha from yaml.
+    arguments:
+    - name: --arg1 -a
+      summary: Arg1 from yaml.
+"""
+
+
+class TestHelpIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.module_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.module_dir, 'help.yaml'), 'w') as f:
+            f.write(HELP_YAML)
+
+        self.cli_ctx = mock.MagicMock()
+        self.cli_ctx.config.config_dir = self.config_dir
+        self.cli_ctx.config.getboolean.return_value = True
+        self.cli_ctx.invocation.commands_loader.cmd_to_loader_map = {'test alpha': [mock.MagicMock()]}
+
+        patches = [
+            mock.patch.dict(helps, {'test': 'type: group\nshort-summary: Test group.',
+                                    'test alpha': 'type: command\nshort-summary: Alpha.'}, clear=True),
+            mock.patch('inspect.getfile', return_value=os.path.join(self.module_dir, '__init__.py')),
+            mock.patch('azure.cli.core.extension.get_extensions', return_value=[])
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir)
+        shutil.rmtree(self.module_dir)
+
+    def test_help_index_build_and_load(self):
+        build_help_index(self.cli_ctx)
+
+        index = HelpIndex.load(get_help_index_path(self.cli_ctx))
+        self.assertEqual(index.get('test')['help'], {'type': 'group', 'short-summary': 'Test group.'})
+        self.assertEqual(list(index._entries), ['test'])
+
+        entry = index.get('test alpha')
+        self.assertEqual(entry['help']['short-summary'], 'Alpha.')
+        self.assertEqual(entry['yaml']['summary'], 'Alpha from yaml.')
+        self.assertEqual(entry['yaml']['version'], 1)
+        self.assertIsNone(index.get('test beta'))
+
+    def test_help_index_rebuilt_when_out_of_date(self):
+        index = get_help_index(self.cli_ctx)
+        self.assertEqual(index.get('test alpha')['help']['short-summary'], 'Alpha.')
+
+        # an up-to-date index is read from the file
+        with mock.patch('azure.cli.core._help_index.compile_help_entries') as compile_mock:
+            index = get_help_index(self.cli_ctx)
+            self.assertFalse(compile_mock.called)
+        self.assertEqual(index.path, get_help_index_path(self.cli_ctx))
+
+        helps['test alpha'] = 'type: command\nshort-summary: Alpha, updated.'
+        self.assertEqual(get_help_index(self.cli_ctx).get('test alpha')['help']['short-summary'],
+                         'Alpha, updated.')
+
+        ext = mock.MagicMock()
+        ext.name, ext.version = 'myext', '0.1.0'
+        with mock.patch('azure.cli.core.extension.get_extensions', return_value=[ext]):
+            with mock.patch('azure.cli.core._help_index.compile_help_entries', return_value={}) as compile_mock:
+                get_help_index(self.cli_ctx)
+                self.assertTrue(compile_mock.called)
+
+    def test_help_index_not_built_for_invalid_help_yaml(self):
+        with open(os.path.join(self.module_dir, 'help.yaml'), 'w') as f:
+            f.write('content: [')
+        self.assertEqual(get_help_yaml_files(self.cli_ctx.invocation.commands_loader),
+                         [os.path.join(self.module_dir, 'help.yaml')])
+        self.assertIsNone(get_help_index(self.cli_ctx))
+        self.assertFalse(os.path.exists(get_help_index_path(self.cli_ctx)))
+
+    def test_help_index_turned_off(self):
+        self.cli_ctx.config.getboolean.return_value = False
+        self.assertIsNone(get_help_index(self.cli_ctx))
+
+    def test_help_index_replaced_file(self):
+        build_help_index(self.cli_ctx)
+        index = HelpIndex.load(get_help_index_path(self.cli_ctx))
+
+        helps['test'] = 'type: group\nshort-summary: A test group with a longer summary.'
+        build_help_index(self.cli_ctx)
+        # entries at offsets of the old file are not used
+        self.assertIsNone(index.get('test alpha'))
+
+
+if __name__ == '__main__':
+    unittest.main()
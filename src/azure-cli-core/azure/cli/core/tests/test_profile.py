@@ -1104,6 +1104,42 @@ class TestProfile(unittest.TestCase):
         self.assertEqual([], subs)
         mock_logger.warning.assert_called_once_with(mock.ANY, mock.ANY, mock.ANY)
 
+    @mock.patch('azure.cli.core._profile.logger', autospec=True)
+    def test_find_subscriptions_thru_common_tenant_with_failed_tenants(self, mock_logger):
+        cli = DummyCli()
+        tenants = ['tenant{}'.format(i) for i in range(5)]
+
+        def _create_auth_context(_, tenant, _2):
+            context = mock.MagicMock()
+            if tenant == 'tenant3':
+                context.acquire_token.side_effect = AdalError('Account is disabled')
+            else:
+                context.acquire_token.return_value = dict(self.token_entry1, accessToken=tenant)
+            return context
+
+        def _create_arm_client(credentials):
+            client = mock.MagicMock()
+            client.tenants.list.return_value = [TenantStub(t) for t in tenants]
+            token = credentials.token['access_token']
+            client.subscriptions.list.return_value = [SubscriptionStub('subscriptions/' + token, token,
+                                                                       self.state1, token)]
+            return client
+
+        finder = SubscriptionFinder(cli, _create_auth_context, None, _create_arm_client)
+        # action
+        subs = finder._find_using_common_tenant(self.raw_token1, 'https://management.core.windows.net/')
+
+        # assert
+        self.assertEqual([s.display_name for s in subs], ['tenant0', 'tenant1', 'tenant2', 'tenant4'])
+        self.assertEqual(finder.tenants, ['tenant0', 'tenant1', 'tenant2', 'tenant4'])
+        mock_logger.warning.assert_called_once_with(mock.ANY, 1, mock.ANY)
+
+        # restrict discovery to the configured tenants
+        finder.tenants = []
+        with mock.patch.dict('os.environ', {'AZURE_CORE_ALLOWED_TENANTS': 'TENANT1, tenant4'}):
+            subs = finder._find_using_common_tenant(self.raw_token1, 'https://management.core.windows.net/')
+        self.assertEqual([s.display_name for s in subs], ['tenant1', 'tenant4'])
+
     @mock.patch('adal.AuthenticationContext', autospec=True)
     def test_find_subscriptions_from_particular_tenent(self, mock_auth_context):
         def just_raise(ex):
@@ -0,0 +1,265 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import threading
+import unittest
+
+import mock
+from six import StringIO
+
+from azure.cli.core import AzCommandsLoader
+from azure.cli.core.mock import DummyCli
+from azure.cli.core.wait import (wait_until, wait_all, get_backoff_delays, get_retry_after, is_transient_error,
+                                 FakeClock, WaitTimeoutError, WAIT_SUCCEEDED, WAIT_FAILED, WAIT_TIMED_OUT)
+
+
+class _ThrottledError(Exception):
+    def __init__(self, retry_after):
+        super(_ThrottledError, self).__init__('Too many requests')
+        self.response = mock.MagicMock(status_code=429, headers={'Retry-After': retry_after})
+
+
+class TestWait(unittest.TestCase):
+
+    def test_wait_until_backs_off_up_to_max_interval(self):
+        clock = FakeClock()
+        states = iter(['Creating'] * 5 + ['Succeeded'])
+        result = wait_until(lambda: next(states), lambda s: s == 'Succeeded', interval=2, backoff=2, max_interval=10,
+                            clock=clock)
+        self.assertEqual(result, 'Succeeded')
+        self.assertEqual(clock.sleeps, [2, 4, 8, 10, 10])
+
+    def test_wait_until_timeout_caps_last_sleep(self):
+        clock = FakeClock()
+        with self.assertRaises(WaitTimeoutError) as ex:
+            wait_until(lambda: 'Creating', lambda s: s == 'Succeeded', interval=30, timeout=75,
+                       timeout_message='too slow', clock=clock)
+        self.assertEqual(str(ex.exception), 'too slow')
+        self.assertEqual(ex.exception.last_result, 'Creating')
+        self.assertEqual(clock.sleeps, [30, 30, 15])
+
+    def test_wait_until_retries_transient_errors_honoring_retry_after(self):
+        clock = FakeClock()
+        results = [_ThrottledError('7'), 'Creating', 'Succeeded']
+
+        def _poll():
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        self.assertEqual(wait_until(_poll, lambda s: s == 'Succeeded', interval=1, retry_on=is_transient_error,
+                                    clock=clock), 'Succeeded')
+        self.assertEqual(clock.sleeps, [7, 1])
+
+        with self.assertRaises(ValueError):
+            wait_until(mock.MagicMock(side_effect=ValueError('bad')), retry_on=is_transient_error, clock=clock)
+
+    def test_wait_until_reports_progress_and_cancels(self):
+        cli_ctx = mock.MagicMock()
+        progress = cli_ctx.get_progress_controller.return_value
+        cancel = threading.Event()
+        polls = []
+
+        def _poll():
+            polls.append(1)
+            if len(polls) == 2:
+                cancel.set()
+            return False
+
+        with self.assertRaises(KeyboardInterrupt):
+            wait_until(_poll, cli_ctx=cli_ctx, cancel_event=cancel, clock=FakeClock())
+        self.assertEqual(len(polls), 2)
+        progress.begin.assert_called_once_with()
+        progress.stop.assert_called_once_with()
+        self.assertFalse(progress.end.called)
+
+    def test_backoff_delays_with_jitter(self):
+        rand = mock.MagicMock()
+        rand.uniform.return_value = 0.1
+        delays = get_backoff_delays(10, max_interval=30, backoff=3, jitter=0.1, rand=rand)
+        self.assertEqual([round(next(delays), 6) for _ in range(3)], [11, 33, 33])
+        rand.uniform.assert_called_with(-0.1, 0.1)
+
+    def test_get_retry_after(self):
+        self.assertEqual(get_retry_after(mock.MagicMock(headers={'Retry-After': '3'})), 3)
+        self.assertEqual(get_retry_after(mock.MagicMock(headers={'Retry-After': 'Thu, 01 Jan 1970 00:00:00 GMT'})), 0)
+        self.assertIsNone(get_retry_after(mock.MagicMock(headers={})))
+        self.assertIsNone(get_retry_after('Succeeded'))
+
+
+class _Resource(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, name, provisioning_state):
+        self.name = name
+        self.provisioning_state = provisioning_state
+
+
+class _FakeOperations(object):
+    """ Resources move from 'Creating' to their final state after a number of polls. """
+
+    def get(client, resource_group_name, resource_name):  # pylint: disable=no-self-argument
+        client.calls.append(('get', resource_group_name, resource_name))
+        return client.poll(resource_group_name, resource_name)
+
+    def list(client, resource_group_name):  # pylint: disable=no-self-argument
+        client.calls.append(('list', resource_group_name))
+        return [client.poll(resource_group_name, n) for (rg, n) in sorted(client.states) if rg == resource_group_name]
+
+
+class _FakeClient(object):
+    def __init__(self, states):
+        # (resource group, name) -> list of provisioning states returned by successive polls
+        self.states = states
+        self.calls = []
+
+    def poll(self, resource_group_name, resource_name):
+        states = self.states[(resource_group_name, resource_name)]
+        return _Resource(resource_name, states.pop(0) if len(states) > 1 else states[0])
+
+
+class TestWaitAll(unittest.TestCase):
+
+    def test_wait_all_settles_each_target(self):
+        clock = FakeClock()
+        polls = []
+
+        def _poll(pending):
+            polls.append(list(pending))
+            round_number = len(polls)
+            return {'a': round_number >= 2, 'b': ValueError('gone'), 'c': False,
+                    'd': _ThrottledError('20') if round_number == 1 else True}
+
+        settled = []
+        results = wait_all(['a', 'b', 'c', 'd'], _poll, interval=5, timeout=30, clock=clock,
+                           retry_on=is_transient_error, on_result=lambda t, s, e: settled.append((t, s)))
+        self.assertEqual(polls[0], ['a', 'b', 'c', 'd'])
+        self.assertEqual(polls[1], ['a', 'c', 'd'])
+        self.assertEqual(polls[2], ['c'])
+        self.assertEqual(clock.sleeps, [20, 5, 5])
+        self.assertEqual(settled[:3], [('b', WAIT_FAILED), ('a', WAIT_SUCCEEDED), ('d', WAIT_SUCCEEDED)])
+        self.assertEqual(results['c'], (WAIT_TIMED_OUT, None))
+        self.assertEqual(list(results), ['a', 'b', 'c', 'd'])
+
+    def test_bulk_wait_command_coalesces_list_calls(self):
+        client = _FakeClient({
+            ('rg1', 'vm1'): ['Creating', 'Succeeded'],
+            ('rg1', 'vm2'): ['Creating', 'Creating', 'Failed'],
+            ('rg1', 'other'): ['Succeeded'],
+            ('rg2', 'vm3'): ['Creating', 'Succeeded'],
+        })
+
+        class _WaitTestCommandsLoader(AzCommandsLoader):
+            def load_command_table(self, args):
+                from azure.cli.core.commands import CliCommandType
+                test_type = CliCommandType(operations_tmpl='azure.cli.core.tests.test_wait#_FakeOperations.{}',
+                                           client_factory=lambda cli_ctx: client)
+                with self.command_group('fake', test_type) as g:
+                    g.wait_command('wait')
+                return self.command_table
+
+        cli = DummyCli(commands_loader_cls=_WaitTestCommandsLoader)
+        loader = _WaitTestCommandsLoader(cli)
+        command = loader.load_command_table(None)['fake wait']
+        targets = [('rg1', 'vm1'), ('rg1', 'vm2'), ('rg2', 'vm3')]
+        args_list = [{'cmd': command, 'resource_group_name': rg, 'resource_name': n, 'timeout': 60, 'interval': 0,
+                      'created': True, 'updated': False, 'deleted': False, 'exists': False, 'custom': None,
+                      'bulk': True} for rg, n in targets]
+        ids = ['/subscriptions/sub/resourceGroups/{}/providers/Fake/resources/{}'.format(rg, n) for rg, n in targets]
+
+        with mock.patch('time.sleep'):
+            summary = command.command_kwargs['bulk_handler'](args_list, ids)
+
+        self.assertEqual(summary['succeeded'], [ids[0], ids[2]])
+        self.assertEqual(summary['failed'], [{'id': ids[1], 'error': 'The operation failed'}])
+        self.assertEqual(summary['timedOut'], [])
+        # rg1 is listed while both of its resources are pending; single resources are fetched with a GET
+        self.assertEqual([c for c in client.calls if c[0] == 'list'], [('list', 'rg1')] * 2)
+        self.assertEqual([c for c in client.calls if c[0] == 'get'],
+                         [('get', 'rg2', 'vm3')] * 2 + [('get', 'rg1', 'vm2')])
+
+    def _invoke_bulk_wait(self, client, disable_concurrent_ids=False, args=None, client_factory=None):
+        class _WaitTestCommandsLoader(AzCommandsLoader):
+            def load_command_table(self, args):
+                from azure.cli.core.commands import CliCommandType
+                test_type = CliCommandType(operations_tmpl='azure.cli.core.tests.test_wait#_FakeOperations.{}',
+                                           client_factory=client_factory or (lambda cli_ctx: client))
+                with self.command_group('fake', test_type) as g:
+                    g.wait_command('wait')
+                return self.command_table
+
+            def load_arguments(self, command):
+                with self.argument_context('fake wait') as c:
+                    c.argument('resource_group_name', id_part='resource_group')
+                    c.argument('resource_name', id_part='name')
+                super(_WaitTestCommandsLoader, self).load_arguments(command)
+
+        cli = DummyCli(commands_loader_cls=_WaitTestCommandsLoader)
+        getboolean = cli.config.getboolean
+
+        def _getboolean(section, option, fallback=False):
+            if option == 'disable_concurrent_ids':
+                return disable_concurrent_ids
+            return getboolean(section, option, fallback)
+
+        ids = ['/subscriptions/00000000-0000-0000-0000-000000000000/resourceGroups/rg1/providers/Fake/resources/'
+               '{}'.format(n) for n in ['vm1', 'vm2']]
+        out_file = StringIO()
+        with mock.patch('time.sleep'), mock.patch.object(cli.config, 'getboolean', side_effect=_getboolean):
+            exit_code = cli.invoke(['fake', 'wait', '--ids'] + ids + (args or ['--created', '--bulk']) +
+                                   ['--interval', '0', '--timeout', '60'], out_file=out_file)
+        return exit_code, out_file.getvalue()
+
+    def test_bulk_wait_command_honors_disable_concurrent_ids(self):
+        def _client():
+            return _FakeClient({('rg1', 'vm1'): ['Creating', 'Succeeded'], ('rg1', 'vm2'): ['Succeeded']})
+
+        client = _client()
+        self.assertEqual(self._invoke_bulk_wait(client)[0], 0)
+        self.assertIn(('list', 'rg1'), client.calls)
+
+        # without concurrency the ids are waited for one after another, each with a GET
+        client = _client()
+        self.assertEqual(self._invoke_bulk_wait(client, disable_concurrent_ids=True)[0], 0)
+        self.assertEqual(client.calls, [('get', 'rg1', 'vm1')] * 2 + [('get', 'rg1', 'vm2')])
+
+    def test_bulk_wait_command_is_opt_in(self):
+        client = _FakeClient({('rg1', 'vm1'): ['Creating', 'Succeeded'], ('rg1', 'vm2'): ['Succeeded']})
+        exit_code, output = self._invoke_bulk_wait(client, args=['--created'])
+        # each resource is fetched on its own and the output is that of the single waits, as before
+        self.assertEqual((exit_code, json.loads(output)), (0, [None, None]))
+        self.assertEqual(sorted(set(client.calls)), [('get', 'rg1', 'vm1'), ('get', 'rg1', 'vm2')])
+
+        client = _FakeClient({('rg1', 'vm1'): ['Creating', 'Succeeded'], ('rg1', 'vm2'): ['Succeeded']})
+        exit_code, output = self._invoke_bulk_wait(client)
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(json.loads(output)['succeeded'], [
+            '/subscriptions/00000000-0000-0000-0000-000000000000/resourceGroups/rg1/providers/Fake/resources/'
+            '{}'.format(n) for n in ['vm1', 'vm2']])
+
+    def test_bulk_wait_command_fails_fast_on_missing_resource(self):
+        client = _FakeClient({('rg1', 'vm1'): ['Succeeded'], ('rg1', 'other'): ['Succeeded']})
+        exit_code, output = self._invoke_bulk_wait(client, args=['--updated', '--bulk'])
+        self.assertEqual(exit_code, 1)
+        failed = json.loads(output)['failed']
+        self.assertEqual(len(failed), 1)
+        self.assertTrue(failed[0]['id'].endswith('/vm2'))
+        self.assertEqual(failed[0]['error'], "Resource 'vm2' not found.")
+        self.assertEqual(client.calls, [('list', 'rg1')])
+
+    def test_bulk_wait_command_does_not_share_clients_built_for_arguments(self):
+        built = []
+
+        def _factory(cli_ctx, args):
+            client = _FakeClient({('rg1', 'vm1'): ['Succeeded'], ('rg1', 'vm2'): ['Succeeded']})
+            built.append((args['resource_name'], client))
+            return client
+
+        self.assertEqual(self._invoke_bulk_wait(None, client_factory=_factory)[0], 0)
+        self.assertEqual(sorted(name for name, _ in built), ['vm1', 'vm2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -188,6 +188,36 @@ def get_file_json(file_path, throw_on_empty=True, preserve_order=False):
     return shell_safe_json_parse(content, preserve_order)
 
 
+def write_json_atomic(file_path, data):
+    """ Write data as JSON to a temporary file next to file_path and move it into place, so that concurrent
+    readers see either the old or the new content but never a partially written file. """
+    write_file_atomic(file_path, json.dumps(data))
+
+
+def write_file_atomic(file_path, content):
+    """ Write content, bytes or text, to a temporary file next to file_path and move it into place. """
+    import os
+    import tempfile
+    dir_name, file_name = os.path.split(os.path.abspath(file_path))
+    if not os.path.isdir(dir_name):
+        os.makedirs(dir_name)
+    fd, temp_path = tempfile.mkstemp(dir=dir_name, prefix='.' + file_name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb' if isinstance(content, bytes) else 'w') as f:
+            f.write(content)
+        replace = getattr(os, 'replace', None)
+        if replace:
+            replace(temp_path, file_path)
+        else:  # Python 2.7
+            if os.path.exists(file_path) and sys.platform == 'win32':
+                os.remove(file_path)
+            os.rename(temp_path, file_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
 def read_file_content(file_path, allow_binary=False):
     from codecs import open as codecs_open
     # Note, always put 'utf-8-sig' first, so that BOM in WinOS won't cause trouble.
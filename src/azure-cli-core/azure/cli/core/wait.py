@@ -0,0 +1,268 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Polling a resource until it reaches a desired state.
+
+`wait_until` calls a poll function until a condition on its result holds. The delay between polls starts at
+`interval` and grows by `backoff` up to `max_interval`, with optional random jitter so that many clients do not
+poll in lockstep. A `Retry-After` header on the polled response, or on a retried exception, takes precedence
+over the computed delay. Time is read through a clock object so that unit tests can use `FakeClock`.
+"""
+
+import random
+import time
+
+import six
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+logger = get_logger(__name__)
+
+DEFAULT_WAIT_INTERVAL = 5
+
+
+class WaitTimeoutError(CLIError):
+
+    def __init__(self, message, last_result=None):
+        super(WaitTimeoutError, self).__init__(message)
+        self.last_result = last_result
+
+
+class Clock(object):
+
+    @staticmethod
+    def time():
+        return time.time()
+
+    @staticmethod
+    def sleep(seconds, cancel_event=None):
+        """ Sleeps for the given number of seconds. Returns False if the cancel event was set first. """
+        if cancel_event is None:
+            time.sleep(seconds)
+            return True
+        return not cancel_event.wait(seconds)
+
+
+class FakeClock(object):
+    """ A clock for unit tests. Sleeping returns immediately and advances the time. """
+
+    def __init__(self, start=0.0):
+        self.now = start
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds, cancel_event=None):
+        if cancel_event is not None and cancel_event.is_set():
+            return False
+        self.sleeps.append(seconds)
+        self.now += seconds
+        return True
+
+
+def get_retry_after(obj):
+    """ Returns the number of seconds requested by a Retry-After header of a response or an exception carrying
+    one, or None. """
+    response = getattr(obj, 'response', None)
+    headers = getattr(obj, 'headers', None) or getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        value = headers.get('Retry-After')
+    except AttributeError:
+        return None
+    if not value or not isinstance(value, six.string_types + (int, float)):
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_tz, mktime_tz
+        return max(mktime_tz(parsedate_tz(value)) - time.time(), 0.0)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def is_transient_error(ex):
+    """ Whether a failed poll is worth repeating: throttling, server errors and connection failures. """
+    import requests
+    if isinstance(ex, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    status_code = getattr(ex, 'status_code', None) or getattr(getattr(ex, 'response', None), 'status_code', None)
+    return status_code == 429 or (status_code is not None and status_code >= 500)
+
+
+def get_backoff_delays(interval, max_interval=None, backoff=1.0, jitter=0.0, rand=None):
+    """ Yields the delays between polls: interval * backoff ** n, capped at max_interval, with each delay
+    randomized by up to +/- jitter (a fraction of the delay). """
+    rand = rand or random
+    delay = float(interval)
+    cap = float(max_interval) if max_interval else None
+    while True:
+        value = min(delay, cap) if cap else delay
+        if jitter:
+            value *= 1 + rand.uniform(-jitter, jitter)
+        yield max(value, 0.0)
+        delay *= backoff
+
+
+def _format_timeout(seconds):
+    return '{:g} seconds'.format(seconds)
+
+
+# pylint: disable=too-many-locals
+def wait_until(poll, condition=None, interval=DEFAULT_WAIT_INTERVAL, max_interval=None, backoff=1.0, jitter=0.0,
+               timeout=None, retry_on=None, cli_ctx=None, message='Waiting', timeout_message=None,
+               cancel_event=None, clock=None):
+    """ Calls poll() until condition(result) is true and returns that result.
+
+    :param poll: callable without arguments returning the current state.
+    :param condition: callable deciding whether a state is final. Defaults to the truthiness of the state.
+    :param interval: initial delay in seconds between polls.
+    :param max_interval: upper bound of the delay. Defaults to no bound.
+    :param backoff: factor the delay grows by after every poll.
+    :param jitter: fraction by which each delay is randomized.
+    :param timeout: seconds after which WaitTimeoutError is raised. None or a value <= 0 waits indefinitely.
+    :param retry_on: callable deciding whether an exception raised by poll() should be treated as a state that
+        is not final yet, e.g. `is_transient_error`. Other exceptions propagate.
+    :param cli_ctx: reports progress through the progress controller of this CLI context.
+    :param message: the progress message.
+    :param timeout_message: the message of the WaitTimeoutError.
+    :param cancel_event: a threading.Event; setting it stops the wait with a KeyboardInterrupt.
+    :param clock: the clock used to read the time and sleep.
+    """
+    condition = condition or bool
+    clock = clock or Clock()
+    deadline = clock.time() + timeout if timeout and timeout > 0 else None
+    delays = get_backoff_delays(interval, max_interval, backoff, jitter)
+    progress = cli_ctx.get_progress_controller() if cli_ctx else None
+    if progress:
+        progress.begin()
+
+    result = None
+    try:
+        while True:
+            if progress:
+                progress.add(message=message)
+            retry_after = None
+            try:
+                result = poll()
+            except Exception as ex:  # pylint: disable=broad-except
+                if not (retry_on and retry_on(ex)):
+                    raise
+                logger.info("%s: retrying after error: %s", message, ex)
+                retry_after = get_retry_after(ex)
+            else:
+                if condition(result):
+                    if progress:
+                        progress.end()
+                    return result
+                retry_after = get_retry_after(result)
+
+            delay = next(delays) if retry_after is None else retry_after
+            if deadline is not None:
+                remaining = deadline - clock.time()
+                if remaining <= 0:
+                    raise WaitTimeoutError(
+                        timeout_message or 'Wait operation timed-out after {}'.format(_format_timeout(timeout)),
+                        last_result=result)
+                delay = min(delay, remaining)
+            logger.debug("%s: polling again in %.1f seconds", message, delay)
+            if not clock.sleep(delay, cancel_event):
+                raise KeyboardInterrupt()
+    except KeyboardInterrupt:
+        if progress:
+            progress.stop()
+        logger.warning("%s: cancelled.", message)
+        raise
+    except Exception:
+        if progress:
+            progress.stop()
+        raise
+
+
+WAIT_SUCCEEDED = 'Succeeded'
+WAIT_FAILED = 'Failed'
+WAIT_TIMED_OUT = 'TimedOut'
+
+
+# pylint: disable=too-many-locals, too-many-branches
+def wait_all(targets, poll, interval=DEFAULT_WAIT_INTERVAL, max_interval=None, backoff=1.0, jitter=0.0,
+             timeout=None, retry_on=None, cli_ctx=None, message='Waiting', on_result=None, cancel_event=None,
+             clock=None):
+    """ Polls many targets on a single schedule until each one is done, has failed or the deadline passes.
+
+    :param targets: hashable identifiers of the things to wait for.
+    :param poll: callable taking the list of targets still pending and returning a dict that maps a target to
+        True when it is done, False when it is not, or the exception raised while checking it. Targets missing
+        from the dict stay pending.
+    :param on_result: callable invoked with (target, status, error) as soon as a target is settled.
+
+    The remaining parameters are the same as for `wait_until`. Returns an OrderedDict mapping each target to a
+    (status, error) pair, where status is one of WAIT_SUCCEEDED, WAIT_FAILED and WAIT_TIMED_OUT.
+    """
+    from collections import OrderedDict
+    clock = clock or Clock()
+    deadline = clock.time() + timeout if timeout and timeout > 0 else None
+    delays = get_backoff_delays(interval, max_interval, backoff, jitter)
+    results = OrderedDict((t, None) for t in targets)
+    progress = cli_ctx.get_progress_controller(det=True) if cli_ctx else None
+    if progress:
+        progress.begin()
+
+    def _settle(target, status, error=None):
+        results[target] = (status, error)
+        if on_result:
+            on_result(target, status, error)
+
+    try:
+        while True:
+            pending = [t for t, r in results.items() if r is None]
+            if progress:
+                progress.add(message=message, value=len(results) - len(pending), total_val=len(results))
+            retry_after = None
+            for target, outcome in poll(pending).items():
+                if results.get(target, True) is not None:
+                    continue
+                if isinstance(outcome, Exception):
+                    if retry_on and retry_on(outcome):
+                        logger.info("%s: retrying '%s' after error: %s", message, target, outcome)
+                        requested = get_retry_after(outcome)
+                        if requested is not None:
+                            retry_after = max(retry_after or 0, requested)
+                        continue
+                    _settle(target, WAIT_FAILED, outcome)
+                elif outcome:
+                    _settle(target, WAIT_SUCCEEDED)
+            if all(r is not None for r in results.values()):
+                break
+
+            delay = next(delays) if retry_after is None else retry_after
+            if deadline is not None:
+                remaining = deadline - clock.time()
+                if remaining <= 0:
+                    for target in [t for t, r in results.items() if r is None]:
+                        _settle(target, WAIT_TIMED_OUT)
+                    break
+                delay = min(delay, remaining)
+            logger.debug("%s: polling %d target(s) again in %.1f seconds", message,
+                         len([r for r in results.values() if r is None]), delay)
+            if not clock.sleep(delay, cancel_event):
+                raise KeyboardInterrupt()
+    except KeyboardInterrupt:
+        if progress:
+            progress.stop()
+        logger.warning("%s: cancelled.", message)
+        raise
+    except Exception:
+        if progress:
+            progress.stop()
+        raise
+    if progress:
+        progress.end()
+    return results
@@ -5,7 +5,7 @@
 
 import sys
 import os
-import subprocess
+import time
 
 try:
     import portalocker
@@ -27,91 +27,146 @@ from azure.cli.telemetry.util import save_payload
 
 
 def _start(config_dir):
-    from azure.cli.telemetry.components.telemetry_logging import get_logger
-
-    logger = get_logger('process')
+    import atexit
+    import threading
+    from azure.cli.telemetry.const import UPLOAD_TIME_LIMIT
 
-    args = [sys.executable, os.path.realpath(__file__), config_dir]
-    logger.info('Creating upload process: "%s %s %s"', *args)
+    # the thread is a daemon, so that the process doesn't wait for the upload beyond its deadline
+    deadline = time.time() + UPLOAD_TIME_LIMIT.total_seconds()
+    thread = threading.Thread(target=upload, args=(config_dir, deadline), name='telemetry_upload')
+    thread.daemon = True
+    thread.start()
+    atexit.register(_wait_for_upload, thread, deadline)
 
-    kwargs = {'args': args}
-    if os.name == 'nt':
-        # Windows process creation flag to not reuse the parent console.
-        # Without this, the background service is associated with the
-        # starting process's console, and will block that console from
-        # exiting until the background service self-terminates.
-        # Elsewhere, fork just does the right thing.
-        kwargs['creationflags'] = 0x00000010  # CREATE_NEW_CONSOLE
-
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        startupinfo.wShowWindow = subprocess.SW_HIDE
-        kwargs['startupinfo'] = startupinfo
-    else:
-        if sys.version_info >= (3, 3):
-            kwargs['stdin'] = subprocess.DEVNULL
-            kwargs['stdout'] = subprocess.DEVNULL
-            kwargs['stderr'] = subprocess.STDOUT
 
-    subprocess.Popen(**kwargs)
-    logger.info('Return from creating process')
+def _wait_for_upload(thread, deadline):
+    thread.join(max(deadline - time.time(), 0))
 
 
 def save(config_dir, payload):
-    from azure.cli.telemetry.util import should_upload
+    from azure.cli.telemetry.util import claim_upload, is_agent_running
     from azure.cli.telemetry.components.telemetry_logging import get_logger
 
-    if save_payload(config_dir, payload) and should_upload(config_dir):
+    if save_payload(config_dir, payload) and not is_agent_running(config_dir) and claim_upload(config_dir):
         logger = get_logger('main')
-        logger.info('Begin creating telemetry upload process.')
+        logger.info('Begin uploading telemetry in a thread.')
         _start(config_dir)
-        logger.info('Finish creating telemetry upload process.')
 
 
-def main():
-    from azure.cli.telemetry.util import should_upload
-    from azure.cli.telemetry.components.telemetry_note import TelemetryNote
+def _spool_legacy_cache(config_dir, spool):
+    """ Moves the records left in the rotating cache files of earlier versions to the spool. """
+    import datetime
+    from azure.cli.telemetry.const import TELEMETRY_CACHE_DIR
     from azure.cli.telemetry.components.records_collection import RecordsCollection
-    from azure.cli.telemetry.components.telemetry_client import CliTelemetryClient
-    from azure.cli.telemetry.components.telemetry_logging import config_logging_for_upload, get_logger
 
+    cache = os.path.join(config_dir, TELEMETRY_CACHE_DIR, 'cache')
+    if os.path.isfile(cache):
+        # the current file is read along with the rotated ones, cache.1, cache.2 and so on, once it has a name of
+        # its own. A rename replaces an existing file on POSIX and fails on Windows, so the name must be free.
+        index = 0
+        while os.path.exists('{}.{}'.format(cache, index)):
+            index += 1
+        os.rename(cache, '{}.{}'.format(cache, index))
+    collection = RecordsCollection(datetime.datetime.min, config_dir)
+    collection.snapshot_and_read()
+    for record in collection:
+        spool.append(record)
+
+
+def upload(config_dir, deadline, service_endpoint_uri=None):
+    """ Uploads the spooled records in batches until the spool is empty or the deadline, a time in seconds since the
+    epoch, has passed. Returns the number of records uploaded. """
+    from azure.cli.telemetry.const import UPLOAD_BATCH_RECORDS, UPLOAD_BATCH_SIZE
+    from azure.cli.telemetry.components.telemetry_spool import TelemetrySpool
+    from azure.cli.telemetry.components.telemetry_client import CliTelemetryClient, _NoRetrySender
+    from azure.cli.telemetry.components.telemetry_logging import get_logger
+
+    logger = get_logger('upload')
+    spool = TelemetrySpool(config_dir)
+    senders = []
+
+    def _create_sender():
+        senders.append(_NoRetrySender(service_endpoint_uri, deadline))
+        return senders[-1]
+
+    count = 0
     try:
-        config_dir = sys.argv[1]
-        config_logging_for_upload(config_dir)
+        _spool_legacy_cache(config_dir, spool)
+        while time.time() < deadline:
+            records, offset = spool.read_batch(UPLOAD_BATCH_RECORDS, UPLOAD_BATCH_SIZE)
+            if not offset:
+                break
+            del senders[:]
+            client = CliTelemetryClient(batch=UPLOAD_BATCH_RECORDS, sender=_create_sender)
+            for each in records:
+                client.add(each)
+            client.flush(force=True)
+            if any(s.failed for s in senders):
+                # the batch is uploaded again next time
+                logger.warning('Keep %d records, which were not uploaded. Stop uploading.', len(records))
+                break
+            spool.remove(offset)
+            count += len(records)
+    except portalocker.LockException as err:
+        logger.warning('Lock out from the spool under %s. Stop uploading. Reason: %s', config_dir, err)
+    except (OSError, IOError) as err:
+        logger.warning('Unexpected IO Error %s. Stop uploading.', err)
+    except Exception as err:  # pylint: disable=broad-except
+        logger.error('Unexpected Error %s. Stop uploading.', err)
+        logger.exception(err)
+    logger.info('Uploaded %d records.', count)
+    return count
+
+
+def _run_agent(config_dir, period, service_endpoint_uri):
+    from azure.cli.telemetry.const import TELEMETRY_CACHE_DIR, TELEMETRY_SPOOL_DIR, TELEMETRY_AGENT_LOCK_NAME
+    from azure.cli.telemetry.const import AGENT_UPLOAD_TIME_LIMIT
+    from azure.cli.telemetry.components.telemetry_logging import get_logger
 
-        logger = get_logger('main')
-        logger.info('Attempt start. Configuration directory [%s].', sys.argv[1])
-
-        if not should_upload(config_dir):
-            logger.info('Exit early. The note file indicates it is not a suitable time to upload telemetry.')
-            sys.exit(0)
-
-        try:
-            with TelemetryNote(config_dir) as telemetry_note:
-                telemetry_note.touch()
-
-                collection = RecordsCollection(telemetry_note.get_last_sent(), config_dir)
-                collection.snapshot_and_read()
-
-                client = CliTelemetryClient()
-                for each in collection:
-                    client.add(each, flush=True)
-                client.flush(force=True)
-
-                telemetry_note.update_telemetry_note(collection.next_send)
-        except portalocker.AlreadyLocked:
-            # another upload process is running.
-            logger.info('Lock out from note file under %s which means another process is running. Exit 0.', config_dir)
-            sys.exit(0)
-        except IOError as err:
-            logger.warning('Unexpected IO Error %s. Exit 1.', err)
-            sys.exit(1)
-        except Exception as err:  # pylint: disable=broad-except
-            logger.error('Unexpected Error %s. Exit 2.', err)
-            logger.exception(err)
-            sys.exit(2)
-    except IndexError:
-        sys.exit(1)
+    logger = get_logger('agent')
+    folder = os.path.join(config_dir, TELEMETRY_CACHE_DIR, TELEMETRY_SPOOL_DIR)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    try:
+        # held while the agent runs, which tells the CLI processes to leave the upload to it
+        with portalocker.Lock(os.path.join(folder, TELEMETRY_AGENT_LOCK_NAME), mode='a', timeout=0,
+                              fail_when_locked=True):
+            logger.info('Agent started. Configuration directory [%s].', config_dir)
+            while True:
+                upload(config_dir, time.time() + AGENT_UPLOAD_TIME_LIMIT.total_seconds(), service_endpoint_uri)
+                time.sleep(period)
+    except portalocker.LockException:
+        logger.info('Another agent is running for %s. Exit 0.', config_dir)
+        sys.exit(0)
+
+
+def main(args=None):
+    """ Uploads the spooled telemetry of a configuration directory once or, with --agent, periodically until the
+    process is stopped, on behalf of all the CLI processes using the directory. """
+    import argparse
+    from azure.cli.telemetry.util import claim_upload
+    from azure.cli.telemetry.const import AGENT_UPLOAD_PERIOD, AGENT_UPLOAD_TIME_LIMIT
+    from azure.cli.telemetry.components.telemetry_logging import config_logging_for_upload, get_logger
+
+    parser = argparse.ArgumentParser(prog='azure.cli.telemetry', description='Upload the Azure CLI telemetry.')
+    parser.add_argument('config_dir', help='The configuration directory of the CLI.')
+    parser.add_argument('--agent', action='store_true',
+                        help='Keep running and upload the telemetry of all processes periodically.')
+    parser.add_argument('--period', type=float, default=AGENT_UPLOAD_PERIOD.total_seconds(),
+                        help='Seconds between the uploads of the agent.')
+    parser.add_argument('--endpoint', help='The URL to upload to, e.g. a local stand-in for tests.')
+    args = parser.parse_args(args)
+
+    config_logging_for_upload(args.config_dir)
+    logger = get_logger('main')
+    logger.info('Attempt start. Configuration directory [%s].', args.config_dir)
+
+    if args.agent:
+        _run_agent(args.config_dir, args.period, args.endpoint)
+    elif not claim_upload(args.config_dir):
+        logger.info('Exit early. The note file indicates it is not a suitable time to upload telemetry.')
+    else:
+        upload(args.config_dir, time.time() + AGENT_UPLOAD_TIME_LIMIT.total_seconds(), args.endpoint)
 
 
 if __name__ == '__main__':
@@ -5,6 +5,7 @@
 
 import json
 import datetime
+import time
 import six
 
 from applicationinsights import TelemetryClient
@@ -91,11 +92,20 @@ class CliTelemetryClient(object):
 
 
 class _NoRetrySender(SynchronousSender):
-    def __init__(self):
+    def __init__(self, service_endpoint_uri=None, deadline=None):
         from azure.cli.telemetry.components.telemetry_logging import get_logger
 
-        super(_NoRetrySender, self).__init__()
+        super(_NoRetrySender, self).__init__(service_endpoint_uri)
+        self._deadline = deadline
         self._logger = get_logger('sender')
+        # whether data was dropped, because a request was skipped or failed
+        self.failed = False
+
+    def _get_timeout(self):
+        """ Returns the timeout of a request, which ends by the deadline if there is one. """
+        if self._deadline is None:
+            return 10
+        return min(10, self._deadline - time.time())
 
     def send(self, data_to_send):
         """ Override the default resend mechanism in SenderBase. Stop resend when it fails."""
@@ -106,15 +116,23 @@ class _NoRetrySender(SynchronousSender):
         request = http_client_t.Request(self._service_endpoint_uri, content,
                                         {'Accept': 'application/json',
                                          'Content-Type': 'application/json; charset=utf-8'})
+        timeout = self._get_timeout()
+        if timeout <= 0:
+            self._logger.warning('Skip uploading %d bytes. The upload is out of time.', len(content))
+            self.failed = True
+            return
         try:
-            http_client_t.urlopen(request, timeout=10)
+            http_client_t.urlopen(request, timeout=timeout)
             self._logger.info('Sending %d bytes', len(content))
         except HTTPError as e:
             self._logger.error('Upload failed. HTTPError: %s', e)
+            self.failed = True
         except OSError as e:  # socket timeout
             # stop retry during socket timeout
             self._logger.error('Upload failed. OSError: %s', e)
+            self.failed = True
         except Exception as e:  # pylint: disable=broad-except
             self._logger.error('Unexpected exception: %s', e)
+            self.failed = True
         finally:
             self._logger.info('Finish uploading in %f seconds.', (datetime.datetime.now() - begin).total_seconds())
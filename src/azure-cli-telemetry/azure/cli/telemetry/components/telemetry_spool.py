@@ -0,0 +1,152 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import contextlib
+import os
+import struct
+
+import portalocker
+
+_LENGTH = struct.Struct('>I')
+
+
+class TelemetrySpool(object):
+    """ An append-only log of telemetry records, each a payload prefixed with its length in bytes.
+
+    Records are appended at the end and uploaded from the start. Reads, appends and the removal of uploaded records
+    all happen under one lock file, so that the log is never seen half written.
+    """
+
+    def __init__(self, config_dir):
+        from azure.cli.telemetry.const import (TELEMETRY_CACHE_DIR, TELEMETRY_SPOOL_DIR, TELEMETRY_SPOOL_NAME,
+                                               TELEMETRY_SPOOL_LOCK_NAME)
+        from azure.cli.telemetry.components.telemetry_logging import get_logger
+
+        self._folder = os.path.join(config_dir, TELEMETRY_CACHE_DIR, TELEMETRY_SPOOL_DIR)
+        self._path = os.path.join(self._folder, TELEMETRY_SPOOL_NAME)
+        self._lock_path = os.path.join(self._folder, TELEMETRY_SPOOL_LOCK_NAME)
+        self._logger = get_logger('spool')
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def folder(self):
+        return self._folder
+
+    @contextlib.contextmanager
+    def lock(self):
+        """ Holds the lock of the spool. Raises portalocker.LockException if it isn't acquired in time. """
+        from azure.cli.telemetry.const import SPOOL_LOCK_TIMEOUT
+
+        if not os.path.isdir(self._folder):
+            os.makedirs(self._folder)
+        with portalocker.Lock(self._lock_path, mode='a', timeout=SPOOL_LOCK_TIMEOUT.total_seconds(),
+                              fail_when_locked=False):
+            yield
+
+    def append(self, payload):
+        """ Appends a record. Returns False if the record is dropped, because the spool is full or unavailable. """
+        from azure.cli.telemetry.const import SPOOL_MAX_SIZE, SPOOL_MAX_RECORD_SIZE
+
+        content = payload.encode('utf-8')
+        if len(content) > SPOOL_MAX_RECORD_SIZE:
+            self._logger.warning('Drop a record of %d bytes, which is too large.', len(content))
+            return False
+
+        record = _LENGTH.pack(len(content)) + content
+        try:
+            with self.lock():
+                size = os.path.getsize(self._path) if os.path.exists(self._path) else 0
+                if size + len(record) > SPOOL_MAX_SIZE:
+                    self._logger.warning('Drop a record of %d bytes, as the spool is full.', len(content))
+                    return False
+                with open(self._path, 'ab') as fh:
+                    fh.write(record)
+        except (OSError, IOError, portalocker.LockException) as err:
+            self._logger.warning('Fail to append a record to %s. Reason: %s.', self._path, err)
+            return False
+        return True
+
+    def read_batch(self, max_records, max_size):
+        """ Returns the first records of the spool, at most `max_records` of them and, unless the first record is
+        larger, at most `max_size` bytes, and the offset to pass to `remove` once they are handled. """
+        from azure.cli.telemetry.const import SPOOL_MAX_RECORD_SIZE
+
+        records = []
+        offset = 0
+        with self.lock():
+            try:
+                fh = open(self._path, 'rb')
+            except (OSError, IOError):
+                return records, offset
+
+            with fh:
+                while len(records) < max_records:
+                    header = fh.read(_LENGTH.size)
+                    if not header:
+                        break
+                    length = _LENGTH.unpack(header)[0] if len(header) == _LENGTH.size else None
+                    if length is None or length > SPOOL_MAX_RECORD_SIZE:
+                        return records, self._skip_corrupt(fh, offset)
+                    if records and offset + _LENGTH.size + length > max_size:
+                        break
+                    content = fh.read(length)
+                    if len(content) < length:
+                        return records, self._skip_corrupt(fh, offset)
+                    try:
+                        records.append(content.decode('utf-8'))
+                    except UnicodeDecodeError:
+                        self._logger.warning('Skip a record at offset %d, which is not UTF-8.', offset)
+                    offset += _LENGTH.size + length
+        return records, offset
+
+    def _skip_corrupt(self, fh, offset):
+        fh.seek(0, os.SEEK_END)
+        self._logger.warning('The spool is corrupt after offset %d. Drop the rest of it.', offset)
+        return fh.tell()
+
+    def remove(self, offset):
+        """ Removes the records before `offset`, which `read_batch` returned. The records left are written to a
+        temporary file which replaces the spool, so that a process stopped meanwhile leaves the spool as it was. """
+        import tempfile
+
+        if not offset:
+            return
+        with self.lock():
+            self._remove_temp_files()
+            with open(self._path, 'rb') as fh:
+                fh.seek(offset)
+                rest = fh.read()
+            fd, temp_path = tempfile.mkstemp(dir=self._folder, prefix=self._temp_prefix, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as fh:
+                    fh.write(rest)
+                replace = getattr(os, 'replace', None)
+                if replace:
+                    replace(temp_path, self._path)
+                else:  # Python 2.7
+                    if os.name == 'nt':
+                        os.remove(self._path)
+                    os.rename(temp_path, self._path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+        self._logger.info('Remove %d bytes of uploaded records. %d bytes left.', offset, len(rest))
+
+    @property
+    def _temp_prefix(self):
+        return '.' + os.path.basename(self._path)
+
+    def _remove_temp_files(self):
+        # left by a process stopped while it removed records; called under the lock
+        for name in os.listdir(self._folder):
+            if name.startswith(self._temp_prefix) and name.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(self._folder, name))
+                except (OSError, IOError):
+                    pass
@@ -11,3 +11,21 @@ TELEMETRY_CACHE_DIR = 'telemetry'
 TELEMETRY_NOTE_NAME = 'telemetry.txt'
 TELEMETRY_LOG_NAME = 'telemetry.log'
 TELEMETRY_LOG_DIR = 'logs'
+
+TELEMETRY_SPOOL_DIR = 'spool'
+TELEMETRY_SPOOL_NAME = 'records'
+TELEMETRY_SPOOL_LOCK_NAME = 'records.lock'
+TELEMETRY_AGENT_LOCK_NAME = 'agent.lock'
+
+# the spool drops new records rather than grow beyond this size
+SPOOL_MAX_SIZE = 4 * 1024 * 1024
+# a longer length prefix means the rest of the spool is corrupt
+SPOOL_MAX_RECORD_SIZE = 256 * 1024
+SPOOL_LOCK_TIMEOUT = timedelta(seconds=1)
+
+UPLOAD_BATCH_RECORDS = 100
+UPLOAD_BATCH_SIZE = 512 * 1024
+# time for the upload that follows a command, which delays its exit
+UPLOAD_TIME_LIMIT = timedelta(seconds=2)
+AGENT_UPLOAD_TIME_LIMIT = timedelta(seconds=30)
+AGENT_UPLOAD_PERIOD = timedelta(minutes=1)
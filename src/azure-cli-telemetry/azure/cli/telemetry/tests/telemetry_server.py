@@ -0,0 +1,61 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import threading
+
+try:
+    # Python 2.x
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    # Python 3.x
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+class TelemetryServer(object):
+    """ A local stand-in of the telemetry service, which records the envelopes uploaded to it.
+
+        with TelemetryServer() as server:
+            upload(config_dir, deadline, server.endpoint)
+            names = [e['data']['baseData']['name'] for e in server.envelopes]
+    """
+
+    def __init__(self, status=200):
+        self.status = status
+        self.requests = []
+        self._server = HTTPServer(('127.0.0.1', 0), self._create_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+
+    @property
+    def endpoint(self):
+        return 'http://127.0.0.1:{}/v2/track'.format(self._server.server_address[1])
+
+    @property
+    def envelopes(self):
+        return [envelope for request in self.requests for envelope in request]
+
+    def _create_handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_POST(self):  # pylint: disable=invalid-name
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                server.requests.append(json.loads(body.decode('utf-8')))
+                self.send_response(server.status)
+                self.end_headers()
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        return _Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
@@ -107,6 +107,7 @@ class TestNoRetrySender(unittest.TestCase):
             sender.send(self.sample_data[0])
 
         mock_url_open.assert_called_once()
+        self.assertFalse(sender.failed)
         args, kwargs = mock_url_open.call_args
 
         self.assertEqual(10, kwargs['timeout'])
@@ -125,6 +126,7 @@ class TestNoRetrySender(unittest.TestCase):
             sender.send(self.sample_data[0])
 
         mock_url_open.assert_called_once()
+        self.assertTrue(sender.failed)
         args, kwargs = mock_url_open.call_args
 
         self.assertEqual(10, kwargs['timeout'])
@@ -143,6 +145,7 @@ class TestNoRetrySender(unittest.TestCase):
             sender.send(self.sample_data[0])
 
         mock_url_open.assert_called_once()
+        self.assertTrue(sender.failed)
 
     def test_limited_retry_sender_other_exception(self):
         mock_url_open = mock.Mock()
@@ -153,6 +156,7 @@ class TestNoRetrySender(unittest.TestCase):
             sender.send(self.sample_data[0])
 
         mock_url_open.assert_called_once()
+        self.assertTrue(sender.failed)
 
 
 if __name__ == '__main__':
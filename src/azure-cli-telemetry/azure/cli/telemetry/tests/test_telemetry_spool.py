@@ -0,0 +1,238 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+import portalocker
+
+from azure.cli.telemetry import main, save, upload
+from azure.cli.telemetry.const import TELEMETRY_CACHE_DIR, TELEMETRY_SPOOL_DIR, TELEMETRY_AGENT_LOCK_NAME
+from azure.cli.telemetry.components.telemetry_spool import TelemetrySpool
+from azure.cli.telemetry.tests.telemetry_server import TelemetryServer
+from azure.cli.telemetry.util import claim_upload, is_agent_running
+
+TEST_RESOURCE_FOLDER = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+def _get_payload(name):
+    properties = {'Context.Default.AzureCLI.Command': name, 'Reserved.SequenceNumber': 1}
+    return json.dumps({'instrumentation-key': [{'name': name, 'properties': properties}]})
+
+
+class TestTelemetrySpool(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.spool = TelemetrySpool(self.work_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_telemetry_spool_append_and_remove(self):
+        self.assertEqual(([], 0), self.spool.read_batch(10, 1024))
+
+        for i in range(5):
+            self.assertTrue(self.spool.append(u'record {} é'.format(i)))
+
+        records, offset = self.spool.read_batch(3, 1024)
+        self.assertEqual([u'record 0 é', u'record 1 é', u'record 2 é'], records)
+
+        # a record appended while a batch is uploaded is kept
+        self.spool.append(u'record 5')
+        self.spool.remove(offset)
+
+        records, offset = self.spool.read_batch(10, 1024)
+        self.assertEqual([u'record 3 é', u'record 4 é', u'record 5'], records)
+        self.assertEqual(os.path.getsize(self.spool.path), offset)
+
+        # a batch is limited in size, but has at least one record
+        self.assertEqual([u'record 3 é'], self.spool.read_batch(10, 20)[0])
+        self.assertEqual([u'record 3 é'], self.spool.read_batch(10, 1)[0])
+
+        self.spool.remove(offset)
+        self.assertEqual(0, os.path.getsize(self.spool.path))
+
+    def test_telemetry_spool_remove_interrupted(self):
+        for i in range(3):
+            self.spool.append('record {}'.format(i))
+        records, offset = self.spool.read_batch(2, 1024)
+        with open(self.spool.path, 'rb') as fh:
+            content = fh.read()
+
+        # e.g. the upload thread is stopped at exit while the spool is rewritten
+        with mock.patch('os.replace' if hasattr(os, 'replace') else 'os.rename', side_effect=OSError('stopped')):
+            with self.assertRaises(OSError):
+                self.spool.remove(offset)
+        with open(self.spool.path, 'rb') as fh:
+            self.assertEqual(content, fh.read())
+        self.assertEqual(sorted(os.listdir(self.spool.folder)), ['records', 'records.lock'])
+
+        # a temporary file left by a process which was killed is cleaned up
+        with open(os.path.join(self.spool.folder, '.records1234.tmp'), 'wb') as fh:
+            fh.write(b'partial')
+        self.spool.remove(offset)
+        self.assertEqual((['record 2'], offset // 2), self.spool.read_batch(10, 1024))
+        self.assertEqual(sorted(os.listdir(self.spool.folder)), ['records', 'records.lock'])
+
+    def test_telemetry_spool_size_limits(self):
+        with mock.patch('azure.cli.telemetry.const.SPOOL_MAX_SIZE', 100):
+            self.assertTrue(self.spool.append('a' * 60))
+            # the spool doesn't grow beyond its limit
+            self.assertFalse(self.spool.append('b' * 60))
+            self.assertTrue(self.spool.append('c' * 30))
+
+        with mock.patch('azure.cli.telemetry.const.SPOOL_MAX_RECORD_SIZE', 100):
+            self.assertFalse(self.spool.append('d' * 101))
+
+        self.assertEqual(['a' * 60, 'c' * 30], self.spool.read_batch(10, 1024)[0])
+
+    def test_telemetry_spool_corrupt(self):
+        self.spool.append('first')
+        self.spool.append('second')
+        # a record cut short, e.g. when the disk is full
+        with open(self.spool.path, 'ab') as fh:
+            fh.write(b'\x00\x00\x00\x10abc')
+        size = os.path.getsize(self.spool.path)
+
+        self.assertEqual((['first', 'second'], size), self.spool.read_batch(10, 1024))
+
+        with open(self.spool.path, 'wb') as fh:
+            fh.write(b'\xff\xff\xff\xff' + b'x' * 10)
+        self.assertEqual(([], 14), self.spool.read_batch(10, 1024))
+
+    def test_telemetry_spool_locked(self):
+        with mock.patch('azure.cli.telemetry.const.SPOOL_LOCK_TIMEOUT', mock.MagicMock(total_seconds=lambda: 0.1)):
+            with self.spool.lock():
+                # the record is dropped, rather than the process waiting
+                self.assertFalse(TelemetrySpool(self.work_dir).append('record'))
+                with self.assertRaises(portalocker.LockException):
+                    TelemetrySpool(self.work_dir).read_batch(10, 1024)
+        self.assertTrue(self.spool.append('record'))
+
+
+class TestTelemetryUpload(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.spool = TelemetrySpool(self.work_dir)
+
+        # keep the logging of the upload process out of the test run
+        patch = mock.patch('azure.cli.telemetry.components.telemetry_logging.config_logging_for_upload')
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _get_names(self, server):
+        return [e['data']['baseData']['name'] for e in server.envelopes]
+
+    def test_telemetry_upload(self):
+        for i in range(250):
+            self.spool.append(_get_payload('command {}'.format(i)))
+
+        with TelemetryServer() as server:
+            self.assertEqual(250, upload(self.work_dir, time.time() + 10, server.endpoint))
+
+        # uploaded in batches of 100 records
+        self.assertEqual([100, 100, 50], [len(r) for r in server.requests])
+        self.assertEqual(['command {}'.format(i) for i in range(250)], self._get_names(server))
+        self.assertEqual(0, os.path.getsize(self.spool.path))
+
+    def test_telemetry_upload_deadline(self):
+        self.spool.append(_get_payload('command'))
+        with TelemetryServer() as server:
+            self.assertEqual(0, upload(self.work_dir, time.time() - 1, server.endpoint))
+        self.assertEqual([], server.requests)
+        self.assertEqual(1, len(self.spool.read_batch(10, 1024)[0]))
+
+    def test_telemetry_upload_failed(self):
+        for i in range(3):
+            self.spool.append(_get_payload('command {}'.format(i)))
+
+        # the records are kept when the service fails or the upload runs out of time
+        with TelemetryServer(status=500) as server:
+            self.assertEqual(0, upload(self.work_dir, time.time() + 10, server.endpoint))
+        self.assertEqual(1, len(server.requests))
+        with TelemetryServer() as server:
+            with mock.patch('azure.cli.telemetry.components.telemetry_client._NoRetrySender._get_timeout',
+                            return_value=0):
+                self.assertEqual(0, upload(self.work_dir, time.time() + 10, server.endpoint))
+            self.assertEqual([], server.requests)
+            self.assertEqual(3, upload(self.work_dir, time.time() + 10, server.endpoint))
+        self.assertEqual(['command {}'.format(i) for i in range(3)], self._get_names(server))
+        self.assertEqual(0, os.path.getsize(self.spool.path))
+
+    def test_telemetry_upload_legacy_cache(self):
+        shutil.copytree(TEST_RESOURCE_FOLDER, os.path.join(self.work_dir, TELEMETRY_CACHE_DIR))
+        with TelemetryServer() as server:
+            count = upload(self.work_dir, time.time() + 10, server.endpoint)
+
+        self.assertGreater(count, 0)
+        self.assertEqual([TELEMETRY_SPOOL_DIR], os.listdir(os.path.join(self.work_dir, TELEMETRY_CACHE_DIR)))
+        self.assertTrue(server.envelopes)
+
+    def test_telemetry_upload_legacy_cache_taken_name(self):
+        folder = os.path.join(self.work_dir, TELEMETRY_CACHE_DIR)
+        os.makedirs(folder)
+        for name in ['cache', 'cache.0', 'cache.1']:
+            with open(os.path.join(folder, name), 'w') as fh:
+                fh.write('2018-07-01T00:00:00,{}\n'.format(_get_payload(name)))
+
+        with TelemetryServer() as server:
+            self.assertEqual(3, upload(self.work_dir, time.time() + 10, server.endpoint))
+
+        # no cache file replaces another
+        self.assertEqual(['cache', 'cache.0', 'cache.1'], sorted(self._get_names(server)))
+
+    def test_telemetry_save(self):
+        with mock.patch('azure.cli.telemetry._start') as start_mock:
+            save(self.work_dir, _get_payload('first'))
+            start_mock.assert_called_once_with(self.work_dir)
+
+            # the note file holds off other uploads for a while
+            save(self.work_dir, _get_payload('second'))
+            self.assertEqual(1, start_mock.call_count)
+            self.assertFalse(claim_upload(self.work_dir))
+
+        self.assertEqual(['first', 'second'],
+                         [json.loads(r)['instrumentation-key'][0]['name'] for r in self.spool.read_batch(10, 4096)[0]])
+
+    def test_telemetry_save_with_agent(self):
+        folder = os.path.join(self.work_dir, TELEMETRY_CACHE_DIR, TELEMETRY_SPOOL_DIR)
+        os.makedirs(folder)
+        self.assertFalse(is_agent_running(self.work_dir))
+
+        with portalocker.Lock(os.path.join(folder, TELEMETRY_AGENT_LOCK_NAME), mode='a', timeout=0,
+                              fail_when_locked=True):
+            self.assertTrue(is_agent_running(self.work_dir))
+            with mock.patch('azure.cli.telemetry._start') as start_mock:
+                save(self.work_dir, _get_payload('command'))
+                self.assertFalse(start_mock.called)
+
+            # a second agent exits
+            with self.assertRaises(SystemExit):
+                main([self.work_dir, '--agent'])
+
+        self.assertFalse(is_agent_running(self.work_dir))
+
+    def test_telemetry_main(self):
+        self.spool.append(_get_payload('command'))
+        with TelemetryServer() as server:
+            main([self.work_dir, '--endpoint', server.endpoint])
+            self.assertEqual(['command'], self._get_names(server))
+
+            # the upload is skipped while the note file is new
+            self.spool.append(_get_payload('command'))
+            main([self.work_dir, '--endpoint', server.endpoint])
+            self.assertEqual(1, len(server.envelopes))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,6 @@
 import os
 import stat
 import logging
-import logging.handlers
 from datetime import datetime
 
 from azure.cli.telemetry.const import TELEMETRY_NOTE_NAME, MANDATORY_WAIT_PERIOD
@@ -41,38 +40,53 @@ def should_upload(config_dir):
     return True
 
 
-def save_payload(config_dir, payload):
-    """
-    Save a telemetry payload to the telemetry cache directory under the given configuration directory
+def claim_upload(config_dir):
+    """Returns True if this process is to upload the spooled telemetry now, in which case the telemetry.txt file is
+    updated so that no other process does before MANDATORY_WAIT_PERIOD has passed.
     """
-    logger = logging.getLogger('telemetry.save')
+    from azure.cli.telemetry.components.telemetry_spool import TelemetrySpool
+    import portalocker
 
-    if payload:
-        cache_saver = _create_rotate_file_logger(config_dir)
-        if cache_saver:
-            cache_saver.info(payload)
-            logger.info('Save telemetry record of length %d in cache', len(payload))
+    logger = logging.getLogger('telemetry.check')
 
+    try:
+        with TelemetrySpool(config_dir).lock():
+            if not should_upload(config_dir):
+                return False
+            with open(os.path.join(config_dir, TELEMETRY_NOTE_NAME), mode='w') as fh:
+                fh.write(datetime.now().strftime('%Y-%m-%dT%H:%M:%S'))
             return True
-    return False
+    except (OSError, IOError, portalocker.LockException) as err:
+        logger.warning('Fail to claim the upload. Reason %s.', err)
+        return False
+
 
+def is_agent_running(config_dir):
+    """Returns True if a telemetry agent uploads the spooled telemetry of the given configuration directory."""
+    from azure.cli.telemetry.const import TELEMETRY_CACHE_DIR, TELEMETRY_SPOOL_DIR, TELEMETRY_AGENT_LOCK_NAME
+    import portalocker
 
-def _create_rotate_file_logger(log_dir):
-    cache_name = os.path.join(log_dir, 'telemetry', 'cache')
+    path = os.path.join(config_dir, TELEMETRY_CACHE_DIR, TELEMETRY_SPOOL_DIR, TELEMETRY_AGENT_LOCK_NAME)
+    if not os.path.exists(path):
+        return False
     try:
-        if not os.path.exists(os.path.dirname(cache_name)):
-            os.makedirs(os.path.dirname(cache_name))
-
-        handler = logging.handlers.RotatingFileHandler(cache_name, maxBytes=128 * 1024, backupCount=100)
-        handler.setLevel(logging.INFO)
-        handler.setFormatter(logging.Formatter(fmt='%(asctime)s,%(message)s',
-                                               datefmt='%Y-%m-%dT%H:%M:%S'))
-
-        logger = logging.Logger(name='telemetry_cache', level=logging.INFO)
-        logger.addHandler(handler)
-        return logger
-    except OSError as err:
-        logging.getLogger('telemetry.save').warning('Fail to create telemetry cache directory for %s. Reason %s.',
-                                                    cache_name,
-                                                    err)
-        return None
+        with portalocker.Lock(path, mode='a', timeout=0, fail_when_locked=True):
+            return False
+    except portalocker.LockException:
+        return True
+    except (OSError, IOError):
+        return False
+
+
+def save_payload(config_dir, payload):
+    """
+    Save a telemetry payload to the telemetry spool under the given configuration directory
+    """
+    from azure.cli.telemetry.components.telemetry_spool import TelemetrySpool
+
+    logger = logging.getLogger('telemetry.save')
+
+    if payload and TelemetrySpool(config_dir).append(payload):
+        logger.info('Save telemetry record of length %d in spool', len(payload))
+        return True
+    return False
@@ -0,0 +1,413 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Run test suites in parallel worker processes, sharded by the durations of earlier runs.
+
+    python -m azure.cli.testsdk.runner azure.cli.command_modules.vm azure.cli.command_modules.network -n 8
+
+Every worker is a new process with its own configuration directory, so that the session files written by one test
+run are not seen by another and the patches of a test apply only in its worker. A worker creates one DummyCli and
+loads the command table once, and the ScenarioTest tests it runs share that CLI instead of creating their own. The
+tests are split so that the shards take about as long as each other, based on the durations in a timings file which
+every run updates. The duration of every test and command, and optionally profiles of the slowest commands, are
+written to a JSON report.
+"""
+
+from __future__ import print_function
+
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import unittest
+
+TIMINGS_FILE_NAME = 'testTimings.json'
+DEFAULT_TEST_DURATION = 1.0
+# files copied to the configuration directories of the workers of live runs, to use the account that is logged in
+LIVE_CONFIG_FILES = ['azureProfile.json', 'accessTokens.json', 'clouds.config', 'config']
+
+
+def get_default_timings_path():
+    from azure.cli.core._environment import get_config_dir
+    return os.path.join(get_config_dir(), TIMINGS_FILE_NAME)
+
+
+def _iter_tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            for each in _iter_tests(test):
+                yield each
+        else:
+            yield test
+
+
+def discover_tests(targets):
+    """ Returns the ids of the tests in the given packages, modules, classes or methods, given as dotted names. """
+    from importlib import import_module
+    from pkgutil import walk_packages
+
+    loader = unittest.TestLoader()
+    test_ids = []
+    for target in targets:
+        try:
+            module = import_module(target)
+        except ImportError:
+            module = None
+
+        if module is None:
+            suites = [loader.loadTestsFromName(target)]
+        elif hasattr(module, '__path__'):
+            suites = [loader.loadTestsFromModule(import_module(name))
+                      for _, name, is_pkg in walk_packages(module.__path__, target + '.')
+                      if not is_pkg and name.rsplit('.', 1)[-1].startswith('test')]
+        else:
+            suites = [loader.loadTestsFromModule(module)]
+
+        for suite in suites:
+            for test in _iter_tests(suite):
+                if test.id() not in test_ids:
+                    test_ids.append(test.id())
+    return test_ids
+
+
+def load_timings(path):
+    try:
+        with open(path, 'r') as f:
+            timings = json.load(f)
+        return timings if isinstance(timings, dict) else {}
+    except (OSError, IOError, ValueError):
+        return {}
+
+
+def save_timings(path, timings, results):
+    """ Records the durations of the tests that ran in the timings file. """
+    from azure.cli.core.util import write_file_atomic
+    timings = dict(timings)
+    for result in results:
+        # tests that didn't run to the end have no duration
+        if result['outcome'] != 'skipped' and result['duration']:
+            timings[result['id']] = round(result['duration'], 3)
+    write_file_atomic(path, json.dumps(timings, indent=2, sort_keys=True))
+
+
+def shard_tests(test_ids, timings, count):
+    """ Splits the tests into at most `count` shards of about the same duration, placing the longest tests first,
+    each on the shard with the least work so far. Tests that haven't run before count as the median duration. """
+    known = sorted(timings[t] for t in test_ids if t in timings)
+    default = known[len(known) // 2] if known else DEFAULT_TEST_DURATION
+    estimates = sorted(((timings.get(t, default), t) for t in test_ids), key=lambda e: (-e[0], e[1]))
+
+    shards = [(0.0, i, []) for i in range(min(count, len(test_ids)))]
+    heapq.heapify(shards)
+    for duration, test_id in estimates:
+        total, index, tests = heapq.heappop(shards)
+        tests.append(test_id)
+        heapq.heappush(shards, (total + duration, index, tests))
+    return [(total, tests) for total, _, tests in sorted(shards, key=lambda s: s[1])]
+
+
+class _Worker(object):
+    def __init__(self, index, tests, work_dir, args):
+        self.index = index
+        self.tests = tests
+        self.config_dir = os.path.join(work_dir, 'worker{}'.format(index))
+        self.shard_file = os.path.join(work_dir, 'shard{}.json'.format(index))
+        self.result_file = os.path.join(work_dir, 'result{}.jsonl'.format(index))
+        self.log_file = os.path.join(work_dir, 'worker{}.log'.format(index))
+        self.process = None
+        self.start_time = None
+        self.duration = None
+        self.timed_out = False
+
+        os.makedirs(self.config_dir)
+        if os.environ.get('AZURE_TEST_RUN_LIVE', None):
+            from azure.cli.core._environment import get_config_dir
+            for name in LIVE_CONFIG_FILES:
+                if os.path.isfile(os.path.join(get_config_dir(), name)):
+                    shutil.copy(os.path.join(get_config_dir(), name), self.config_dir)
+        with open(self.shard_file, 'w') as f:
+            json.dump({'tests': tests, 'profile_commands': args.profile_commands, 'reuse_cli': args.reuse_cli}, f)
+
+    def start(self):
+        env = dict(os.environ)
+        env['AZURE_CONFIG_DIR'] = self.config_dir
+        with open(self.log_file, 'w') as log:
+            self.process = subprocess.Popen([sys.executable, '-m', 'azure.cli.testsdk.runner', '--worker',
+                                             self.shard_file, self.result_file],
+                                            env=env, stdout=log, stderr=subprocess.STDOUT)
+        self.start_time = time.time()
+
+    def poll(self, timeout):
+        """ Returns True once the worker has exited, stopping it when it runs out of time. """
+        if self.duration is not None:
+            return True
+        if self.process.poll() is None:
+            if not timeout or time.time() - self.start_time < timeout:
+                return False
+            self.process.kill()
+            self.process.wait()
+            self.timed_out = True
+        self.duration = time.time() - self.start_time
+        return True
+
+    def read_results(self):
+        """ Returns the results the worker wrote, with an error for every test it didn't finish, and the profiles
+        of its slowest commands. """
+        results = []
+        profiles = []
+        try:
+            with open(self.result_file, 'r') as f:
+                for line in f:
+                    result = json.loads(line)
+                    if 'profiles' in result:
+                        profiles = result['profiles']
+                    else:
+                        results.append(dict(result, worker=self.index))
+        except (OSError, IOError, ValueError):
+            # the last line is cut short if the worker was stopped while writing it
+            pass
+
+        finished = set(r['id'] for r in results)
+        if self.timed_out:
+            reason = 'The worker was stopped after running out of time.'
+        else:
+            reason = 'The worker exited with code {}.'.format(self.process.returncode)
+        for test_id in self.tests:
+            if test_id not in finished:
+                results.append({'id': test_id, 'worker': self.index, 'outcome': 'error', 'duration': 0.0,
+                                'message': '{} See {}.'.format(reason, self.log_file), 'commands': []})
+        return results, profiles
+
+
+def run_tests(test_ids, workers, timings_path=None, report_path=None, profile_commands=0, timeout=None,
+              reuse_cli=True):
+    """ Runs the tests in worker processes and returns their results. """
+    args = argparse.Namespace(profile_commands=profile_commands, reuse_cli=reuse_cli)
+    timings_path = timings_path or get_default_timings_path()
+    timings = load_timings(timings_path)
+    shards = shard_tests(test_ids, timings, workers)
+
+    start_time = time.time()
+    work_dir = tempfile.mkdtemp(prefix='az_test_runner_')
+    running = []
+    for index, (estimate, tests) in enumerate(shards):
+        print('Worker {}: {} tests, about {:.1f}s.'.format(index, len(tests), estimate))
+        worker = _Worker(index, tests, work_dir, args)
+        worker.start()
+        running.append(worker)
+
+    while not all([w.poll(timeout) for w in running]):
+        time.sleep(0.2)
+
+    results = []
+    profiles = []
+    for worker in running:
+        worker_results, worker_profiles = worker.read_results()
+        results.extend(worker_results)
+        profiles.extend(worker_profiles)
+    duration = time.time() - start_time
+
+    save_timings(timings_path, timings, results)
+    report = {
+        'duration': round(duration, 3),
+        'workers': [{'index': w.index, 'tests': len(w.tests), 'duration': round(w.duration, 3),
+                     'timedOut': w.timed_out, 'log': w.log_file} for w in running],
+        'tests': sorted(results, key=lambda r: r['id']),
+        'profiles': sorted(profiles, key=lambda p: -p['duration'])[:profile_commands]
+    }
+    if report_path:
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+    _print_summary(report)
+
+    if all(r['outcome'] in ('passed', 'skipped') for r in results):
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def _print_summary(report, count=10):
+    tests = report['tests']
+    commands = [dict(c, test=t['id']) for t in tests for c in t['commands']]
+
+    print('\nSlowest tests:')
+    for result in sorted(tests, key=lambda r: -r['duration'])[:count]:
+        print('  {:8.2f}s  {}'.format(result['duration'], result['id']))
+
+    print('\nSlowest commands:')
+    for command in sorted(commands, key=lambda c: -c['duration'])[:count]:
+        print('  {:8.2f}s  az {}  ({})'.format(command['duration'], command['command'], command['test']))
+
+    for profile in report['profiles']:
+        print('\nProfile of `az {}` ({:.2f}s):\n{}'.format(profile['command'], profile['duration'], profile['profile']))
+
+    failed = [r for r in tests if r['outcome'] in ('failed', 'error')]
+    for result in failed:
+        print('\n{}: {}\n{}'.format(result['outcome'].upper(), result['id'], result['message']))
+
+    print('\nRan {} tests in {:.1f}s with {} workers: {} passed, {} failed, {} skipped.'.format(
+        len(tests), report['duration'], len(report['workers']),
+        len([r for r in tests if r['outcome'] == 'passed']), len(failed),
+        len([r for r in tests if r['outcome'] == 'skipped'])))
+
+
+class _CommandRecorder(object):
+    """ Times the commands of the tests a worker runs, keeping profiles of the slowest of them. """
+
+    def __init__(self, profile_commands):
+        self.profile_commands = profile_commands
+        self.test_id = None
+        self.commands = []
+        self._profiles = []
+        self._count = 0
+
+    def wrap(self, execute):
+        recorder = self
+
+        def _in_process_execute(result, cli_ctx, command, expect_failure=False):
+            import cProfile
+            profiler = cProfile.Profile() if recorder.profile_commands else None
+            start = time.time()
+            try:
+                if profiler:
+                    profiler.enable()
+                return execute(result, cli_ctx, command, expect_failure=expect_failure)
+            finally:
+                if profiler:
+                    profiler.disable()
+                recorder.add(command, time.time() - start, profiler)
+
+        return _in_process_execute
+
+    def add(self, command, duration, profiler):
+        command = command[3:] if command.startswith('az ') else command
+        self.commands.append({'command': command, 'duration': round(duration, 3)})
+        if profiler is None:
+            return
+        # only the profiles of the slowest commands are kept, as the text of a profile is long
+        self._count += 1
+        entry = (duration, self._count, {'test': self.test_id, 'command': command, 'duration': round(duration, 3)})
+        if len(self._profiles) < self.profile_commands:
+            heapq.heappush(self._profiles, entry)
+        elif duration > self._profiles[0][0]:
+            heapq.heapreplace(self._profiles, entry)
+        else:
+            return
+        entry[2]['profile'] = _format_profile(profiler)
+
+    def take(self):
+        commands, self.commands = self.commands, []
+        return commands
+
+    @property
+    def profiles(self):
+        return [profile for _, _, profile in sorted(self._profiles, reverse=True)]
+
+
+def _format_profile(profiler, limit=20):
+    import pstats
+    from six import StringIO
+
+    stream = StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
+
+
+def _run_worker(shard_file, result_file):
+    """ Runs the tests of a shard, writing the result of every test to a line of the result file. """
+    import mock
+    from azure.cli.testsdk import base
+    from azure.cli.testsdk.reverse_dependency import get_dummy_cli
+
+    with open(shard_file, 'r') as f:
+        shard = json.load(f)
+
+    recorder = _CommandRecorder(shard['profile_commands'])
+    execute = base.ExecutionResult._in_process_execute  # pylint: disable=protected-access
+    patches = [mock.patch.object(base.ExecutionResult, '_in_process_execute', recorder.wrap(execute))]
+    if shard['reuse_cli']:
+        try:
+            cli_ctx = get_dummy_cli()
+            # loads and imports all command modules, so that the first test doesn't pay for it
+            cli_ctx.commands_loader.load_command_table(None)
+            patches.append(mock.patch.object(base, 'get_dummy_cli', return_value=cli_ctx))
+        except Exception:  # pylint: disable=broad-except
+            # the tests create their own CLI instead, and report the error themselves if it affects them
+            print('Failed to load the command table. Every test creates its own CLI.', file=sys.stderr)
+            traceback.print_exc()
+    for patch in patches:
+        patch.start()
+
+    loader = unittest.TestLoader()
+    with open(result_file, 'a') as results:
+        for test_id in shard['tests']:
+            recorder.test_id = test_id
+            outcome, message, duration = _run_test(loader, test_id)
+            result = {'id': test_id, 'outcome': outcome, 'message': message, 'duration': round(duration, 3),
+                      'commands': recorder.take()}
+            results.write(json.dumps(result) + '\n')
+            results.flush()
+        results.write(json.dumps({'profiles': recorder.profiles}) + '\n')
+
+
+def _run_test(loader, test_id):
+    result = unittest.TestResult()
+    start = time.time()
+    try:
+        suite = loader.loadTestsFromName(test_id)
+        suite.run(result)
+    except Exception:  # pylint: disable=broad-except
+        result.errors.append((test_id, traceback.format_exc()))
+    duration = time.time() - start
+
+    problems = result.errors + result.failures
+    if problems:
+        return ('error' if result.errors else 'failed'), '\n'.join(text for _, text in problems), duration
+    if result.skipped:
+        return 'skipped', result.skipped[0][1], duration
+    if result.unexpectedSuccesses:
+        return 'failed', 'Unexpected success.', duration
+    return 'passed', None, duration
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m azure.cli.testsdk.runner',
+                                     description='Run tests in parallel worker processes.')
+    parser.add_argument('tests', nargs='*',
+                        help='Dotted names of the packages, modules, classes or methods of the tests to run.')
+    parser.add_argument('-n', '--workers', type=int, default=multiprocessing.cpu_count(),
+                        help='The number of worker processes.')
+    parser.add_argument('--timings', help='The file of the durations of earlier runs, which is updated. Default: '
+                                          '{} in the configuration directory.'.format(TIMINGS_FILE_NAME))
+    parser.add_argument('--report', help='The JSON file to write the results and timings to.')
+    parser.add_argument('--profile-commands', type=int, default=0, metavar='COUNT',
+                        help='Profile the commands and show the profiles of the slowest COUNT of them.')
+    parser.add_argument('--timeout', type=float, help='Seconds after which a worker is stopped.')
+    parser.add_argument('--no-reuse-cli', dest='reuse_cli', action='store_false',
+                        help='Create a CLI for every test, rather than one for every worker.')
+    parser.add_argument('--worker', nargs=2, metavar=('SHARD_FILE', 'RESULT_FILE'), help=argparse.SUPPRESS)
+    args = parser.parse_args(args)
+
+    if args.worker:
+        _run_worker(*args.worker)
+        return
+
+    test_ids = discover_tests(args.tests)
+    if not test_ids:
+        print('No tests found.')
+        sys.exit(1)
+    results = run_tests(test_ids, args.workers, timings_path=args.timings, report_path=args.report,
+                        profile_commands=args.profile_commands, timeout=args.timeout, reuse_cli=args.reuse_cli)
+    sys.exit(0 if all(r['outcome'] in ('passed', 'skipped') for r in results) else 1)
+
+
+if __name__ == '__main__':
+    main()
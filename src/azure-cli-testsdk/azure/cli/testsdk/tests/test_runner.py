@@ -0,0 +1,119 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import mock
+
+from azure.cli.testsdk.runner import _Worker, _run_worker, load_timings, save_timings, shard_tests
+
+SAMPLE_TESTS = '''
+import unittest
+
+
+class SampleTest(unittest.TestCase):
+    def test_pass(self):
+        pass
+
+    def test_fail(self):
+        self.fail('failed')
+'''
+
+
+class TestRunnerSharding(unittest.TestCase):
+    def test_runner_shard_longest_first(self):
+        timings = {'a': 10.0, 'b': 6.0, 'c': 5.0, 'd': 4.0, 'e': 1.0}
+        shards = shard_tests(sorted(timings), timings, 2)
+        self.assertEqual([(14.0, ['a', 'd']), (12.0, ['b', 'c', 'e'])], shards)
+
+    def test_runner_shard_unknown_tests(self):
+        # tests without a timing count as the median of the known ones
+        shards = shard_tests(['a', 'b', 'c', 'new'], {'a': 1.0, 'b': 2.0, 'c': 3.0}, 2)
+        self.assertEqual([(4.0, ['c', 'a']), (4.0, ['b', 'new'])], shards)
+
+        # no more shards than tests
+        self.assertEqual([(1.0, ['a'])], shard_tests(['a'], {}, 4))
+
+
+class TestRunnerTimings(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.work_dir, 'timings.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_runner_save_and_load_timings(self):
+        self.assertEqual({}, load_timings(self.path))
+
+        results = [{'id': 'a', 'outcome': 'passed', 'duration': 1.23456},
+                   {'id': 'b', 'outcome': 'failed', 'duration': 2.0},
+                   {'id': 'c', 'outcome': 'skipped', 'duration': 0.5},
+                   {'id': 'd', 'outcome': 'error', 'duration': 0.0}]
+        save_timings(self.path, {'c': 3.0, 'd': 4.0, 'e': 5.0}, results)
+
+        # skipped tests and tests that didn't run to the end keep their earlier durations
+        self.assertEqual({'a': 1.235, 'b': 2.0, 'c': 3.0, 'd': 4.0, 'e': 5.0}, load_timings(self.path))
+        self.assertEqual(['timings.json'], os.listdir(self.work_dir))
+
+    def test_runner_load_timings_invalid(self):
+        for content in ['{"a": ', '[1, 2]']:
+            with open(self.path, 'w') as f:
+                f.write(content)
+            self.assertEqual({}, load_timings(self.path))
+
+
+class TestRunnerWorker(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.args = argparse.Namespace(profile_commands=0, reuse_cli=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_runner_read_results(self):
+        worker = _Worker(0, ['t1', 't2', 't3'], self.work_dir, self.args)
+        worker.process = mock.MagicMock(returncode=1)
+        with open(worker.result_file, 'w') as f:
+            f.write(json.dumps({'id': 't1', 'outcome': 'passed', 'message': None, 'duration': 1.0,
+                                'commands': []}) + '\n')
+            f.write(json.dumps({'profiles': [{'command': 'group list', 'duration': 1.0}]}) + '\n')
+            # the worker died while writing this line
+            f.write('{"id": "t2", "outc')
+
+        results, profiles = worker.read_results()
+
+        self.assertEqual([{'command': 'group list', 'duration': 1.0}], profiles)
+        self.assertEqual(['t1', 't2', 't3'], [r['id'] for r in results])
+        self.assertEqual(['passed', 'error', 'error'], [r['outcome'] for r in results])
+        self.assertIn('exited with code 1', results[1]['message'])
+        self.assertTrue(all(r['worker'] == 0 for r in results))
+
+    def test_runner_worker_command_table_fails(self):
+        sys.path.insert(0, self.work_dir)
+        self.addCleanup(sys.path.remove, self.work_dir)
+        with open(os.path.join(self.work_dir, 'runner_sample_tests.py'), 'w') as f:
+            f.write(SAMPLE_TESTS)
+        tests = ['runner_sample_tests.SampleTest.test_pass', 'runner_sample_tests.SampleTest.test_fail']
+        worker = _Worker(0, tests, self.work_dir, self.args)
+
+        self.addCleanup(mock.patch.stopall)
+        with mock.patch('azure.cli.testsdk.reverse_dependency.get_dummy_cli', side_effect=ImportError('broken')):
+            _run_worker(worker.shard_file, worker.result_file)
+
+        # the tests still run, each with a CLI of its own
+        worker.process = mock.MagicMock(returncode=0)
+        results, _ = worker.read_results()
+        self.assertEqual(['passed', 'failed'], [r['outcome'] for r in results])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,7 +14,7 @@ except ImportError:
     logger.warn("Wheel is not available, disabling bdist_wheel hook")
     cmdclass = {}
 
-VERSION = "0.2.4"
+VERSION = "0.2.5"
 
 CLASSIFIERS = [
     'Development Status :: 3 - Alpha',
@@ -381,6 +381,15 @@ helps['aks get-credentials'] = """
         - name: --output -o
           type: string
           long-summary: Credentials are always in YAML format, so this argument is effectively ignored.
+    long-summary: >
+        The configuration file is locked while it is updated and replaced in one step, so parallel runs don't lose
+        entries. Fetching the credentials of a cluster again replaces its entries if the cluster's server is
+        unchanged, without --overwrite-existing.
+    examples:
+        - name: Get the credentials of a managed Kubernetes cluster.
+          text: az aks get-credentials -g MyResourceGroup -n MyManagedCluster
+        - name: Get the credentials of several managed Kubernetes clusters at once.
+          text: az aks get-credentials -g MyResourceGroup --clusters MyManagedCluster1 MyManagedCluster2
 """
 
 helps['aks get-upgrades'] = """
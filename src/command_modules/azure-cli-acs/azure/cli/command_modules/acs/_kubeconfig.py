@@ -0,0 +1,144 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Reading, merging and writing kubeconfig files safely.
+
+Several CLI processes may merge credentials into the same kubeconfig at once, e.g. parallel jobs each running
+`az aks get-credentials`. A merge therefore holds an advisory lock on '<kubeconfig>.lock' from reading the file
+to replacing it, and the new content is written to a temporary file, readable and writable by its owner only,
+which is then renamed over the kubeconfig, so that readers never see a partially written file.
+"""
+
+import errno
+import os
+import time
+from contextlib import contextmanager
+
+import yaml
+from knack.log import get_logger
+from knack.util import CLIError
+
+logger = get_logger(__name__)
+
+LOCK_TIMEOUT = 60
+_LOCK_RETRY_INTERVAL = 0.1
+
+
+def _try_lock(lock_file):
+    """ Takes an exclusive lock on an open file without blocking. Returns False if another process holds it. """
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        import msvcrt
+        try:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except (IOError, OSError):
+            return False
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except (IOError, OSError) as ex:
+        if ex.errno in (errno.EACCES, errno.EAGAIN):
+            return False
+        raise
+
+
+def _unlock(lock_file):
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        import msvcrt
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def kubeconfig_lock(path, timeout=LOCK_TIMEOUT):
+    """ Holds the advisory lock of a kubeconfig file. Only processes which take the lock too are kept out. """
+    # a kubeconfig reached through symbolic links is locked next to the file it links to
+    lock_path = os.path.realpath(path) + '.lock'
+    with os.fdopen(os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o600), 'r+') as lock_file:
+        deadline = time.time() + timeout
+        while not _try_lock(lock_file):
+            if time.time() > deadline:
+                raise CLIError("Timed out waiting for the lock on '{}'. If no other process is merging credentials "
+                               "into it, delete '{}'.".format(path, lock_path))
+            time.sleep(_LOCK_RETRY_INTERVAL)
+        try:
+            yield
+        finally:
+            _unlock(lock_file)
+
+
+def write_kubeconfig(path, config):
+    """ Replaces the kubeconfig file with config and returns the path of the file written. The new file is
+    readable and writable by its owner only. A symbolic link is kept, and the file it links to is replaced. """
+    import tempfile
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path)
+    # mkstemp creates the file with mode 0600
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as stream:
+            yaml.safe_dump(config, stream, default_flow_style=False)
+            stream.flush()
+            os.fsync(stream.fileno())
+        replace = getattr(os, 'replace', None)
+        if replace:
+            replace(temp_path, path)
+        else:  # Python 2.7
+            if os.path.exists(path) and os.name == 'nt':
+                os.remove(path)
+            os.rename(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+
+def _get_server(cluster):
+    server = ((cluster or {}).get('cluster') or {}).get('server') or ''
+    return server.lower().rstrip('/')
+
+
+def get_refreshable_names(existing, addition):
+    """ Returns the names of the clusters, contexts and users of addition which belong to a cluster of existing
+    with the same name and server FQDN. They are new credentials for the same cluster and replace the existing
+    entries, so that fetching credentials again is idempotent. """
+    servers = {c.get('name'): _get_server(c) for c in existing.get('clusters') or []}
+    clusters = set(c.get('name') for c in addition.get('clusters') or []
+                   if _get_server(c) and servers.get(c.get('name')) == _get_server(c))
+    contexts = [c for c in addition.get('contexts') or [] if (c.get('context') or {}).get('cluster') in clusters]
+    users = set((c.get('context') or {}).get('user') for c in contexts)
+    return clusters | set(c.get('name') for c in contexts) | users
+
+
+def handle_merge(existing, addition, key, replace, refreshable=()):
+    if not addition.get(key):
+        return
+    if existing.get(key) is None:
+        existing[key] = addition[key]
+        return
+
+    for i in addition[key]:
+        for j in existing[key]:
+            if i['name'] == j['name'] and not (replace or i == j or i['name'] in refreshable):
+                raise CLIError('A different object named {} already exists in {}'.format(i['name'], key))
+        existing[key] = [j for j in existing[key] if j['name'] != i['name']] + [i]
+
+
+def merge_kubeconfig(existing, addition, replace):
+    """ Merges the clusters, users and contexts of addition into existing and returns the result. """
+    if existing is None:
+        return addition
+    refreshable = get_refreshable_names(existing, addition)
+    for key in ['clusters', 'users', 'contexts']:
+        handle_merge(existing, addition, key, replace, refreshable)
+    existing['current-context'] = addition.get('current-context')
+    return existing
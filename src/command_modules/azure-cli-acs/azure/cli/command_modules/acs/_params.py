@@ -189,6 +189,10 @@ def load_arguments(self, _):
         c.argument('admin', options_list=['--admin', '-a'], default=False)
         c.argument('path', options_list=['--file', '-f'], type=file_type, completer=FilesCompleter(),
                    default=os.path.join(os.path.expanduser('~'), '.kube', 'config'))
+        c.argument('clusters', nargs='+', arg_group='Bulk',
+                   help='Space-separated names or IDs of managed clusters whose credentials are fetched concurrently and merged with a single write.')
+        c.argument('max_parallel', type=int, arg_group='Bulk',
+                   help='The maximum number of clusters whose credentials are fetched at the same time.')
 
     with self.argument_context('aks install-cli') as c:
         c.argument('client_version', validator=validate_k8s_client_version)
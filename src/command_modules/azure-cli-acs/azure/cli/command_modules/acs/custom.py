@@ -1002,22 +1002,6 @@ def _k8s_get_credentials_internal(name, acs_info, path, ssh_key_file, overwrite_
             logger.warning('The credentials have been saved to %s', path_candidate)
 
 
-def _handle_merge(existing, addition, key, replace):
-    if addition[key]:
-        if existing[key] is None:
-            existing[key] = addition[key]
-            return
-
-        for i in addition[key]:
-            for j in existing[key]:
-                if i['name'] == j['name']:
-                    if replace or i == j:
-                        existing[key].remove(j)
-                    else:
-                        raise CLIError('A different object named {} already exists in {}'.format(i['name'], key))
-            existing[key].append(i)
-
-
 def load_kubernetes_configuration(filename):
     try:
         with open(filename) as stream:
@@ -1031,10 +1015,7 @@ def load_kubernetes_configuration(filename):
         raise CLIError('Error parsing {} ({})'.format(filename, str(ex)))
 
 
-def merge_kubernetes_configurations(existing_file, addition_file, replace):
-    existing = load_kubernetes_configuration(existing_file)
-    addition = load_kubernetes_configuration(addition_file)
-
+def _rename_admin_context(addition):
     # rename the admin context so it doesn't overwrite the user context
     for ctx in addition.get('contexts', []):
         try:
@@ -1045,30 +1026,37 @@ def merge_kubernetes_configurations(existing_file, addition_file, replace):
         except (KeyError, TypeError):
             continue
 
-    if addition is None:
-        raise CLIError('failed to load additional configuration from {}'.format(addition_file))
 
-    if existing is None:
-        existing = addition
-    else:
-        _handle_merge(existing, addition, 'clusters', replace)
-        _handle_merge(existing, addition, 'users', replace)
-        _handle_merge(existing, addition, 'contexts', replace)
-        existing['current-context'] = addition['current-context']
+def _merge_into_kubernetes_configuration(existing_file, additions, replace):
+    """ Merges loaded configurations into a kubeconfig file with a single write, while holding its lock. """
+    from azure.cli.command_modules.acs._kubeconfig import kubeconfig_lock, merge_kubeconfig, write_kubeconfig
+    with kubeconfig_lock(existing_file):
+        existing = load_kubernetes_configuration(existing_file)
+        for addition in additions:
+            existing = merge_kubeconfig(existing, addition, replace)
+        written_file = write_kubeconfig(existing_file, existing)
+
+        # check that ~/.kube/config is only read- and writable by its owner
+        if platform.system() != 'Windows':
+            existing_file_perms = "{:o}".format(stat.S_IMODE(os.stat(written_file).st_mode))
+            if not existing_file_perms.endswith('600'):
+                logger.warning('%s has permissions "%s".\nIt should be readable and writable only by its owner.',
+                               existing_file, existing_file_perms)
 
-    # check that ~/.kube/config is only read- and writable by its owner
-    if platform.system() != 'Windows':
-        existing_file_perms = "{:o}".format(stat.S_IMODE(os.lstat(existing_file).st_mode))
-        if not existing_file_perms.endswith('600'):
-            logger.warning('%s has permissions "%s".\nIt should be readable and writable only by its owner.',
-                           existing_file, existing_file_perms)
+    for addition in additions:
+        current_context = addition.get('current-context', 'UNKNOWN')
+        msg = 'Merged "{}" as current context in {}'.format(current_context, existing_file)
+        print(msg)
+
+
+def merge_kubernetes_configurations(existing_file, addition_file, replace):
+    addition = load_kubernetes_configuration(addition_file)
 
-    with open(existing_file, 'w+') as stream:
-        yaml.safe_dump(existing, stream, default_flow_style=False)
+    if addition is None:
+        raise CLIError('failed to load additional configuration from {}'.format(addition_file))
 
-    current_context = addition.get('current-context', 'UNKNOWN')
-    msg = 'Merged "{}" as current context in {}'.format(current_context, existing_file)
-    print(msg)
+    _rename_admin_context(addition)
+    _merge_into_kubernetes_configuration(existing_file, [addition], replace)
 
 
 def _get_host_name(acs_info):
@@ -1657,10 +1645,7 @@ def aks_get_versions(cmd, client, location):
     return client.list_orchestrators(location, resource_type='managedClusters')
 
 
-def aks_get_credentials(cmd, client, resource_group_name, name, admin=False,
-                        path=os.path.join(os.path.expanduser('~'), '.kube', 'config'),
-                        overwrite_existing=False):
-    credentialResults = None
+def _get_kubeconfig(client, resource_group_name, name, admin):
     if admin:
         credentialResults = client.list_cluster_admin_credentials(resource_group_name, name)
     else:
@@ -1668,12 +1653,66 @@ def aks_get_credentials(cmd, client, resource_group_name, name, admin=False,
 
     if not credentialResults:
         raise CLIError("No Kubernetes credentials found.")
-    else:
+    try:
+        return credentialResults.kubeconfigs[0].value.decode(encoding='UTF-8')
+    except (IndexError, ValueError):
+        raise CLIError("Fail to find kubeconfig file.")
+
+
+def aks_get_credentials(cmd, client, resource_group_name=None, name=None, admin=False,
+                        path=os.path.join(os.path.expanduser('~'), '.kube', 'config'),
+                        overwrite_existing=False, clusters=None, max_parallel=8):
+    if clusters:
+        _aks_get_many_credentials(client, clusters, resource_group_name, admin, path, overwrite_existing,
+                                  max_parallel)
+        return
+    if not resource_group_name or not name:
+        raise CLIError('usage error: --resource-group NAME --name NAME | --clusters NAME_OR_ID [NAME_OR_ID ...]')
+
+    kubeconfig = _get_kubeconfig(client, resource_group_name, name, admin)
+    _print_or_merge_credentials(path, kubeconfig, overwrite_existing)
+
+
+def _aks_get_many_credentials(client, clusters, resource_group_name, admin, path, overwrite_existing,
+                              max_parallel):
+    """ Fetches the credentials of many clusters concurrently and merges them into the kubeconfig with one write. """
+    from concurrent.futures import ThreadPoolExecutor
+    from msrestazure.tools import is_valid_resource_id, parse_resource_id
+    if max_parallel < 1:
+        raise CLIError('--max-parallel must be greater than 0.')
+    targets = []
+    for cluster in clusters:
+        if is_valid_resource_id(cluster):
+            parts = parse_resource_id(cluster)
+            targets.append((parts['resource_group'], parts['name']))
+        elif resource_group_name:
+            targets.append((resource_group_name, cluster))
+        else:
+            raise CLIError('usage error: --resource-group is required for cluster names which are not IDs.')
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        futures = [(t, executor.submit(_get_kubeconfig, client, t[0], t[1], admin)) for t in targets]
+    kubeconfigs, failed = [], []
+    for (rg, name), future in futures:
         try:
-            kubeconfig = credentialResults.kubeconfigs[0].value.decode(encoding='UTF-8')
-            _print_or_merge_credentials(path, kubeconfig, overwrite_existing)
-        except (IndexError, ValueError):
-            raise CLIError("Fail to find kubeconfig file.")
+            kubeconfigs.append(future.result())
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning("Failed to get the credentials of cluster '%s' in '%s': %s", name, rg, ex)
+            failed.append(name)
+
+    if path == "-":
+        for kubeconfig in kubeconfigs:
+            print(kubeconfig)
+    elif kubeconfigs:
+        _ensure_kubernetes_configuration_exists(path)
+        additions = []
+        for kubeconfig in kubeconfigs:
+            addition = yaml.safe_load(kubeconfig)
+            _rename_admin_context(addition)
+            additions.append(addition)
+        _merge_into_kubernetes_configuration(path, additions, overwrite_existing)
+    if failed:
+        raise CLIError('Failed to get the credentials of: {}'.format(', '.join(failed)))
 
 
 ADDONS = {
@@ -2340,15 +2379,7 @@ def _get_rg_location(ctx, resource_group_name, subscription_id=None):
     return rg.location
 
 
-def _print_or_merge_credentials(path, kubeconfig, overwrite_existing):
-    """Merge an unencrypted kubeconfig into the file at the specified path, or print it to
-    stdout if the path is "-".
-    """
-    # Special case for printing to stdout
-    if path == "-":
-        print(kubeconfig)
-        return
-
+def _ensure_kubernetes_configuration_exists(path):
     # ensure that at least an empty ~/.kube/config exists
     directory = os.path.dirname(path)
     if directory and not os.path.exists(directory):
@@ -2361,6 +2392,18 @@ def _print_or_merge_credentials(path, kubeconfig, overwrite_existing):
         with os.fdopen(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600), 'wt'):
             pass
 
+
+def _print_or_merge_credentials(path, kubeconfig, overwrite_existing):
+    """Merge an unencrypted kubeconfig into the file at the specified path, or print it to
+    stdout if the path is "-".
+    """
+    # Special case for printing to stdout
+    if path == "-":
+        print(kubeconfig)
+        return
+
+    _ensure_kubernetes_configuration_exists(path)
+
     # merge the new kubeconfig into the existing one
     fd, temp_path = tempfile.mkstemp()
     additional_file = os.fdopen(fd, 'w+t')
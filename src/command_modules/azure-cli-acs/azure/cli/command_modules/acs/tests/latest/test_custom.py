@@ -544,6 +544,112 @@ class AcsCustomCommandTest(unittest.TestCase):
         self.assertEqual(merged['users'], expected_users)
         self.assertEqual(merged['current-context'], obj2['current-context'])
 
+    @staticmethod
+    def _kubeconfig(name, token, server=None):
+        return {
+            'clusters': [{'cluster': {'server': server or 'https://{}-abc123.hcp.eastus.azmk8s.io:443'.format(name)},
+                          'name': name}],
+            'contexts': [{'context': {'cluster': name, 'user': 'clusterUser_rg_' + name}, 'name': name}],
+            'users': [{'name': 'clusterUser_rg_' + name, 'user': {'token': token}}],
+            'current-context': name,
+        }
+
+    def test_merge_credentials_again_replaces_same_cluster(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        existing = os.path.join(temp_dir, 'config')
+        addition = os.path.join(temp_dir, 'addition')
+        with open(existing, 'w') as stream:
+            yaml.safe_dump(self._kubeconfig('cluster1', 'token1'), stream)
+        with open(addition, 'w') as stream:
+            yaml.safe_dump(self._kubeconfig('cluster1', 'token2'), stream)
+
+        # the server is unchanged, so the rotated token replaces the old one without --overwrite-existing
+        merge_kubernetes_configurations(existing, addition, False)
+        with open(existing) as stream:
+            merged = yaml.safe_load(stream)
+        self.assertEqual(merged, self._kubeconfig('cluster1', 'token2'))
+        if platform.system() != 'Windows':
+            self.assertEqual(os.stat(existing).st_mode & 0o777, 0o600)
+
+        with open(addition, 'w') as stream:
+            yaml.safe_dump(self._kubeconfig('cluster1', 'token3', server='https://other.azmk8s.io:443'), stream)
+        with self.assertRaises(CLIError):
+            merge_kubernetes_configurations(existing, addition, False)
+
+    @unittest.skipIf(platform.system() == 'Windows', 'symbolic links need privileges on Windows')
+    def test_merge_credentials_through_symlink(self):
+        from azure.cli.command_modules.acs import custom
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        target = os.path.join(temp_dir, 'shared', 'config')
+        os.makedirs(os.path.dirname(target))
+        with open(target, 'w') as stream:
+            yaml.safe_dump(self._kubeconfig('cluster1', 'token1'), stream)
+        os.chmod(target, 0o644)
+        existing = os.path.join(temp_dir, 'config')
+        os.symlink(target, existing)
+        addition = os.path.join(temp_dir, 'addition')
+        with open(addition, 'w') as stream:
+            yaml.safe_dump(self._kubeconfig('cluster2', 'token2'), stream)
+
+        with mock.patch.object(custom.logger, 'warning') as warning:
+            merge_kubernetes_configurations(existing, addition, False)
+
+        # the link is kept and the file it links to is updated, with the permissions of the new file
+        self.assertTrue(os.path.islink(existing))
+        with open(target) as stream:
+            merged = yaml.safe_load(stream)
+        self.assertEqual([c['name'] for c in merged['clusters']], ['cluster1', 'cluster2'])
+        self.assertEqual(os.stat(target).st_mode & 0o777, 0o600)
+        warning.assert_not_called()
+        self.assertEqual(sorted(os.listdir(os.path.dirname(target))), ['config', 'config.lock'])
+
+    def test_merge_credentials_concurrently(self):
+        from concurrent.futures import ThreadPoolExecutor
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        existing = os.path.join(temp_dir, 'config')
+        open(existing, 'w').close()
+        additions = []
+        for i in range(20):
+            additions.append(os.path.join(temp_dir, 'addition{}'.format(i)))
+            with open(additions[-1], 'w') as stream:
+                yaml.safe_dump(self._kubeconfig('cluster{}'.format(i), 'token'), stream)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for future in [executor.submit(merge_kubernetes_configurations, existing, a, False) for a in additions]:
+                future.result()
+
+        with open(existing) as stream:
+            merged = yaml.safe_load(stream)
+        self.assertEqual(sorted(c['name'] for c in merged['clusters']), sorted('cluster{}'.format(i) for i in range(20)))
+        self.assertEqual(len(merged['users']), 20)
+
+    def test_aks_get_credentials_for_many_clusters(self):
+        from azure.cli.command_modules.acs.custom import aks_get_credentials
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        path = os.path.join(temp_dir, 'config')
+
+        def _credentials(resource_group_name, name):
+            if name == 'missing':
+                raise CloudError(mock.MagicMock(status_code=404), 'not found')
+            kubeconfig = yaml.safe_dump(self._kubeconfig(name, 'token')).encode('utf-8')
+            return mock.MagicMock(kubeconfigs=[mock.MagicMock(value=kubeconfig)])
+
+        client = mock.MagicMock()
+        client.list_cluster_user_credentials.side_effect = _credentials
+        clusters = ['cluster1', '/subscriptions/sub/resourceGroups/rg2/providers/Microsoft.ContainerService/'
+                                'managedClusters/cluster2', 'missing']
+        with self.assertRaises(CLIError):
+            aks_get_credentials(mock.MagicMock(), client, resource_group_name='rg1', path=path, clusters=clusters)
+
+        client.list_cluster_user_credentials.assert_any_call('rg2', 'cluster2')
+        with open(path) as stream:
+            merged = yaml.safe_load(stream)
+        self.assertEqual([c['name'] for c in merged['clusters']], ['cluster1', 'cluster2'])
+
     def test_acs_sp_create_failed_with_polished_error_if_due_to_permission(self):
 
         class FakedError(object):
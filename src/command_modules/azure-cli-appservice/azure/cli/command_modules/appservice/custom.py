@@ -2098,24 +2098,24 @@ def list_locations(cmd, sku, linux_workers_enabled=None):
 
 def _check_zip_deployment_status(deployment_status_url, authorization, timeout=None):
     import requests
-    total_trials = (int(timeout) // 2) if timeout else 450
-    num_trials = 0
-    while num_trials < total_trials:
-        time.sleep(2)
-        response = requests.get(deployment_status_url, headers=authorization)
+    from azure.cli.core.wait import wait_until, is_transient_error, WaitTimeoutError
+
+    def _deployment_done(response):
         res_dict = response.json()
-        num_trials = num_trials + 1
         if res_dict.get('status', 0) == 3:
             raise CLIError("Zip deployment failed. {}".format(res_dict))
-        elif res_dict.get('status', 0) == 4:
-            break
         if 'progress' in res_dict:
             logger.info(res_dict['progress'])  # show only in debug mode, customers seem to find this confusing
-    # if the deployment is taking longer than expected
-    if res_dict.get('status', 0) != 4:
+        return res_dict.get('status', 0) == 4
+
+    try:
+        response = wait_until(lambda: requests.get(deployment_status_url, headers=authorization), _deployment_done,
+                              interval=2, timeout=int(timeout) if timeout else 900, retry_on=is_transient_error)
+    except WaitTimeoutError:
+        # if the deployment is taking longer than expected
         raise CLIError("""Deployment is taking longer than expected. Please verify
                             status at '{}' beforing launching the app""".format(deployment_status_url))
-    return res_dict
+    return response.json()
 
 
 def list_continuous_webjobs(cmd, resource_group_name, name, slot=None):
@@ -2380,20 +2380,25 @@ def create_tunnel_and_session(cmd, resource_group_name, name, port=None, slot=No
 
     while s.isAlive() and t.isAlive():
         time.sleep(5)
+    tunnel_server.stop()
 
 
 def _wait_for_webapp(tunnel_server):
-    tries = 0
-    while True:
-        if is_webapp_up(tunnel_server):
-            break
-        if tries == 0:
-            logger.warning('Connection is not ready yet, please wait')
-        if tries == 60:
-            raise CLIError("Timeout Error, Unable to establish a connection")
-        tries = tries + 1
-        logger.warning('.')
-        time.sleep(1)
+    from azure.cli.core.wait import wait_until, WaitTimeoutError
+    reported = []
+
+    def _webapp_up(is_up):
+        if not is_up:
+            if not reported:
+                logger.warning('Connection is not ready yet, please wait')
+                reported.append(True)
+            logger.warning('.')
+        return is_up
+
+    try:
+        wait_until(lambda: is_webapp_up(tunnel_server), _webapp_up, interval=1, timeout=60)
+    except WaitTimeoutError:
+        raise CLIError("Timeout Error, Unable to establish a connection")
 
 
 def _start_tunnel(tunnel_server):
@@ -0,0 +1,146 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import socket
+import threading
+import time
+import unittest
+from contextlib import closing
+
+from azure.cli.command_modules.appservice.tunnel import TunnelServer, SocketRemote
+
+
+class EchoServer(object):
+    """ A local TCP server sending back whatever it receives, standing in for the Kudu tunnel. """
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(100)
+        self.address = self.sock.getsockname()
+        self.connections = 0
+        thread = threading.Thread(target=self._serve)
+        thread.daemon = True
+        thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except (OSError, IOError, socket.error):
+                return
+            self.connections += 1
+            thread = threading.Thread(target=self._echo, args=(client,))
+            thread.daemon = True
+            thread.start()
+
+    @staticmethod
+    def _echo(client):
+        with closing(client):
+            while True:
+                data = client.recv(65536)
+                if not data:
+                    return
+                client.sendall(data)
+
+    def connect(self):
+        return SocketRemote(socket.create_connection(self.address))
+
+    def close(self):
+        self.sock.close()
+
+
+def _recv_exactly(sock, size):
+    chunks, received = [], 0
+    while received < size:
+        data = sock.recv(min(65536, size - received))
+        if not data:
+            break
+        chunks.append(data)
+        received += len(data)
+    return b''.join(chunks)
+
+
+class TestTunnelServer(unittest.TestCase):
+    def setUp(self):
+        self.echo = EchoServer()
+        self.tunnel = TunnelServer('127.0.0.1', 0, 'myapp', 'user', 'password', remote_factory=self.echo.connect)
+        self.thread = threading.Thread(target=self.tunnel.start_server)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        self.tunnel.stop()
+        self.thread.join(15)
+        self.echo.close()
+
+    def _connect(self):
+        sock = socket.create_connection(('127.0.0.1', self.tunnel.get_port()))
+        sock.settimeout(10)
+        return sock
+
+    def test_tunnel_multiplexes_concurrent_connections(self):
+        clients = [self._connect() for _ in range(20)]
+        for i, client in enumerate(clients):
+            client.sendall('hello {}'.format(i).encode())
+        for i, client in enumerate(clients):
+            expected = 'hello {}'.format(i).encode()
+            self.assertEqual(_recv_exactly(client, len(expected)), expected)
+        self.assertEqual(self.echo.connections, 20)
+        self.assertEqual(len(self.tunnel.connections), 20)
+        for client in clients:
+            client.close()
+
+    def test_tunnel_applies_backpressure_to_large_transfers(self):
+        payload = bytes(bytearray(i % 251 for i in range(8 * 1024 * 1024)))
+        client = self._connect()
+        received = []
+        reader = threading.Thread(target=lambda: received.append(_recv_exactly(client, len(payload))))
+        reader.start()
+        client.sendall(payload)
+        reader.join(30)
+        self.assertEqual(received[0], payload)
+        stats = self.tunnel.get_stats()[0]
+        self.assertEqual(stats['bytesFromClient'], len(payload))
+        self.assertEqual(stats['bytesToClient'], len(payload))
+        self.assertTrue(stats['open'])
+        client.close()
+
+    def test_tunnel_closes_connections_and_records_stats(self):
+        client = self._connect()
+        client.sendall(b'ping')
+        self.assertEqual(_recv_exactly(client, 4), b'ping')
+        client.close()
+        for _ in range(50):
+            if not self.tunnel.connections:
+                break
+            time.sleep(0.1)
+        self.assertEqual(self.tunnel.connections, {})
+        stats = self.tunnel.get_stats()
+        self.assertEqual(len(stats), 1)
+        self.assertFalse(stats[0]['open'])
+        self.assertEqual((stats[0]['bytesFromClient'], stats[0]['bytesToClient']), (4, 4))
+
+    def test_tunnel_closes_idle_connections(self):
+        self.tunnel.idle_timeout = 0.5
+        client = self._connect()
+        client.sendall(b'ping')
+        self.assertEqual(_recv_exactly(client, 4), b'ping')
+        # the tunnel closes the connection, so the client reads the end of the stream
+        self.assertEqual(client.recv(1), b'')
+        client.close()
+
+    def test_tunnel_stops_gracefully(self):
+        client = self._connect()
+        client.sendall(b'ping')
+        self.assertEqual(_recv_exactly(client, 4), b'ping')
+        self.tunnel.stop()
+        self.thread.join(15)
+        self.assertFalse(self.thread.is_alive())
+        self.assertEqual(client.recv(1), b'')
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,40 +3,144 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+"""A local TCP server tunneling every accepted connection through a websocket of its own to the Kudu tunnel.
+
+All connections are served by one event loop thread. Local sockets are non-blocking and read into one preallocated
+buffer; the remote end of a connection is read when its socket is readable and written by a small pool of sender
+threads, so that a slow remote doesn't hold up the others. Data waiting to be written to one side is bounded: once
+more than HIGH_WATER bytes are pending, the other side is not read until fewer than LOW_WATER bytes are left.
+Connections idle for longer than the idle timeout are closed, and `stop` stops accepting connections and closes
+the open ones once their pending data has been written.
+"""
+
 # pylint: disable=import-error,unused-import
-import sys
+import errno
 import ssl
 import socket
 import time
-import traceback
 import logging as logs
+from collections import deque
 from contextlib import closing
-from datetime import datetime
-from threading import Thread
 
-import websocket
-from websocket import create_connection, WebSocket
+try:
+    import selectors
+except ImportError:  # Python 2.7
+    import selectors34 as selectors
 
 from knack.util import CLIError
 from knack.log import get_logger
 logger = get_logger(__name__)
 
+BUFFER_SIZE = 64 * 1024
+HIGH_WATER = 1024 * 1024
+LOW_WATER = 256 * 1024
+IDLE_TIMEOUT = 60 * 60
+SHUTDOWN_TIMEOUT = 10
+MAX_SENDERS = 4
+_TICK = 1
+
+_WOULD_BLOCK = (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR)
+
+
+class SocketRemote(object):
+    """ The remote end of a connection over a plain TCP socket, e.g. to a local echo server in tests. """
 
-class TunnelWebSocket(WebSocket):
-    def recv_frame(self):
-        frame = super(TunnelWebSocket, self).recv_frame()
-        logger.info('Received frame: %s', frame)
-        return frame
+    def __init__(self, sock):
+        self.sock = sock
+
+    def fileno(self):
+        return self.sock.fileno()
 
     def recv(self):
-        data = super(TunnelWebSocket, self).recv()
-        logger.info('Received websocket data: %s', data)
-        return data
+        """ Returns the next data received, b'' once the remote has closed the connection. """
+        return self.sock.recv(BUFFER_SIZE)
+
+    def pending(self):  # pylint: disable=no-self-use
+        return False
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+    def close(self):
+        self.sock.close()
+
+
+class WebSocketRemote(SocketRemote):
+    """ The remote end of a connection over a websocket. A readable socket is read a message at a time. """
+
+    def recv(self):
+        from websocket import ABNF
+        opcode, data = self.sock.recv_data()
+        return b'' if opcode == ABNF.OPCODE_CLOSE else data
+
+    def pending(self):
+        # TLS may have decrypted data in its buffer which doesn't make the socket readable
+        pending = getattr(self.sock.sock, 'pending', None)
+        return bool(pending and pending())
+
+    def fileno(self):
+        return self.sock.sock.fileno()
+
+    def send(self, data):
+        self.sock.send_binary(data)
 
 
-# pylint: disable=no-member,too-many-instance-attributes,bare-except,no-self-use
+def _socketpair():
+    """ A connected pair of sockets, used to wake up the event loop from other threads. """
+    if hasattr(socket, 'socketpair'):
+        return socket.socketpair()
+    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as listener:  # Windows, Python 2.7
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        writer = socket.create_connection(listener.getsockname())
+        reader, _ = listener.accept()
+    return reader, writer
+
+
+class _Connection(object):  # pylint: disable=too-many-instance-attributes
+    """ A local client and its remote end. Data read from one side waits in the buffer of the other side until it
+    has been written. """
+
+    def __init__(self, index, client, address):
+        self.index = index
+        self.client = client
+        self.address = address
+        self.remote = None
+        self.to_client = deque()
+        self.to_client_size = 0
+        self.to_remote = deque()
+        self.to_remote_size = 0
+        self.sending = False
+        self.client_paused = False
+        self.remote_paused = False
+        self.client_eof = False
+        self.remote_eof = False
+        self.closed = False
+        self.bytes_from_client = 0
+        self.bytes_to_client = 0
+        self.opened = time.time()
+        self.last_activity = self.opened
+
+    def stats(self):
+        duration = (time.time() if not self.closed else self.last_activity) - self.opened
+        transferred = self.bytes_from_client + self.bytes_to_client
+        return {
+            'index': self.index,
+            'address': '{}:{}'.format(*self.address[:2]) if self.address else None,
+            'open': not self.closed,
+            'duration': round(duration, 3),
+            'bytesFromClient': self.bytes_from_client,
+            'bytesToClient': self.bytes_to_client,
+            'throughput': round(transferred / float(duration)) if duration > 0 else transferred
+        }
+
+
+# pylint: disable=too-many-instance-attributes
 class TunnelServer(object):
-    def __init__(self, local_addr, local_port, remote_addr, remote_user_name, remote_password):
+    def __init__(self, local_addr, local_port, remote_addr, remote_user_name, remote_password,
+                 remote_factory=None, idle_timeout=IDLE_TIMEOUT, max_senders=MAX_SENDERS):
+        """ remote_factory returns the remote end of a new connection, by default a websocket to the Kudu tunnel
+        of remote_addr. """
         self.local_addr = local_addr
         self.local_port = local_port
         if self.local_port != 0 and not self.is_port_open():
@@ -44,8 +148,20 @@ class TunnelServer(object):
         self.remote_addr = remote_addr
         self.remote_user_name = remote_user_name
         self.remote_password = remote_password
-        self.client = None
-        self.ws = None
+        self.remote_factory = remote_factory or self._create_websocket
+        self.idle_timeout = idle_timeout
+        self.max_senders = max_senders
+        self.connections = {}
+        self.closed_stats = deque(maxlen=1000)
+        self._selector = None
+        self._registered = {}
+        self._buffer = bytearray(BUFFER_SIZE)
+        self._view = memoryview(self._buffer)
+        self._callbacks = deque()
+        self._executor = None
+        self._stopping = False
+        self._wake_reader, self._wake_writer = None, None
+        self._index = 0
         logger.info('Creating a socket on port: %s', self.local_port)
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         logger.info('Setting socket options')
@@ -55,6 +171,8 @@ class TunnelServer(object):
         if self.local_port == 0:
             self.local_port = self.sock.getsockname()[1]
             logger.info('Auto-selecting port: %s', self.local_port)
+        # connections made before the server is started wait in the backlog
+        self.sock.listen(100)
         logger.info('Finished initialization')
 
     def create_basic_auth(self):
@@ -103,89 +221,306 @@ class TunnelServer(object):
             return True
         return False
 
-    def _listen(self):
-        self.sock.listen(100)
-        index = 0
-        basic_auth_string = self.create_basic_auth()
-        while True:
-            self.client, _address = self.sock.accept()
-            self.client.settimeout(60 * 60)
-            host = 'wss://{}{}'.format(self.remote_addr, '.scm.azurewebsites.net/AppServiceTunnel/Tunnel.ashx')
-            basic_auth_header = 'Authorization: Basic {}'.format(basic_auth_string)
-            cli_logger = get_logger()  # get CLI logger which has the level set through command lines
-            is_verbose = any(handler.level <= logs.INFO for handler in cli_logger.handlers)
-            if is_verbose:
-                logger.info('Websocket tracing enabled')
-                websocket.enableTrace(True)
-            else:
-                logger.info('Websocket tracing disabled, use --verbose flag to enable')
-                websocket.enableTrace(False)
-            self.ws = create_connection(host,
-                                        sockopt=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
-                                        class_=TunnelWebSocket,
-                                        header=[basic_auth_header],
-                                        sslopt={'cert_reqs': ssl.CERT_NONE},
-                                        timeout=60 * 60,
-                                        enable_multithread=True)
-            logger.info('Websocket, connected status: %s', self.ws.connected)
-            index = index + 1
-            logger.info('Got debugger connection... index: %s', index)
-            debugger_thread = Thread(target=self._listen_to_client, args=(self.client, self.ws, index))
-            web_socket_thread = Thread(target=self._listen_to_web_socket, args=(self.client, self.ws, index))
-            debugger_thread.start()
-            web_socket_thread.start()
-            logger.info('Both debugger and websocket threads started...')
-            logger.info('Successfully connected to local server..')
-            debugger_thread.join()
-            web_socket_thread.join()
-            logger.info('Both debugger and websocket threads stopped...')
-            logger.info('Stopped local server..')
+    def _create_websocket(self):
+        import websocket
+        host = 'wss://{}{}'.format(self.remote_addr, '.scm.azurewebsites.net/AppServiceTunnel/Tunnel.ashx')
+        basic_auth_header = 'Authorization: Basic {}'.format(self.create_basic_auth())
+        cli_logger = get_logger()  # get CLI logger which has the level set through command lines
+        websocket.enableTrace(any(handler.level <= logs.DEBUG for handler in cli_logger.handlers))
+        ws = websocket.create_connection(host,
+                                         sockopt=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
+                                         header=[basic_auth_header],
+                                         sslopt={'cert_reqs': ssl.CERT_NONE},
+                                         timeout=60 * 60,
+                                         enable_multithread=True)
+        logger.info('Websocket, connected status: %s', ws.connected)
+        return WebSocketRemote(ws)
+
+    # region event loop
+    def _set_events(self, fileobj, events, data):
+        """ Registers fileobj with the selector for events, or unregisters it if there are none. """
+        current = self._registered.get(fileobj, 0)
+        if current == events:
+            return
+        if not events:
+            self._selector.unregister(fileobj)
+            del self._registered[fileobj]
+        elif not current:
+            self._selector.register(fileobj, events, data)
+            self._registered[fileobj] = events
+        else:
+            self._selector.modify(fileobj, events, data)
+            self._registered[fileobj] = events
 
-    def _listen_to_web_socket(self, client, ws_socket, index):
+    def _update_events(self, conn):
+        if conn.closed:
+            return
+        if conn.to_remote_size >= HIGH_WATER:
+            conn.client_paused = True
+        elif conn.to_remote_size < LOW_WATER:
+            conn.client_paused = False
+        if conn.to_client_size >= HIGH_WATER:
+            conn.remote_paused = True
+        elif conn.to_client_size < LOW_WATER:
+            conn.remote_paused = False
+        reading = conn.remote is not None and not (conn.client_paused or conn.client_eof or self._stopping)
+        client_events = (selectors.EVENT_READ if reading else 0) | (selectors.EVENT_WRITE if conn.to_client else 0)
+        self._set_events(conn.client, client_events, (self._on_client_event, conn))
+        if conn.remote is not None:
+            reading = not (conn.remote_paused or conn.remote_eof or self._stopping)
+            self._set_events(conn.remote, selectors.EVENT_READ if reading else 0, (self._on_remote_event, conn))
+
+    def _call_soon(self, callback, *args):
+        """ Runs callback on the event loop thread. Safe to call from any thread. """
+        self._callbacks.append((callback, args))
         try:
-            while True:
-                logger.info('Waiting for websocket data, connection status: %s, index: %s', ws_socket.connected, index)
-                data = ws_socket.recv()
-                logger.info('Received websocket data: %s, index: %s', data, index)
-                if data:
-                    # Set the response to echo back the recieved data
-                    response = data
-                    logger.info('Sending to debugger, response: %s, index: %s', response, index)
-                    client.sendall(response)
-                    logger.info('Done sending to debugger, index: %s', index)
-                else:
-                    break
+            self._wake_writer.send(b'\0')
+        except (OSError, IOError, socket.error):
+            pass  # the loop has been woken up already
+
+    def _on_wake(self, _events):
+        try:
+            while self._wake_reader.recv(4096):
+                pass
+        except (OSError, IOError, socket.error):
+            pass
+        while self._callbacks:
+            callback, args = self._callbacks.popleft()
+            callback(*args)
+
+    def _on_accept(self, _events):
+        while not self._stopping:
+            try:
+                client, address = self.sock.accept()
+            except (OSError, IOError, socket.error) as ex:
+                if ex.errno in _WOULD_BLOCK:
+                    return
+                raise
+            client.setblocking(False)
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._index += 1
+            conn = _Connection(self._index, client, address)
+            self.connections[conn.index] = conn
+            logger.info('Got connection %s from %s', conn.index, address)
+            # the client isn't read until its remote end is connected
+            self._executor.submit(self._connect_remote, conn)
+
+    def _connect_remote(self, conn):
+        try:
+            remote = self.remote_factory()
         except Exception as ex:  # pylint: disable=broad-except
-            logger.info(ex)
-        finally:
-            logger.info('Client disconnected!, index: %s', index)
-            client.close()
-            ws_socket.close()
+            self._call_soon(self._on_remote_connected, conn, None, ex)
+            return
+        self._call_soon(self._on_remote_connected, conn, remote, None)
+
+    def _on_remote_connected(self, conn, remote, error):
+        if error is not None:
+            logger.warning('Unable to open the tunnel for connection %s: %s', conn.index, error)
+            self._close(conn)
+            return
+        if conn.closed:
+            remote.close()
+            return
+        conn.remote = remote
+        self._update_events(conn)
+        self._close_when_flushed(conn)
+
+    def _on_client_event(self, conn, events):
+        if conn.closed:
+            return
+        if events & selectors.EVENT_WRITE:
+            self._write_client(conn)
+        if events & selectors.EVENT_READ and not conn.closed:
+            self._read_client(conn)
+        self._update_events(conn)
 
-    def _listen_to_client(self, client, ws_socket, index):
+    def _read_client(self, conn):
+        try:
+            nbytes = conn.client.recv_into(self._buffer, BUFFER_SIZE)
+        except (OSError, IOError, socket.error) as ex:
+            if ex.errno in _WOULD_BLOCK:
+                return
+            logger.info('Connection %s: %s', conn.index, ex)
+            self._close(conn)
+            return
+        conn.last_activity = time.time()
+        if not nbytes:
+            conn.client_eof = True
+            self._close_when_flushed(conn)
+            return
+        conn.bytes_from_client += nbytes
+        # the buffer is read into again right away, so the data is copied once, to be queued
+        conn.to_remote.append(self._view[:nbytes].tobytes())
+        conn.to_remote_size += nbytes
+        self._send_remote(conn)
+
+    def _write_client(self, conn):
+        while conn.to_client:
+            data = conn.to_client[0]
+            try:
+                sent = conn.client.send(data)
+            except (OSError, IOError, socket.error) as ex:
+                if ex.errno in _WOULD_BLOCK:
+                    break
+                logger.info('Connection %s: %s', conn.index, ex)
+                self._close(conn)
+                return
+            conn.to_client_size -= sent
+            conn.bytes_to_client += sent
+            conn.last_activity = time.time()
+            if sent < len(data):
+                conn.to_client[0] = data[sent:]  # a memoryview, the rest isn't copied
+                break
+            conn.to_client.popleft()
+        self._close_when_flushed(conn)
+
+    def _on_remote_event(self, conn, _events):
+        if conn.closed:
+            return
         try:
             while True:
-                logger.info('Waiting for debugger data, index: %s', index)
-                buf = bytearray(4096)
-                nbytes = client.recv_into(buf, 4096)
-                logger.info('Received debugger data, nbytes: %s, index: %s', nbytes, index)
-                if nbytes > 0:
-                    responseData = buf[0:nbytes]
-                    logger.info('Sending to websocket, response data: %s, index: %s', responseData, index)
-                    ws_socket.send_binary(responseData)
-                    logger.info('Done sending to websocket, index: %s', index)
-                else:
+                data = conn.remote.recv()
+                conn.last_activity = time.time()
+                if not data:
+                    conn.remote_eof = True
+                    break
+                conn.to_client.append(memoryview(data))
+                conn.to_client_size += len(data)
+                if conn.to_client_size >= HIGH_WATER or not conn.remote.pending():
                     break
         except Exception as ex:  # pylint: disable=broad-except
-            logger.info(ex)
-            logger.warning("Connection Timed Out")
+            logger.info('Connection %s: %s', conn.index, ex)
+            self._close(conn)
+            return
+        self._write_client(conn)
+        self._update_events(conn)
+
+    def _send_remote(self, conn):
+        """ Hands the data pending for the remote to a sender thread, unless one is writing it already, so that
+        the data of a connection is sent in order. """
+        if conn.sending or not conn.to_remote or conn.closed:
+            return
+        batch = b''.join(conn.to_remote)
+        conn.to_remote.clear()
+        conn.sending = True
+        self._executor.submit(self._send_batch, conn, batch)
+
+    def _send_batch(self, conn, batch):
+        try:
+            conn.remote.send(batch)
+            error = None
+        except Exception as ex:  # pylint: disable=broad-except
+            error = ex
+        self._call_soon(self._on_remote_sent, conn, len(batch), error)
+
+    def _on_remote_sent(self, conn, nbytes, error):
+        conn.sending = False
+        conn.to_remote_size -= nbytes
+        if error is not None:
+            logger.info('Connection %s: %s', conn.index, error)
+            self._close(conn)
+            return
+        self._send_remote(conn)
+        self._close_when_flushed(conn)
+        self._update_events(conn)
+
+    def _close_when_flushed(self, conn):
+        """ Closes a connection once one side has closed and everything it sent has been written to the other. """
+        if conn.closed:
+            return
+        client_done = conn.client_eof and not conn.to_remote_size
+        remote_done = conn.remote_eof and not conn.to_client_size
+        draining = self._stopping and not conn.to_client_size and not conn.to_remote_size
+        if client_done or remote_done or draining or (self._stopping and conn.remote is None):
+            self._close(conn)
+
+    def _close(self, conn):
+        if conn.closed:
+            return
+        for fileobj in (conn.client, conn.remote):
+            if fileobj is None:
+                continue
+            self._set_events(fileobj, 0, None)
+            try:
+                fileobj.close()
+            except Exception:  # pylint: disable=broad-except
+                pass
+        conn.last_activity = time.time()
+        conn.closed = True
+        del self.connections[conn.index]
+        stats = conn.stats()
+        self.closed_stats.append(stats)
+        logger.info('Connection %s closed after %.1fs: %s bytes from the client, %s bytes to it (%s bytes/s)',
+                    conn.index, stats['duration'], stats['bytesFromClient'], stats['bytesToClient'],
+                    stats['throughput'])
+
+    def _close_idle(self):
+        if not self.idle_timeout:
+            return
+        now = time.time()
+        for conn in list(self.connections.values()):
+            if now - conn.last_activity > self.idle_timeout:
+                logger.warning('Closing connection %s, idle for more than %s seconds', conn.index, self.idle_timeout)
+                self._close(conn)
+
+    def _run(self):
+        deadline = None
+        while True:
+            if self._stopping:
+                if deadline is None:
+                    logger.info('Stopping the tunnel, closing %s connections', len(self.connections))
+                    deadline = time.time() + SHUTDOWN_TIMEOUT
+                    self._set_events(self.sock, 0, None)
+                    for conn in list(self.connections.values()):
+                        self._update_events(conn)
+                        self._close_when_flushed(conn)
+                if not self.connections or time.time() > deadline:
+                    break
+            for key, events in self._selector.select(_TICK):
+                callback, conn = key.data
+                if conn is None:
+                    callback(events)
+                else:
+                    callback(conn, events)
+            self._close_idle()
+        for conn in list(self.connections.values()):
+            self._close(conn)
+
+    def _listen(self):
+        self.sock.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._wake_reader, self._wake_writer = _socketpair()
+        self._wake_reader.setblocking(False)
+        self._wake_writer.setblocking(False)
+        self._set_events(self._wake_reader, selectors.EVENT_READ, (self._on_wake, None))
+        self._set_events(self.sock, selectors.EVENT_READ, (self._on_accept, None))
+        from concurrent.futures import ThreadPoolExecutor
+        self._executor = ThreadPoolExecutor(max_workers=self.max_senders)
+        try:
+            self._run()
         finally:
-            logger.info('Client disconnected %s', index)
-            client.close()
-            ws_socket.close()
+            self._executor.shutdown(wait=False)
+            self._selector.close()
+            self.sock.close()
+            self._wake_reader.close()
+            self._wake_writer.close()
+            logger.info('Stopped local server..')
+    # endregion
 
     def start_server(self):
+        """ Serves connections until stop is called. """
         self._listen()
 
+    def stop(self):
+        """ Stops accepting connections and closes the open ones once their pending data has been written, or
+        after SHUTDOWN_TIMEOUT seconds. Safe to call from any thread. """
+        self._stopping = True
+        if self._wake_writer is not None:
+            self._call_soon(lambda: None)
+
+    def get_stats(self):
+        """ Returns the byte counts and throughput of the open connections and of the last closed ones. """
+        return list(self.closed_stats) + [c.stats() for c in list(self.connections.values())]
+
     def get_port(self):
         return self.local_port
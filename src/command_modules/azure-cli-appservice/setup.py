@@ -68,5 +68,8 @@ setup(
         'azure.cli.command_modules.appservice'
     ],
     install_requires=DEPENDENCIES,
+    extras_require={
+        ":python_version<'3.4'": ['selectors34']
+    },
     cmdclass=cmdclass
 )
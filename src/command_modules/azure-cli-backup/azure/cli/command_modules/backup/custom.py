@@ -477,18 +477,17 @@ def stop_job(client, resource_group_name, vault_name, name):
 
 
 def wait_for_job(client, resource_group_name, vault_name, name, timeout=None):
+    from azure.cli.core.wait import wait_until, is_transient_error, WaitTimeoutError
     logger.warning("Waiting for job '%s' ...", name)
-    start_timestamp = datetime.utcnow()
-    job_details = client.get(vault_name, resource_group_name, name)
-    while _job_in_progress(job_details.properties.status):
-        if timeout:
-            elapsed_time = datetime.utcnow() - start_timestamp
-            if elapsed_time.seconds > timeout:
-                logger.warning("Command timed out while waiting for job '%s'", name)
-                break
-        job_details = client.get(vault_name, resource_group_name, name)
-        time.sleep(30)
-    return job_details
+    try:
+        # most jobs finish within minutes, so poll often at first and back off for long running ones
+        return wait_until(lambda: client.get(vault_name, resource_group_name, name),
+                          lambda job: not _job_in_progress(job.properties.status),
+                          interval=5, backoff=1.5, max_interval=30, jitter=0.1, timeout=timeout,
+                          retry_on=is_transient_error)
+    except WaitTimeoutError as ex:
+        logger.warning("Command timed out while waiting for job '%s'", name)
+        return ex.last_result
 
 # Client Utilities
 
@@ -924,27 +924,32 @@ def tail_file(client, resource_group, workspace_name, experiment_name, job_name,
 
 
 def wait_for_job_completion(client, resource_group, workspace_name, experiment_name, job_name, check_interval_sec=15):
-    job = client.jobs.get(resource_group, workspace_name, experiment_name, job_name)  # type: models.Job
-    logger.warning('Job submitted at %s', str(job.creation_time))
-    last_state = None
-    reported_job_start_time = False
-    while True:
+    from azure.cli.core.wait import wait_until, is_transient_error
+    reported = {'submitted': False, 'state': None, 'start_time': False}
+
+    def _get_job():
+        return client.jobs.get(resource_group, workspace_name, experiment_name, job_name)  # type: models.Job
+
+    def _job_finished(job):
+        if not reported['submitted']:
+            logger.warning('Job submitted at %s', str(job.creation_time))
+            reported['submitted'] = True
         info = job.execution_info  # type: models.JobPropertiesExecutionInfo
-        if info and not reported_job_start_time:
+        if info and not reported['start_time']:
             logger.warning('Job started execution at %s', str(info.start_time))
-            reported_job_start_time = True
-        if job.execution_state != last_state:
+            reported['start_time'] = True
+        if job.execution_state != reported['state']:
             logger.warning('Job state: %s', job.execution_state)
-            last_state = job.execution_state
-        if job.execution_state == models.ExecutionState.succeeded:
-            logger.warning('Job completed at %s; execution took %s', str(info.end_time),
-                           str(info.end_time - info.start_time))
-            return
-        if job.execution_state == models.ExecutionState.failed:
-            _log_failed_job(resource_group, job)
-            sys.exit(-1)
-        time.sleep(check_interval_sec)
-        job = client.jobs.get(resource_group, workspace_name, experiment_name, job_name)
+            reported['state'] = job.execution_state
+        return job.execution_state in [models.ExecutionState.succeeded, models.ExecutionState.failed]
+
+    job = wait_until(_get_job, _job_finished, interval=check_interval_sec, retry_on=is_transient_error)
+    if job.execution_state == models.ExecutionState.failed:
+        _log_failed_job(resource_group, job)
+        sys.exit(-1)
+    info = job.execution_info
+    logger.warning('Job completed at %s; execution took %s', str(info.end_time),
+                   str(info.end_time - info.start_time))
 
 
 def _log_failed_job(resource_group, job):
@@ -20,6 +20,7 @@ class ConfigureCommandsLoader(AzCommandsLoader):
 
         with self.command_group('', configure_custom) as g:
             g.command('configure', 'handle_configure')
+            g.command('batch-run', 'run_batch')
 
         return self.command_table
 
@@ -29,5 +30,13 @@ class ConfigureCommandsLoader(AzCommandsLoader):
             c.argument('defaults', nargs='+', options_list=('--defaults', '-d'))
             c.ignore('_subscription')  # ignore the global subscription param
 
+        with self.argument_context('batch-run') as c:
+            c.argument('batch_file', options_list=('--file', '-f'),
+                       help="File with one command per line. Use '-' or omit to read from stdin.")
+            c.argument('max_parallel', type=int, help='Maximum number of commands to run concurrently.')
+            c.argument('stop_on_error', action='store_true',
+                       help='Do not start further commands once a command has failed.')
+            c.ignore('_subscription')  # each command in the batch can specify its own subscription
+
 
 COMMAND_LOADER_CLS = ConfigureCommandsLoader
@@ -20,3 +20,22 @@ helps['configure'] = """
         - name: Clear default webapp and VM names.
           text: az configure --defaults vm='' web=''
 """
+
+helps['batch-run'] = """
+    type: command
+    short-summary: Run many Azure CLI commands in a single process.
+    long-summary: >
+        Each line of the input holds one command; the leading 'az' is optional, blank lines and lines starting
+        with '#' are ignored. Capture a command's result with 'name=$(az ...)' and reference it in later
+        commands with '${name}' or '${name.<JMESPath>}'. A line containing only 'wait' makes later commands
+        wait until every earlier command has finished. Commands that reference a captured variable always run
+        after the command that produces it. The output is a report with the exit code, result and error of
+        every command.
+    examples:
+        - name: Run the commands in a file one after another.
+          text: az batch-run --file commands.txt
+        - name: Run up to 8 independent commands at a time and show a summary table.
+          text: az batch-run --file commands.txt --max-parallel 8 --query "[].{line:line, status:status}" -o table
+        - name: Read the commands from stdin, for example 'rg=$(az group create -n MyResourceGroup -l westus)' followed by 'az vm list -g ${rg.name}'.
+          text: cat commands.txt | az batch-run
+"""
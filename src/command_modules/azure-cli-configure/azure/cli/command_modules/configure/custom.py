@@ -153,3 +153,15 @@ def _normalize_config_value(value):
     if value:
         value = '' if value in ["''", '""'] else value
     return value
+
+
+def run_batch(cmd, batch_file=None, max_parallel=1, stop_on_error=False):
+    import sys
+    from azure.cli.core.batch import run_batch_script
+    from azure.cli.core.util import read_file_content
+
+    if not batch_file or batch_file == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        lines = read_file_content(os.path.expanduser(batch_file)).splitlines()
+    return run_batch_script(cmd.cli_ctx, lines, max_parallel=max_parallel, stop_on_error=stop_on_error)
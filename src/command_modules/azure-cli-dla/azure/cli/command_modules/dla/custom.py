@@ -2,7 +2,6 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
-import time
 import uuid
 
 from knack.log import get_logger
@@ -293,21 +292,21 @@ def submit_adla_job(client, account_name, job_name, script, runtime_version=None
 
 def wait_adla_job(client, account_name, job_id, wait_interval_sec=5, max_wait_time_sec=-1):
     from azure.mgmt.datalake.analytics.job.models import JobState
+    from azure.cli.core.wait import wait_until, is_transient_error
     if wait_interval_sec < 1:
         raise CLIError('wait times must be greater than 0 when polling jobs. Value specified: {}'
                        .format(wait_interval_sec))
 
-    job = client.get(account_name, job_id)
-    time_waited_sec = 0
-    while job.state != JobState.ended:
-        if max_wait_time_sec > 0 and time_waited_sec >= max_wait_time_sec:
-            # pylint: disable=line-too-long
-            raise CLIError('Data Lake Analytics Job with ID: {0} has not completed in {1} seconds. Check job runtime or increase the value of --max-wait-time-sec'.format(job_id, time_waited_sec))
+    def _job_ended(job):
+        if job.state == JobState.ended:
+            return True
         logger.info('Job is not yet done. Current job state: \'%s\'', job.state)
-        time.sleep(wait_interval_sec)
-        job = client.get(account_name, job_id)
+        return False
 
-    return job
+    # pylint: disable=line-too-long
+    return wait_until(lambda: client.get(account_name, job_id), _job_ended, interval=wait_interval_sec,
+                      timeout=max_wait_time_sec, retry_on=is_transient_error,
+                      timeout_message='Data Lake Analytics Job with ID: {0} has not completed in {1} seconds. Check job runtime or increase the value of --max-wait-time-sec'.format(job_id, max_wait_time_sec))
 # endregion
 
 
@@ -8,7 +8,13 @@ from knack.help_files import helps
 
 helps['find'] = """
     type: command
-    short-summary: I'm an AI robot, my advice is based on our Azure documentation as well as the usage patterns of Azure CLI and Azure ARM users. Using me improves Azure products and documentation.
+    short-summary: Find Azure CLI commands and examples.
+    long-summary: >
+        Searches the names, summaries, arguments and examples of the commands of all installed modules and extensions,
+        without a network connection. The search index is kept in the config dir and updated after the CLI or an
+        extension is installed or updated. With --remote, I'm an AI robot and add advice based on our Azure
+        documentation as well as the usage patterns of Azure CLI and Azure ARM users. Using me improves Azure products
+        and documentation.
     examples:
         - name: Give me any Azure CLI group and I’ll show the most popular commands within the group.
           text: |
@@ -19,4 +25,7 @@ helps['find'] = """
         - name: You can also enter a search term, and I'll try to help find the best commands.
           text: |
             az find 'arm template'
+        - name: Add the most popular ways to use a command, from the Aladdin service.
+          text: |
+            az find 'az vm create' --remote
 """
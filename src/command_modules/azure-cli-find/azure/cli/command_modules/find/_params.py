@@ -7,3 +7,5 @@
 def load_arguments(self, _):
     with self.argument_context('find') as c:
         c.positional('cli_term', help='An Azure CLI command or group for which you need an example.')
+        c.argument('remote', action='store_true',
+                   help='Also show examples from the Aladdin service, based on the usage patterns of Azure CLI users.')
@@ -0,0 +1,377 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Local full-text search over the commands of the installed modules and extensions.
+
+Every command is a document made of its name, summary, argument names and help examples, weighted in that order.
+Words are lower-cased, stemmed and mapped to a canonical form, so that 'virtual machines', 'VMs' and 'vm' are the
+same term, and documents are ranked with BM25. Documents are kept in an index under the config dir, grouped by the
+module or extension that contributes them. A group is compiled again only when the version of its module or
+extension, or its help, changes, since compiling loads the arguments of its commands.
+"""
+
+from __future__ import division
+
+import hashlib
+import math
+import re
+from collections import Counter, OrderedDict
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+SEARCH_INDEX_FORMAT = 1
+SEARCH_INDEX_FILE_NAME = 'searchIndex.json'
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+NAME_WEIGHT = 3
+SUMMARY_WEIGHT = 2
+ARGUMENT_WEIGHT = 1
+EXAMPLE_WEIGHT = 1
+PREFIX_BOOST = 2
+
+_STOP_WORDS = {'a', 'an', 'and', 'az', 'can', 'do', 'for', 'how', 'i', 'in', 'is', 'it', 'my', 'of', 'on', 'or',
+               'the', 'to', 'what', 'with'}
+# words with the same meaning in commands and queries, mapped to the word used by the commands
+_SYNONYMS = {
+    'new': 'create', 'make': 'create', 'provision': 'create',
+    'remove': 'delete', 'destroy': 'delete', 'erase': 'delete', 'purge': 'delete',
+    'get': 'show', 'describe': 'show', 'detail': 'show', 'view': 'show', 'display': 'show',
+    'modify': 'update', 'change': 'update', 'edit': 'update',
+    'enumerate': 'list',
+    'boot': 'start', 'shutdown': 'stop', 'reboot': 'restart',
+    'virtualmachine': 'vm', 'machine': 'vm', 'vms': 'vm',
+    'scaleset': 'vmss',
+    'resourcegroup': 'group', 'rg': 'group', 'rgs': 'group',
+    'k8s': 'aks', 'kubernetes': 'aks', 'kubectl': 'aks',
+    'website': 'webapp', 'site': 'webapp', 'web': 'webapp',
+    'function': 'functionapp', 'func': 'functionapp', 'serverless': 'functionapp',
+    'kv': 'keyvault', 'vault': 'keyvault', 'secret': 'keyvault',
+    'cert': 'certificate',
+    'registry': 'acr', 'docker': 'container',
+    'blob': 'storage', 'bucket': 'container',
+    'db': 'database', 'sqlserver': 'sql',
+    'virtualnetwork': 'vnet', 'loadbalancer': 'lb', 'balancer': 'lb',
+    'securitygroup': 'nsg', 'nsgs': 'nsg',
+    'ip': 'address', 'ips': 'address', 'publicip': 'address',
+    'signin': 'login', 'sign': 'login', 'logon': 'login', 'authenticate': 'login',
+    'serviceprincipal': 'sp', 'principal': 'sp',
+    'permission': 'role', 'rbac': 'role',
+    'log': 'monitor', 'metric': 'monitor', 'alert': 'monitor',
+    'subscription': 'account', 'tenant': 'account',
+    'domain': 'dns',
+    'region': 'location',
+}
+# pairs of words which are joined before synonyms are looked up
+_PHRASES = {
+    ('virtual', 'machine'): 'virtualmachine', ('scale', 'set'): 'scaleset', ('resource', 'group'): 'resourcegroup',
+    ('web', 'app'): 'webapp', ('function', 'app'): 'functionapp', ('key', 'vault'): 'kv',
+    ('virtual', 'network'): 'virtualnetwork', ('load', 'balancer'): 'loadbalancer',
+    ('security', 'group'): 'securitygroup', ('public', 'ip'): 'publicip', ('service', 'principal'): 'serviceprincipal',
+    ('sql', 'server'): 'sqlserver', ('container', 'registry'): 'registry', ('app', 'service'): 'webapp',
+}
+
+_WORD = re.compile(r'[a-z0-9]+')
+_SUFFIXES = [('sses', 'ss'), ('ies', 'y'), ('s', '')]
+
+
+def _to_bytes(value):
+    return value if isinstance(value, bytes) else value.encode('utf-8')
+
+
+def stem(word):
+    """ A light stemmer, which reduces plurals and the -ing and -ed forms of a word, and a trailing 'e', to the
+    same stem. """
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix) and not word.endswith(('ss', 'us', 'is')):
+            word = word[:-len(suffix)] + replacement
+            break
+    for suffix in ['ing', 'ed']:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            # stopp -> stop, but not install -> instal
+            if word[-1] == word[-2] and word[-1] not in 'lsz':
+                word = word[:-1]
+            break
+    if word.endswith('e') and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+_STEMMED_SYNONYMS = {stem(word): stem(canonical) for word, canonical in _SYNONYMS.items()}
+_STEMMED_PHRASES = {(stem(first), stem(second)): stem(joined) for (first, second), joined in _PHRASES.items()}
+
+
+def tokenize(text):
+    """ Returns the canonical terms of a text. """
+    words = [stem(w) for w in _WORD.findall((text or '').lower()) if w not in _STOP_WORDS]
+    terms = []
+    index = 0
+    while index < len(words):
+        joined = _STEMMED_PHRASES.get(tuple(words[index:index + 2]))
+        if joined:
+            index += 2
+        else:
+            joined = words[index]
+            index += 1
+        terms.append(_STEMMED_SYNONYMS.get(joined, joined))
+    return terms
+
+
+def _get_example_text(example):
+    # examples of `helps` have a name and text, examples of help.yaml files a summary and command
+    return example.get('text') or example.get('command') or ''
+
+
+def _get_first_command(text):
+    lines = []
+    for line in text.strip().splitlines():
+        if not lines and line.lstrip().startswith('#'):
+            continue
+        lines.append(line.rstrip())
+        if not line.rstrip().endswith('\\'):
+            break
+    return '\n'.join(lines)
+
+
+def make_document(command, summary, arguments, examples):
+    """ Returns the document of a command. arguments is a list of (option names, summary) and examples a list of
+    help examples. """
+    weighted = [(command, NAME_WEIGHT), (summary, SUMMARY_WEIGHT)]
+    weighted.extend((' '.join(options), ARGUMENT_WEIGHT) for options, _ in arguments)
+    weighted.extend((e.get('name') or e.get('summary') or '', EXAMPLE_WEIGHT) for e in examples)
+    weighted.extend((_get_example_text(e), EXAMPLE_WEIGHT) for e in examples)
+    terms = Counter()
+    for text, weight in weighted:
+        for term in tokenize(text):
+            terms[term] += weight
+    # the first example of the command itself, as some show commands to run before it
+    example_texts = [_get_example_text(e) for e in examples if _get_example_text(e).strip()]
+    example = next((t for t in example_texts if 'az {} '.format(command) in t + ' '), None) or \
+        next(iter(example_texts), None)
+    example = _get_first_command(example) if example else None
+    return OrderedDict([
+        ('command', command),
+        ('summary', summary or ''),
+        ('example', example),
+        ('terms', dict(terms)),
+        # only the name and summary count, so that commands with many arguments or examples are not ranked lower
+        ('length', len(tokenize(command)) * NAME_WEIGHT + len(tokenize(summary)) * SUMMARY_WEIGHT)
+    ])
+
+
+class SearchIndex(object):
+    """ Documents grouped by the module or extension that contributes them, with the stamp they were compiled
+    for. """
+
+    def __init__(self, sources=None):
+        self.sources = sources or {}
+
+    @classmethod
+    def load(cls, path):
+        from azure.cli.core.util import get_file_json
+        try:
+            data = get_file_json(path)
+        except Exception:  # pylint: disable=broad-except
+            return cls()
+        if not isinstance(data, dict) or data.get('format') != SEARCH_INDEX_FORMAT:
+            return cls()
+        return cls(data.get('sources'))
+
+    def save(self, path):
+        from azure.cli.core.util import write_json_atomic
+        write_json_atomic(path, {'format': SEARCH_INDEX_FORMAT, 'sources': self.sources})
+
+    def get_stamp(self, source):
+        return self.sources.get(source, {}).get('stamp')
+
+    def update(self, source, stamp, documents):
+        self.sources[source] = {'stamp': stamp, 'documents': documents}
+
+    def remove(self, source):
+        self.sources.pop(source, None)
+
+    @property
+    def documents(self):
+        return [d for source in sorted(self.sources) for d in self.sources[source]['documents']]
+
+    def search(self, query, top=5):
+        """ Returns up to top (score, document) of the documents matching a query, best first. Commands starting
+        with the words of the query, like 'az storage account', rank first. """
+        prefix = ' '.join(w for w in query.lower().split() if w != 'az')
+        terms = list(OrderedDict.fromkeys(tokenize(query)))
+        documents = self.documents
+        if not terms or not documents:
+            return []
+        average_length = sum(d['length'] for d in documents) / len(documents) or 1
+        frequencies = {t: 0 for t in terms}
+        matches = []
+        for document in documents:
+            found = [(t, document['terms'][t]) for t in terms if t in document['terms']]
+            if found:
+                matches.append((document, found))
+                for term, _ in found:
+                    frequencies[term] += 1
+
+        def _idf(term):
+            count = frequencies[term]
+            return math.log(1 + (len(documents) - count + 0.5) / (count + 0.5))
+
+        results = []
+        for document, found in matches:
+            norm = K1 * (1 - B + B * document['length'] / average_length)
+            score = sum(_idf(t) * tf * (K1 + 1) / (tf + norm) for t, tf in found)
+            if prefix and (document['command'] + ' ').startswith(prefix + ' '):
+                score *= PREFIX_BOOST
+            results.append((score, document))
+        results.sort(key=lambda r: (-r[0], r[1]['command']))
+        return results[:top]
+
+
+def get_search_index_path(cli_ctx):
+    import os
+    return os.path.join(cli_ctx.config.config_dir, SEARCH_INDEX_FILE_NAME)
+
+
+def get_command_table(commands_loader):
+    """ Returns the commands of all modules and extensions. The command table of an invocation is trimmed down to
+    the command being run, but the table of every module and extension loader is kept. """
+    command_table = {}
+    for name, loaders in commands_loader.cmd_to_loader_map.items():
+        command = next((ldr.command_table[name] for ldr in loaders if name in ldr.command_table), None)
+        if command is not None:
+            command_table[name] = command
+    return command_table
+
+
+def get_command_sources(command_table):
+    """ Returns the names of the commands of every module and extension, by 'module:<name>' or
+    'extension:<name>'. """
+    sources = {}
+    for name, command in command_table.items():
+        source = command.command_source
+        extension_name = getattr(source, 'extension_name', None)
+        if extension_name:
+            key = 'extension:' + extension_name
+        else:
+            key = 'module:{}'.format(source or '')
+        sources.setdefault(key, []).append(name)
+    return sources
+
+
+def get_source_stamp(source, commands, extension_versions):
+    """ The version of the module or extension and a digest of the help of its commands. """
+    from knack.help_files import helps
+    from azure.cli.core import __version__ as core_version
+    digest = hashlib.sha1()
+    for command in sorted(commands):
+        digest.update(_to_bytes(command))
+        digest.update(_to_bytes(helps.get(command, '')))
+    kind, name = source.split(':', 1)
+    version = extension_versions.get(name) if kind == 'extension' else core_version
+    return [version, digest.hexdigest()]
+
+
+def _get_arguments(commands_loader, command):
+    import argparse
+    try:
+        commands_loader.load_arguments(command)
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.debug("Unable to load the arguments of '%s': %s", command, ex)
+        return []
+    arguments = []
+    for argument in commands_loader.command_table[command].arguments.values():
+        settings = argument.type.settings
+        if settings.get('help') == argparse.SUPPRESS:
+            continue
+        options = settings.get('options_list') or ['--' + argument.name.replace('_', '-')]
+        arguments.append(([str(o) for o in options], settings.get('help') or ''))
+    return arguments
+
+
+def _get_help(help_index, command):
+    """ Returns the summary and examples of a command, from the help index or the help of the command. """
+    import yaml
+    from knack.help_files import helps
+    entry = help_index.get(command) if help_index is not None else None
+    if entry is not None:
+        data, yaml_data = entry.get('help'), entry.get('yaml')
+    else:
+        try:
+            data, yaml_data = yaml.safe_load(helps.get(command, '')), None
+        except yaml.YAMLError:
+            data, yaml_data = None, None
+    data = data if isinstance(data, dict) else {}
+    yaml_data = yaml_data or {}
+    summary = yaml_data.get('summary') or data.get('short-summary') or ''
+    examples = yaml_data.get('examples') or data.get('examples') or []
+    return summary, [e for e in examples if isinstance(e, dict)]
+
+
+def _get_description(command):
+    # the description of commands without help is loaded from the docstring of their operation
+    try:
+        description = command.description
+        description = description() if callable(description) else description
+    except Exception:  # pylint: disable=broad-except
+        return ''
+    return (description or '').split('.')[0]
+
+
+def compile_documents(cli_ctx, command_table, commands):
+    from azure.cli.core._help_index import get_help_index
+    commands_loader = cli_ctx.invocation.commands_loader
+    help_index = get_help_index(cli_ctx)
+    documents = []
+    invocation_table = commands_loader.command_table
+    # arguments are loaded through the command table
+    commands_loader.command_table = command_table
+    try:
+        for command in sorted(commands):
+            summary, examples = _get_help(help_index, command)
+            if not summary:
+                summary = _get_description(command_table[command])
+            documents.append(make_document(command, summary, _get_arguments(commands_loader, command), examples))
+    finally:
+        commands_loader.command_table = invocation_table
+    return documents
+
+
+def get_search_index(cli_ctx):
+    """ Returns the search index of the loaded commands, compiling the documents of the modules and extensions
+    that changed since the index was saved. """
+    from azure.cli.core.extension import get_extensions
+    commands_loader = cli_ctx.invocation.commands_loader
+    path = get_search_index_path(cli_ctx)
+    index = SearchIndex.load(path)
+
+    extension_versions = {ext.name: ext.version for ext in get_extensions()}
+    command_table = get_command_table(commands_loader)
+    sources = get_command_sources(command_table)
+    stamps = {s: get_source_stamp(s, commands, extension_versions) for s, commands in sources.items()}
+    stale = sorted(s for s in sources if index.get_stamp(s) != stamps[s])
+    removed = [s for s in index.sources if s not in sources]
+    if not stale and not removed:
+        return index
+
+    if stale:
+        logger.warning('Updating the local search index. This happens once after the CLI or an extension is '
+                       'installed or updated.')
+        logger.debug('Compiling the search documents of %s.', ', '.join(stale))
+    for source in removed:
+        index.remove(source)
+    for source in stale:
+        index.update(source, stamps[source], compile_documents(cli_ctx, command_table, sources[source]))
+    try:
+        index.save(path)
+    except (OSError, IOError) as ex:
+        logger.debug("Unable to save the search index to '%s': %s", path, ex)
+    return index
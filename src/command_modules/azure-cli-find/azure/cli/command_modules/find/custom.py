@@ -23,41 +23,77 @@ WAIT_MESSAGE = ['I\'m an AI bot (learn more: aka.ms/aladdinkb); Let me see how I
 
 EXTENSION_NAME = 'find'
 
-
-def process_query(cli_term):
-    print(random.choice(WAIT_MESSAGE), file=sys.stderr)
-    response = call_aladdin_service(cli_term)
-
+NUM_RESULTS = 3
+
+
+def process_query(cmd, cli_term, remote=False):
+    from azure.cli.command_modules.find._search import get_search_index
+    results = [(document['summary'], document['example'] or 'az ' + document['command'])
+               for _, document in get_search_index(cmd.cli_ctx).search(cli_term, top=NUM_RESULTS)]
+    pruned = False
+    if remote:
+        print(random.choice(WAIT_MESSAGE), file=sys.stderr)
+        remote_results, pruned = get_remote_results(cli_term)
+        shown = set(_get_command_name(snippet) for _, snippet in results)
+        results.extend([r for r in remote_results if _get_command_name(r[1]) not in shown][:NUM_RESULTS])
+
+    if (platform.system() == 'Windows' and should_enable_styling()):
+        colorama.init(convert=True)
+
+    if not results:
+        print("\nSorry I am not able to help with [" + cli_term + "]."
+              "\nTry typing the beginning of a command e.g. " + style_message('az vm') + ".", file=sys.stderr)
+        return
+    if pruned:
+        print("\nMore commands and examples are available in the latest version of the CLI,"
+              "please update for the best experience.")
+    print("\nHere are the most common ways to use [" + cli_term + "]: \n", file=sys.stderr)
+    for title, snippet in results:
+        print(style_message(title))
+        print(snippet)
+
+
+def _get_command_name(snippet):
+    words = []
+    for word in snippet.split():
+        if word.startswith('-'):
+            break
+        words.append(word)
+    return ' '.join(words[1:] if words[:1] == ['az'] else words)
+
+
+def get_remote_results(cli_term):
+    """ Returns the (title, snippet) of the answers of the Aladdin service, and whether it has more answers for
+    newer versions of the CLI. """
+    try:
+        response = call_aladdin_service(cli_term)
+    except requests.RequestException as ex:
+        logger.warning('Unable to get examples from the Aladdin service: %s', ex)
+        return [], False
     if response.status_code != 200:
-        logger.error('[?] Unexpected Error: [HTTP %s]: Content: %s', response.status_code, response.content)
-    else:
-        if (platform.system() == 'Windows' and should_enable_styling()):
-            colorama.init(convert=True)
-
-        answer_list = json.loads(response.content)
-        if (not answer_list or answer_list[0]['source'] == 'bing'):
-            print("\nSorry I am not able to help with [" + cli_term + "]."
-                  "\nTry typing the beginning of a command e.g. " + style_message('az vm') + ".", file=sys.stderr)
-        else:
-            if answer_list[0]['source'] == 'pruned':
-                print("\nMore commands and examples are available in the latest version of the CLI,"
-                      "please update for the best experience.")
-                answer_list.pop(0)
-            print("\nHere are the most common ways to use [" + cli_term + "]: \n", file=sys.stderr)
-            num_results_to_show = min(3, len(answer_list))
-            for i in range(num_results_to_show):
-                current_title = answer_list[i]['title'].strip()
-                current_snippet = answer_list[i]['snippet'].strip()
-                if current_title.startswith("az "):
-                    current_title, current_snippet = current_snippet, current_title
-                    current_title = current_title.split('\r\n')[0]
-                elif '```azurecli\r\n' in current_snippet:
-                    start_index = current_snippet.index('```azurecli\r\n') + len('```azurecli\r\n')
-                    current_snippet = current_snippet[start_index:]
-                current_snippet = current_snippet.replace('```', '').replace(current_title, '').strip()
-                current_snippet = re.sub(r'\[.*\]', '', current_snippet).strip()
-                print(style_message(current_title))
-                print(current_snippet)
+        logger.warning('[?] Unexpected Error: [HTTP %s]: Content: %s', response.status_code, response.content)
+        return [], False
+
+    answer_list = json.loads(response.content)
+    if not answer_list or answer_list[0]['source'] == 'bing':
+        return [], False
+    pruned = answer_list[0]['source'] == 'pruned'
+    if pruned:
+        answer_list.pop(0)
+    results = []
+    for answer in answer_list[:NUM_RESULTS]:
+        current_title = answer['title'].strip()
+        current_snippet = answer['snippet'].strip()
+        if current_title.startswith("az "):
+            current_title, current_snippet = current_snippet, current_title
+            current_title = current_title.split('\r\n')[0]
+        elif '```azurecli\r\n' in current_snippet:
+            start_index = current_snippet.index('```azurecli\r\n') + len('```azurecli\r\n')
+            current_snippet = current_snippet[start_index:]
+        current_snippet = current_snippet.replace('```', '').replace(current_title, '').strip()
+        current_snippet = re.sub(r'\[.*\]', '', current_snippet).strip()
+        results.append((current_title, current_snippet))
+    return results, pruned
 
 
 def style_message(msg):
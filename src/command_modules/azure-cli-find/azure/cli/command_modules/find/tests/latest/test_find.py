@@ -4,22 +4,137 @@
 # --------------------------------------------------------------------------------------------
 
 import contextlib
+import json
+import shutil
+import tempfile
 import unittest
 import mock
 import sys
 import six
 from six import StringIO
 
-from azure.cli.command_modules.find.custom import call_aladdin_service
+from azure.cli.command_modules.find.custom import call_aladdin_service, process_query
+from azure.cli.command_modules.find._search import (SearchIndex, get_search_index, make_document, stem,
+                                                    tokenize)
 from azure.cli.core.mock import DummyCli
 
 
+@contextlib.contextmanager
+def capture_output():
+    out, err = StringIO(), StringIO()
+    old_out, old_err = sys.stdout, sys.stderr
+    try:
+        sys.stdout, sys.stderr = out, err
+        yield out, err
+    finally:
+        sys.stdout, sys.stderr = old_out, old_err
+
+
+def _get_index():
+    index = SearchIndex()
+    index.update('module:vm', ['2.0.60', 'digest'], [
+        make_document('vm create', 'Create an Azure Virtual Machine.',
+                      [(['--resource-group', '-g'], ''), (['--image'], 'The name of the operating system image.')],
+                      [{'name': 'Create a VM from an image.', 'text': 'az vm create -n MyVm -g MyResourceGroup'}]),
+        make_document('vm delete', 'Delete a VM.', [], [{'summary': 'Delete a VM without a prompt.',
+                                                         'command': 'az vm delete -g MyRg -n MyVm --yes'}]),
+        make_document('vm list', 'List details of Virtual Machines.', [], [])
+    ])
+    index.update('extension:storage-preview', ['0.2.0', 'digest'], [
+        make_document('storage account create', 'Create a storage account.', [(['--sku'], '')],
+                      [{'name': 'Create a storage account.', 'text': 'az storage account create -n MyAccount'}])
+    ])
+    return index
+
+
 class FindCustomCommandTest(unittest.TestCase):
 
     def test_call_aladdin_service(self):
         response = call_aladdin_service("what is azure cli?")
         self.assertEqual(200, response.status_code)
 
+    def test_find_tokenize(self):
+        self.assertEqual(stem('creating'), stem('create'))
+        self.assertEqual(stem('stopped'), 'stop')
+        self.assertEqual(stem('policies'), 'policy')
+        self.assertEqual(stem('address'), 'address')
+        self.assertEqual(tokenize('Virtual Machines'), ['vm'])
+        self.assertEqual(tokenize('az vm'), ['vm'])
+        self.assertEqual(tokenize('remove the resource groups'), tokenize('delete group'))
+
+    def test_find_search(self):
+        index = _get_index()
+        results = index.search('create a virtual machine')
+        self.assertEqual(results[0][1]['command'], 'vm create')
+        self.assertEqual(results[0][1]['example'], 'az vm create -n MyVm -g MyResourceGroup')
+        self.assertEqual([d['command'] for _, d in index.search('remove vms')][0], 'vm delete')
+        # argument names are searched
+        self.assertEqual([d['command'] for _, d in index.search('sku')], ['storage account create'])
+        # commands starting with the query come first
+        self.assertEqual([d['command'] for _, d in index.search('az vm', top=3)][2], 'vm list')
+        self.assertEqual(index.search('az'), [])
+
+    def test_find_search_index_updates(self):
+        cli_ctx = mock.MagicMock()
+        cli_ctx.config.config_dir = tempfile.mkdtemp()
+        vm_loader, ext_loader = mock.MagicMock(), mock.MagicMock()
+        vm_loader.command_table = {'vm create': mock.MagicMock(command_source='vm')}
+        ext_loader.command_table = {'storage account create': mock.MagicMock()}
+        ext_loader.command_table['storage account create'].command_source.extension_name = 'storage-preview'
+        cli_ctx.invocation.commands_loader.cmd_to_loader_map = {
+            'vm create': [vm_loader],
+            'storage account create': [ext_loader]
+        }
+        ext = mock.MagicMock()
+        ext.name, ext.version = 'storage-preview', '0.2.0'
+
+        def _compile(_, command_table, commands):
+            return [make_document(c, c, [], []) for c in commands]
+
+        try:
+            with mock.patch('azure.cli.core.extension.get_extensions', return_value=[ext]), \
+                    mock.patch('azure.cli.command_modules.find._search.compile_documents',
+                               side_effect=_compile) as compile_mock:
+                index = get_search_index(cli_ctx)
+                self.assertEqual(compile_mock.call_count, 2)
+                self.assertEqual(sorted(index.sources), ['extension:storage-preview', 'module:vm'])
+
+                # only the documents of an updated extension are compiled again
+                compile_mock.reset_mock()
+                ext.version = '0.3.0'
+                get_search_index(cli_ctx)
+                self.assertEqual([c[0][2] for c in compile_mock.call_args_list], [['storage account create']])
+
+                # removed extensions are dropped from the index
+                del cli_ctx.invocation.commands_loader.cmd_to_loader_map['storage account create']
+                index = get_search_index(cli_ctx)
+                self.assertEqual(list(index.sources), ['module:vm'])
+        finally:
+            shutil.rmtree(cli_ctx.config.config_dir)
+
+    def test_find_process_query(self):
+        cmd = mock.MagicMock()
+        with mock.patch('azure.cli.command_modules.find._search.get_search_index', return_value=_get_index()), \
+                mock.patch('azure.cli.command_modules.find.custom.call_aladdin_service') as service_mock:
+            with capture_output() as (out, _):
+                process_query(cmd, 'delete a vm')
+            self.assertFalse(service_mock.called)
+            self.assertTrue(out.getvalue().startswith('Delete a VM.\naz vm delete -g MyRg -n MyVm --yes\n'))
+
+            service_mock.return_value.status_code = 200
+            service_mock.return_value.content = json.dumps([
+                {'source': 'docs', 'title': 'Delete a VM', 'snippet': 'az vm delete -n MyVm'},
+                {'source': 'docs', 'title': 'Deallocate a VM', 'snippet': 'az vm deallocate -n MyVm'}])
+            with capture_output() as (out, _):
+                process_query(cmd, 'delete a vm', remote=True)
+            # the remote answer for a command already shown is left out
+            self.assertNotIn('az vm delete -n MyVm', out.getvalue())
+            self.assertIn('Deallocate a VM\naz vm deallocate -n MyVm', out.getvalue())
+
+            with capture_output() as (_, err):
+                process_query(cmd, 'nothing matches this')
+            self.assertIn('Sorry I am not able to help with [nothing matches this]', err.getvalue())
+
 
 if __name__ == '__main__':
     unittest.main()
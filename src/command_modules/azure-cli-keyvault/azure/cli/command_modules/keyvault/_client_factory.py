@@ -3,6 +3,9 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import threading
+import time
+
 
 def keyvault_client_factory(cli_ctx, **_):
     from azure.cli.core.commands.client_factory import get_mgmt_service_client
@@ -14,24 +17,52 @@ def keyvault_client_vaults_factory(cli_ctx, _):
     return keyvault_client_factory(cli_ctx).vaults
 
 
+# refresh a cached data plane token once it is this close (in seconds) to expiring
+TOKEN_REFRESH_MARGIN = 300
+
+
+def _get_token_expiry(token_entry):
+    """ Returns the expiry of a raw token entry as a POSIX timestamp or 0 if it cannot be determined. """
+    from datetime import datetime
+    try:
+        return time.mktime(datetime.strptime(token_entry['expiresOn'], "%Y-%m-%d %H:%M:%S.%f").timetuple())
+    except (KeyError, TypeError, ValueError):
+        pass
+    try:  # needed to deal with differing unserialized MSI token payload
+        return float(token_entry['expires_on'])
+    except (KeyError, TypeError, ValueError):
+        return 0
+
+
 def keyvault_data_plane_factory(cli_ctx, _):
     from azure.keyvault import KeyVaultAuthentication, KeyVaultClient
     from azure.cli.core.profiles import ResourceType, get_api_version
     version = str(get_api_version(cli_ctx, ResourceType.DATA_KEYVAULT))
 
+    # The callback runs for every request the client sends. Bulk operations such as 'keyvault backup-all' send
+    # thousands of them from several threads, so the token is cached until it is about to expire.
+    token_cache = {}
+    token_lock = threading.Lock()
+
     def get_token(server, resource, scope):  # pylint: disable=unused-argument
         import adal
         from azure.cli.core._profile import Profile
-        try:
-            return Profile(cli_ctx=cli_ctx).get_raw_token(resource)[0]
-        except adal.AdalError as err:
-            from knack.util import CLIError
-            # pylint: disable=no-member
-            if (hasattr(err, 'error_response') and
-                    ('error_description' in err.error_response) and
-                    ('AADSTS70008:' in err.error_response['error_description'])):
-                raise CLIError(
-                    "Credentials have expired due to inactivity. Please run 'az login'")
-            raise CLIError(err)
+        with token_lock:
+            cached = token_cache.get(resource)
+            if cached and cached[1] - time.time() > TOKEN_REFRESH_MARGIN:
+                return cached[0]
+            try:
+                token = Profile(cli_ctx=cli_ctx).get_raw_token(resource)[0]
+            except adal.AdalError as err:
+                from knack.util import CLIError
+                # pylint: disable=no-member
+                if (hasattr(err, 'error_response') and
+                        ('error_description' in err.error_response) and
+                        ('AADSTS70008:' in err.error_response['error_description'])):
+                    raise CLIError(
+                        "Credentials have expired due to inactivity. Please run 'az login'")
+                raise CLIError(err)
+            token_cache[resource] = (token, _get_token_expiry(token[2]))
+            return token
 
     return KeyVaultClient(KeyVaultAuthentication(get_token), api_version=version)
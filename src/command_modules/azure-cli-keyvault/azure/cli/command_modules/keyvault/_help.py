@@ -12,6 +12,26 @@ type: group
 short-summary: Manage KeyVault keys, secrets, and certificates.
 """
 
+helps['keyvault backup-all'] = """
+type: command
+short-summary: Back up all keys, secrets and certificates of a Key Vault to a local directory.
+long-summary: Objects are backed up concurrently. The directory holds a manifest.json file recording the state of every object next to the backup blobs; running the command again for the same directory only backs up objects which are missing or failed previously. Keys and secrets managed by a certificate are part of the certificate backup.
+examples:
+  - name: Back up a vault.
+    text: az keyvault backup-all -n vaultname -d ./vaultname-backup
+  - name: Back up only the secrets of a vault, at most 4 at a time.
+    text: az keyvault backup-all -n vaultname -d ./vaultname-backup --types secret --max-parallel 4
+"""
+
+helps['keyvault restore-all'] = """
+type: command
+short-summary: Restore the objects of a backup created with `az keyvault backup-all` to a Key Vault.
+long-summary: The vault must be in the same subscription and geography as the vault the backup was taken from. Progress is recorded in restore-progress.json inside the directory, so an interrupted restore can be resumed by running the command again.
+examples:
+  - name: Restore a backup into another vault.
+    text: az keyvault restore-all -n othervault -d ./vaultname-backup
+"""
+
 helps['keyvault certificate'] = """
 type: group
 short-summary: Manage certificates.
@@ -91,6 +91,13 @@ def load_arguments(self, _):
         c.argument('ip_address', help='IPv4 address or CIDR range.')
         c.argument('subnet', help='Name or ID of subnet. If name is supplied, `--vnet-name` must be supplied.')
         c.argument('vnet_name', help='Name of a virtual network.', validator=validate_subnet)
+
+    for scope in ['keyvault backup-all', 'keyvault restore-all']:
+        with self.argument_context(scope) as c:
+            c.argument('vault_base_url', vault_name_type, options_list=['--name', '-n'], type=get_vault_base_url_type(self.cli_ctx))
+            c.argument('directory', options_list=['--directory', '-d'], help='Local directory holding the manifest and the backup of every object.')
+            c.argument('object_types', options_list=['--types'], arg_type=get_enum_type(['key', 'secret', 'certificate']), nargs='+', help='Space-separated list of object types to include. Defaults to all types.')
+            c.argument('max_parallel', type=int, help='Maximum number of objects processed concurrently.')
     # endregion
 
     # region Shared
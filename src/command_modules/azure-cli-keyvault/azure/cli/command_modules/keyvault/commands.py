@@ -65,6 +65,10 @@ def load_command_table(self, _):
         g.custom_command('list', 'list_network_rules')
 
     # Data Plane Commands
+    with self.command_group('keyvault', kv_data_sdk) as g:
+        g.keyvault_custom('backup-all', 'backup_keyvault')
+        g.keyvault_custom('restore-all', 'restore_keyvault')
+
     with self.command_group('keyvault key', kv_data_sdk) as g:
         g.keyvault_command('list', 'get_keys')
         g.keyvault_command('list-versions', 'get_key_versions')
@@ -1003,3 +1003,205 @@ def restore_storage_account(client, vault_base_url, file_path):
         data = file_in.read()
         return client.restore_storage_account(vault_base_url, data)
 # endregion
+
+
+# region KeyVault bulk backup and restore
+KEYVAULT_BACKUP_MANIFEST = 'manifest.json'
+KEYVAULT_RESTORE_PROGRESS = 'restore-progress.json'
+KEYVAULT_BULK_TYPES = ['key', 'secret', 'certificate']
+_BULK_MAX_RETRIES = 6
+_BULK_SAVE_INTERVAL = 2
+
+
+def _call_with_throttling_retry(func, *args):
+    """ Invoke a data plane operation, backing off while the vault is throttling requests. """
+    for attempt in range(_BULK_MAX_RETRIES + 1):
+        try:
+            return func(*args)
+        except Exception as ex:  # pylint: disable=broad-except
+            response = getattr(ex, 'response', None)
+            if getattr(response, 'status_code', None) not in (429, 503) or attempt == _BULK_MAX_RETRIES:
+                raise
+            try:
+                delay = float(response.headers['Retry-After'])
+            except (KeyError, TypeError, ValueError):
+                delay = min(2 ** attempt, 60)
+            logger.info("The vault is throttling requests. Retrying in %s seconds.", delay)
+            time.sleep(delay)
+
+
+class _BulkProgressFile(object):
+    """ Thread-safe record of per-object progress, flushed to disk periodically so an interrupted run can
+    pick up where it stopped. """
+
+    def __init__(self, path, data):
+        import threading
+        self.path = path
+        self.data = data
+        self._lock = threading.Lock()
+        self._last_save = 0
+
+    def update(self, key, **values):
+        with self._lock:
+            self.data['objects'][key].update(values)
+            if time.time() - self._last_save > _BULK_SAVE_INTERVAL:
+                self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        from azure.cli.core.util import write_json_atomic
+        write_json_atomic(self.path, self.data)
+        self._last_save = time.time()
+
+
+def _load_json_file(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, IOError):
+        return None
+    except ValueError as ex:
+        raise CLIError("Unable to read '{}': {}".format(path, ex))
+
+
+def _resolve_bulk_types(cmd, object_types):
+    object_types = object_types or KEYVAULT_BULK_TYPES
+    if 'certificate' in object_types and \
+            not cmd.supported_api_version(resource_type=ResourceType.DATA_KEYVAULT, min_api='7.0'):
+        logger.warning("Certificate backup requires Key Vault API version 7.0 or later. Skipping certificates.")
+        object_types = [t for t in object_types if t != 'certificate']
+    return object_types
+
+
+def _list_bulk_objects(client, vault_base_url, object_types):
+    listers = {'key': client.get_keys, 'secret': client.get_secrets, 'certificate': client.get_certificates}
+    objects = []
+    for object_type in object_types:
+        # a throttled page restarts the listing of that type from the beginning
+        items = _call_with_throttling_retry(lambda t=object_type: list(listers[t](vault_base_url, maxresults=25)))
+        for item in items:
+            if getattr(item, 'managed', False):
+                # keys and secrets backing a certificate are included in the certificate backup
+                continue
+            name = (item.kid if object_type == 'key' else item.id).rstrip('/').split('/')[-1]
+            objects.append((object_type, name))
+    return objects
+
+
+def _run_bulk_operation(operation, keys, max_parallel):
+    from concurrent.futures import ThreadPoolExecutor
+    if max_parallel < 1:
+        raise CLIError('--max-parallel must be greater than 0.')
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        for _ in executor.map(operation, keys):
+            pass
+
+
+def _summarize_bulk_operation(directory, objects, keys):
+    failures = [{'type': objects[k]['type'], 'name': objects[k]['name'], 'error': objects[k]['error']}
+                for k in keys if objects[k]['status'] != 'Succeeded']
+    if failures:
+        logger.warning("%s of %s object(s) failed. Run the command again to retry them.", len(failures), len(keys))
+    return {
+        'directory': directory,
+        'total': len(keys),
+        'succeeded': len(keys) - len(failures),
+        'failed': failures
+    }
+
+
+def backup_keyvault(cmd, client, vault_base_url, directory, object_types=None, max_parallel=8):
+    """ Back up all keys, secrets and certificates of a vault into a local directory. """
+    import hashlib
+    object_types = _resolve_bulk_types(cmd, object_types)
+    manifest_path = os.path.join(directory, KEYVAULT_BACKUP_MANIFEST)
+    manifest = _load_json_file(manifest_path)
+    if manifest and manifest.get('vaultUri', '').rstrip('/') != vault_base_url.rstrip('/'):
+        raise CLIError("Directory '{}' contains a backup of vault '{}'. Use an empty directory instead.".format(
+            directory, manifest.get('vaultUri')))
+    manifest = manifest or {'vaultUri': vault_base_url, 'objects': {}}
+    for object_type in object_types:
+        if not os.path.isdir(os.path.join(directory, object_type + 's')):
+            os.makedirs(os.path.join(directory, object_type + 's'))
+
+    objects = manifest['objects']
+    pending = []
+    keys = []
+    for object_type, name in _list_bulk_objects(client, vault_base_url, object_types):
+        key = '{}/{}'.format(object_type, name)
+        keys.append(key)
+        entry = objects.get(key)
+        if entry and entry['status'] == 'Succeeded' and os.path.isfile(os.path.join(directory, entry['file'])):
+            continue
+        objects[key] = {'type': object_type, 'name': name, 'file': '{}s/{}.blob'.format(object_type, name),
+                        'status': 'Pending', 'error': None}
+        pending.append(key)
+    logger.warning("Backing up %s of %s object(s) from %s.", len(pending), len(keys), vault_base_url)
+
+    progress = _BulkProgressFile(manifest_path, manifest)
+    progress.save()
+
+    def _backup(key):
+        entry = objects[key]
+        try:
+            backup = _call_with_throttling_retry(getattr(client, 'backup_' + entry['type']),
+                                                 vault_base_url, entry['name']).value
+            with open(os.path.join(directory, entry['file']), 'wb') as output:
+                output.write(backup)
+            progress.update(key, status='Succeeded', error=None, sha256=hashlib.sha256(backup).hexdigest())
+        except Exception as ex:  # pylint: disable=broad-except
+            progress.update(key, status='Failed', error=str(ex))
+
+    try:
+        _run_bulk_operation(_backup, pending, max_parallel)
+    finally:
+        progress.save()
+    return _summarize_bulk_operation(directory, objects, keys)
+
+
+def restore_keyvault(cmd, client, vault_base_url, directory, object_types=None, max_parallel=8):
+    """ Restore the objects recorded in a backup directory into a vault. """
+    import hashlib
+    object_types = _resolve_bulk_types(cmd, object_types)
+    manifest = _load_json_file(os.path.join(directory, KEYVAULT_BACKUP_MANIFEST))
+    if not manifest:
+        raise CLIError("No backup manifest found in '{}'.".format(directory))
+
+    progress_path = os.path.join(directory, KEYVAULT_RESTORE_PROGRESS)
+    restore = _load_json_file(progress_path)
+    if not restore or restore.get('vaultUri', '').rstrip('/') != vault_base_url.rstrip('/'):
+        restore = {'vaultUri': vault_base_url, 'objects': {}}
+    objects = restore['objects']
+    keys = sorted(k for k, v in manifest['objects'].items()
+                  if v['status'] == 'Succeeded' and v['type'] in object_types)
+    pending = []
+    for key in keys:
+        if objects.get(key, {}).get('status') != 'Succeeded':
+            objects[key] = dict(manifest['objects'][key], status='Pending', error=None)
+            pending.append(key)
+    logger.warning("Restoring %s of %s object(s) to %s.", len(pending), len(keys), vault_base_url)
+
+    progress = _BulkProgressFile(progress_path, restore)
+    progress.save()
+
+    def _restore(key):
+        entry = objects[key]
+        try:
+            with open(os.path.join(directory, entry['file']), 'rb') as file_in:
+                data = file_in.read()
+            if entry.get('sha256') and hashlib.sha256(data).hexdigest() != entry['sha256']:
+                raise CLIError("backup file '{}' is corrupted.".format(entry['file']))
+            _call_with_throttling_retry(getattr(client, 'restore_' + entry['type']), vault_base_url, data)
+            progress.update(key, status='Succeeded', error=None)
+        except Exception as ex:  # pylint: disable=broad-except
+            progress.update(key, status='Failed', error=str(ex))
+
+    try:
+        _run_bulk_operation(_restore, pending, max_parallel)
+    finally:
+        progress.save()
+    return _summarize_bulk_operation(directory, objects, keys)
+# endregion
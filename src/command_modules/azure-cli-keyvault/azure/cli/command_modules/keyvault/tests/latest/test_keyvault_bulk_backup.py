@@ -0,0 +1,107 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from azure.cli.command_modules.keyvault.custom import (
+    backup_keyvault, restore_keyvault, KEYVAULT_BACKUP_MANIFEST, KEYVAULT_RESTORE_PROGRESS)
+
+VAULT = 'https://myvault.vault.azure.net'
+
+
+class _Item(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class _ThrottledError(Exception):
+    def __init__(self):
+        super(_ThrottledError, self).__init__('Too many requests')
+        self.response = mock.MagicMock(status_code=429, headers={'Retry-After': '0'})
+
+
+def _mock_client():
+    client = mock.MagicMock()
+    client.get_keys.return_value = [_Item(kid=VAULT + '/keys/key1', managed=None),
+                                    _Item(kid=VAULT + '/keys/cert1', managed=True)]
+    client.get_secrets.return_value = [_Item(id=VAULT + '/secrets/secret1', managed=None)]
+    client.get_certificates.return_value = [_Item(id=VAULT + '/certificates/cert1')]
+    client.backup_key.side_effect = lambda vault, name: _Item(value=b'key:' + name.encode())
+    client.backup_secret.side_effect = lambda vault, name: _Item(value=b'secret:' + name.encode())
+    client.backup_certificate.side_effect = lambda vault, name: _Item(value=b'cert:' + name.encode())
+    return client
+
+
+class TestKeyVaultBulkBackup(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cmd = mock.MagicMock()
+        self.cmd.supported_api_version.return_value = True
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _read_json(self, name):
+        with open(os.path.join(self.directory, name)) as f:
+            return json.load(f)
+
+    def test_backup_all_writes_manifest_and_blobs(self):
+        client = _mock_client()
+        result = backup_keyvault(self.cmd, client, VAULT, self.directory, max_parallel=2)
+
+        self.assertEqual(result['total'], 3)
+        self.assertEqual(result['succeeded'], 3)
+        self.assertEqual(result['failed'], [])
+        # the key backing the certificate is part of the certificate backup
+        client.backup_key.assert_called_once_with(VAULT, 'key1')
+        manifest = self._read_json(KEYVAULT_BACKUP_MANIFEST)
+        self.assertEqual(sorted(manifest['objects']), ['certificate/cert1', 'key/key1', 'secret/secret1'])
+        with open(os.path.join(self.directory, manifest['objects']['secret/secret1']['file']), 'rb') as f:
+            self.assertEqual(f.read(), b'secret:secret1')
+
+    def test_backup_all_retries_throttled_requests_and_resumes(self):
+        client = _mock_client()
+        client.backup_secret.side_effect = [_ThrottledError(), _Item(value=b'secret')]
+        client.backup_certificate.side_effect = ValueError('boom')
+        result = backup_keyvault(self.cmd, client, VAULT, self.directory, max_parallel=1)
+
+        self.assertEqual(client.backup_secret.call_count, 2)
+        self.assertEqual(result['failed'], [{'type': 'certificate', 'name': 'cert1', 'error': 'boom'}])
+
+        # a second run only backs up what failed before
+        client.backup_certificate.side_effect = lambda vault, name: _Item(value=b'cert')
+        result = backup_keyvault(self.cmd, client, VAULT, self.directory, max_parallel=1)
+        self.assertEqual(result['succeeded'], 3)
+        self.assertEqual(client.backup_key.call_count, 1)
+        self.assertEqual(client.backup_secret.call_count, 2)
+
+    def test_restore_all_resumes_from_progress(self):
+        backup_keyvault(self.cmd, _mock_client(), VAULT, self.directory)
+        client = mock.MagicMock()
+        client.restore_secret.side_effect = ValueError('conflict')
+        result = restore_keyvault(self.cmd, client, 'https://other.vault.azure.net', self.directory)
+
+        client.restore_key.assert_called_once_with('https://other.vault.azure.net', b'key:key1')
+        client.restore_certificate.assert_called_once_with('https://other.vault.azure.net', b'cert:cert1')
+        self.assertEqual(result['failed'], [{'type': 'secret', 'name': 'secret1', 'error': 'conflict'}])
+        self.assertEqual(self._read_json(KEYVAULT_RESTORE_PROGRESS)['objects']['key/key1']['status'], 'Succeeded')
+
+        client.reset_mock()
+        client.restore_secret.side_effect = None
+        result = restore_keyvault(self.cmd, client, 'https://other.vault.azure.net', self.directory)
+        self.assertEqual(result['succeeded'], 3)
+        client.restore_secret.assert_called_once_with('https://other.vault.azure.net', b'secret:secret1')
+        self.assertFalse(client.restore_key.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
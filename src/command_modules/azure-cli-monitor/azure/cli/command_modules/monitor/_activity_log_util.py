@@ -0,0 +1,178 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Time-sharded retrieval of activity log events.
+
+Long time windows are split into shards which are queried concurrently when exported. The shards do not overlap,
+so emitting them newest first, each sorted by timestamp, yields one stream in the order the service returns
+events for a single query. Listing pages the shards lazily instead, as it usually stops after a few events.
+"""
+
+import json
+import os
+import time
+from datetime import timedelta
+
+from knack.log import get_logger
+from knack.util import CLIError, todict
+
+from azure.cli.command_modules.monitor.util import split_time_window
+
+logger = get_logger(__name__)
+
+DEFAULT_SHARD_SIZE = timedelta(days=1)
+MIN_SHARD_SIZE = timedelta(minutes=10)
+SHARD_RETRIES = 2
+
+
+def _is_retriable(ex):
+    """ Throttling, server errors and connection failures are retried. Anything else, e.g. an invalid filter or a
+    credential that is not accepted, fails the same way for every shard and is raised at once. """
+    from msrest.exceptions import ClientRequestError
+    from azure.cli.core.wait import is_transient_error
+    if isinstance(ex, ClientRequestError):
+        # msrest wraps the errors of the requests library
+        ex = getattr(ex, 'inner_exception', None) or ex
+    return is_transient_error(ex)
+
+
+def _before(events, boundary):
+    # adjacent shards share their boundary; an event exactly on it belongs to the newer shard
+    return [e for e in events if e.event_timestamp is None or e.event_timestamp < boundary]
+
+
+class ActivityLogShardReader(object):
+
+    def __init__(self, client, build_filter, select, start, end, shard_size=None, max_parallel=4):
+        """
+        :param build_filter: callable returning the OData filter for a (start, end) pair of datetimes
+        """
+        if max_parallel < 1:
+            raise CLIError('--max-parallel must be greater than 0.')
+        self._client = client
+        self._build_filter = build_filter
+        self._select = select
+        self.max_parallel = max_parallel
+        # boundaries are aligned to the shard size, so that exports of overlapping ranges share their shards
+        self.shards = list(reversed(split_time_window(start, end, shard_size or DEFAULT_SHARD_SIZE, align=True)))
+
+    def _query(self, start, end):
+        return list(self._client.list(filter=self._build_filter(start, end), select=self._select))
+
+    def _fetch(self, start, end):
+        for attempt in range(SHARD_RETRIES + 1):
+            try:
+                return self._query(start, end)
+            except Exception as ex:  # pylint: disable=broad-except
+                if not _is_retriable(ex):
+                    raise
+                if end - start >= 2 * MIN_SHARD_SIZE:
+                    # a narrower window needs fewer page continuations, which is what usually times out
+                    middle = start + (end - start) // 2
+                    logger.info("Splitting activity log shard %s - %s after error: %s", start, end, ex)
+                    return self._fetch(middle, end) + _before(self._fetch(start, middle), middle)
+                if attempt == SHARD_RETRIES:
+                    raise
+                logger.info("Retrying activity log shard %s - %s after error: %s", start, end, ex)
+                time.sleep(2 ** attempt)
+        return []
+
+    def fetch_shard(self, index):
+        start, end = self.shards[index]
+        events = self._fetch(start, end)
+        if index:
+            events = _before(events, end)
+        return sorted(events, key=lambda e: (e.event_timestamp is not None, e.event_timestamp), reverse=True)
+
+    def iter_shards(self, skip=0):
+        """ Yields (shard index, events) newest shard first while later shards are fetched in the background. """
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            futures = {}
+            next_index = skip
+            for index in range(skip, len(self.shards)):
+                while next_index < len(self.shards) and next_index < index + self.max_parallel:
+                    futures[next_index] = executor.submit(self.fetch_shard, next_index)
+                    next_index += 1
+                yield index, futures.pop(index).result()
+
+    def iter_events(self, max_events=None):
+        """ Yields up to max_events events newest first. The shards are paged lazily one after the other, so that
+        no more pages are requested than the events returned need. """
+        count = 0
+        for index, (start, end) in enumerate(self.shards):
+            if max_events is not None and count >= max_events:
+                return
+            for event in self._client.list(filter=self._build_filter(start, end), select=self._select):
+                if index and event.event_timestamp is not None and event.event_timestamp >= end:
+                    continue
+                yield event
+                count += 1
+                if max_events is not None and count >= max_events:
+                    return
+
+
+def _read_checkpoint(checkpoint_path):
+    try:
+        with open(checkpoint_path) as f:
+            return json.load(f)
+    except (OSError, IOError, ValueError):
+        return None
+
+
+def get_resumed_time_range(output_file, query):
+    """ Returns the (start, end) of an interrupted export of `query` to `output_file`, or None.
+
+    :param query: the query of the export without its time range. A range relative to now moves with every run, so
+    such an export resumes with the range it started with.
+    """
+    checkpoint = _read_checkpoint(output_file + '.checkpoint')
+    recorded = dict((checkpoint or {}).get('query') or {})
+    start, end = recorded.pop('start', None), recorded.pop('end', None)
+    if recorded != query or not start or not end:
+        return None
+    return start, end
+
+
+def _load_checkpoint(checkpoint_path, query, output_file):
+    checkpoint = _read_checkpoint(checkpoint_path)
+    if checkpoint is None:
+        return None
+    if checkpoint.get('query') != query or not os.path.isfile(output_file) or \
+            os.path.getsize(output_file) < checkpoint.get('offset', 0):
+        logger.warning("Checkpoint '%s' does not match this export. Starting over.", checkpoint_path)
+        return None
+    return checkpoint
+
+
+def export_activity_log(reader, output_file, query, max_events=None):
+    """ Write the events of every shard as NDJSON. Progress is recorded in '<output_file>.checkpoint' after each
+    completed shard, so running the same export again resumes after the last shard that was written. """
+    from azure.cli.core.util import write_json_atomic
+    checkpoint_path = output_file + '.checkpoint'
+    checkpoint = _load_checkpoint(checkpoint_path, query, output_file)
+    if checkpoint:
+        logger.warning("Resuming export after %s of %s shard(s).", checkpoint['completedShards'], len(reader.shards))
+    else:
+        checkpoint = {'query': query, 'completedShards': 0, 'offset': 0, 'events': 0}
+
+    with open(output_file, 'r+b' if checkpoint['offset'] else 'wb') as f:
+        # drop anything written after the last checkpoint
+        f.seek(checkpoint['offset'])
+        f.truncate()
+        for index, events in reader.iter_shards(skip=checkpoint['completedShards']):
+            for event in events:
+                if max_events is not None and checkpoint['events'] >= max_events:
+                    break
+                f.write((json.dumps(todict(event), default=str) + '\n').encode('utf-8'))
+                checkpoint['events'] += 1
+            f.flush()
+            checkpoint.update(completedShards=index + 1, offset=f.tell())
+            write_json_atomic(checkpoint_path, checkpoint)
+            if max_events is not None and checkpoint['events'] >= max_events:
+                break
+
+    os.remove(checkpoint_path)
+    logger.warning("Exported %s event(s) to '%s'.", checkpoint['events'], output_file)
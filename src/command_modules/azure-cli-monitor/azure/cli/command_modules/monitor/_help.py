@@ -196,6 +196,14 @@ helps['monitor metrics list'] = """
               az monitor metrics list --resource {ResourceName} --metric Transactions \\
                                       --filter "ApiName eq '*'" \\
                                       --start-time 2017-01-01T00:00:00Z
+        - name: List the CPU usage of many VMs over the past day as rows of resource, metric, timestamp and value.
+          text: >
+              az monitor metrics list --resource-ids-file vm-ids.txt --metric "Percentage CPU" --offset 1d \\
+                  --interval 5m --output-file cpu.json
+        - name: Summarize the CPU usage across all VMs of a resource group for every minute of the past hour.
+          text: >
+              az monitor metrics list --resources $(az vm list -g {ResourceGroup} --query [].id -o tsv) \\
+                  --metric "Percentage CPU" --aggregate-resources -o table
 """
 
 helps['monitor metrics list-definitions'] = """
@@ -872,7 +880,7 @@ helps['monitor activity-log list'] = """
           short-summary: >
             Status to query for (ex: Failed)
         - name: --max-events
-          short-summary: Maximum number of records to return.
+          short-summary: Maximum number of records to return. Defaults to 50, or to all events with --output-file.
         - name: --select
           short-summary: Space-separated list of properties to return.
         - name: --offset
@@ -890,6 +898,12 @@ helps['monitor activity-log list'] = """
           text: az monitor activity-log list --correlation-id b5eac9d2-e829-4c9a-9efb-586d19417c5f
         - name: List events within the past hour based on resource group.
           text: az monitor activity-log list -g {ResourceGroup} --offset 1h
+        - name: >
+            Export 90 days of events as newline-delimited JSON, retrieving 12 hour shards eight at a time.
+            If the export is interrupted, running the same command again resumes after the last completed shard.
+          text: >
+            az monitor activity-log list --start-time 2018-07-01 --end-time 2018-09-29 --shard-size 12h
+            --max-parallel 8 --output-file events.json
 """
 
 helps['monitor activity-log list-categories'] = """
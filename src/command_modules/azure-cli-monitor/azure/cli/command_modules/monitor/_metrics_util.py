@@ -0,0 +1,140 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Metric queries over many resources.
+
+Every resource is queried separately, with long time ranges split into windows the service can return in one
+response. Results are flattened into one row per resource, metric, aggregation and timestamp.
+"""
+
+import json
+from collections import OrderedDict
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+from azure.cli.command_modules.monitor.util import split_time_window
+
+logger = get_logger(__name__)
+
+# the service returns at most this many data points per time series
+MAX_POINTS_PER_QUERY = 1440
+METRIC_AGGREGATIONS = ['average', 'minimum', 'maximum', 'total', 'count']
+CROSS_RESOURCE_PERCENTILES = [50, 90, 99]
+
+
+def read_resource_ids(resources=None, resource_ids_file=None):
+    """ Combine --resources and the lines of --resource-ids-file, skipping blank lines, comments and duplicates. """
+    resource_ids = list(resources or [])
+    if resource_ids_file:
+        try:
+            with open(resource_ids_file) as f:
+                resource_ids += [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+        except (OSError, IOError) as ex:
+            raise CLIError("Unable to read '{}': {}".format(resource_ids_file, ex))
+    seen = set()
+    return [r for r in resource_ids if not (r.lower() in seen or seen.add(r.lower()))]
+
+
+def parse_interval(interval):
+    import isodate
+    from azure.cli.command_modules.monitor.actions import get_period_type
+    try:
+        return isodate.parse_duration(interval)
+    except (isodate.ISO8601Error, TypeError):
+        return get_period_type(as_timedelta=True)(interval)
+
+
+def get_query_windows(start, end, interval):
+    return split_time_window(start, end, parse_interval(interval) * MAX_POINTS_PER_QUERY)
+
+
+def flatten_metrics_response(resource_id, response):
+    rows = []
+    for metric in response.value or []:
+        for series in metric.timeseries or []:
+            dimensions = ','.join('{}={}'.format(m.name.value, m.value) for m in series.metadatavalues or [])
+            for point in series.data or []:
+                for aggregation in METRIC_AGGREGATIONS:
+                    value = getattr(point, aggregation)
+                    if value is None:
+                        continue
+                    row = OrderedDict([('resource', resource_id), ('metric', metric.name.value)])
+                    if dimensions:
+                        row['dimensions'] = dimensions
+                    row['aggregation'] = aggregation
+                    row['timestamp'] = point.time_stamp.isoformat()
+                    row['value'] = value
+                    rows.append(row)
+    return rows
+
+
+def _percentile(sorted_values, percent):
+    # linear interpolation between the closest ranks
+    position = (len(sorted_values) - 1) * percent / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _row_key(row):
+    return row['metric'], row.get('dimensions'), row['aggregation'], row['timestamp']
+
+
+def aggregate_across_resources(rows):
+    """ Summarize the values of all resources for each metric, dimension, aggregation and timestamp. """
+    groups = OrderedDict()
+    for row in rows:
+        groups.setdefault(_row_key(row), []).append(row['value'])
+    result = []
+    for (metric, dimensions, aggregation, timestamp), values in groups.items():
+        values = sorted(values)
+        row = OrderedDict([('metric', metric)])
+        if dimensions:
+            row['dimensions'] = dimensions
+        row['aggregation'] = aggregation
+        row['timestamp'] = timestamp
+        row['resources'] = len(values)
+        row['min'] = values[0]
+        row['max'] = values[-1]
+        row['avg'] = sum(values) / float(len(values))
+        for percent in CROSS_RESOURCE_PERCENTILES:
+            row['p{}'.format(percent)] = _percentile(values, percent)
+        result.append(row)
+    return sorted(result, key=lambda r: (r['metric'], r.get('dimensions') or '', r['aggregation'], r['timestamp']))
+
+
+def query_resources_metrics(query, resource_ids, windows, max_parallel=8):
+    """ Run query(resource_id, window_start, window_end) for every resource and window on a bounded pool.
+
+    Yields the flattened rows of one resource at a time, in the order of resource_ids. Resources which fail
+    are reported and skipped. """
+    from concurrent.futures import ThreadPoolExecutor
+    if max_parallel < 1:
+        raise CLIError('--max-parallel must be greater than 0.')
+
+    def _query_resource_window(resource_id, window):
+        return flatten_metrics_response(resource_id, query(resource_id, window[0], window[1]))
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        futures = [(r, [executor.submit(_query_resource_window, r, w) for w in windows]) for r in resource_ids]
+        for resource_id, resource_futures in futures:
+            try:
+                rows = [row for f in resource_futures for row in f.result()]
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.warning("Failed to retrieve metrics for '%s': %s", resource_id, ex)
+                continue
+            # adjacent windows may both return the data point on their shared boundary
+            seen = set()
+            yield [r for r in rows if not (_row_key(r) in seen or seen.add(_row_key(r)))]
+
+
+def write_ndjson(rows, output_file):
+    count = 0
+    with open(output_file, 'w') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+            count += 1
+    logger.warning("Wrote %s row(s) to '%s'.", count, output_file)
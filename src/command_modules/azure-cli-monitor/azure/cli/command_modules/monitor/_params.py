@@ -3,12 +3,15 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+from argcomplete.completers import FilesCompleter
+
 from knack.arguments import CLIArgumentType
 
 from azure.cli.core.util import get_json_object
 
 from azure.cli.core.commands.parameters import (
-    get_location_type, tags_type, get_three_state_flag, get_enum_type, get_datetime_type, resource_group_name_type)
+    get_location_type, tags_type, get_three_state_flag, get_enum_type, get_datetime_type, resource_group_name_type,
+    file_type)
 from azure.cli.core.commands.validators import get_default_location_from_resource_group
 
 from azure.cli.command_modules.monitor.actions import (
@@ -93,7 +96,7 @@ def load_arguments(self, _):
 
     with self.argument_context('monitor metrics list') as c:
         from azure.mgmt.monitor.models import AggregationType
-        c.resource_parameter('resource', arg_group='Target Resource')
+        c.resource_parameter('resource', arg_group='Target Resource', required=False)
         c.argument('metadata', action='store_true')
         c.argument('dimension', nargs='*', validator=validate_metric_dimension)
         c.argument('aggregation', arg_type=get_enum_type(t for t in AggregationType if t.name != 'none'), nargs='*')
@@ -103,6 +106,13 @@ def load_arguments(self, _):
         c.argument('filters', options_list='--filter')
         c.argument('metric_namespace', options_list='--namespace')
 
+    with self.argument_context('monitor metrics list', arg_group='Multiple Resources') as c:
+        c.argument('resources', nargs='+', help='Space-separated list of resource IDs to query instead of --resource.')
+        c.argument('resource_ids_file', type=file_type, completer=FilesCompleter(), help='File with one resource ID per line to query instead of --resource.')
+        c.argument('max_parallel', type=int, help='Maximum number of queries sent concurrently.')
+        c.argument('aggregate_resources', action='store_true', help='Instead of one row per resource, return the count, min, max, average and 50th, 90th and 99th percentile of the values of all resources for each metric and timestamp.')
+        c.argument('output_file', help='Write the rows to this file as newline-delimited JSON instead of returning them.')
+
     with self.argument_context('monitor metrics list', arg_group='Time') as c:
         c.argument('start_time', arg_type=get_datetime_type(help='Start time of the query.'))
         c.argument('end_time', arg_type=get_datetime_type(help='End time of the query. Defaults to the current time.'))
@@ -256,6 +266,11 @@ def load_arguments(self, _):
         activity_log_props = [x['key'] for x in EventData()._attribute_map.values()]  # pylint: disable=protected-access
         c.argument('select', nargs='+', arg_type=get_enum_type(activity_log_props))
         c.argument('max_events', type=int)
+        c.argument('output_file', help='Write the events to this file as newline-delimited JSON instead of returning them.')
+
+    with self.argument_context('monitor activity-log list', arg_group='Sharding') as c:
+        c.argument('shard_size', type=get_period_type(as_timedelta=True), help='Split the time range into shards of this size, in ##d##h format, which are retrieved concurrently. Default: 1d.')
+        c.argument('max_parallel', type=int, help='Maximum number of shards retrieved concurrently.')
 
     with self.argument_context('monitor activity-log list', arg_group='Time') as c:
         c.argument('start_time', arg_type=get_datetime_type(help='Start time of the query.'))
@@ -12,23 +12,66 @@ logger = get_logger(__name__)
 
 # region ActivityLog
 def list_activity_log(client, filters=None, correlation_id=None, resource_group=None, resource_id=None,
-                      resource_provider=None, start_time=None, end_time=None, caller=None, status=None, max_events=50,
-                      select=None, offset='6h'):
+                      resource_provider=None, start_time=None, end_time=None, caller=None, status=None, max_events=None,
+                      select=None, offset='6h', shard_size=None, max_parallel=4, output_file=None):
+    from azure.cli.command_modules.monitor._activity_log_util import (ActivityLogShardReader, export_activity_log,
+                                                                      get_resumed_time_range)
+    from azure.cli.command_modules.monitor.util import parse_time_range
+
+    select_filters = _activity_log_select_filter_builder(select)
+    logger.info('Select Filter: %s', select_filters)
+    query = {'filter': filters, 'correlationId': correlation_id, 'resourceGroup': resource_group,
+             'resourceId': resource_id, 'resourceProvider': resource_provider, 'caller': caller, 'status': status,
+             'select': select_filters, 'shardSize': shard_size.total_seconds() if shard_size else None,
+             # the offset only places a range relative to now; a changed offset is a different export
+             'offset': None if start_time or end_time else offset.total_seconds()}
+    reader = None
     if filters:
         odata_filters = filters
     else:
+        if output_file and not start_time and not end_time:
+            start_time, end_time = get_resumed_time_range(output_file, query) or (None, None)
+        start_time, end_time = _resolve_time_range(start_time, end_time, offset)
         odata_filters = _build_activity_log_odata_filter(correlation_id, resource_group, resource_id, resource_provider,
                                                          start_time, end_time, caller, status, offset)
 
-    select_filters = _activity_log_select_filter_builder(select)
+        def _build_shard_filter(shard_start, shard_end):
+            return _build_activity_log_odata_filter(correlation_id, resource_group, resource_id, resource_provider,
+                                                    shard_start.isoformat(), shard_end.isoformat(), caller, status)
+
+        start, end = parse_time_range(start_time, end_time)
+        reader = ActivityLogShardReader(client, _build_shard_filter, select_filters, start, end,
+                                        shard_size=shard_size, max_parallel=max_parallel)
+        query.update(start=start.isoformat(), end=end.isoformat())
     logger.info('OData Filter: %s', odata_filters)
-    logger.info('Select Filter: %s', select_filters)
-    activity_log = client.list(filter=odata_filters, select=select_filters)
-    return _limit_results(activity_log, max_events)
 
+    if output_file:
+        if not reader:
+            reader = _SingleQueryReader(client, odata_filters, select_filters)
+        return export_activity_log(reader, output_file, query, max_events)
 
-def _build_activity_log_odata_filter(correlation_id=None, resource_group=None, resource_id=None, resource_provider=None,
-                                     start_time=None, end_time=None, caller=None, status=None, offset=None):
+    if reader and len(reader.shards) > 1:
+        activity_log = reader.iter_events(50 if max_events is None else max_events)
+    else:
+        activity_log = client.list(filter=odata_filters, select=select_filters)
+    return _limit_results(activity_log, 50 if max_events is None else max_events)
+
+
+class _SingleQueryReader(object):
+    """ Presents a query with user supplied filters, which cannot be split by time, as a single shard. """
+
+    def __init__(self, client, odata_filters, select):
+        self._client = client
+        self._odata_filters = odata_filters
+        self._select = select
+        self.shards = [None]
+
+    def iter_shards(self, skip=0):
+        if not skip:
+            yield 0, self._client.list(filter=self._odata_filters, select=self._select)
+
+
+def _resolve_time_range(start_time=None, end_time=None, offset=None):
     from datetime import datetime
     import dateutil.parser
 
@@ -41,7 +84,12 @@ def _build_activity_log_odata_filter(correlation_id=None, resource_group=None, r
     elif not end_time:
         # if no end_time, apply offset fowards from start_time
         end_time = (dateutil.parser.parse(start_time) + offset).isoformat()
+    return start_time, end_time
+
 
+def _build_activity_log_odata_filter(correlation_id=None, resource_group=None, resource_id=None, resource_provider=None,
+                                     start_time=None, end_time=None, caller=None, status=None, offset=None):
+    start_time, end_time = _resolve_time_range(start_time, end_time, offset)
     odata_filters = 'eventTimestamp ge {} and eventTimestamp le {}'.format(start_time, end_time)
 
     if correlation_id:
@@ -99,38 +147,61 @@ def _limit_results(paged, limit):
 
 # region Metrics
 # pylint:disable=unused-argument
-def list_metrics(cmd, resource,
+def list_metrics(cmd, resource=None,
                  start_time=None, end_time=None, offset='1h', interval='1m',
                  metadata=None, dimension=None, aggregation=None, metrics=None,
-                 filters=None, metric_namespace=None, orderby=None, top=10):
+                 filters=None, metric_namespace=None, orderby=None, top=10,
+                 resources=None, resource_ids_file=None, max_parallel=8, aggregate_resources=False,
+                 output_file=None):
 
     from azure.mgmt.monitor.models import ResultType
-    from datetime import datetime
-    import dateutil.parser
     from six.moves.urllib.parse import quote_plus
 
-    if not start_time and not end_time:
-        # if neither value provided, end_time is now
-        end_time = datetime.utcnow().isoformat()
-    if not start_time:
-        # if no start_time, apply offset backwards from end_time
-        start_time = (dateutil.parser.parse(end_time) - offset).isoformat()
-    elif not end_time:
-        # if no end_time, apply offset fowards from start_time
-        end_time = (dateutil.parser.parse(start_time) + offset).isoformat()
-
-    timespan = '{}/{}'.format(start_time, end_time)
+    if bool(resource) == bool(resources or resource_ids_file):
+        from knack.util import CLIError
+        raise CLIError('usage error: --resource ID | --resources ID [ID ...] | --resource-ids-file FILE')
 
+    start_time, end_time = _resolve_time_range(start_time, end_time, offset)
     client = cf_metrics(cmd.cli_ctx, None)
-    return client.list(
-        resource_uri=resource,
-        timespan=quote_plus(timespan),
-        interval=interval,
-        metricnames=','.join(metrics) if metrics else None,
-        aggregation=','.join(aggregation) if aggregation else None,
-        top=top,
-        orderby=orderby,
-        filter=filters,
-        result_type=ResultType.metadata if metadata else None,
-        metricnamespace=metric_namespace)
+
+    def _query(resource_uri, timespan):
+        return client.list(
+            resource_uri=resource_uri,
+            timespan=quote_plus(timespan),
+            interval=interval,
+            metricnames=','.join(metrics) if metrics else None,
+            aggregation=','.join(aggregation) if aggregation else None,
+            top=top,
+            orderby=orderby,
+            filter=filters,
+            result_type=ResultType.metadata if metadata else None,
+            metricnamespace=metric_namespace)
+
+    if resource:
+        return _query(resource, '{}/{}'.format(start_time, end_time))
+    return _list_metrics_for_resources(_query, start_time, end_time, interval, resources, resource_ids_file,
+                                       max_parallel, aggregate_resources, output_file)
+
+
+def _list_metrics_for_resources(query, start_time, end_time, interval, resources, resource_ids_file,
+                                max_parallel, aggregate_resources, output_file):
+    import itertools
+    from azure.cli.command_modules.monitor._metrics_util import (
+        read_resource_ids, get_query_windows, query_resources_metrics, aggregate_across_resources, write_ndjson)
+    from azure.cli.command_modules.monitor.util import parse_time_range
+
+    resource_ids = read_resource_ids(resources, resource_ids_file)
+    windows = get_query_windows(*(parse_time_range(start_time, end_time) + (interval,)))
+    logger.info('Querying %s resource(s) in %s time window(s).', len(resource_ids), len(windows))
+
+    def _query_window(resource_id, window_start, window_end):
+        return query(resource_id, '{}/{}'.format(window_start.isoformat(), window_end.isoformat()))
+
+    rows = itertools.chain.from_iterable(query_resources_metrics(_query_window, resource_ids, windows,
+                                                                 max_parallel=max_parallel))
+    if aggregate_resources:
+        rows = aggregate_across_resources(rows)
+    if output_file:
+        return write_ndjson(rows, output_file)
+    return list(rows)
 # endregion
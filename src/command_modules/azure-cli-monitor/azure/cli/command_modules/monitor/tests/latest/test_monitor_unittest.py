@@ -151,3 +151,261 @@ class MonitorMetricAlertActionTest(unittest.TestCase):
         ns = self._build_namespace()
         with self.assertRaisesRegexp(CLIError, 'usage error: --condition'):
             self.call_condition(ns, 'avg Wra!!ga * woo')
+
+
+class _FakeEvent(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, event_timestamp, name):
+        self.event_timestamp = event_timestamp
+        self.operation_name = name
+
+
+class ActivityLogShardingTest(unittest.TestCase):
+
+    def _fake_client(self, events, failures=None):
+        import re
+        import dateutil.parser
+        failures = failures or []
+        client = mock.MagicMock()
+
+        def _list(filter, select):  # pylint: disable=redefined-builtin
+            start, end = [dateutil.parser.parse(t) for t in re.findall(r'(?:ge|le) (\S+)', filter)]
+            error = failures.pop(0) if failures else None
+            if error:
+                raise error
+            # newest first, as the service returns them
+            return [e for e in reversed(events) if start <= e.event_timestamp <= end]
+
+        client.list.side_effect = _list
+        return client
+
+    def _events(self):
+        from datetime import datetime, timedelta
+        from dateutil.tz import tzutc
+        base = datetime(2018, 7, 1, tzinfo=tzutc())
+        # one event every 6 hours, including the shard boundaries
+        return [_FakeEvent(base + timedelta(hours=6 * i), 'op{}'.format(i)) for i in range(12)]
+
+    def test_activity_log_list_sharded_in_order(self):
+        from datetime import timedelta
+        from azure.cli.command_modules.monitor.custom import list_activity_log
+        client = self._fake_client(self._events())
+
+        result = list_activity_log(client, start_time='2018-07-01T00:00:00Z', end_time='2018-07-03T18:00:00Z',
+                                   shard_size=timedelta(days=1), max_parallel=3, max_events=100)
+
+        self.assertEqual(client.list.call_count, 3)
+        self.assertEqual([e.operation_name for e in result], ['op{}'.format(i) for i in range(11, -1, -1)])
+
+    def test_activity_log_list_sharded_lazily(self):
+        from datetime import timedelta
+        from azure.cli.command_modules.monitor.custom import list_activity_log
+        client = self._fake_client(self._events())
+        listed = []
+
+        def _pages(filter, select):  # pylint: disable=redefined-builtin
+            for event in self._fake_client(self._events()).list(filter=filter, select=select):
+                listed.append(event)
+                yield event
+
+        client.list.side_effect = _pages
+        result = list_activity_log(client, start_time='2018-07-01T00:00:00Z', end_time='2018-07-03T18:00:00Z',
+                                   shard_size=timedelta(days=1), max_parallel=3, max_events=5)
+
+        self.assertEqual([e.operation_name for e in result], ['op11', 'op10', 'op9', 'op8', 'op7'])
+        # the third shard is not requested, and the second is read no further than needed
+        self.assertEqual(client.list.call_count, 2)
+        self.assertEqual(len(listed), 6)
+
+    def test_activity_log_shard_split_on_failure(self):
+        from datetime import datetime, timedelta
+        from dateutil.tz import tzutc
+        from azure.cli.command_modules.monitor._activity_log_util import ActivityLogShardReader
+        from requests.exceptions import ConnectionError  # pylint: disable=redefined-builtin
+        client = self._fake_client(self._events(), failures=[ConnectionError('timeout')])
+        start = datetime(2018, 7, 1, tzinfo=tzutc())
+        reader = ActivityLogShardReader(client, lambda s, e: 'ge {} le {}'.format(s.isoformat(), e.isoformat()),
+                                        None, start, start + timedelta(days=1))
+
+        events = [e for _, shard in reader.iter_shards() for e in shard]
+
+        self.assertEqual([e.operation_name for e in events], ['op4', 'op3', 'op2', 'op1', 'op0'])
+        self.assertEqual(client.list.call_count, 3)
+
+    def test_activity_log_shard_error_not_retried(self):
+        from datetime import datetime, timedelta
+        from dateutil.tz import tzutc
+        from azure.cli.command_modules.monitor._activity_log_util import ActivityLogShardReader
+        client = self._fake_client(self._events(), failures=[TypeError('bad argument')])
+        start = datetime(2018, 7, 1, tzinfo=tzutc())
+        reader = ActivityLogShardReader(client, lambda s, e: 'ge {} le {}'.format(s.isoformat(), e.isoformat()),
+                                        None, start, start + timedelta(days=1))
+
+        # an error which no retry fixes is neither retried nor split
+        with self.assertRaises(TypeError):
+            list(reader.iter_events())
+        self.assertEqual(client.list.call_count, 1)
+
+    def test_activity_log_shard_is_retriable(self):
+        from msrest.exceptions import ClientRequestError
+        from requests.exceptions import ConnectionError, Timeout  # pylint: disable=redefined-builtin
+        from azure.cli.command_modules.monitor._activity_log_util import _is_retriable
+
+        def _http_error(status_code):
+            error = CLIError('failed')
+            error.response = mock.MagicMock(status_code=status_code)
+            return error
+
+        self.assertTrue(_is_retriable(_http_error(429)))
+        self.assertTrue(_is_retriable(_http_error(503)))
+        self.assertFalse(_is_retriable(_http_error(400)))
+        self.assertFalse(_is_retriable(_http_error(403)))
+        self.assertTrue(_is_retriable(Timeout('timed out')))
+        self.assertTrue(_is_retriable(ClientRequestError('failed', inner_exception=ConnectionError('reset'))))
+        self.assertFalse(_is_retriable(ClientRequestError('failed', inner_exception=ValueError('bad url'))))
+        self.assertFalse(_is_retriable(CLIError('Please run `az login`')))
+        self.assertFalse(_is_retriable(TypeError('bad argument')))
+
+    def test_activity_log_shards_aligned(self):
+        from datetime import datetime, timedelta
+        from dateutil.tz import tzutc
+        from azure.cli.command_modules.monitor._activity_log_util import ActivityLogShardReader
+        start = datetime(2018, 7, 1, 5, 30, tzinfo=tzutc())
+        reader = ActivityLogShardReader(mock.MagicMock(), None, None, start, start + timedelta(days=2))
+
+        midnight = datetime(2018, 7, 2, tzinfo=tzutc())
+        self.assertEqual(reader.shards, [(midnight + timedelta(days=1), start + timedelta(days=2)),
+                                         (midnight, midnight + timedelta(days=1)),
+                                         (start, midnight)])
+
+    def test_activity_log_export_resumes_from_checkpoint(self):
+        import json
+        import os
+        import shutil
+        import tempfile
+        from datetime import timedelta
+        from azure.cli.command_modules.monitor.custom import list_activity_log
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        output_file = os.path.join(temp_dir, 'events.json')
+        kwargs = {'start_time': '2018-07-01T00:00:00Z', 'end_time': '2018-07-03T18:00:00Z',
+                  'shard_size': timedelta(days=1), 'max_parallel': 1, 'output_file': output_file}
+
+        # the second shard fails for good, so the export stops after the first one
+        client = self._fake_client(self._events(), failures=[None, CLIError('denied')])
+        with self.assertRaises(CLIError):
+            list_activity_log(client, **kwargs)
+        self.assertTrue(os.path.isfile(output_file + '.checkpoint'))
+        with open(output_file) as f:
+            self.assertEqual(len(f.readlines()), 4)
+
+        client = self._fake_client(self._events())
+        list_activity_log(client, **kwargs)
+        self.assertEqual(client.list.call_count, 2)
+        self.assertFalse(os.path.isfile(output_file + '.checkpoint'))
+        with open(output_file) as f:
+            names = [json.loads(line)['operationName'] for line in f]
+        self.assertEqual(names, ['op{}'.format(i) for i in range(11, -1, -1)])
+
+    def test_activity_log_export_resumes_relative_range(self):
+        import json
+        import os
+        import shutil
+        import tempfile
+        from datetime import timedelta
+        import dateutil.parser
+        from azure.cli.command_modules.monitor import custom
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        output_file = os.path.join(temp_dir, 'events.json')
+        kwargs = {'offset': timedelta(hours=66), 'shard_size': timedelta(days=1), 'max_parallel': 1,
+                  'output_file': output_file}
+        resolve_time_range = custom._resolve_time_range  # pylint: disable=protected-access
+
+        def _resolve_at(now):
+            def _resolve(start_time=None, end_time=None, offset=None):
+                if not start_time and not end_time:
+                    return (dateutil.parser.parse(now) - offset).isoformat(), now
+                return resolve_time_range(start_time, end_time, offset)
+            return _resolve
+
+        client = self._fake_client(self._events(), failures=[None, CLIError('denied')])
+        with mock.patch.object(custom, '_resolve_time_range', _resolve_at('2018-07-03T18:00:00')):
+            with self.assertRaises(CLIError):
+                custom.list_activity_log(client, **kwargs)
+
+        # an hour later, the export continues with the range it started with
+        client = self._fake_client(self._events())
+        with mock.patch.object(custom, '_resolve_time_range', _resolve_at('2018-07-03T19:00:00')):
+            custom.list_activity_log(client, **kwargs)
+        self.assertEqual(client.list.call_count, 2)
+        with open(output_file) as f:
+            names = [json.loads(line)['operationName'] for line in f]
+        self.assertEqual(names, ['op{}'.format(i) for i in range(11, -1, -1)])
+
+        # with another offset, the export starts over with the range of that offset
+        client = self._fake_client(self._events(), failures=[None, CLIError('denied')])
+        with mock.patch.object(custom, '_resolve_time_range', _resolve_at('2018-07-03T18:00:00')):
+            with self.assertRaises(CLIError):
+                custom.list_activity_log(client, **kwargs)
+        kwargs['offset'] = timedelta(hours=12)
+        client = self._fake_client(self._events())
+        with mock.patch.object(custom, '_resolve_time_range', _resolve_at('2018-07-03T19:00:00')):
+            custom.list_activity_log(client, **kwargs)
+        with open(output_file) as f:
+            names = [json.loads(line)['operationName'] for line in f]
+        self.assertEqual(names, ['op11', 'op10'])
+
+
+class MultiResourceMetricsTest(unittest.TestCase):
+
+    @staticmethod
+    def _response(resource_uri, timespan):
+        from datetime import datetime, timedelta
+        from dateutil.tz import tzutc
+        from six.moves.urllib.parse import unquote_plus
+        from azure.mgmt.monitor.models import Response, Metric, TimeSeriesElement, MetricValue, LocalizableString
+        import dateutil.parser
+        start, end = [dateutil.parser.parse(t) for t in unquote_plus(timespan).split('/')]
+        base = 10 if resource_uri.endswith('vm1') else 20
+        points = []
+        stamp = start
+        while stamp <= end:  # include the end to simulate overlapping windows
+            points.append(MetricValue(time_stamp=stamp, average=base + stamp.hour))
+            stamp += timedelta(hours=12)
+        return Response(timespan=timespan, value=[Metric(
+            id='id', type='type', name=LocalizableString(value='Percentage CPU'), unit='Percent',
+            timeseries=[TimeSeriesElement(data=points)])])
+
+    @mock.patch('azure.cli.command_modules.monitor.custom.cf_metrics', autospec=True)
+    def test_metrics_list_for_many_resources(self, cf_metrics_mock):
+        from azure.cli.command_modules.monitor.custom import list_metrics
+        client = cf_metrics_mock.return_value
+        client.list.side_effect = lambda resource_uri, timespan, **kwargs: self._response(resource_uri, timespan)
+
+        # 12 hour points over 2 days need 2 windows of 1440 points each
+        rows = list_metrics(mock.MagicMock(), resources=['/subscriptions/sub/vm1', '/subscriptions/sub/vm2'],
+                            start_time='2018-07-01T00:00:00Z', end_time='2018-07-03T00:00:00Z',
+                            interval='PT1M', max_parallel=3)
+        self.assertEqual(client.list.call_count, 4)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(list(rows[0].items()), [('resource', '/subscriptions/sub/vm1'), ('metric', 'Percentage CPU'),
+                                                 ('aggregation', 'average'),
+                                                 ('timestamp', '2018-07-01T00:00:00+00:00'), ('value', 10)])
+        self.assertEqual(rows[5]['resource'], '/subscriptions/sub/vm2')
+
+        client.list.reset_mock()
+        summary = list_metrics(mock.MagicMock(), resources=['/subscriptions/sub/vm1', '/subscriptions/sub/vm2'],
+                               start_time='2018-07-01T00:00:00Z', end_time='2018-07-01T12:00:00Z',
+                               aggregate_resources=True)
+        self.assertEqual(client.list.call_count, 2)
+        self.assertEqual(summary[1]['timestamp'], '2018-07-01T12:00:00+00:00')
+        self.assertEqual((summary[1]['resources'], summary[1]['min'], summary[1]['max'], summary[1]['avg']),
+                         (2, 22, 32, 27))
+        self.assertEqual(summary[1]['p50'], 27)
+
+    def test_metrics_list_requires_one_target(self):
+        from azure.cli.command_modules.monitor.custom import list_metrics
+        with self.assertRaisesRegexp(CLIError, 'usage error'):
+            list_metrics(mock.MagicMock(), resource='/subscriptions/sub/vm1', resources=['/subscriptions/sub/vm2'])
+        with self.assertRaisesRegexp(CLIError, 'usage error'):
+            list_metrics(mock.MagicMock())
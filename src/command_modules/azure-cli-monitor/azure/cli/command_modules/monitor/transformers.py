@@ -76,6 +76,10 @@ def metrics_table(results):
         except ValueError:
             return time_string
 
+    if isinstance(results, list):
+        # rows of a multi-resource query are flat already
+        return results
+
     retval = []
     for value_group in results['value']:
         name = value_group['name']['localizedValue']
@@ -55,3 +55,37 @@ def get_autoscale_scale_direction_map():
     return {'to': ScaleDirection.none, 'out': ScaleDirection.increase,
             'in': ScaleDirection.decrease}
 # endregion
+
+
+# region Time Windows
+def parse_time_range(start_time, end_time):
+    """ Parse ISO 8601 start and end times, treating values without a timezone as UTC. """
+    import dateutil.parser
+    from dateutil.tz import tzutc
+
+    def _parse(value):
+        parsed = dateutil.parser.parse(value)
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=tzutc())
+    return _parse(start_time), _parse(end_time)
+
+
+def split_time_window(start, end, window_size, align=False):
+    """ Split [start, end] into consecutive windows of at most window_size, oldest first. With align, the windows
+    between the first and the last one start at multiples of window_size since the Unix epoch. """
+    windows = []
+    window_start = start
+    while window_start < end:
+        window_end = min(end, _next_boundary(window_start, window_size) if align else window_start + window_size)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows or [(start, end)]
+
+
+def _next_boundary(value, window_size):
+    import math
+    from datetime import datetime, timedelta
+    from dateutil.tz import tzutc
+    epoch = datetime(1970, 1, 1, tzinfo=tzutc() if value.tzinfo else None)
+    size = window_size.total_seconds()
+    return epoch + timedelta(seconds=(math.floor((value - epoch).total_seconds() / size) + 1) * size)
+# endregion
@@ -0,0 +1,313 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Staged editing of application gateways.
+
+Every change to a sub-resource of an application gateway is a PUT of the whole gateway, which may take many
+minutes. An edit session keeps a working copy of the gateway in the config directory instead: while it is open,
+the commands reading and changing the gateway and its sub-resources use the working copy and return at once.
+`az network application-gateway edit diff` lists the pending changes, `edit validate` checks the references
+between the sub-resources and `edit commit` applies all changes with a single PUT, which fails if the gateway
+has been changed by someone else since the session started.
+"""
+
+import json
+import os
+from collections import OrderedDict
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+logger = get_logger(__name__)
+
+AG_EDIT_DIR_NAME = 'applicationGatewayEdits'
+
+# sub-resource collections under 'properties', as serialized
+SUBRESOURCE_COLLECTIONS = [
+    'gatewayIPConfigurations', 'authenticationCertificates', 'trustedRootCertificates', 'sslCertificates',
+    'frontendIPConfigurations', 'frontendPorts', 'probes', 'backendAddressPools', 'backendHttpSettingsCollection',
+    'httpListeners', 'urlPathMaps', 'requestRoutingRules', 'rewriteRuleSets', 'redirectConfigurations'
+]
+# collections nested in the items of a sub-resource collection
+_NESTED_COLLECTIONS = {'urlPathMaps': 'pathRules'}
+
+
+def _get_session_path(cli_ctx, resource_group_name, application_gateway_name):
+    from azure.cli.core.commands.client_factory import get_subscription_id
+    file_name = '{}-{}-{}.json'.format(get_subscription_id(cli_ctx), resource_group_name,
+                                       application_gateway_name).lower()
+    return os.path.join(cli_ctx.config.config_dir, AG_EDIT_DIR_NAME, file_name)
+
+
+def load_session(cli_ctx, resource_group_name, application_gateway_name):
+    """ Returns the open edit session of a gateway, or None. """
+    try:
+        with open(_get_session_path(cli_ctx, resource_group_name, application_gateway_name)) as f:
+            return json.load(f)
+    except (OSError, IOError):
+        return None
+    except ValueError:
+        raise CLIError("The edit session of application gateway '{}' is corrupt. Run 'az network "
+                       "application-gateway edit discard' and start again.".format(application_gateway_name))
+
+
+def _save_session(cli_ctx, session):
+    from azure.cli.core.util import write_json_atomic
+    write_json_atomic(_get_session_path(cli_ctx, session['resourceGroup'], session['name']), session)
+
+
+def discard_session(cli_ctx, resource_group_name, application_gateway_name):
+    try:
+        os.remove(_get_session_path(cli_ctx, resource_group_name, application_gateway_name))
+        return True
+    except (OSError, IOError):
+        return False
+
+
+def get_session(cli_ctx, resource_group_name, application_gateway_name):
+    session = load_session(cli_ctx, resource_group_name, application_gateway_name)
+    if session is None:
+        raise CLIError("Application gateway '{}' has no edit session. Run 'az network application-gateway edit "
+                       "start' first.".format(application_gateway_name))
+    return session
+
+
+def start_session(cli_ctx, client, resource_group_name, application_gateway_name, force=False):
+    """ Opens an edit session with the current state of a gateway. client is the unstaged operations group. """
+    if not force and load_session(cli_ctx, resource_group_name, application_gateway_name) is not None:
+        raise CLIError("Application gateway '{}' has an edit session already. Commit or discard it, or use --force "
+                       "to start over.".format(application_gateway_name))
+    gateway = client.get(resource_group_name, application_gateway_name)
+    data = gateway.serialize(keep_readonly=True)
+    session = OrderedDict([
+        ('resourceGroup', resource_group_name),
+        ('name', application_gateway_name),
+        ('etag', gateway.etag),
+        ('base', data),
+        ('working', data)
+    ])
+    _save_session(cli_ctx, session)
+    return session
+
+
+def _deserialize_gateway(cli_ctx, data):
+    from azure.cli.core.profiles import get_sdk, ResourceType
+    ApplicationGateway = get_sdk(cli_ctx, ResourceType.MGMT_NETWORK, 'ApplicationGateway', mod='models')
+    return ApplicationGateway.deserialize(data)
+
+
+class StagedApplicationGatewaysOperations(object):
+    """ The application gateways operations group, reading from and writing to the working copy of a gateway
+    with an open edit session. Every other operation goes to the service. """
+
+    def __init__(self, cli_ctx, operations):
+        self._cli_ctx = cli_ctx
+        self._operations = operations
+
+    def __getattr__(self, name):
+        return getattr(self._operations, name)
+
+    def get(self, resource_group_name, application_gateway_name, *args, **kwargs):
+        session = load_session(self._cli_ctx, resource_group_name, application_gateway_name)
+        if session is None:
+            return self._operations.get(resource_group_name, application_gateway_name, *args, **kwargs)
+        return _deserialize_gateway(self._cli_ctx, session['working'])
+
+    def create_or_update(self, resource_group_name, application_gateway_name, parameters, *args, **kwargs):
+        session = load_session(self._cli_ctx, resource_group_name, application_gateway_name)
+        if session is None:
+            return self._operations.create_or_update(resource_group_name, application_gateway_name, parameters,
+                                                     *args, **kwargs)
+        session['working'] = parameters.serialize(keep_readonly=True)
+        _save_session(self._cli_ctx, session)
+        logger.warning("The change is staged in the edit session of application gateway '%s'. Run 'az network "
+                       "application-gateway edit commit' to apply it.", application_gateway_name)
+        return parameters
+
+
+# region diff
+def _changed_paths(old, new, prefix=''):
+    """ Returns the dotted paths of the values which differ between two serialized objects. """
+    if isinstance(old, dict) and isinstance(new, dict):
+        paths = []
+        for key in sorted(set(old) | set(new)):
+            paths.extend(_changed_paths(old.get(key), new.get(key), '{}.{}'.format(prefix, key) if prefix else key))
+        return paths
+    return [] if old == new else [prefix]
+
+
+def _by_name(items):
+    return OrderedDict(((item.get('name') or '').lower(), item) for item in items or [])
+
+
+def _diff_collection(collection, old_items, new_items, changes):
+    old, new = _by_name(old_items), _by_name(new_items)
+    for key, item in new.items():
+        if key not in old:
+            changes.append(OrderedDict([('collection', collection), ('name', item.get('name')), ('change', 'add'),
+                                        ('properties', [])]))
+        else:
+            paths = _changed_paths(old[key], item)
+            if paths:
+                changes.append(OrderedDict([('collection', collection), ('name', item.get('name')),
+                                            ('change', 'update'), ('properties', paths)]))
+    for key, item in old.items():
+        if key not in new:
+            changes.append(OrderedDict([('collection', collection), ('name', item.get('name')),
+                                        ('change', 'remove'), ('properties', [])]))
+
+
+def diff_session(session):
+    """ Returns the changes of the working copy relative to the gateway as it was when the session started: one
+    entry per added, updated or removed sub-resource, and one for the changed gateway level properties. """
+    base, working = session['base'], session['working']
+    base_props, working_props = base.get('properties') or {}, working.get('properties') or {}
+    changes = []
+    for collection in SUBRESOURCE_COLLECTIONS:
+        _diff_collection(collection, base_props.get(collection), working_props.get(collection), changes)
+
+    def _gateway_level(data):
+        data = dict(data)
+        data['properties'] = {k: v for k, v in (data.get('properties') or {}).items()
+                              if k not in SUBRESOURCE_COLLECTIONS}
+        return data
+
+    paths = _changed_paths(_gateway_level(base), _gateway_level(working))
+    if paths:
+        changes.append(OrderedDict([('collection', None), ('name', session['name']), ('change', 'update'),
+                                    ('properties', paths)]))
+    return changes
+# endregion
+
+
+# region validation
+def _iter_references(data, path=''):
+    """ Yields (path, ID) for the sub-resource references, i.e. the objects with an ID only, under data. """
+    if isinstance(data, dict):
+        if list(data) == ['id'] and data['id']:
+            yield path, data['id']
+            return
+        for key, value in data.items():
+            for reference in _iter_references(value, '{}.{}'.format(path, key) if path else key):
+                yield reference
+    elif isinstance(data, list):
+        for index, value in enumerate(data):
+            for reference in _iter_references(value, '{}[{}]'.format(path, index)):
+                yield reference
+
+
+def _get_names(properties):
+    """ Returns the lower case names of the items of every collection, nested collections keyed by the name of
+    their parent, e.g. names['urlPathMaps/map1/pathRules']. """
+    names = {}
+    for collection in SUBRESOURCE_COLLECTIONS:
+        items = properties.get(collection) or []
+        names[collection.lower()] = [(i.get('name') or '').lower() for i in items]
+        nested = _NESTED_COLLECTIONS.get(collection)
+        for item in items if nested else []:
+            key = '{}/{}/{}'.format(collection, item.get('name'), nested).lower()
+            names[key] = [(i.get('name') or '').lower() for i in (item.get('properties') or {}).get(nested) or []]
+    return names
+
+
+def _check_reference(gateway_id, names, reference_id):
+    """ Returns why a reference to a sub-resource of the gateway is broken, or None. """
+    relative = reference_id[len(gateway_id):].strip('/').split('/')
+    if len(relative) % 2:
+        return 'is not a valid sub-resource ID'
+    for index in range(0, len(relative), 2):
+        collection = '/'.join(relative[:index + 1]).lower()
+        if collection not in names:
+            return "refers to unknown collection '{}'".format(relative[index])
+        if relative[index + 1].lower() not in names[collection]:
+            return "refers to {} '{}', which does not exist".format(relative[index], relative[index + 1])
+    return None
+
+
+def _get_required_references(properties):
+    """ Yields (path, description) of the references a gateway can't do without. """
+    def _has(props, key):
+        return bool((props.get(key) or {}).get('id'))
+
+    for index, listener in enumerate(properties.get('httpListeners') or []):
+        path = 'httpListeners[{}]'.format(index)
+        props = listener.get('properties') or {}
+        for key in ['frontendIPConfiguration', 'frontendPort']:
+            if not _has(props, key):
+                yield path, "http listener '{}' has no {}".format(listener.get('name'), key)
+        if (props.get('protocol') or '').lower() == 'https' and not _has(props, 'sslCertificate'):
+            yield path, "HTTPS listener '{}' has no sslCertificate".format(listener.get('name'))
+
+    for index, rule in enumerate(properties.get('requestRoutingRules') or []):
+        path = 'requestRoutingRules[{}]'.format(index)
+        props = rule.get('properties') or {}
+        if not _has(props, 'httpListener'):
+            yield path, "rule '{}' has no httpListener".format(rule.get('name'))
+        if (props.get('ruleType') or '').lower() == 'pathbasedrouting':
+            if not _has(props, 'urlPathMap'):
+                yield path, "path based rule '{}' has no urlPathMap".format(rule.get('name'))
+        elif not _has(props, 'redirectConfiguration') and not (_has(props, 'backendAddressPool') and
+                                                               _has(props, 'backendHttpSettings')):
+            yield path, "rule '{}' needs a backendAddressPool and backendHttpSettings, or a " \
+                        "redirectConfiguration".format(rule.get('name'))
+
+
+def validate_session(session):
+    """ Returns the problems of the working copy: references to sub-resources which don't exist, missing
+    references and duplicate names. """
+    working = session['working']
+    gateway_id = (working.get('id') or '').lower()
+    properties = working.get('properties') or {}
+    names = _get_names(properties)
+    errors = []
+    for collection in SUBRESOURCE_COLLECTIONS:
+        seen = set()
+        for name in names[collection.lower()]:
+            if name in seen:
+                errors.append("{} has more than one item named '{}'".format(collection, name))
+            seen.add(name)
+    for path, reference_id in _iter_references(properties):
+        if gateway_id and reference_id.lower().startswith(gateway_id + '/'):
+            problem = _check_reference(gateway_id, names, reference_id)
+            if problem:
+                errors.append('{} {}'.format(path, problem))
+    errors.extend('{}: {}'.format(path, problem) for path, problem in _get_required_references(properties))
+    return errors
+# endregion
+
+
+def commit_session(cmd, client, resource_group_name, application_gateway_name, no_wait=False):
+    """ Applies the working copy with one PUT, provided the gateway still has the ETag it had when the session
+    started. client is the unstaged operations group. """
+    from msrestazure.azure_exceptions import CloudError
+    from azure.cli.core.commands import LongRunningOperation
+    from azure.cli.core.util import sdk_no_wait
+    session = get_session(cmd.cli_ctx, resource_group_name, application_gateway_name)
+    errors = validate_session(session)
+    if errors:
+        raise CLIError("The edit session of application gateway '{}' has problems:\n  {}".format(
+            application_gateway_name, '\n  '.join(errors)))
+    if not diff_session(session):
+        logger.warning("The edit session of application gateway '%s' has no changes.", application_gateway_name)
+        discard_session(cmd.cli_ctx, resource_group_name, application_gateway_name)
+        return None
+    parameters = _deserialize_gateway(cmd.cli_ctx, session['working'])
+    custom_headers = {'If-Match': session['etag']} if session.get('etag') else None
+    try:
+        poller = sdk_no_wait(no_wait, client.create_or_update, resource_group_name, application_gateway_name,
+                             parameters, custom_headers=custom_headers)
+    except CloudError as ex:
+        if getattr(ex, 'status_code', None) == 412:
+            raise CLIError("Application gateway '{}' has been changed since the edit session started. Run 'az "
+                           "network application-gateway edit discard' and make the changes again.".format(
+                               application_gateway_name))
+        raise
+    if no_wait:
+        discard_session(cmd.cli_ctx, resource_group_name, application_gateway_name)
+        return None
+    # the session is kept if the update fails, so that it can be fixed and committed again
+    result = LongRunningOperation(cmd.cli_ctx)(poller)
+    discard_session(cmd.cli_ctx, resource_group_name, application_gateway_name)
+    return result
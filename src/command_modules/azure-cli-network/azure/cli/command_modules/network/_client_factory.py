@@ -17,7 +17,8 @@ def resource_client_factory(cli_ctx, **_):
 
 
 def cf_application_gateways(cli_ctx, _):
-    return network_client_factory(cli_ctx).application_gateways
+    from ._ag_edit import StagedApplicationGatewaysOperations
+    return StagedApplicationGatewaysOperations(cli_ctx, network_client_factory(cli_ctx).application_gateways)
 
 
 def cf_application_security_groups(cli_ctx, _):
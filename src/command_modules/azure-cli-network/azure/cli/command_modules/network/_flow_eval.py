@@ -0,0 +1,435 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Evaluating flows and next hops against a snapshot of network security groups and route tables.
+
+`az network watcher test-ip-flow` and `show-next-hop` ask Network Watcher, one long running operation per flow.
+A snapshot holds the NSGs, route tables, network interfaces and virtual networks of a resource group, as listed by
+ARM, so that any number of flows can be evaluated locally: the NSG rules, including the default rules, are
+matched in the order of their priority, the subnet NSG before the NIC NSG for inbound traffic and the other way
+round for outbound traffic, and the next hop is chosen by longest prefix match, user routes taking precedence over
+system routes with the same prefix. Service tags other than VirtualNetwork, AzureLoadBalancer and Internet are
+expanded from the file of Azure IP ranges and service tags.
+"""
+
+from collections import OrderedDict
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+from ._nsg_apply import normalize_rule
+from ._util import to_snake_case
+
+logger = get_logger(__name__)
+
+SNAPSHOT_KEYS = ['networkSecurityGroups', 'routeTables', 'networkInterfaces', 'virtualNetworks']
+SYSTEM_ROUTE = 'System Route'
+
+_ANY = ('*', 'any')
+_PRIVATE_PREFIXES = ['10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16', '100.64.0.0/10']
+_AZURE_LOAD_BALANCER = ['168.63.129.16/32']
+_DEFAULT_RULES = [
+    ('AllowVnetInBound', 65000, 'Inbound', 'Allow', 'VirtualNetwork', 'VirtualNetwork'),
+    ('AllowAzureLoadBalancerInBound', 65001, 'Inbound', 'Allow', 'AzureLoadBalancer', '*'),
+    ('DenyAllInBound', 65500, 'Inbound', 'Deny', '*', '*'),
+    ('AllowVnetOutBound', 65000, 'Outbound', 'Allow', 'VirtualNetwork', 'VirtualNetwork'),
+    ('AllowInternetOutBound', 65001, 'Outbound', 'Allow', '*', 'Internet'),
+    ('DenyAllOutBound', 65500, 'Outbound', 'Deny', '*', '*')
+]
+
+
+def _get(obj, key, default=None):
+    """ Returns a property of a resource listed by `az`, in snake_case or as exported from ARM with 'properties'.
+    Names are compared ignoring case and underscores, e.g. privateIpAddress matches privateIPAddress. """
+    wanted = key.lower()
+    for source in (obj, obj.get('properties') or {}):
+        for name, value in source.items():
+            if value is not None and name.replace('_', '').lower() == wanted:
+                return value
+    return default
+
+
+def _id(obj):
+    value = obj.get('id') if isinstance(obj, dict) else obj
+    return value.lower() if value else None
+
+
+def _to_range(prefix):
+    """ Returns (version, first, last) of the addresses of a prefix or an address. """
+    from ipaddress import ip_network
+    try:
+        network = ip_network(u'{}'.format(prefix).strip(), strict=False)
+    except ValueError:
+        return None
+    return network.version, int(network.network_address), int(network.broadcast_address)
+
+
+def _to_address(address):
+    from ipaddress import ip_address
+    try:
+        value = ip_address(u'{}'.format(address).strip())
+    except ValueError:
+        raise CLIError("'{}' is not a valid IP address.".format(address))
+    return value.version, int(value)
+
+
+def _in_ranges(ranges, address):
+    version, value = address
+    return any(v == version and first <= value <= last for v, first, last in ranges)
+
+
+class AddressSet(object):
+    """ A set of address ranges, together with the addresses outside of the excluded ranges if given. A set with
+    an error, e.g. an unknown service tag, raises it when a flow reaches the rule using it. """
+
+    def __init__(self, ranges=None, excluded=None, any_address=False, error=None):
+        self.ranges = list(ranges or [])
+        self.excluded = excluded
+        self.any_address = any_address
+        self.error = error
+
+    def __contains__(self, address):
+        if self.error:
+            raise CLIError(self.error)
+        return self.any_address or _in_ranges(self.ranges, address) or \
+            (self.excluded is not None and not _in_ranges(self.excluded, address))
+
+
+def _parse_ports(values):
+    ranges = []
+    for value in values:
+        value = str(value).strip()
+        if value in ('*', ''):
+            return None
+        first, _, last = value.partition('-')
+        try:
+            ranges.append((int(first), int(last or first)))
+        except ValueError:
+            raise CLIError("'{}' is not a valid port range.".format(value))
+    return ranges
+
+
+def _ports_match(ranges, port):
+    return ranges is None or port is None or any(first <= port <= last for first, last in ranges)
+
+
+def load_service_tags(path):
+    """ Reads the address prefixes of service tags from the file of Azure IP ranges and service tags, or from an
+    object mapping tag names to lists of prefixes. """
+    from azure.cli.core.util import get_file_json
+    try:
+        data = get_file_json(path)
+    except (OSError, IOError, ValueError) as ex:
+        raise CLIError("Unable to read the service tags '{}': {}".format(path, ex))
+    if isinstance(data, dict) and isinstance(data.get('values'), list):
+        return {v['name'].lower(): list(_get(v, 'addressPrefixes', [])) for v in data['values'] if v.get('name')}
+    if isinstance(data, dict) and all(isinstance(v, list) for v in data.values()):
+        return {k.lower(): v for k, v in data.items()}
+    raise CLIError("The service tags '{}' must be the file of Azure IP ranges and service tags, or an object "
+                   "mapping tag names to lists of address prefixes.".format(path))
+
+
+def load_snapshot_file(path):
+    from azure.cli.core.util import get_file_json
+    try:
+        data = get_file_json(path)
+    except (OSError, IOError, ValueError) as ex:
+        raise CLIError("Unable to read the snapshot '{}': {}".format(path, ex))
+    if not isinstance(data, dict) or not any(k in data for k in SNAPSHOT_KEYS):
+        raise CLIError("The snapshot '{}' must be an object with any of {}.".format(path, ', '.join(SNAPSHOT_KEYS)))
+    return data
+
+
+def export_snapshot(cli_ctx, resource_group_name=None):
+    """ Lists the resources of a snapshot, in a resource group or in the subscription, as shown by `az`. """
+    from knack.util import todict
+    from ._client_factory import network_client_factory
+    client = network_client_factory(cli_ctx)
+    operations = [client.network_security_groups, client.route_tables, client.network_interfaces,
+                  client.virtual_networks]
+    snapshot = OrderedDict()
+    for key, ops in zip(SNAPSHOT_KEYS, operations):
+        items = ops.list(resource_group_name) if resource_group_name else ops.list_all()
+        snapshot[key] = todict(list(items))
+    return snapshot
+
+
+class NetworkSnapshot(object):
+    """ The NSGs, route tables, network interfaces and virtual networks of a snapshot, indexed for evaluating
+    flows. NSG rules and routes are compiled on first use. """
+
+    def __init__(self, data, service_tags=None):
+        self.service_tags = service_tags or {}
+        self.nsgs = {_id(n): n for n in data.get('networkSecurityGroups') or []}
+        self.route_tables = {_id(r): r for r in data.get('routeTables') or []}
+        self.subnets = {}
+        self.vnets = {}
+        for vnet in data.get('virtualNetworks') or []:
+            self.vnets[_id(vnet)] = vnet
+            for subnet in _get(vnet, 'subnets', []):
+                self.subnets[_id(subnet)] = (subnet, vnet)
+
+        self.nics = {}
+        self.ip_configs = {}
+        self.asg_members = {}
+        for nic in data.get('networkInterfaces') or []:
+            self.nics[_id(nic)] = nic
+            for config in _get(nic, 'ipConfigurations', []):
+                address = _get(config, 'privateIpAddress')
+                if not address:
+                    continue
+                self.ip_configs.setdefault(_to_address(address), []).append((nic, config))
+                for asg in _get(config, 'applicationSecurityGroups', []):
+                    self.asg_members.setdefault(_id(asg), []).append(_to_range(address))
+        self._rules = {}
+        self._routes = {}
+
+    def find_nic(self, nic=None, address=None):
+        """ Returns the NIC, given by name or ID, and its IP configuration with address. If no NIC is given, the
+        NIC with the address is found. """
+        if nic:
+            key = nic.lower()
+            matches = [n for k, n in self.nics.items() if k == key or (n.get('name') or '').lower() == key]
+            if not matches:
+                raise CLIError("NIC '{}' is not in the snapshot.".format(nic))
+            if len(matches) > 1:
+                raise CLIError("More than one NIC of the snapshot is named '{}'. Use its ID.".format(nic))
+            configs = [c for c in _get(matches[0], 'ipConfigurations', [])
+                       if address is None or (_get(c, 'privateIpAddress') and
+                                              _to_address(_get(c, 'privateIpAddress')) == address)]
+            if not configs:
+                raise CLIError("NIC '{}' has no IP configuration with the address.".format(nic))
+            primary = [c for c in configs if _get(c, 'primary')]
+            return matches[0], (primary or configs)[0]
+        matches = self.ip_configs.get(address) or []
+        if not matches:
+            raise CLIError('No NIC of the snapshot has the address {}.'.format(_format_address(address)))
+        if len(matches) > 1:
+            raise CLIError('More than one NIC of the snapshot has the address {}. Use --nic.'.format(
+                _format_address(address)))
+        return matches[0]
+
+    def _get_subnet(self, config):
+        subnet_id = _id(_get(config, 'subnet'))
+        subnet, vnet = self.subnets.get(subnet_id, (None, None))
+        if subnet is None:
+            raise CLIError("Subnet '{}' is not in the snapshot.".format(subnet_id))
+        return subnet, vnet
+
+    def _virtual_network_ranges(self, vnet):
+        prefixes = list(_get(_get(vnet, 'addressSpace', {}), 'addressPrefixes', []))
+        for peering in _get(vnet, 'virtualNetworkPeerings', []):
+            prefixes.extend(_get(_get(peering, 'remoteAddressSpace', {}), 'addressPrefixes', []))
+        return [r for r in (_to_range(p) for p in prefixes) if r]
+
+    def _resolve_prefix(self, prefix, vnet, rule_name):
+        value = str(prefix).strip()
+        if value.lower() in _ANY:
+            return [], True
+        if value.lower() == 'virtualnetwork':
+            return self._virtual_network_ranges(vnet), False
+        address_range = _to_range(value)
+        if address_range:
+            return [address_range], False
+        prefixes = self.service_tags.get(value.lower())
+        if prefixes is None and value.lower() == 'azureloadbalancer':
+            prefixes = _AZURE_LOAD_BALANCER
+        if prefixes is None:
+            raise CLIError("Service tag '{}' of rule '{}' is unknown. Use --service-tags with the file of Azure IP "
+                           "ranges and service tags.".format(value, rule_name))
+        return [r for r in (_to_range(p) for p in prefixes) if r], False
+
+    def _address_set(self, rule, side, vnet):
+        ranges, excluded = [], None
+        for prefix in rule[side + '_address_prefixes']:
+            if str(prefix).strip().lower() == 'internet':
+                # the public addresses outside of the virtual network
+                excluded = self._virtual_network_ranges(vnet) + [_to_range(p) for p in _PRIVATE_PREFIXES]
+                continue
+            try:
+                resolved, any_address = self._resolve_prefix(prefix, vnet, rule['name'])
+            except CLIError as ex:
+                return AddressSet(error=str(ex))
+            if any_address:
+                return AddressSet(any_address=True)
+            ranges.extend(resolved)
+        for asg in rule[side + '_application_security_groups']:
+            ranges.extend(self.asg_members.get(asg.lower(), []))
+        return AddressSet(ranges, excluded)
+
+    def _compile_rules(self, nsg_id, vnet):
+        key = (nsg_id, _id(vnet))
+        if key not in self._rules:
+            nsg = self.nsgs.get(nsg_id)
+            if nsg is None:
+                raise CLIError("NSG '{}' is not in the snapshot.".format(nsg_id))
+            default_rules = _get(nsg, 'defaultSecurityRules') or [
+                {'name': n, 'priority': p, 'direction': d, 'access': a, 'protocol': '*',
+                 'sourceAddressPrefix': s, 'destinationAddressPrefix': t}
+                for n, p, d, a, s, t in _DEFAULT_RULES]
+            compiled = {'Inbound': [], 'Outbound': []}
+            for kind, rules in [('securityRules', _get(nsg, 'securityRules', [])),
+                                ('defaultSecurityRules', default_rules)]:
+                for data in rules:
+                    rule = normalize_rule(data)
+                    compiled.setdefault(rule['direction'], []).append((
+                        rule['priority'], '{}/{}'.format(kind, rule['name']), rule['access'],
+                        rule['protocol'].lower(),
+                        self._address_set(rule, 'source', vnet), _parse_ports(rule['source_port_ranges']),
+                        self._address_set(rule, 'destination', vnet),
+                        _parse_ports(rule['destination_port_ranges'])))
+            for rules in compiled.values():
+                rules.sort(key=lambda r: r[0])
+            self._rules[key] = compiled
+        return self._rules[key]
+
+    def _route_table(self, subnet, vnet):
+        key = _id(subnet)
+        if key not in self._routes:
+            routes = OrderedDict()
+
+            def _add(prefix, next_hop_type, next_hop_ip, route_table_id, name):
+                address_range = _to_range(prefix)
+                if address_range:
+                    version, first, last = address_range
+                    length = (32 if version == 4 else 128) - (last - first).bit_length()
+                    routes[(version, length, first)] = OrderedDict([
+                        ('nextHopType', next_hop_type), ('nextHopIpAddress', next_hop_ip),
+                        ('routeTableId', route_table_id), ('routeName', name), ('addressPrefix', prefix)])
+
+            for prefix in _PRIVATE_PREFIXES:
+                _add(prefix, 'None', None, SYSTEM_ROUTE, None)
+            _add('0.0.0.0/0', 'Internet', None, SYSTEM_ROUTE, None)
+            for peering in _get(vnet, 'virtualNetworkPeerings', []):
+                for prefix in _get(_get(peering, 'remoteAddressSpace', {}), 'addressPrefixes', []):
+                    _add(prefix, 'VNetPeering', None, SYSTEM_ROUTE, None)
+            for prefix in _get(_get(vnet, 'addressSpace', {}), 'addressPrefixes', []):
+                _add(prefix, 'VnetLocal', None, SYSTEM_ROUTE, None)
+            # user routes replace system routes with the same prefix
+            route_table_id = _id(_get(subnet, 'routeTable'))
+            if route_table_id:
+                route_table = self.route_tables.get(route_table_id)
+                if route_table is None:
+                    raise CLIError("Route table '{}' is not in the snapshot.".format(route_table_id))
+                for route in _get(route_table, 'routes', []):
+                    _add(_get(route, 'addressPrefix'), _get(route, 'nextHopType'), _get(route, 'nextHopIpAddress'),
+                         route_table.get('id'), route.get('name'))
+            lengths = sorted(set((v, length) for v, length, _ in routes), key=lambda k: -k[1])
+            self._routes[key] = (lengths, routes)
+        return self._routes[key]
+
+    def evaluate_flow(self, direction, protocol, local, remote, nic=None):
+        """ Returns whether the NSGs of a NIC allow a flow, and the rule deciding it, like test-ip-flow. local and
+        remote are addresses with a port, or '*' for any port. """
+        direction = str(direction).capitalize()
+        if direction not in ('Inbound', 'Outbound'):
+            raise CLIError("Direction '{}' must be Inbound or Outbound.".format(direction))
+        local_address, local_port = _parse_endpoint(local)
+        remote_address, remote_port = _parse_endpoint(remote)
+        nic, config = self.find_nic(nic, local_address)
+        subnet, vnet = self._get_subnet(config)
+        nsg_ids = [_id(_get(subnet, 'networkSecurityGroup')), _id(_get(nic, 'networkSecurityGroup'))]
+        if direction == 'Outbound':
+            nsg_ids.reverse()
+            source, destination = (local_address, local_port), (remote_address, remote_port)
+        else:
+            source, destination = (remote_address, remote_port), (local_address, local_port)
+
+        protocol = str(protocol).lower()
+        result = OrderedDict([('access', 'Allow'), ('ruleName', None), ('networkSecurityGroup', None)])
+        for nsg_id in [n for n in nsg_ids if n]:
+            rule = next((r for r in self._compile_rules(nsg_id, vnet)[direction]
+                         if r[3] in ('*', protocol) and source[0] in r[4] and destination[0] in r[6] and
+                         (protocol == 'icmp' or (_ports_match(r[5], source[1]) and
+                                                 _ports_match(r[7], destination[1])))), None)
+            result = OrderedDict([('access', rule[2] if rule else 'Deny'), ('ruleName', rule[1] if rule else None),
+                                  ('networkSecurityGroup', self.nsgs[nsg_id].get('id'))])
+            if result['access'] != 'Allow':
+                break
+        return result
+
+    def next_hop(self, source_ip, dest_ip, nic=None):
+        """ Returns the next hop of traffic from an address of a NIC, like show-next-hop. """
+        source, destination = _to_address(source_ip), _to_address(dest_ip)
+        _, config = self.find_nic(nic, source)
+        subnet, vnet = self._get_subnet(config)
+        lengths, routes = self._route_table(subnet, vnet)
+        version, value = destination
+        for route_version, length in lengths:
+            if route_version != version:
+                continue
+            host_bits = (32 if version == 4 else 128) - length
+            route = routes.get((version, length, (value >> host_bits) << host_bits))
+            if route:
+                return route
+        return OrderedDict([('nextHopType', 'None'), ('nextHopIpAddress', None), ('routeTableId', SYSTEM_ROUTE),
+                            ('routeName', None), ('addressPrefix', None)])
+
+
+def _format_address(address):
+    from ipaddress import IPv4Address, IPv6Address
+    return str((IPv4Address if address[0] == 4 else IPv6Address)(address[1]))
+
+
+def _parse_endpoint(value):
+    """ Parses 'ADDRESS:PORT', '[IPv6 ADDRESS]:PORT' or an address alone. The port is None for '*' or no port. """
+    value = str(value).strip()
+    if value.startswith('['):
+        address, _, port = value[1:].partition(']')
+        port = port.lstrip(':')
+    elif value.count(':') == 1:
+        address, port = value.split(':')
+    else:
+        address, port = value, '*'
+    if port in ('*', ''):
+        return _to_address(address), None
+    try:
+        return _to_address(address), int(port)
+    except ValueError:
+        raise CLIError("'{}' must be an IP address and a port, e.g. 10.0.0.4:80 or 10.0.0.4:*.".format(value))
+
+
+def load_flows(path):
+    """ Reads flows from a JSON or YAML list of objects, or from a CSV file with a header row. """
+    import json
+    import yaml
+    from azure.cli.core.util import read_file_content
+    try:
+        content = read_file_content(path)
+    except (OSError, IOError) as ex:
+        raise CLIError("Unable to read the flows '{}': {}".format(path, ex))
+    if path.lower().endswith('.csv'):
+        import csv
+        return [{k.strip(): (v or '').strip() for k, v in row.items() if k} for row in
+                csv.DictReader(content.splitlines())]
+    try:
+        flows = json.loads(content)
+    except ValueError:
+        try:
+            flows = yaml.safe_load(content)
+        except yaml.YAMLError as ex:
+            raise CLIError("Unable to parse the flows '{}': {}".format(path, ex))
+    if not isinstance(flows, list) or not all(isinstance(f, dict) for f in flows):
+        raise CLIError("The flows '{}' must be a list of objects.".format(path))
+    return flows
+
+
+def evaluate_flows(evaluate, flows, defaults, fields):
+    """ Calls evaluate for every flow, with the defaults for fields missing from the flow, and returns the flows
+    with their results. A flow which cannot be evaluated gets an 'error' instead. """
+    results = []
+    for index, flow in enumerate(flows):
+        values = OrderedDict((f, _get(flow, f, defaults.get(f))) for f in fields)
+        result = OrderedDict((f, v) for f, v in values.items() if v is not None)
+        try:
+            missing = [f for f in fields if f != 'nic' and values[f] in (None, '')]
+            if missing:
+                raise CLIError('The flow has no {}.'.format(', '.join(missing)))
+            result.update(evaluate(**{to_snake_case(f): v for f, v in values.items()}))
+        except CLIError as ex:
+            logger.warning('Flow %d: %s', index + 1, ex)
+            result['error'] = str(ex)
+        results.append(result)
+    return results
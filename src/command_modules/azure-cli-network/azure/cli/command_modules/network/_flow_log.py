@@ -0,0 +1,327 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Analysing NSG flow logs where they are stored.
+
+Flow logs are written to one PT1H.json blob per NSG, hour and NIC, under names of the form
+resourceId=<NSG ID>/y=<year>/m=<month>/d=<day>/h=<hour>/m=00/macAddress=<MAC>/PT1H.json. The blobs of a time
+range are listed with one listing per NSG and hour, concurrently, the NSGs being found by listing the levels of the
+names down to the NSG IDs, so that the whole container is never listed. Each blob is read in ranges and parsed one
+record at a time, so that neither a whole blob nor all the flows are held in memory. Flows are aggregated as they are
+parsed, or written out as NDJSON. A local copy of the container, e.g. downloaded with `az storage blob
+download-batch`, can be analysed the same way.
+"""
+
+import codecs
+import json
+import os
+import re
+import threading
+from collections import Counter, OrderedDict, namedtuple
+from datetime import datetime, timedelta
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+logger = get_logger(__name__)
+
+FLOW_LOG_CONTAINER = 'insights-logs-networksecuritygroupflowevent'
+CHUNK_SIZE = 4 * 1024 * 1024
+REPORTS = ['summary', 'top-talkers', 'denied', 'bytes']
+
+_BLOB_NAME = re.compile(r'resourceId=(?P<nsg>.+?)/y=(?P<y>\d+)/m=(?P<m>\d+)/d=(?P<d>\d+)/h=(?P<h>\d+)/'
+                        r'm=\d+/(?:macAddress=(?P<mac>[^/]+)/)?PT1H\.json$', re.I)
+_PROTOCOLS = {'T': 'Tcp', 'U': 'Udp'}
+_DIRECTIONS = {'I': 'Inbound', 'O': 'Outbound'}
+_DECISIONS = {'A': 'Allow', 'D': 'Deny'}
+_STATES = {'B': 'Begin', 'C': 'Continuing', 'E': 'End'}
+_EPOCH = datetime(1970, 1, 1)
+
+FlowTuple = namedtuple('FlowTuple', [
+    'time', 'nsg', 'rule', 'mac', 'sourceIp', 'destIp', 'sourcePort', 'destPort', 'protocol', 'direction',
+    'decision', 'state', 'packetsSent', 'bytesSent', 'packetsReceived', 'bytesReceived'])
+
+
+def _to_timestamp(value):
+    """ Returns the seconds since the epoch of a datetime, naive datetimes being UTC. """
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return int((value - _EPOCH).total_seconds())
+
+
+def _hours(start, end):
+    hour = datetime.utcfromtimestamp(start - start % 3600)
+    while _to_timestamp(hour) < end:
+        yield hour
+        hour += timedelta(hours=1)
+
+
+def get_blob_prefixes(nsg_id, start, end):
+    """ Returns the prefix of the blobs of an NSG for every hour from start to end, in seconds since the epoch.
+    Flow logs store the NSG ID in upper case. """
+    return ['resourceId={}/y={:04d}/m={:02d}/d={:02d}/h={:02d}/'.format(nsg_id.upper(), h.year, h.month, h.day, h.hour)
+            for h in _hours(start, end)]
+
+
+def blob_in_range(name, start, end):
+    """ Returns whether a blob has flows of the hours from start to end. Names not of flow logs are skipped. """
+    match = _BLOB_NAME.search(name)
+    if not match:
+        return False
+    hour = _to_timestamp(datetime(*(int(match.group(k)) for k in ['y', 'm', 'd', 'h'])))
+    return start - 3600 < hour < end
+
+
+class LocalBlobSource(object):
+    """ Flow log blobs in a local directory, with the same layout as the container. """
+
+    def __init__(self, directory):
+        if not os.path.isdir(directory):
+            raise CLIError("'{}' is not a directory.".format(directory))
+        self.directory = directory
+
+    def list_blobs(self, prefix=''):
+        root = os.path.join(self.directory, *prefix.rstrip('/').split('/')) if prefix else self.directory
+        for path, _, files in os.walk(root):
+            for name in files:
+                yield os.path.relpath(os.path.join(path, name), self.directory).replace(os.sep, '/')
+
+    def list_prefixes(self, prefix):
+        root = os.path.join(self.directory, *prefix.rstrip('/').split('/'))
+        if os.path.isdir(root):
+            for name in sorted(os.listdir(root)):
+                if os.path.isdir(os.path.join(root, name)):
+                    yield prefix + name + '/'
+
+    def read_chunks(self, name, chunk_size=CHUNK_SIZE):
+        with open(os.path.join(self.directory, *name.split('/')), 'rb') as stream:
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                yield chunk
+
+
+class StorageBlobSource(object):
+    """ Flow log blobs in a storage container, read in ranges of chunk_size bytes. """
+
+    def __init__(self, service, container=FLOW_LOG_CONTAINER):
+        self.service = service
+        self.container = container
+
+    def list_blobs(self, prefix=''):
+        # the generator follows the continuation markers of the listing
+        for blob in self.service.list_blobs(self.container, prefix=prefix or None):
+            yield blob.name
+
+    def list_prefixes(self, prefix):
+        """ Lists the names one level below prefix, which ends with '/', as the prefixes of the blobs under them. """
+        for item in self.service.list_blobs(self.container, prefix=prefix, delimiter='/'):
+            if item.name.endswith('/'):
+                yield item.name
+
+    def read_chunks(self, name, chunk_size=CHUNK_SIZE):
+        size = self.service.get_blob_properties(self.container, name).properties.content_length
+        for offset in range(0, size, chunk_size):
+            yield self.service.get_blob_to_bytes(self.container, name, start_range=offset,
+                                                 end_range=min(offset + chunk_size, size) - 1).content
+
+
+def get_storage_blob_source(cli_ctx, storage_account):
+    """ Returns the blob source of the flow logs of a storage account, given by ID. """
+    from msrestazure.tools import parse_resource_id
+    from azure.cli.core.commands.client_factory import get_mgmt_service_client, get_data_service_client
+    from azure.cli.core.profiles import ResourceType, get_sdk
+    BlockBlobService = get_sdk(cli_ctx, ResourceType.DATA_STORAGE, 'blob.blockblobservice#BlockBlobService')
+    parts = parse_resource_id(storage_account)
+    keys = get_mgmt_service_client(cli_ctx, ResourceType.MGMT_STORAGE).storage_accounts.list_keys(
+        parts['resource_group'], parts['name'])
+    service = get_data_service_client(cli_ctx, BlockBlobService, parts['name'], keys.keys[0].value,
+                                      endpoint_suffix=cli_ctx.cloud.suffixes.storage_endpoint)
+    return StorageBlobSource(service)
+
+
+# resourceId=/SUBSCRIPTIONS/<ID>/RESOURCEGROUPS/<name>/PROVIDERS/MICROSOFT.NETWORK/NETWORKSECURITYGROUPS/<name>/
+_NSG_ID_LEVELS = 8
+
+
+def list_flow_log_nsgs(source, max_parallel=8):
+    """ Returns the IDs of the NSGs with flow logs in a source, listing the names one level at a time. """
+    from concurrent.futures import ThreadPoolExecutor
+    prefixes = ['resourceId=/']
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        for _ in range(_NSG_ID_LEVELS):
+            prefixes = [p for listing in executor.map(lambda p: list(source.list_prefixes(p)), prefixes)
+                        for p in listing]
+    return sorted(p[len('resourceId='):].rstrip('/') for p in prefixes)
+
+
+def list_flow_log_blobs(source, start, end, nsg=None, max_parallel=8):
+    """ Lists the blobs of the hours from start to end, of all NSGs or of an NSG given by name or ID. The hours of
+    every NSG are listed concurrently. """
+    from concurrent.futures import ThreadPoolExecutor
+    if nsg and nsg.startswith('/'):
+        nsg_ids = [nsg]
+    else:
+        nsg_ids = [i for i in list_flow_log_nsgs(source, max_parallel)
+                   if not nsg or i.rsplit('/', 1)[1].lower() == nsg.lower()]
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        listings = executor.map(lambda p: [n for n in source.list_blobs(p) if blob_in_range(n, start, end)],
+                                [p for i in nsg_ids for p in get_blob_prefixes(i, start, end)])
+        return sorted(n for names in listings for n in names)
+
+
+def iter_records(chunks):
+    """ Parses the records of a flow log blob, {"records": [...]}, one at a time from chunks of bytes. """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer, position, in_records = '', 0, False
+    for chunk in chunks:
+        buffer = buffer[position:] + utf8.decode(chunk)
+        position = 0
+        if not in_records:
+            match = re.search(r'"records"\s*:\s*\[', buffer)
+            if not match:
+                continue
+            in_records, position = True, match.end()
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position >= len(buffer) or buffer[position] == ']':
+                break
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                break  # the record continues in the next chunk
+            yield record
+    remaining = buffer[position:].strip()
+    if not in_records or not remaining.startswith(']'):
+        raise CLIError('The flow log is incomplete or is not valid JSON.')
+
+
+def _int(value):
+    return int(value) if value else 0
+
+
+def iter_flow_tuples(records, start=None, end=None):
+    """ Returns the flow tuples of version 1 and 2 records, from start to end in seconds since the epoch. """
+    for record in records:
+        properties = record.get('properties') or {}
+        version = properties.get('Version', 1)
+        nsg = record.get('resourceId')
+        for rule_flows in properties.get('flows') or []:
+            rule = rule_flows.get('rule')
+            for mac_flows in rule_flows.get('flows') or []:
+                mac = mac_flows.get('mac')
+                for text in mac_flows.get('flowTuples') or []:
+                    fields = text.split(',')
+                    timestamp = int(fields[0])
+                    if (start is not None and timestamp < start) or (end is not None and timestamp >= end):
+                        continue
+                    counters = (fields + [''] * 13)[9:13] if version >= 2 else ['', '', '', '']
+                    yield FlowTuple(
+                        timestamp, nsg, rule, mac, fields[1], fields[2], _int(fields[3]), _int(fields[4]),
+                        _PROTOCOLS.get(fields[5], fields[5]), _DIRECTIONS.get(fields[6], fields[6]),
+                        _DECISIONS.get(fields[7], fields[7]),
+                        _STATES.get(fields[8], fields[8]) if version >= 2 and len(fields) > 8 else None,
+                        *(_int(c) for c in counters))
+
+
+def flow_to_dict(flow):
+    result = flow._asdict()
+    result['time'] = datetime.utcfromtimestamp(flow.time).isoformat() + 'Z'
+    return result
+
+
+class FlowLogAnalysis(object):
+    """ Aggregates flow tuples: totals, flows and bytes per source address, denied flows per rule and flows and
+    bytes per source, destination, port and protocol. Bytes are only recorded by version 2 flow logs. """
+
+    def __init__(self):
+        self.blobs = 0
+        self.records = 0
+        self.flows = 0
+        self.denied = 0
+        self.bytes = 0
+        self.talker_flows = Counter()
+        self.talker_bytes = Counter()
+        self.denied_by_rule = Counter()
+        self.connection_flows = Counter()
+        self.connection_bytes = Counter()
+
+    def add(self, flow):
+        self.flows += 1
+        size = flow.bytesSent + flow.bytesReceived
+        self.bytes += size
+        self.talker_flows[flow.sourceIp] += 1
+        self.talker_bytes[flow.sourceIp] += size
+        if flow.decision == 'Deny':
+            self.denied += 1
+            self.denied_by_rule[flow.rule] += 1
+        key = (flow.sourceIp, flow.destIp, flow.destPort, flow.protocol)
+        self.connection_flows[key] += 1
+        self.connection_bytes[key] += size
+
+    def merge(self, other):
+        for name in ['blobs', 'records', 'flows', 'denied', 'bytes']:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name in ['talker_flows', 'talker_bytes', 'denied_by_rule', 'connection_flows', 'connection_bytes']:
+            getattr(self, name).update(getattr(other, name))
+
+    def report(self, report='summary', top=10):
+        if report == 'summary':
+            return OrderedDict([('blobs', self.blobs), ('records', self.records), ('flows', self.flows),
+                                ('allowed', self.flows - self.denied), ('denied', self.denied),
+                                ('bytes', self.bytes)])
+        if report == 'top-talkers':
+            talkers = sorted(self.talker_flows, key=lambda k: (-self.talker_bytes[k], -self.talker_flows[k], k))
+            return [OrderedDict([('sourceIp', k), ('flows', self.talker_flows[k]), ('bytes', self.talker_bytes[k])])
+                    for k in talkers[:top]]
+        if report == 'denied':
+            return [OrderedDict([('rule', rule), ('flows', count)])
+                    for rule, count in sorted(self.denied_by_rule.items(), key=lambda i: (-i[1], i[0]))[:top]]
+        if report == 'bytes':
+            keys = sorted(self.connection_flows,
+                          key=lambda k: (-self.connection_bytes[k], -self.connection_flows[k], k))
+            return [OrderedDict([('sourceIp', k[0]), ('destIp', k[1]), ('destPort', k[2]), ('protocol', k[3]),
+                                 ('flows', self.connection_flows[k]), ('bytes', self.connection_bytes[k])])
+                    for k in keys[:top]]
+        raise CLIError("Report '{}' must be one of {}.".format(report, ', '.join(REPORTS)))
+
+
+def analyze_flow_logs(source, blobs, start=None, end=None, max_parallel=8, emit=None):
+    """ Parses the blobs concurrently and returns the aggregated analysis. emit, if given, is called with every
+    flow tuple, under a lock. """
+    from concurrent.futures import ThreadPoolExecutor
+    lock = threading.Lock()
+
+    def _analyze(name):
+        analysis = FlowLogAnalysis()
+        analysis.blobs = 1
+        records = iter_records(source.read_chunks(name))
+        for record in records:
+            analysis.records += 1
+            flows = list(iter_flow_tuples([record], start, end))
+            for flow in flows:
+                analysis.add(flow)
+            if emit and flows:
+                with lock:
+                    for flow in flows:
+                        emit(flow)
+        return analysis
+
+    result = FlowLogAnalysis()
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        futures = [(name, executor.submit(_analyze, name)) for name in blobs]
+        for index, (name, future) in enumerate(futures):
+            try:
+                result.merge(future.result())
+            except CLIError as ex:
+                logger.warning("%s: %s (%d/%d)", name, ex, index + 1, len(futures))
+    return result
+
+
+def write_ndjson(stream):
+    def _emit(flow):
+        stream.write(json.dumps(flow_to_dict(flow)))
+        stream.write('\n')
+    return _emit
@@ -214,6 +214,18 @@ def transform_waf_rule_sets_table_output(result):
     return transformed
 
 
+def transform_ag_edit_diff_table_output(result):
+    transformed = []
+    for item in result:
+        item_obj = OrderedDict()
+        item_obj['Change'] = item['change']
+        item_obj['Collection'] = item['collection'] or '(gateway)'
+        item_obj['Name'] = item['name']
+        item_obj['Properties'] = ', '.join(item['properties'])
+        transformed.append(item_obj)
+    return transformed
+
+
 def transform_network_usage_list(result):
     result = list(result)
     for item in result:
@@ -806,6 +806,61 @@ helps['network application-gateway url-path-map rule delete'] = """
 """
 # endregion
 
+# region Application Gateway Edit Session
+helps['network application-gateway edit'] = """
+    type: group
+    short-summary: Stage many changes to an application gateway and apply them at once.
+    long-summary: >
+        While an edit session of a gateway is open, the commands changing the gateway and its sub-resources, such as
+        `az network application-gateway http-listener create`, change a local working copy and return at once instead
+        of updating the gateway. The commands showing the gateway show the working copy. Commit the session to apply
+        all changes with a single update.
+"""
+
+helps['network application-gateway edit start'] = """
+    type: command
+    short-summary: Start an edit session with the current state of an application gateway.
+    examples:
+        - name: Add a frontend port, a listener and a rule to an application gateway with one update.
+          text: |
+            az network application-gateway edit start -g MyResourceGroup -n MyAppGateway
+            az network application-gateway frontend-port create -g MyResourceGroup --gateway-name MyAppGateway \\
+                -n MyFrontendPort --port 8080
+            az network application-gateway http-listener create -g MyResourceGroup --gateway-name MyAppGateway \\
+                -n MyListener --frontend-port MyFrontendPort
+            az network application-gateway rule create -g MyResourceGroup --gateway-name MyAppGateway \\
+                -n MyRule --http-listener MyListener --address-pool MyAddressPool
+            az network application-gateway edit diff -g MyResourceGroup -n MyAppGateway -o table
+            az network application-gateway edit commit -g MyResourceGroup -n MyAppGateway
+"""
+
+helps['network application-gateway edit diff'] = """
+    type: command
+    short-summary: List the sub-resources added, updated and removed in the edit session of an application gateway.
+"""
+
+helps['network application-gateway edit validate'] = """
+    type: command
+    short-summary: Check the references between the sub-resources of the edit session of an application gateway.
+    long-summary: >
+        Reports references to sub-resources which don't exist, e.g. a listener using a removed frontend port, listeners
+        and rules missing a required reference, and duplicate names.
+"""
+
+helps['network application-gateway edit commit'] = """
+    type: command
+    short-summary: Apply the changes of the edit session of an application gateway with a single update.
+    long-summary: >
+        The session is validated first. The update fails if the gateway has been changed since the session started;
+        the session is kept if the update fails.
+"""
+
+helps['network application-gateway edit discard'] = """
+    type: command
+    short-summary: Discard the edit session of an application gateway and its changes.
+"""
+# endregion
+
 # region Application Gateway WAF Config
 helps['network application-gateway waf-config'] = """
     type: group
@@ -1729,10 +1784,17 @@ helps['network dns zone delete'] = """
 helps['network dns zone export'] = """
     type: command
     short-summary: Export a DNS zone as a DNS zone file.
+    long-summary: >
+        Record sets are written sorted by name, comparing labels from the right, and by type, with the records of
+        every set sorted too, so that exports of a zone can be compared with each other, e.g. under version control.
+        The file is written as the zone is read, and zones too large to sort in memory are sorted in temporary files.
     examples:
         - name: Export a DNS zone as a DNS zone file.
           text: >
             az network dns zone export -g MyResourceGroup -n www.mysite.com -f mysite_com_zone.txt
+        - name: Export the A and CNAME record sets under 'api'.
+          text: >
+            az network dns zone export -g MyResourceGroup -n www.mysite.com --record-type a cname --name-prefix api
 """
 
 helps['network dns zone import'] = """
@@ -2886,6 +2948,34 @@ helps['network nsg create'] = """
           text: az network nsg create -g MyResourceGroup -n MyNsg --tags super_secure no_80 no_22
 """
 
+helps['network nsg apply'] = """
+    type: command
+    short-summary: Make the rules of a network security group match a rule set, with a single update.
+    long-summary: |
+        The rule set is a YAML or JSON file listing rules with the fields shown by `az network nsg rule list`. Rules
+        are matched by name. Rules missing from the NSG are added, rules which differ are changed and rules of the NSG
+        missing from the rule set are removed, unless --keep-extra is used. The command fails without changing
+        anything if two rules of the same direction would share a priority, or if the NSG changes meanwhile.
+        With several --ids the NSGs are updated concurrently, and those which fail are listed under 'failed'.
+    examples:
+        - name: Use the rules of an NSG as the baseline of other NSGs.
+          text: |
+            az network nsg rule list -g MyResourceGroup --nsg-name MyBaselineNsg > baseline.json
+            az network nsg apply --rule-set baseline.json --ids $(az network nsg list -g MyResourceGroup --query [].id -o tsv)
+        - name: Apply a rule set written in YAML.
+          text: |
+            # rules.yaml:
+            # - name: allow-https
+            #   priority: 100
+            #   direction: Inbound
+            #   access: Allow
+            #   protocol: Tcp
+            #   destinationPortRanges: ['443']
+            az network nsg apply -g MyResourceGroup -n MyNsg --rule-set rules.yaml
+        - name: Fail if any NSG of a resource group differs from a rule set, e.g. in a compliance pipeline.
+          text: az network nsg apply --rule-set rules.yaml --check --ids $(az network nsg list -g MyResourceGroup --query [].id -o tsv)
+"""
+
 helps['network nsg delete'] = """
     type: command
     short-summary: Delete a network security group.
@@ -4304,6 +4394,52 @@ helps['network watcher connection-monitor stop'] = """
 # endregion
 
 # region Network Watcher Packet Capture
+helps['network watcher offline'] = """
+    type: group
+    short-summary: Evaluate flows and next hops locally, without Network Watcher.
+    long-summary: |
+        The NSGs, route tables, NICs and virtual networks of a resource group are loaded once, from ARM or from a
+        snapshot written by `az network watcher offline export`, and any number of flows are evaluated against them.
+        NSG rules, including the default rules, are matched by priority, the subnet NSG before the NIC NSG for
+        inbound traffic and the other way round for outbound traffic. Next hops are chosen by longest prefix match
+        among the user and system routes. Routes learned through BGP are not known offline.
+"""
+
+helps['network watcher offline export'] = """
+    type: command
+    short-summary: Write the NSGs, route tables, NICs and virtual networks of a resource group as a snapshot.
+    examples:
+        - name: Save a snapshot of a resource group to evaluate flows against later.
+          text: az network watcher offline export -g MyResourceGroup > snapshot.json
+"""
+
+helps['network watcher offline show-next-hop'] = """
+    type: command
+    short-summary: Get the next hop of traffic from a NIC, from its route table and the system routes.
+    examples:
+        - name: Get the next hop from an IP address of a NIC to 10.1.0.4.
+          text: az network watcher offline show-next-hop --snapshot snapshot.json --source-ip 10.0.0.4 --dest-ip 10.1.0.4
+        - name: Get the next hops of the flows of a CSV file with the columns sourceIp and destIp.
+          text: az network watcher offline show-next-hop -g MyResourceGroup --flows flows.csv -o table
+"""
+
+helps['network watcher offline test-ip-flow'] = """
+    type: command
+    short-summary: Test whether the NSGs of a NIC allow a flow, and which rule decides it.
+    examples:
+        - name: Test an inbound HTTPS flow to a NIC of a snapshot.
+          text: |
+            az network watcher offline test-ip-flow --snapshot snapshot.json --direction Inbound \\
+                --protocol Tcp --local 10.0.0.4:443 --remote 203.0.113.7:*
+        - name: Test the flows of a file, expanding service tags from the file of Azure IP ranges and service tags.
+          text: |
+            # flows.json:
+            # [{"direction": "Outbound", "local": "10.0.0.4:*", "remote": "10.1.0.4:1433"},
+            #  {"direction": "Inbound", "local": "10.0.0.4:22", "remote": "198.51.100.1:*"}]
+            az network watcher offline test-ip-flow --snapshot snapshot.json --protocol Tcp --flows flows.json \\
+                --service-tags ServiceTags_Public.json
+"""
+
 helps['network watcher packet-capture'] = """
     type: group
     short-summary: Manage packet capture sessions on VMs.
@@ -4416,6 +4552,27 @@ helps['network watcher flow-log'] = """
         For more information about configuring flow logs visit https://docs.microsoft.com/en-us/azure/network-watcher/network-watcher-nsg-flow-logging-cli
 """
 
+helps['network watcher flow-log analyze'] = """
+    type: command
+    short-summary: Analyze the flow logs of network security groups from their storage account or a local copy.
+    long-summary: |
+        The PT1H.json blobs of the time range are listed with one listing per hour and parsed as they are read, so
+        flow logs of any size can be analyzed without downloading them first. Version 1 and 2 flow logs are
+        supported. Bytes are only recorded by version 2 flow logs.
+    examples:
+        - name: Show the sources sending the most bytes through an NSG during a day.
+          text: |
+            az network watcher flow-log analyze -g MyResourceGroup --nsg MyNsg --report top-talkers \\
+                --start 2019-03-01T00:00:00Z --end 2019-03-02T00:00:00Z -o table
+        - name: Count the denied flows of the last hour by rule.
+          text: az network watcher flow-log analyze -g MyResourceGroup --nsg MyNsg --report denied -o table
+        - name: Analyze a local copy of the flow log container and write every flow as NDJSON.
+          text: |
+            az storage blob download-batch --account-name MyStorageAccount -d ./flowlogs \\
+                -s insights-logs-networksecuritygroupflowevent
+            az network watcher flow-log analyze --source-dir ./flowlogs --start 2019-03-01 --ndjson > flows.ndjson
+"""
+
 helps['network watcher flow-log configure'] = """
     type: command
     short-summary: Configure flow logging on a network security group.
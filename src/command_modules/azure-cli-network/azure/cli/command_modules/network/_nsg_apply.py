@@ -0,0 +1,236 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Applying a declared set of security rules to network security groups.
+
+A rule set is a YAML or JSON file listing rules with the fields of `az network nsg rule list`, so the rules of a
+reference NSG can be exported as a baseline. Rules are matched with the rules of an NSG by name and compared
+field by field, ignoring case and the order of lists. The changes are applied with a single update of the NSG,
+sent with the ETag it was read with, instead of one request per rule.
+"""
+
+from collections import OrderedDict
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+from ._util import to_snake_case
+
+logger = get_logger(__name__)
+
+_PROTOCOLS = {'tcp': 'Tcp', 'udp': 'Udp', 'icmp': 'Icmp', 'esp': 'Esp', 'ah': 'Ah', '*': '*'}
+_COMPARED_FIELDS = ['priority', 'direction', 'access', 'protocol', 'description', 'source_address_prefixes',
+                    'source_port_ranges', 'destination_address_prefixes', 'destination_port_ranges',
+                    'source_application_security_groups', 'destination_application_security_groups']
+
+
+def _get_values(rule, singular, plural):
+    values = list(rule.get(plural) or [])
+    if rule.get(singular) not in (None, ''):
+        values.insert(0, rule[singular])
+    return sorted(set(str(v) for v in values))
+
+
+def _get_asg_ids(rule, key):
+    return sorted(set(a['id'] if isinstance(a, dict) else getattr(a, 'id', a) for a in rule.get(key) or []),
+                  key=lambda i: i.lower())
+
+
+def normalize_rule(data):
+    """ Returns a rule, given in camelCase or snake_case and flattened or with 'properties', in a canonical form
+    with lists for the prefixes, port ranges and application security groups. """
+    rule = {}
+    for key, value in data.items():
+        if key == 'properties' and isinstance(value, dict):
+            rule.update((to_snake_case(k), v) for k, v in value.items())
+        else:
+            rule[to_snake_case(key)] = value
+    if not rule.get('name'):
+        raise CLIError('Every rule of the rule set needs a name.')
+    try:
+        priority = int(rule.get('priority'))
+    except (TypeError, ValueError):
+        raise CLIError("Rule '{}' needs an integer priority.".format(rule['name']))
+
+    normalized = OrderedDict([
+        ('name', rule['name']),
+        ('priority', priority),
+        ('direction', str(rule.get('direction') or 'Inbound').capitalize()),
+        ('access', str(rule.get('access') or 'Allow').capitalize()),
+        ('protocol', _PROTOCOLS.get(str(rule.get('protocol') or '*').lower(), rule.get('protocol'))),
+        ('description', rule.get('description') or None)
+    ])
+    for prefix in ['source', 'destination']:
+        asgs = _get_asg_ids(rule, prefix + '_application_security_groups')
+        addresses = _get_values(rule, prefix + '_address_prefix', prefix + '_address_prefixes')
+        normalized[prefix + '_address_prefixes'] = addresses or ([] if asgs else ['*'])
+        normalized[prefix + '_port_ranges'] = _get_values(rule, prefix + '_port_range',
+                                                          prefix + '_port_ranges') or ['*']
+        normalized[prefix + '_application_security_groups'] = asgs
+    return normalized
+
+
+def load_rule_set(path):
+    """ Reads the rules of a YAML or JSON file: a list of rules, or an object with the list under 'rules' or
+    'securityRules'. """
+    import yaml
+    from azure.cli.core.util import read_file_content
+    try:
+        data = yaml.safe_load(read_file_content(path))
+    except (OSError, IOError) as ex:
+        raise CLIError("Unable to read the rule set '{}': {}".format(path, ex))
+    except yaml.YAMLError as ex:
+        raise CLIError("Unable to parse the rule set '{}': {}".format(path, ex))
+    if isinstance(data, dict):
+        data = data.get('rules', data.get('securityRules', data.get('security_rules')))
+    if not isinstance(data, list) or not all(isinstance(r, dict) for r in data):
+        raise CLIError("The rule set '{}' must be a list of rules, or an object with the list under "
+                       "'rules'.".format(path))
+    rules = [normalize_rule(r) for r in data]
+    names = [r['name'].lower() for r in rules]
+    duplicates = sorted(set(n for n in names if names.count(n) > 1))
+    if duplicates:
+        raise CLIError('The rule set has more than one rule named {}.'.format(', '.join(duplicates)))
+    return rules
+
+
+def _comparable(rule):
+    def _value(field):
+        value = rule[field]
+        if field in ['source_application_security_groups', 'destination_application_security_groups']:
+            return [v.lower() for v in value]
+        if field in ['source_address_prefixes', 'destination_address_prefixes']:
+            return sorted(v.lower() for v in value)
+        return value
+    return {field: _value(field) for field in _COMPARED_FIELDS}
+
+
+def diff_rules(desired, current, keep_extra=False):
+    """ Compares the desired rules with the normalized current rules of an NSG. Rules of the NSG missing from the
+    rule set are removed, unless keep_extra is set. """
+    current_by_name = OrderedDict((r['name'].lower(), r) for r in current)
+    desired_names = set(r['name'].lower() for r in desired)
+    added, changed = [], []
+    for rule in desired:
+        existing = current_by_name.get(rule['name'].lower())
+        if existing is None:
+            added.append(rule['name'])
+            continue
+        old, new = _comparable(existing), _comparable(rule)
+        fields = [f for f in _COMPARED_FIELDS if old[f] != new[f]]
+        if fields:
+            changed.append(OrderedDict([('name', rule['name']), ('properties', fields)]))
+    extra = [r for key, r in current_by_name.items() if key not in desired_names]
+
+    slots = OrderedDict()
+    for rule in desired + (extra if keep_extra else []):
+        slots.setdefault((rule['direction'], rule['priority']), []).append(rule['name'])
+    collisions = [OrderedDict([('direction', d), ('priority', p), ('rules', names)])
+                  for (d, p), names in slots.items() if len(names) > 1]
+    removed = [] if keep_extra else [r['name'] for r in extra]
+    return OrderedDict([
+        ('inSync', not (added or changed or removed)),
+        ('added', added),
+        ('changed', changed),
+        ('removed', removed),
+        ('priorityCollisions', collisions)
+    ])
+
+
+def _to_security_rule(cmd, rule):
+    SecurityRule = cmd.get_models('SecurityRule')
+    kwargs = {key: rule[key] for key in ['name', 'priority', 'direction', 'access', 'protocol', 'description']}
+    for prefix in ['source', 'destination']:
+        for singular, plural in [('_address_prefix', '_address_prefixes'), ('_port_range', '_port_ranges')]:
+            values = rule[prefix + plural]
+            kwargs[prefix + singular] = values[0] if len(values) == 1 else ''
+            kwargs[prefix + plural] = values if len(values) > 1 else None
+        asgs = rule[prefix + '_application_security_groups']
+        if asgs:
+            ApplicationSecurityGroup = cmd.get_models('ApplicationSecurityGroup')
+            kwargs[prefix + '_application_security_groups'] = [ApplicationSecurityGroup(id=i) for i in asgs]
+    return SecurityRule(**kwargs)
+
+
+def apply_rule_set(cmd, resource_group_name, network_security_group_name, rules, check=False, keep_extra=False,
+                   wait=None):
+    """ Brings the rules of an NSG in line with the rule set with one update and returns the differences found.
+    With check, only the differences are returned. wait is called with the poller of the update. """
+    from msrestazure.azure_exceptions import CloudError
+    from ._client_factory import network_client_factory
+    client = network_client_factory(cmd.cli_ctx).network_security_groups
+    nsg = client.get(resource_group_name, network_security_group_name)
+    current = OrderedDict((r.name.lower(), r) for r in nsg.security_rules or [])
+    normalized = OrderedDict((key, normalize_rule(r.as_dict())) for key, r in current.items())
+    result = OrderedDict([('name', nsg.name), ('resourceGroup', resource_group_name), ('id', nsg.id)])
+    result.update(diff_rules(rules, list(normalized.values()), keep_extra=keep_extra))
+    if result['priorityCollisions']:
+        raise CLIError("NSG '{}' would have more than one rule with the same direction and priority: {}".format(
+            network_security_group_name, '; '.join('{} {}: {}'.format(c['direction'], c['priority'],
+                                                                      ', '.join(c['rules']))
+                                                   for c in result['priorityCollisions'])))
+    if check or result['inSync']:
+        return result
+
+    modified = set(n.lower() for n in result['added']) | set(c['name'].lower() for c in result['changed'])
+    # unchanged rules are sent as they were read
+    security_rules = [_to_security_rule(cmd, r) if r['name'].lower() in modified else current[r['name'].lower()]
+                      for r in rules]
+    if keep_extra:
+        desired_names = set(r['name'].lower() for r in rules)
+        security_rules.extend(r for key, r in current.items() if key not in desired_names)
+    nsg.security_rules = security_rules
+    try:
+        poller = client.create_or_update(resource_group_name, network_security_group_name, nsg,
+                                         custom_headers={'If-Match': nsg.etag} if nsg.etag else None)
+    except CloudError as ex:
+        if getattr(ex, 'status_code', None) == 412:
+            raise CLIError("NSG '{}' has been changed while the rule set was being applied. Run the command "
+                           "again.".format(network_security_group_name))
+        raise
+    (wait or (lambda p: p.result()))(poller)
+    return result
+
+
+def format_drift(result):
+    lines = ["NSG '{}' differs from the rule set:".format(result['name'])]
+    lines.extend('  add {}'.format(name) for name in result['added'])
+    lines.extend('  change {} ({})'.format(c['name'], ', '.join(c['properties'])) for c in result['changed'])
+    lines.extend('  remove {}'.format(name) for name in result['removed'])
+    return '\n'.join(lines)
+
+
+def apply_rule_set_bulk(args_list, ids):
+    """ Applies a rule set to the NSGs of several --ids, up to --max-parallel of them at once. NSGs which fail, or
+    differ from the rule set with --check, are reported under 'failed'. """
+    from concurrent.futures import ThreadPoolExecutor
+    first = args_list[0]
+    if first.get('max_parallel', 10) < 1:
+        raise CLIError('--max-parallel must be greater than 0.')
+    rules = load_rule_set(first['rule_set'])
+    check, keep_extra = first.get('check'), first.get('keep_extra')
+
+    def _apply(args):
+        return apply_rule_set(args['cmd'], args['resource_group_name'], args['network_security_group_name'], rules,
+                              check=check, keep_extra=keep_extra)
+
+    succeeded, failed = [], []
+    with ThreadPoolExecutor(max_workers=first.get('max_parallel', 10)) as executor:
+        futures = [(ids[index] or str(index), executor.submit(_apply, args)) for index, args in enumerate(args_list)]
+        for index, (target, future) in enumerate(futures):
+            try:
+                result = future.result()
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.warning("%s: %s (%d/%d)", target, ex, index + 1, len(futures))
+                failed.append(OrderedDict([('id', target), ('error', str(ex))]))
+                continue
+            if check and not result['inSync']:
+                logger.warning("%s: differs from the rule set (%d/%d)", target, index + 1, len(futures))
+                failed.append(OrderedDict([('id', target), ('error', format_drift(result)), ('diff', result)]))
+            else:
+                logger.warning("%s: %s (%d/%d)", target, 'in sync' if result['inSync'] else 'updated', index + 1,
+                               len(futures))
+                succeeded.append(result)
+    return OrderedDict([('succeeded', succeeded), ('failed', failed)])
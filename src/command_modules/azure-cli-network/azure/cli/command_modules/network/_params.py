@@ -13,7 +13,7 @@ from knack.arguments import CLIArgumentType, ignore_type
 from azure.cli.core.commands.parameters import (get_location_type, get_resource_name_completion_list,
                                                 tags_type, zone_type, zones_type,
                                                 file_type, get_resource_group_completion_list,
-                                                get_three_state_flag, get_enum_type)
+                                                get_three_state_flag, get_enum_type, get_datetime_type)
 from azure.cli.core.commands.validators import get_default_location_from_resource_group
 from azure.cli.core.commands.template_create import get_folded_parameter_help_string
 from azure.cli.command_modules.network._validators import (
@@ -270,6 +270,9 @@ def load_arguments(self, _):
     with self.argument_context('network application-gateway url-path-map rule create') as c:
         c.argument('item_name', options_list=['--name', '-n'], help='The name of the url-path-map rule.', completer=None)
 
+    with self.argument_context('network application-gateway edit start') as c:
+        c.argument('force', action='store_true', help='Discard the open edit session of the gateway, if any, and start a new one.')
+
     with self.argument_context('network application-gateway waf-config') as c:
         c.argument('disabled_rule_groups', nargs='+')
         c.argument('disabled_rules', nargs='+')
@@ -363,6 +366,8 @@ def load_arguments(self, _):
 
     with self.argument_context('network dns zone export') as c:
         c.argument('file_name', options_list=['--file-name', '-f'], type=file_type, completer=FilesCompleter(), help='Path to the DNS zone file to save')
+        c.argument('record_types', options_list='--record-type', nargs='+', arg_type=get_enum_type(['a', 'aaaa', 'caa', 'cname', 'mx', 'ns', 'ptr', 'soa', 'spf', 'srv', 'txt']), help='Space-separated types of the record sets to export. Defaults to all types.')
+        c.argument('name_prefix', help='Export only the record sets whose name relative to the zone starts with this prefix, ignoring case.')
 
     with self.argument_context('network dns zone update') as c:
         c.ignore('if_none_match')
@@ -721,6 +726,12 @@ def load_arguments(self, _):
     with self.argument_context('network nsg create') as c:
         c.argument('name', name_arg_type)
 
+    with self.argument_context('network nsg apply') as c:
+        c.argument('rule_set', help='Path to a YAML or JSON file with the rules the NSG must have, e.g. the output of `az network nsg rule list`.', completer=FilesCompleter())
+        c.argument('check', action='store_true', help='Only compare the rules of the NSG with the rule set, and fail if they differ.')
+        c.argument('keep_extra', action='store_true', help='Keep the rules of the NSG which are not in the rule set instead of removing them.')
+        c.argument('max_parallel', type=int, help='Maximum number of NSGs updated at once when several are given with --ids.')
+
     with self.argument_context('network nsg rule') as c:
         c.argument('security_rule_name', name_arg_type, id_part='child_name_1', help='Name of the network security group rule')
         c.argument('network_security_group_name', options_list='--nsg-name', metavar='NSGNAME', help='Name of the network security group', id_part='name')
@@ -841,6 +852,17 @@ def load_arguments(self, _):
         c.argument('traffic_analytics_workspace', options_list='--workspace', help='Name or ID of a Log Analytics workspace.')
         c.argument('traffic_analytics_enabled', options_list='--traffic-analytics', arg_type=get_three_state_flag(), help='Enable traffic analytics. Defaults to true if `--workspace` is provided.')
 
+    with self.argument_context('network watcher flow-log analyze') as c:
+        c.argument('nsg', help='Name or ID of the network security group. Defaults to all NSGs whose flow logs are in the storage account or directory.')
+        c.argument('storage_account', help='Name or ID of the storage account of the flow logs. Defaults to the account the NSG logs to.')
+        c.argument('source_dir', help='Local directory with a copy of the flow log container, to analyze instead of the storage account.')
+        c.argument('start', arg_type=get_datetime_type(help='Start of the flows to analyze. Defaults to one hour before the end.'))
+        c.argument('end', arg_type=get_datetime_type(help='End of the flows to analyze. Defaults to the current time.'))
+        c.argument('report', arg_type=get_enum_type(['summary', 'top-talkers', 'denied', 'bytes']), help='Aggregation to report.')
+        c.argument('top', type=int, help='Number of entries of the top-talkers, denied and bytes reports.')
+        c.argument('ndjson', action='store_true', help='Write every flow as a line of JSON instead of a report.')
+        c.argument('max_parallel', type=int, help='Maximum number of blobs to list or read at once.')
+
     for item in ['list', 'stop', 'delete', 'show', 'show-status']:
         with self.argument_context('network watcher packet-capture {}'.format(item)) as c:
             c.extra('location')
@@ -857,6 +879,23 @@ def load_arguments(self, _):
         c.argument('source_ip', help='Source IPv4 address.')
         c.argument('dest_ip', help='Destination IPv4 address.')
 
+    with self.argument_context('network watcher offline') as c:
+        c.argument('resource_group_name', required=False, help='Name of the resource group to load the resources from, if no snapshot is given. Defaults to the whole subscription.')
+        c.argument('snapshot', help='JSON file written by `az network watcher offline export`, to evaluate without loading the resources.')
+        c.argument('service_tags', help='JSON file of Azure IP ranges and service tags, to expand the service tags used in rules.')
+        c.argument('nic', help='Name or ID of the NIC. Defaults to the NIC with the local or source IP address.')
+        c.argument('flows', help='JSON, YAML or CSV file of flows to evaluate. Arguments given on the command line are the defaults for fields missing from a flow.')
+
+    with self.argument_context('network watcher offline test-ip-flow') as c:
+        c.argument('direction', arg_type=get_enum_type(['Inbound', 'Outbound']), help='Direction of the packet relative to the NIC.')
+        c.argument('protocol', arg_type=get_enum_type(['Tcp', 'Udp', 'Icmp']), help='Protocol to test.')
+        c.argument('local', help='The private IP address of the NIC and the port, in X.X.X.X:PORT format. `*` can be used for the port.')
+        c.argument('remote', help='The IP address and port of the remote side, in X.X.X.X:PORT format. `*` can be used for the port.')
+
+    with self.argument_context('network watcher offline show-next-hop') as c:
+        c.argument('source_ip', help='Source IP address of the NIC.')
+        c.argument('dest_ip', help='Destination IP address.')
+
     with self.argument_context('network watcher troubleshooting') as c:
         c.argument('resource', help='Name or ID of the resource to troubleshoot.')
         c.argument('resource_type', help='The resource type', options_list=['--resource-type', '-t'], id_part='resource_type', arg_type=get_enum_type(['vnetGateway', 'vpnConnection']))
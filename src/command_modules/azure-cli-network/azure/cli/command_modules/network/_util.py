@@ -3,11 +3,12 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import re
 import sys
 from knack.util import CLIError
 from azure.cli.core.util import sdk_no_wait
 
-from ._client_factory import network_client_factory
+from ._client_factory import network_client_factory, cf_application_gateways
 
 
 class UpdateContext(object):
@@ -28,6 +29,11 @@ class UpdateContext(object):
             setattr(self.instance, prop, value)
 
 
+def to_snake_case(key):
+    """ Converts a camel case key, e.g. destinationPortRanges, to snake case. """
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', key).lower()
+
+
 def _get_property(items, name):
     result = next((x for x in items if x.name.lower() == name.lower()), None)
     if not result:
@@ -36,11 +42,18 @@ def _get_property(items, name):
         return result
 
 
+def _get_operations(cli_ctx, resource):
+    if resource == 'application_gateways':
+        # honors the edit session of the gateway, if any
+        return cf_application_gateways(cli_ctx, None)
+    return getattr(network_client_factory(cli_ctx), resource)
+
+
 def list_network_resource_property(resource, prop):
     """ Factory method for creating list functions. """
 
     def list_func(cmd, resource_group_name, resource_name):
-        client = getattr(network_client_factory(cmd.cli_ctx), resource)
+        client = _get_operations(cmd.cli_ctx, resource)
         return client.get(resource_group_name, resource_name).__getattribute__(prop)
 
     func_name = 'list_network_resource_property_{}_{}'.format(resource, prop)
@@ -52,7 +65,7 @@ def get_network_resource_property_entry(resource, prop):
     """ Factory method for creating get functions. """
 
     def get_func(cmd, resource_group_name, resource_name, item_name):
-        client = getattr(network_client_factory(cmd.cli_ctx), resource)
+        client = _get_operations(cmd.cli_ctx, resource)
         items = getattr(client.get(resource_group_name, resource_name), prop)
 
         result = next((x for x in items if x.name.lower() == item_name.lower()), None)
@@ -71,7 +84,7 @@ def delete_network_resource_property_entry(resource, prop):
     """ Factory method for creating delete functions. """
 
     def delete_func(cmd, resource_group_name, resource_name, item_name, no_wait=False):  # pylint: disable=unused-argument
-        client = getattr(network_client_factory(cmd.cli_ctx), resource)
+        client = _get_operations(cmd.cli_ctx, resource)
         item = client.get(resource_group_name, resource_name)
         keep_items = \
             [x for x in item.__getattribute__(prop) if x.name.lower() != item_name.lower()]
@@ -80,7 +93,9 @@ def delete_network_resource_property_entry(resource, prop):
         if no_wait:
             sdk_no_wait(no_wait, client.create_or_update, resource_group_name, resource_name, item)
         else:
-            result = sdk_no_wait(no_wait, client.create_or_update, resource_group_name, resource_name, item).result()
+            result = sdk_no_wait(no_wait, client.create_or_update, resource_group_name, resource_name, item)
+            # a staged change returns the updated resource instead of a poller
+            result = result.result() if callable(getattr(result, 'result', None)) else result
             if next((x for x in getattr(result, prop) if x.name.lower() == item_name.lower()), None):
                 raise CLIError("Failed to delete '{}' on '{}'".format(item_name, resource_name))
 
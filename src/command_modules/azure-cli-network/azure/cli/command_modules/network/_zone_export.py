@@ -0,0 +1,240 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Exporting DNS zones as zone files in a canonical order, written as they are produced.
+
+Record sets are listed on a background thread, which requests the next pages while the record sets already
+received are converted. They are sorted by name, comparing labels from the right as in the canonical order of
+DNSSEC, then by type, SOA and NS first, and the records of every set are sorted as well, so that exporting an
+unchanged zone gives the same file. Up to MAX_IN_MEMORY record sets are sorted in memory. Larger zones are sorted
+in runs written to temporary files, which are merged while the zone file is written.
+"""
+
+from __future__ import print_function
+
+import heapq
+import json
+import threading
+from time import localtime, strftime
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+MAX_IN_MEMORY = 20000
+PREFETCH_SIZE = 1000
+
+TYPE_PROPERTIES = {
+    'a': 'arecords', 'aaaa': 'aaaa_records', 'caa': 'caa_records', 'cname': 'cname_record', 'mx': 'mx_records',
+    'ns': 'ns_records', 'ptr': 'ptr_records', 'soa': 'soa_record', 'spf': 'txt_records', 'srv': 'srv_records',
+    'txt': 'txt_records'
+}
+_FIRST_TYPES = ['soa', 'ns']
+_HEADER = """
+; Exported zone file from Azure DNS
+;      Zone name: {zone_name}
+;      Resource Group Name: {resource_group}
+;      Date and time (UTC): {datetime}
+
+$TTL {ttl}
+$ORIGIN {origin}
+    """
+_END = object()
+
+
+def prefetch(iterable, size=PREFETCH_SIZE):
+    """ Iterates over iterable on a background thread, up to size items ahead of the caller, so that the next
+    pages of a listing are requested while the items received are processed. The thread is stopped and joined
+    when the generator finishes, fails or is closed. """
+    try:
+        from queue import Queue, Full
+    except ImportError:  # Python 2.7
+        from Queue import Queue, Full
+    items = Queue(maxsize=size)
+    stopped = threading.Event()
+
+    def _put(entry):
+        # the caller may stop reading while the queue is full
+        while not stopped.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def _produce():
+        try:
+            for item in iterable:
+                if not _put((item, None)):
+                    return
+            _put((_END, None))
+        except Exception as ex:  # pylint: disable=broad-except
+            _put((_END, ex))
+
+    thread = threading.Thread(target=_produce)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is _END:
+                return
+            yield item
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def _record_to_obj(record_type, record, ttl):
+    record_obj = {'ttl': ttl}
+    if record_type == 'aaaa':
+        record_obj.update({'ip': record.ipv6_address})
+    elif record_type == 'a':
+        record_obj.update({'ip': record.ipv4_address})
+    elif record_type == 'caa':
+        record_obj.update({'value': record.value, 'tag': record.tag, 'flags': record.flags})
+    elif record_type == 'cname':
+        record_obj.update({'alias': record.cname.rstrip('.') + '.'})
+    elif record_type == 'mx':
+        record_obj.update({'preference': record.preference, 'host': record.exchange})
+    elif record_type == 'ns':
+        record_obj.update({'host': record.nsdname})
+    elif record_type == 'ptr':
+        record_obj.update({'host': record.ptrdname})
+    elif record_type == 'soa':
+        record_obj.update({
+            'mname': record.host.rstrip('.') + '.',
+            'rname': record.email.rstrip('.') + '.',
+            'serial': record.serial_number, 'refresh': record.refresh_time,
+            'retry': record.retry_time, 'expire': record.expire_time,
+            'minimum': record.minimum_ttl
+        })
+    elif record_type == 'srv':
+        record_obj.update({'priority': record.priority, 'weight': record.weight,
+                           'port': record.port, 'target': record.target})
+    elif record_type in ['txt', 'spf']:
+        record_obj.update({'txt': ''.join(record.value)})
+    return record_obj
+
+
+def convert_record_set(record_set):
+    """ Returns the name, type and records of a record set in the form used by make_zone_file, or None if the
+    record set is empty. """
+    record_type = record_set.type.rsplit('/', 1)[1].lower()
+    record_data = getattr(record_set, TYPE_PROPERTIES[record_type], None)
+    if not record_data:
+        return None
+    if not isinstance(record_data, list):
+        record_data = [record_data]
+    return record_set.name, record_type, [_record_to_obj(record_type, r, record_set.ttl) for r in record_data]
+
+
+def sort_key(name, record_type):
+    """ Orders record sets by name, comparing labels from the right and ignoring case, and then by type. """
+    labels = [] if name == '@' else [label.lower() for label in reversed(name.split('.'))]
+    rank = _FIRST_TYPES.index(record_type) if record_type in _FIRST_TYPES else len(_FIRST_TYPES)
+    return [labels, rank, record_type]
+
+
+class ZoneSorter(object):
+    """ Sorts record sets in memory, or in sorted runs spilled to temporary files when there are more than
+    max_in_memory of them. Items are lists of the sort key, name, type and the records as JSON. """
+
+    def __init__(self, max_in_memory=MAX_IN_MEMORY):
+        self.max_in_memory = max_in_memory
+        self.items = []
+        self.runs = []
+
+    def add(self, name, record_type, records):
+        records = sorted(records, key=lambda r: json.dumps(r, sort_keys=True))
+        self.items.append([sort_key(name, record_type), name, record_type, json.dumps(records, sort_keys=True)])
+        if len(self.items) >= self.max_in_memory:
+            self._spill()
+
+    def _spill(self):
+        import tempfile
+        run = tempfile.TemporaryFile(mode='w+')
+        for item in sorted(self.items):
+            run.write(json.dumps(item))
+            run.write('\n')
+        run.seek(0)
+        self.runs.append(run)
+        logger.debug('Sorted %d record sets into run %d.', len(self.items), len(self.runs))
+        self.items = []
+
+    def __iter__(self):
+        if not self.runs:
+            items = sorted(self.items)
+        else:
+            if self.items:
+                self._spill()
+            items = heapq.merge(*[(json.loads(line) for line in run) for run in self.runs])
+        for _, name, record_type, records in items:
+            yield name, record_type, json.loads(records)
+
+    def close(self):
+        for run in self.runs:
+            run.close()
+        self.runs = []
+        self.items = []
+
+
+def write_zone_file(stream, zone_name, resource_group_name, ttl, record_sets):
+    """ Writes the header and the sorted (name, type, records) of a zone as a zone file, like make_zone_file. """
+    from .zone_file import record_processors
+    zone_name = zone_name.rstrip('.')
+    print(_HEADER.format(zone_name=zone_name, resource_group=resource_group_name,
+                         datetime=strftime('%a, %d %b %Y %X %z', localtime()), ttl=ttl, origin=zone_name + '.'),
+          file=stream)
+    previous = None
+    for name, record_type, records in record_sets:
+        first_line = name != previous
+        previous = name
+        if name.endswith(zone_name):
+            name = name[:-(len(zone_name) + 1)]
+        for record in records:
+            getattr(record_processors, 'process_{}'.format(record_type))(stream, record, name, first_line)
+            first_line = False
+        print('', file=stream)
+
+
+def export_zone_file(client, resource_group_name, zone_name, stream, record_types=None, name_prefix=None,
+                     max_in_memory=MAX_IN_MEMORY):
+    """ Writes a zone, or its record sets of the given types and names starting with name_prefix, as a zone file
+    in canonical order. Returns the number of record sets written. """
+    if record_types:
+        listings = [client.record_sets.list_by_type(resource_group_name, zone_name, t.upper())
+                    for t in sorted(set(t.lower() for t in record_types))]
+        record_sets = (r for listing in listings for r in listing)
+    else:
+        record_sets = client.record_sets.list_by_dns_zone(resource_group_name, zone_name)
+
+    ttl, count = None, 0
+    sorter = ZoneSorter(max_in_memory)
+    listing = prefetch(record_sets)
+    try:
+        for record_set in listing:
+            converted = convert_record_set(record_set)
+            if not converted:
+                continue
+            name, record_type, records = converted
+            if record_type == 'soa':
+                ttl = records[0]['minimum']
+            if name_prefix and not name.lower().startswith(name_prefix.lower()):
+                continue
+            sorter.add(name, record_type, records)
+            count += 1
+        if ttl is None:
+            # the SOA record set was filtered out
+            soa = client.record_sets.get(resource_group_name, zone_name, '@', 'SOA').soa_record
+            ttl = soa.minimum_ttl
+        write_zone_file(stream, zone_name, resource_group_name, ttl, sorter)
+    finally:
+        listing.close()
+        sorter.close()
+    return count
@@ -35,7 +35,7 @@ from azure.cli.command_modules.network._format import (
     transform_nsg_create_output, transform_vnet_gateway_create_output,
     transform_vpn_connection, transform_vpn_connection_list,
     transform_geographic_hierachy_table_output,
-    transform_service_community_table_output, transform_waf_rule_sets_table_output,
+    transform_service_community_table_output, transform_waf_rule_sets_table_output, transform_ag_edit_diff_table_output,
     transform_network_usage_list, transform_network_usage_table, transform_nsg_rule_table_output,
     transform_vnet_table_output, transform_effective_route_table, transform_effective_nsg,
     transform_vnet_gateway_routes_table, transform_vnet_gateway_bgp_peer_table)
@@ -51,6 +51,7 @@ from azure.cli.command_modules.network._validators import (
     process_vnet_create_namespace, process_vnet_gateway_create_namespace, process_vnet_gateway_update_namespace,
     process_vpn_connection_create_namespace, process_route_table_create_namespace,
     process_lb_outbound_rule_namespace, process_nw_config_diagnostic_namespace, process_list_delegations_namespace)
+from azure.cli.command_modules.network._nsg_apply import apply_rule_set_bulk
 
 
 # pylint: disable=too-many-locals, too-many-statements
@@ -374,6 +375,13 @@ def load_command_table(self, _):
         g.custom_command('create', 'create_ag_url_path_map_rule', supports_no_wait=True, validator=process_ag_url_path_map_rule_create_namespace)
         g.custom_command('delete', 'delete_ag_url_path_map_rule', supports_no_wait=True)
 
+    with self.command_group('network application-gateway edit') as g:
+        g.custom_command('start', 'start_ag_edit')
+        g.custom_command('diff', 'diff_ag_edit', table_transformer=transform_ag_edit_diff_table_output)
+        g.custom_command('validate', 'validate_ag_edit')
+        g.custom_command('commit', 'commit_ag_edit', supports_no_wait=True)
+        g.custom_command('discard', 'discard_ag_edit')
+
     with self.command_group('network application-gateway waf-config') as g:
         g.custom_command('set', 'set_ag_waf_config_2017_03_01', min_api='2017-03-01', supports_no_wait=True)
         g.custom_command('set', 'set_ag_waf_config_2016_09_01', max_api='2016-09-01', supports_no_wait=True)
@@ -631,6 +639,7 @@ def load_command_table(self, _):
         g.custom_command('list', 'list_nsgs')
         g.custom_command('create', 'create_nsg', transform=transform_nsg_create_output)
         g.generic_update_command('update')
+        g.custom_command('apply', 'apply_nsg_rule_set', bulk_handler=apply_rule_set_bulk)
 
     with self.command_group('network nsg rule', network_nsg_rule_sdk) as g:
         g.command('delete', 'delete')
@@ -682,6 +691,12 @@ def load_command_table(self, _):
     with self.command_group('network watcher flow-log', client_factory=cf_network_watcher, min_api='2016-09-01') as g:
         g.custom_command('configure', 'set_nsg_flow_logging', validator=process_nw_flow_log_set_namespace)
         g.custom_show_command('show', 'show_nsg_flow_logging', validator=process_nw_flow_log_show_namespace)
+        g.custom_command('analyze', 'analyze_nsg_flow_logs')
+
+    with self.command_group('network watcher offline') as g:
+        g.custom_command('export', 'export_nw_offline_snapshot')
+        g.custom_command('test-ip-flow', 'check_nw_ip_flow_offline')
+        g.custom_command('show-next-hop', 'show_nw_next_hop_offline')
 
     with self.command_group('network watcher troubleshooting', client_factory=cf_network_watcher, min_api='2016-09-01') as g:
         g.custom_command('start', 'start_nw_troubleshooting', supports_no_wait=True, validator=process_nw_troubleshooting_start_namespace)
@@ -4,7 +4,7 @@
 # --------------------------------------------------------------------------------------------
 from __future__ import print_function
 
-from collections import Counter, OrderedDict
+from collections import Counter
 
 from msrestazure.azure_exceptions import CloudError
 from msrestazure.tools import parse_resource_id, is_valid_resource_id, resource_id
@@ -17,11 +17,10 @@ from azure.mgmt.trafficmanager.models import MonitorProtocol, ProfileStatus
 from azure.cli.core.commands.client_factory import get_subscription_id, get_mgmt_service_client
 
 from azure.cli.core.util import CLIError, sdk_no_wait
-from azure.cli.command_modules.network._client_factory import network_client_factory
+from azure.cli.command_modules.network._client_factory import network_client_factory, cf_application_gateways
 from azure.cli.command_modules.network._util import _get_property, UpdateContext
 
 from azure.cli.command_modules.network.zone_file.parse_zone_file import parse_zone_file
-from azure.cli.command_modules.network.zone_file.make_zone_file import make_zone_file
 from azure.cli.core.profiles import ResourceType, supported_api_version
 
 logger = get_logger(__name__)
@@ -253,7 +252,7 @@ def update_application_gateway(instance, sku=None, capacity=None, tags=None, ena
 def create_ag_authentication_certificate(cmd, resource_group_name, application_gateway_name, item_name,
                                          cert_data, no_wait=False):
     AuthCert = cmd.get_models('ApplicationGatewayAuthenticationCertificate')
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
     ag = ncf.get(resource_group_name, application_gateway_name)
     new_cert = AuthCert(data=cert_data, name=item_name)
     _upsert(ag, 'authentication_certificates', new_cert, 'name')
@@ -268,11 +267,11 @@ def update_ag_authentication_certificate(instance, parent, item_name, cert_data)
 def create_ag_backend_address_pool(cmd, resource_group_name, application_gateway_name, item_name,
                                    servers=None, no_wait=False):
     ApplicationGatewayBackendAddressPool = cmd.get_models('ApplicationGatewayBackendAddressPool')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
+    ag = ncf.get(resource_group_name, application_gateway_name)
     new_pool = ApplicationGatewayBackendAddressPool(name=item_name, backend_addresses=servers)
     _upsert(ag, 'backend_address_pools', new_pool, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.create_or_update,
+    return sdk_no_wait(no_wait, ncf.create_or_update,
                        resource_group_name, application_gateway_name, ag)
 
 
@@ -288,8 +287,8 @@ def create_ag_frontend_ip_configuration(cmd, resource_group_name, application_ga
                                         private_ip_address_allocation=None, no_wait=False):
     ApplicationGatewayFrontendIPConfiguration, SubResource = cmd.get_models(
         'ApplicationGatewayFrontendIPConfiguration', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
+    ag = ncf.get(resource_group_name, application_gateway_name)
     if public_ip_address:
         new_config = ApplicationGatewayFrontendIPConfiguration(
             name=item_name,
@@ -301,7 +300,7 @@ def create_ag_frontend_ip_configuration(cmd, resource_group_name, application_ga
             private_ip_allocation_method='Static' if private_ip_address else 'Dynamic',
             subnet=SubResource(id=subnet))
     _upsert(ag, 'frontend_ip_configurations', new_config, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.create_or_update,
+    return sdk_no_wait(no_wait, ncf.create_or_update,
                        resource_group_name, application_gateway_name, ag)
 
 
@@ -322,11 +321,11 @@ def update_ag_frontend_ip_configuration(cmd, instance, parent, item_name, public
 def create_ag_frontend_port(cmd, resource_group_name, application_gateway_name, item_name, port,
                             no_wait=False):
     ApplicationGatewayFrontendPort = cmd.get_models('ApplicationGatewayFrontendPort')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
+    ag = ncf.get(resource_group_name, application_gateway_name)
     new_port = ApplicationGatewayFrontendPort(name=item_name, port=port)
     _upsert(ag, 'frontend_ports', new_port, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.create_or_update,
+    return sdk_no_wait(no_wait, ncf.create_or_update,
                        resource_group_name, application_gateway_name, ag)
 
 
@@ -340,8 +339,8 @@ def create_ag_http_listener(cmd, resource_group_name, application_gateway_name,
                             frontend_port, frontend_ip=None, host_name=None, ssl_cert=None,
                             no_wait=False):
     ApplicationGatewayHttpListener, SubResource = cmd.get_models('ApplicationGatewayHttpListener', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
+    ag = ncf.get(resource_group_name, application_gateway_name)
     if not frontend_ip:
         frontend_ip = _get_default_id(ag, 'frontend_ip_configurations', '--frontend-ip')
     new_listener = ApplicationGatewayHttpListener(
@@ -353,7 +352,7 @@ def create_ag_http_listener(cmd, resource_group_name, application_gateway_name,
         protocol='https' if ssl_cert else 'http',
         ssl_certificate=SubResource(id=ssl_cert) if ssl_cert else None)
     _upsert(ag, 'http_listeners', new_listener, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.create_or_update,
+    return sdk_no_wait(no_wait, ncf.create_or_update,
                        resource_group_name, application_gateway_name, ag)
 
 
@@ -385,8 +384,8 @@ def create_ag_backend_http_settings_collection(cmd, resource_group_name, applica
                                                auth_certs=None):
     ApplicationGatewayBackendHttpSettings, ApplicationGatewayConnectionDraining, SubResource = cmd.get_models(
         'ApplicationGatewayBackendHttpSettings', 'ApplicationGatewayConnectionDraining', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
+    ag = ncf.get(resource_group_name, application_gateway_name)
     new_settings = ApplicationGatewayBackendHttpSettings(
         port=port,
         protocol=protocol,
@@ -407,7 +406,7 @@ def create_ag_backend_http_settings_collection(cmd, resource_group_name, applica
         new_settings.probe_enabled = enable_probe
         new_settings.path = path
     _upsert(ag, 'backend_http_settings_collection', new_settings, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.create_or_update,
+    return sdk_no_wait(no_wait, ncf.create_or_update,
                        resource_group_name, application_gateway_name, ag)
 
 
@@ -455,7 +454,7 @@ def create_ag_redirect_configuration(cmd, resource_group_name, application_gatew
                                      include_query_string=None, no_wait=False):
     ApplicationGatewayRedirectConfiguration, SubResource = cmd.get_models(
         'ApplicationGatewayRedirectConfiguration', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
     ag = ncf.get(resource_group_name, application_gateway_name)
     new_config = ApplicationGatewayRedirectConfiguration(
         name=item_name,
@@ -492,8 +491,8 @@ def create_ag_probe(cmd, resource_group_name, application_gateway_name, item_nam
                     min_servers=None, match_body=None, match_status_codes=None):
     ApplicationGatewayProbe, ProbeMatchCriteria = cmd.get_models(
         'ApplicationGatewayProbe', 'ApplicationGatewayProbeHealthResponseMatch')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
+    ag = ncf.get(resource_group_name, application_gateway_name)
     new_probe = ApplicationGatewayProbe(
         name=item_name,
         protocol=protocol,
@@ -508,7 +507,7 @@ def create_ag_probe(cmd, resource_group_name, application_gateway_name, item_nam
         new_probe.match = ProbeMatchCriteria(body=match_body, status_codes=match_status_codes)
 
     _upsert(ag, 'probes', new_probe, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.create_or_update,
+    return sdk_no_wait(no_wait, ncf.create_or_update,
                        resource_group_name, application_gateway_name, ag)
 
 
@@ -547,8 +546,8 @@ def create_ag_request_routing_rule(cmd, resource_group_name, application_gateway
                                    url_path_map=None, rule_type='Basic', no_wait=False):
     ApplicationGatewayRequestRoutingRule, SubResource = cmd.get_models(
         'ApplicationGatewayRequestRoutingRule', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
+    ag = ncf.get(resource_group_name, application_gateway_name)
     if not address_pool and not redirect_config:
         address_pool = _get_default_id(ag, 'backend_address_pools', '--address-pool')
     if not http_settings and not redirect_config:
@@ -565,7 +564,7 @@ def create_ag_request_routing_rule(cmd, resource_group_name, application_gateway
     if cmd.supported_api_version(min_api='2017-06-01'):
         new_rule.redirect_configuration = SubResource(id=redirect_config) if redirect_config else None
     _upsert(ag, 'request_routing_rules', new_rule, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.create_or_update,
+    return sdk_no_wait(no_wait, ncf.create_or_update,
                        resource_group_name, application_gateway_name, ag)
 
 
@@ -591,12 +590,12 @@ def update_ag_request_routing_rule(cmd, instance, parent, item_name, address_poo
 def create_ag_ssl_certificate(cmd, resource_group_name, application_gateway_name, item_name, cert_data,
                               cert_password, no_wait=False):
     ApplicationGatewaySslCertificate = cmd.get_models('ApplicationGatewaySslCertificate')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
+    ag = ncf.get(resource_group_name, application_gateway_name)
     new_cert = ApplicationGatewaySslCertificate(
         name=item_name, data=cert_data, password=cert_password)
     _upsert(ag, 'ssl_certificates', new_cert, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.create_or_update,
+    return sdk_no_wait(no_wait, ncf.create_or_update,
                        resource_group_name, application_gateway_name, ag)
 
 
@@ -611,7 +610,7 @@ def update_ag_ssl_certificate(instance, parent, item_name, cert_data=None, cert_
 def set_ag_ssl_policy_2017_03_01(cmd, resource_group_name, application_gateway_name, disabled_ssl_protocols=None,
                                  clear=False, no_wait=False):
     ApplicationGatewaySslPolicy = cmd.get_models('ApplicationGatewaySslPolicy')
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
     ag = ncf.get(resource_group_name, application_gateway_name)
     ag.ssl_policy = None if clear else ApplicationGatewaySslPolicy(
         disabled_ssl_protocols=disabled_ssl_protocols)
@@ -623,7 +622,7 @@ def set_ag_ssl_policy_2017_06_01(cmd, resource_group_name, application_gateway_n
                                  no_wait=False):
     ApplicationGatewaySslPolicy, ApplicationGatewaySslPolicyType = cmd.get_models(
         'ApplicationGatewaySslPolicy', 'ApplicationGatewaySslPolicyType')
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
     ag = ncf.get(resource_group_name, application_gateway_name)
     policy_type = None
     if policy_name:
@@ -640,14 +639,14 @@ def set_ag_ssl_policy_2017_06_01(cmd, resource_group_name, application_gateway_n
 
 
 def show_ag_ssl_policy(cmd, resource_group_name, application_gateway_name):
-    return network_client_factory(cmd.cli_ctx).application_gateways.get(
+    return cf_application_gateways(cmd.cli_ctx, None).get(
         resource_group_name, application_gateway_name).ssl_policy
 
 
 def create_ag_trusted_root_certificate(cmd, resource_group_name, application_gateway_name, item_name, no_wait=False,
                                        cert_data=None, keyvault_secret=None):
     ApplicationGatewayTrustedRootCertificate = cmd.get_models('ApplicationGatewayTrustedRootCertificate')
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
     ag = ncf.get(resource_group_name, application_gateway_name)
     root_cert = ApplicationGatewayTrustedRootCertificate(name=item_name, data=cert_data,
                                                          keyvault_secret_id=keyvault_secret)
@@ -670,8 +669,8 @@ def create_ag_url_path_map(cmd, resource_group_name, application_gateway_name, i
                            no_wait=False, rule_name='default'):
     ApplicationGatewayUrlPathMap, ApplicationGatewayPathRule, SubResource = cmd.get_models(
         'ApplicationGatewayUrlPathMap', 'ApplicationGatewayPathRule', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
+    ag = ncf.get(resource_group_name, application_gateway_name)
 
     new_rule = ApplicationGatewayPathRule(
         name=rule_name,
@@ -701,7 +700,7 @@ def create_ag_url_path_map(cmd, resource_group_name, application_gateway_name, i
 
     new_map.path_rules.append(new_rule)
     _upsert(ag, 'url_path_maps', new_map, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.create_or_update,
+    return sdk_no_wait(no_wait, ncf.create_or_update,
                        resource_group_name, application_gateway_name, ag)
 
 
@@ -729,8 +728,8 @@ def create_ag_url_path_map_rule(cmd, resource_group_name, application_gateway_na
                                 item_name, paths, address_pool=None, http_settings=None, redirect_config=None,
                                 no_wait=False):
     ApplicationGatewayPathRule, SubResource = cmd.get_models('ApplicationGatewayPathRule', 'SubResource')
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
+    ag = ncf.get(resource_group_name, application_gateway_name)
     url_map = next((x for x in ag.url_path_maps if x.name == url_path_map_name), None)
     if not url_map:
         raise CLIError('URL path map "{}" not found.'.format(url_path_map_name))
@@ -748,20 +747,20 @@ def create_ag_url_path_map_rule(cmd, resource_group_name, application_gateway_na
             if url_map.default_redirect_configuration else None
         new_rule.redirect_configuration = SubResource(id=redirect_config) if redirect_config else default_redirect
     _upsert(url_map, 'path_rules', new_rule, 'name')
-    return sdk_no_wait(no_wait, ncf.application_gateways.create_or_update,
+    return sdk_no_wait(no_wait, ncf.create_or_update,
                        resource_group_name, application_gateway_name, ag)
 
 
 def delete_ag_url_path_map_rule(cmd, resource_group_name, application_gateway_name, url_path_map_name,
                                 item_name, no_wait=False):
-    ncf = network_client_factory(cmd.cli_ctx)
-    ag = ncf.application_gateways.get(resource_group_name, application_gateway_name)
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
+    ag = ncf.get(resource_group_name, application_gateway_name)
     url_map = next((x for x in ag.url_path_maps if x.name == url_path_map_name), None)
     if not url_map:
         raise CLIError('URL path map "{}" not found.'.format(url_path_map_name))
     url_map.path_rules = \
         [x for x in url_map.path_rules if x.name.lower() != item_name.lower()]
-    return sdk_no_wait(no_wait, ncf.application_gateways.create_or_update,
+    return sdk_no_wait(no_wait, ncf.create_or_update,
                        resource_group_name, application_gateway_name, ag)
 
 
@@ -770,7 +769,7 @@ def set_ag_waf_config_2016_09_01(cmd, resource_group_name, application_gateway_n
                                  no_wait=False):
     ApplicationGatewayWebApplicationFirewallConfiguration = cmd.get_models(
         'ApplicationGatewayWebApplicationFirewallConfiguration')
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
     ag = ncf.get(resource_group_name, application_gateway_name)
     ag.web_application_firewall_configuration = \
         ApplicationGatewayWebApplicationFirewallConfiguration(
@@ -788,7 +787,7 @@ def set_ag_waf_config_2017_03_01(cmd, resource_group_name, application_gateway_n
                                  exclusions=None):
     ApplicationGatewayWebApplicationFirewallConfiguration = cmd.get_models(
         'ApplicationGatewayWebApplicationFirewallConfiguration')
-    ncf = network_client_factory(cmd.cli_ctx).application_gateways
+    ncf = cf_application_gateways(cmd.cli_ctx, None)
     ag = ncf.get(resource_group_name, application_gateway_name)
     ag.web_application_firewall_configuration = \
         ApplicationGatewayWebApplicationFirewallConfiguration(
@@ -832,7 +831,7 @@ def set_ag_waf_config_2017_03_01(cmd, resource_group_name, application_gateway_n
 
 
 def show_ag_waf_config(cmd, resource_group_name, application_gateway_name):
-    return network_client_factory(cmd.cli_ctx).application_gateways.get(
+    return cf_application_gateways(cmd.cli_ctx, None).get(
         resource_group_name, application_gateway_name).web_application_firewall_configuration
 
 
@@ -861,6 +860,37 @@ def list_ag_waf_rule_sets(client, _type=None, version=None, group=None):
     return filtered_results
 
 
+def start_ag_edit(cmd, resource_group_name, application_gateway_name, force=False):
+    from azure.cli.command_modules.network._ag_edit import start_session
+    client = network_client_factory(cmd.cli_ctx).application_gateways
+    start_session(cmd.cli_ctx, client, resource_group_name, application_gateway_name, force=force)
+    logger.warning("Changes to application gateway '%s' are staged until you run 'az network application-gateway "
+                   "edit commit'.", application_gateway_name)
+
+
+def diff_ag_edit(cmd, resource_group_name, application_gateway_name):
+    from azure.cli.command_modules.network._ag_edit import get_session, diff_session
+    return diff_session(get_session(cmd.cli_ctx, resource_group_name, application_gateway_name))
+
+
+def validate_ag_edit(cmd, resource_group_name, application_gateway_name):
+    from azure.cli.command_modules.network._ag_edit import get_session, validate_session
+    errors = validate_session(get_session(cmd.cli_ctx, resource_group_name, application_gateway_name))
+    return {'valid': not errors, 'errors': errors}
+
+
+def commit_ag_edit(cmd, resource_group_name, application_gateway_name, no_wait=False):
+    from azure.cli.command_modules.network._ag_edit import commit_session
+    client = network_client_factory(cmd.cli_ctx).application_gateways
+    return commit_session(cmd, client, resource_group_name, application_gateway_name, no_wait=no_wait)
+
+
+def discard_ag_edit(cmd, resource_group_name, application_gateway_name):
+    from azure.cli.command_modules.network._ag_edit import discard_session
+    if not discard_session(cmd.cli_ctx, resource_group_name, application_gateway_name):
+        logger.warning("Application gateway '%s' has no edit session.", application_gateway_name)
+
+
 # endregion
 
 
@@ -1016,96 +1046,32 @@ def update_dns_record_set(instance, cmd, metadata=None, target_resource=None):
 
 
 def _type_to_property_name(key):
-    type_dict = {
-        'a': 'arecords',
-        'aaaa': 'aaaa_records',
-        'caa': 'caa_records',
-        'cname': 'cname_record',
-        'mx': 'mx_records',
-        'ns': 'ns_records',
-        'ptr': 'ptr_records',
-        'soa': 'soa_record',
-        'spf': 'txt_records',
-        'srv': 'srv_records',
-        'txt': 'txt_records',
-    }
-    return type_dict[key.lower()]
+    from ._zone_export import TYPE_PROPERTIES
+    return TYPE_PROPERTIES[key.lower()]
 
 
-def export_zone(cmd, resource_group_name, zone_name, file_name=None):
-    from time import localtime, strftime
+def export_zone(cmd, resource_group_name, zone_name, file_name=None, record_types=None, name_prefix=None):
+    import sys
+    from ._zone_export import export_zone_file
 
-    client = get_mgmt_service_client(cmd.cli_ctx, ResourceType.MGMT_NETWORK_DNS)
-    record_sets = client.record_sets.list_by_dns_zone(resource_group_name, zone_name)
-
-    zone_obj = OrderedDict({
-        '$origin': zone_name.rstrip('.') + '.',
-        'resource-group': resource_group_name,
-        'zone-name': zone_name.rstrip('.'),
-        'datetime': strftime('%a, %d %b %Y %X %z', localtime())
-    })
-
-    for record_set in record_sets:
-        record_type = record_set.type.rsplit('/', 1)[1].lower()
-        record_set_name = record_set.name
-        record_data = getattr(record_set, _type_to_property_name(record_type), None)
-
-        # ignore empty record sets
-        if not record_data:
-            continue
+    class _Tee(object):
+        def __init__(self, *streams):
+            self.streams = streams
 
-        if not isinstance(record_data, list):
-            record_data = [record_data]
-
-        if record_set_name not in zone_obj:
-            zone_obj[record_set_name] = OrderedDict()
-
-        for record in record_data:
-
-            record_obj = {'ttl': record_set.ttl}
-
-            if record_type not in zone_obj[record_set_name]:
-                zone_obj[record_set_name][record_type] = []
-
-            if record_type == 'aaaa':
-                record_obj.update({'ip': record.ipv6_address})
-            elif record_type == 'a':
-                record_obj.update({'ip': record.ipv4_address})
-            elif record_type == 'caa':
-                record_obj.update({'value': record.value, 'tag': record.tag, 'flags': record.flags})
-            elif record_type == 'cname':
-                record_obj.update({'alias': record.cname.rstrip('.') + '.'})
-            elif record_type == 'mx':
-                record_obj.update({'preference': record.preference, 'host': record.exchange})
-            elif record_type == 'ns':
-                record_obj.update({'host': record.nsdname})
-            elif record_type == 'ptr':
-                record_obj.update({'host': record.ptrdname})
-            elif record_type == 'soa':
-                record_obj.update({
-                    'mname': record.host.rstrip('.') + '.',
-                    'rname': record.email.rstrip('.') + '.',
-                    'serial': record.serial_number, 'refresh': record.refresh_time,
-                    'retry': record.retry_time, 'expire': record.expire_time,
-                    'minimum': record.minimum_ttl
-                })
-                zone_obj['$ttl'] = record.minimum_ttl
-            elif record_type == 'srv':
-                record_obj.update({'priority': record.priority, 'weight': record.weight,
-                                   'port': record.port, 'target': record.target})
-            elif record_type == 'txt':
-                record_obj.update({'txt': ''.join(record.value)})
-
-            zone_obj[record_set_name][record_type].append(record_obj)
-
-    zone_file_content = make_zone_file(zone_obj)
-    print(zone_file_content)
-    if file_name:
-        try:
-            with open(file_name, 'w') as f:
-                f.write(zone_file_content)
-        except IOError:
-            raise CLIError('Unable to export to file: {}'.format(file_name))
+        def write(self, text):
+            for stream in self.streams:
+                stream.write(text)
+
+    client = get_mgmt_service_client(cmd.cli_ctx, ResourceType.MGMT_NETWORK_DNS)
+    if not file_name:
+        export_zone_file(client, resource_group_name, zone_name, sys.stdout, record_types, name_prefix)
+        return
+    try:
+        f = open(file_name, 'w')
+    except IOError:
+        raise CLIError('Unable to export to file: {}'.format(file_name))
+    with f:
+        export_zone_file(client, resource_group_name, zone_name, _Tee(sys.stdout, f), record_types, name_prefix)
 
 
 # pylint: disable=too-many-return-statements, inconsistent-return-statements
@@ -2510,6 +2476,19 @@ def create_nsg(cmd, resource_group_name, network_security_group_name, location=N
     return client.create_or_update(resource_group_name, network_security_group_name, nsg)
 
 
+def apply_nsg_rule_set(cmd, resource_group_name, network_security_group_name, rule_set, check=False,
+                       keep_extra=False, max_parallel=10):
+    from azure.cli.core.commands import LongRunningOperation
+    from azure.cli.command_modules.network._nsg_apply import load_rule_set, apply_rule_set, format_drift
+    if max_parallel < 1:
+        raise CLIError('--max-parallel must be greater than 0.')
+    result = apply_rule_set(cmd, resource_group_name, network_security_group_name, load_rule_set(rule_set),
+                            check=check, keep_extra=keep_extra, wait=LongRunningOperation(cmd.cli_ctx))
+    if check and not result['inSync']:
+        raise CLIError(format_drift(result))
+    return result
+
+
 def _create_singular_or_plural_property(kwargs, val, singular_name, plural_name):
 
     if not val:
@@ -2841,6 +2820,43 @@ def show_nw_security_view(cmd, client, resource_group_name, vm, watcher_rg, watc
     return client.get_vm_security_rules(watcher_rg, watcher_name, vm)
 
 
+def _load_nw_offline_snapshot(cmd, snapshot=None, resource_group_name=None, service_tags=None):
+    from ._flow_eval import NetworkSnapshot, export_snapshot, load_snapshot_file, load_service_tags
+    data = load_snapshot_file(snapshot) if snapshot else export_snapshot(cmd.cli_ctx, resource_group_name)
+    return NetworkSnapshot(data, load_service_tags(service_tags) if service_tags else None)
+
+
+def export_nw_offline_snapshot(cmd, resource_group_name=None):
+    from ._flow_eval import export_snapshot
+    return export_snapshot(cmd.cli_ctx, resource_group_name)
+
+
+def check_nw_ip_flow_offline(cmd, direction=None, protocol=None, local=None, remote=None, nic=None, snapshot=None,
+                             resource_group_name=None, service_tags=None, flows=None):
+    from ._flow_eval import evaluate_flows, load_flows
+    network = _load_nw_offline_snapshot(cmd, snapshot, resource_group_name, service_tags)
+    if flows:
+        defaults = {'direction': direction, 'protocol': protocol, 'local': local, 'remote': remote, 'nic': nic}
+        return evaluate_flows(network.evaluate_flow, load_flows(flows), defaults,
+                              ['nic', 'direction', 'protocol', 'local', 'remote'])
+    if not (direction and protocol and local and remote):
+        raise CLIError('usage error: --direction DIRECTION --protocol PROTOCOL --local IP:PORT --remote IP:PORT '
+                       '| --flows FILE')
+    return network.evaluate_flow(direction, protocol, local, remote, nic=nic)
+
+
+def show_nw_next_hop_offline(cmd, source_ip=None, dest_ip=None, nic=None, snapshot=None, resource_group_name=None,
+                             service_tags=None, flows=None):
+    from ._flow_eval import evaluate_flows, load_flows
+    network = _load_nw_offline_snapshot(cmd, snapshot, resource_group_name, service_tags)
+    if flows:
+        defaults = {'sourceIp': source_ip, 'destIp': dest_ip, 'nic': nic}
+        return evaluate_flows(network.next_hop, load_flows(flows), defaults, ['nic', 'sourceIp', 'destIp'])
+    if not (source_ip and dest_ip):
+        raise CLIError('usage error: --source-ip IP --dest-ip IP | --flows FILE')
+    return network.next_hop(source_ip, dest_ip, nic=nic)
+
+
 def create_nw_packet_capture(cmd, client, resource_group_name, capture_name, vm,
                              watcher_rg, watcher_name, location=None,
                              storage_account=None, storage_path=None, file_path=None,
@@ -2927,6 +2943,61 @@ def show_nsg_flow_logging(client, watcher_rg, watcher_name, nsg, resource_group_
     return client.get_flow_log_status(watcher_rg, watcher_name, nsg)
 
 
+def analyze_nsg_flow_logs(cmd, nsg=None, resource_group_name=None, storage_account=None, source_dir=None, start=None,
+                          end=None, report='summary', top=10, ndjson=False, max_parallel=8):
+    import sys
+    from datetime import datetime
+    import dateutil.parser
+    from ._flow_log import (LocalBlobSource, get_storage_blob_source, list_flow_log_blobs, analyze_flow_logs,
+                            write_ndjson, _to_timestamp)
+    if max_parallel < 1:
+        raise CLIError('--max-parallel must be greater than 0.')
+    end = _to_timestamp(dateutil.parser.parse(end)) if end else _to_timestamp(datetime.utcnow())
+    start = _to_timestamp(dateutil.parser.parse(start)) if start else end - 3600
+    if start >= end:
+        raise CLIError('usage error: --start must be before --end.')
+
+    if source_dir:
+        source = LocalBlobSource(source_dir)
+    else:
+        if nsg and not is_valid_resource_id(nsg):
+            nsg = resource_id(
+                subscription=get_subscription_id(cmd.cli_ctx), resource_group=resource_group_name,
+                namespace='Microsoft.Network', type='networkSecurityGroups', name=nsg)
+        if not storage_account:
+            if not nsg:
+                raise CLIError('usage error: --nsg NAME_OR_ID | --storage-account NAME_OR_ID | --source-dir DIR')
+            storage_account = _get_nsg_flow_log_storage_account(cmd, nsg)
+        elif not is_valid_resource_id(storage_account):
+            storage_account = resource_id(
+                subscription=get_subscription_id(cmd.cli_ctx), resource_group=resource_group_name,
+                namespace='Microsoft.Storage', type='storageAccounts', name=storage_account)
+        source = get_storage_blob_source(cmd.cli_ctx, storage_account)
+
+    blobs = list_flow_log_blobs(source, start, end, nsg=nsg, max_parallel=max_parallel)
+    logger.info('Analyzing %d flow log blobs.', len(blobs))
+    analysis = analyze_flow_logs(source, blobs, start, end, max_parallel=max_parallel,
+                                 emit=write_ndjson(sys.stdout) if ndjson else None)
+    return None if ndjson else analysis.report(report, top)
+
+
+def _get_nsg_flow_log_storage_account(cmd, nsg):
+    from azure.cli.core.commands import LongRunningOperation
+    client = network_client_factory(cmd.cli_ctx)
+    id_parts = parse_resource_id(nsg)
+    location = client.network_security_groups.get(id_parts['resource_group'], id_parts['name']).location
+    watcher = next((w for w in client.network_watchers.list_all() if w.location.lower() == location.lower()), None)
+    if not watcher:
+        raise CLIError("network watcher is not enabled for region '{}'.".format(location))
+    watcher_parts = parse_resource_id(watcher.id)
+    status = LongRunningOperation(cmd.cli_ctx)(client.network_watchers.get_flow_log_status(
+        watcher_parts['resource_group'], watcher_parts['name'], nsg))
+    if not status.storage_id:
+        raise CLIError("Flow logging is not configured for NSG '{}'. Use --storage-account or --source-dir.".format(
+            id_parts['name']))
+    return status.storage_id
+
+
 def start_nw_troubleshooting(cmd, client, watcher_name, watcher_rg, resource, storage_account,
                              storage_path, resource_type=None, resource_group_name=None,
                              no_wait=False):
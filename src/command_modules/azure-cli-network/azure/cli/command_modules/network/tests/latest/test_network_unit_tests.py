@@ -3,6 +3,7 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import os
 import unittest
 
 import mock
@@ -77,5 +78,662 @@ class TestNetworkUnitTests(unittest.TestCase):
         self.assertEqual(result[1].value, 'noodle')
 
 
+class TestApplicationGatewayEditSession(unittest.TestCase):
+
+    GATEWAY_ID = '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Network/applicationGateways/ag'
+
+    def _ref(self, collection, name):
+        return {'id': '{}/{}/{}'.format(self.GATEWAY_ID, collection, name)}
+
+    def _gateway(self):
+        return {
+            'id': self.GATEWAY_ID,
+            'name': 'ag',
+            'properties': {
+                'frontendIPConfigurations': [{'name': 'ip1', 'properties': {}}],
+                'frontendPorts': [{'name': 'port1', 'properties': {'port': 80}}],
+                'backendAddressPools': [{'name': 'pool1', 'properties': {}}],
+                'backendHttpSettingsCollection': [{'name': 'settings1', 'properties': {'port': 80}}],
+                'httpListeners': [{'name': 'listener1', 'properties': {
+                    'frontendIPConfiguration': self._ref('frontendIPConfigurations', 'ip1'),
+                    'frontendPort': self._ref('frontendPorts', 'port1'), 'protocol': 'Http'}}],
+                'requestRoutingRules': [{'name': 'rule1', 'properties': {
+                    'ruleType': 'Basic', 'httpListener': self._ref('httpListeners', 'listener1'),
+                    'backendAddressPool': self._ref('backendAddressPools', 'pool1'),
+                    'backendHttpSettings': self._ref('backendHttpSettingsCollection', 'settings1')}}]
+            }
+        }
+
+    def _session(self, working):
+        return {'resourceGroup': 'rg', 'name': 'ag', 'etag': 'W/"1"', 'base': self._gateway(), 'working': working}
+
+    def test_ag_edit_diff(self):
+        from azure.cli.command_modules.network._ag_edit import diff_session
+        working = self._gateway()
+        props = working['properties']
+        props['frontendPorts'][0]['properties']['port'] = 8080
+        props['frontendPorts'].append({'name': 'port2', 'properties': {'port': 443}})
+        props['backendAddressPools'] = []
+        working['tags'] = {'env': 'test'}
+
+        changes = diff_session(self._session(working))
+        self.assertEqual([(c['collection'], c['name'], c['change'], c['properties']) for c in changes], [
+            ('frontendPorts', 'port1', 'update', ['properties.port']),
+            ('frontendPorts', 'port2', 'add', []),
+            ('backendAddressPools', 'pool1', 'remove', []),
+            (None, 'ag', 'update', ['tags'])
+        ])
+        self.assertEqual(diff_session(self._session(self._gateway())), [])
+
+    def test_ag_edit_validate(self):
+        from azure.cli.command_modules.network._ag_edit import validate_session
+        self.assertEqual(validate_session(self._session(self._gateway())), [])
+
+        working = self._gateway()
+        props = working['properties']
+        props['frontendPorts'] = []
+        props['httpListeners'].append({'name': 'LISTENER1', 'properties': {
+            'frontendIPConfiguration': self._ref('frontendIPConfigurations', 'ip1'),
+            'frontendPort': self._ref('frontendPorts', 'port1'), 'protocol': 'Https'}})
+        props['requestRoutingRules'][0]['properties']['backendAddressPool'] = None
+        props['requestRoutingRules'].append({'name': 'rule2', 'properties': {
+            'ruleType': 'PathBasedRouting', 'httpListener': self._ref('httpListeners', 'listener1')}})
+
+        errors = validate_session(self._session(working))
+        self.assertEqual(errors, [
+            "httpListeners has more than one item named 'listener1'",
+            "httpListeners[0].properties.frontendPort refers to frontendPorts 'port1', which does not exist",
+            "httpListeners[1].properties.frontendPort refers to frontendPorts 'port1', which does not exist",
+            "httpListeners[1]: HTTPS listener 'LISTENER1' has no sslCertificate",
+            "requestRoutingRules[0]: rule 'rule1' needs a backendAddressPool and backendHttpSettings, or a "
+            "redirectConfiguration",
+            "requestRoutingRules[1]: path based rule 'rule2' has no urlPathMap"
+        ])
+
+    def test_ag_edit_staged_operations(self):
+        import shutil
+        import tempfile
+        from azure.cli.command_modules.network import _ag_edit
+
+        config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, config_dir)
+        cli_ctx = mock.MagicMock()
+        cli_ctx.config.config_dir = config_dir
+
+        def _model(data):
+            model = mock.MagicMock()
+            model.etag = 'W/"1"'
+            model.serialize.return_value = data
+            return model
+
+        operations = mock.MagicMock()
+        operations.get.return_value = _model(self._gateway())
+        staged = _ag_edit.StagedApplicationGatewaysOperations(cli_ctx, operations)
+        with mock.patch('azure.cli.core.commands.client_factory.get_subscription_id', return_value='sub'), \
+                mock.patch.object(_ag_edit, '_deserialize_gateway', side_effect=lambda _, data: _model(data)):
+            # without a session every call goes to the service
+            staged.get('rg', 'ag')
+            staged.create_or_update('rg', 'ag', 'parameters')
+            operations.create_or_update.assert_called_once_with('rg', 'ag', 'parameters')
+
+            _ag_edit.start_session(cli_ctx, operations, 'rg', 'ag')
+            with self.assertRaises(CLIError):
+                _ag_edit.start_session(cli_ctx, operations, 'rg', 'ag')
+            working = self._gateway()
+            working['properties']['frontendPorts'].append({'name': 'port2', 'properties': {'port': 443}})
+            staged.create_or_update('rg', 'ag', _model(working))
+            self.assertEqual(operations.create_or_update.call_count, 1)
+            self.assertEqual(staged.get('rg', 'ag').serialize(), working)
+            self.assertEqual(operations.get.call_count, 2)
+
+            session = _ag_edit.get_session(cli_ctx, 'rg', 'ag')
+            self.assertEqual([c['name'] for c in _ag_edit.diff_session(session)], ['port2'])
+            self.assertTrue(_ag_edit.discard_session(cli_ctx, 'rg', 'ag'))
+            self.assertIsNone(_ag_edit.load_session(cli_ctx, 'rg', 'ag'))
+
+    def _commit(self, create_or_update, poll=None):
+        """ Commits a session which adds a frontend port, returning the error raised, the calls of
+        create_or_update and whether the session is left. """
+        import shutil
+        import tempfile
+        from azure.cli.command_modules.network import _ag_edit
+
+        config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, config_dir)
+        cmd = mock.MagicMock()
+        cmd.cli_ctx.config.config_dir = config_dir
+        client = mock.MagicMock()
+        client.create_or_update.side_effect = create_or_update
+        working = self._gateway()
+        working['properties']['frontendPorts'].append({'name': 'port2', 'properties': {'port': 443}})
+
+        error = None
+        with mock.patch('azure.cli.core.commands.client_factory.get_subscription_id', return_value='sub'), \
+                mock.patch.object(_ag_edit, '_deserialize_gateway', side_effect=lambda _, data: data), \
+                mock.patch('azure.cli.core.commands.LongRunningOperation') as operation:
+            operation.return_value.side_effect = poll or (lambda poller: poller)
+            _ag_edit._save_session(cmd.cli_ctx, self._session(working))  # pylint: disable=protected-access
+            try:
+                _ag_edit.commit_session(cmd, client, 'rg', 'ag')
+            except Exception as ex:  # pylint: disable=broad-except
+                error = ex
+            left = _ag_edit.load_session(cmd.cli_ctx, 'rg', 'ag') is not None
+        return error, client.create_or_update.call_args_list, left
+
+    def test_ag_edit_commit(self):
+        error, calls, left = self._commit(lambda *args, **kwargs: 'gateway')
+
+        self.assertIsNone(error)
+        self.assertFalse(left)
+        self.assertEqual(len(calls), 1)
+        args, kwargs = calls[0]
+        self.assertEqual(args[:2], ('rg', 'ag'))
+        self.assertEqual([p['name'] for p in args[2]['properties']['frontendPorts']], ['port1', 'port2'])
+        # the update is conditional on the gateway being as it was when the session started
+        self.assertEqual(kwargs['custom_headers'], {'If-Match': 'W/"1"'})
+
+    def test_ag_edit_commit_changed_gateway(self):
+        from msrestazure.azure_exceptions import CloudError
+        response = mock.MagicMock(status_code=412, text='{"Message": "Precondition Failed"}')
+
+        error, _, left = self._commit(CloudError(response, error='Precondition Failed'))
+
+        self.assertIsInstance(error, CLIError)
+        self.assertIn("Application gateway 'ag' has been changed since the edit session started", str(error))
+        self.assertTrue(left)
+
+    def test_ag_edit_commit_failed_update(self):
+        from msrestazure.azure_exceptions import CloudError
+        response = mock.MagicMock(status_code=400, text='{"Message": "Bad Request"}')
+
+        # a rejected update and a failed long-running operation both keep the session to fix and commit again
+        error, _, left = self._commit(CloudError(response, error='Bad Request'))
+        self.assertIsInstance(error, CloudError)
+        self.assertTrue(left)
+
+        error, _, left = self._commit(lambda *args, **kwargs: 'poller', poll=CLIError('Deployment failed'))
+        self.assertIsInstance(error, CLIError)
+        self.assertTrue(left)
+
+
+class TestNsgApply(unittest.TestCase):
+
+    RULES = [
+        {'name': 'allow-https', 'priority': 100, 'protocol': 'tcp', 'destinationPortRanges': ['443']},
+        {'name': 'allow-ssh', 'properties': {'priority': 110, 'protocol': 'Tcp', 'sourceAddressPrefix': '10.0.0.0/8',
+                                             'destinationPortRange': '22'}},
+        {'name': 'deny-all', 'priority': 4000, 'access': 'deny'}
+    ]
+
+    def _current(self, rules):
+        from azure.cli.command_modules.network._nsg_apply import normalize_rule
+        return [normalize_rule(r) for r in rules]
+
+    def test_nsg_apply_normalize_rule(self):
+        from azure.cli.command_modules.network._nsg_apply import normalize_rule
+        rule = normalize_rule(self.RULES[1])
+        self.assertEqual(dict(rule), {
+            'name': 'allow-ssh', 'priority': 110, 'direction': 'Inbound', 'access': 'Allow', 'protocol': 'Tcp',
+            'description': None, 'source_address_prefixes': ['10.0.0.0/8'], 'source_port_ranges': ['*'],
+            'source_application_security_groups': [], 'destination_address_prefixes': ['*'],
+            'destination_port_ranges': ['22'], 'destination_application_security_groups': []})
+        # the snake_case form of the SDK models gives the same rule
+        self.assertEqual(normalize_rule({
+            'name': 'allow-ssh', 'priority': '110', 'direction': 'Inbound', 'access': 'Allow', 'protocol': 'Tcp',
+            'source_address_prefix': '10.0.0.0/8', 'source_port_range': '*', 'destination_address_prefix': '*',
+            'destination_port_range': '22', 'provisioning_state': 'Succeeded'}), rule)
+        with self.assertRaises(CLIError):
+            normalize_rule({'name': 'no-priority'})
+
+    def test_nsg_apply_diff(self):
+        from azure.cli.command_modules.network._nsg_apply import diff_rules
+        desired = self._current(self.RULES)
+        self.assertTrue(diff_rules(desired, self._current(self.RULES))['inSync'])
+
+        current = self._current([
+            {'name': 'ALLOW-HTTPS', 'priority': 100, 'protocol': 'Tcp', 'destinationPortRange': '443'},
+            {'name': 'allow-ssh', 'priority': 110, 'protocol': 'Tcp', 'destinationPortRange': '22'},
+            {'name': 'legacy', 'priority': 4000, 'protocol': 'Udp'}
+        ])
+        diff = diff_rules(desired, current)
+        self.assertFalse(diff['inSync'])
+        self.assertEqual(diff['added'], ['deny-all'])
+        self.assertEqual(diff['changed'], [{'name': 'allow-ssh', 'properties': ['source_address_prefixes']}])
+        self.assertEqual(diff['removed'], ['legacy'])
+        self.assertEqual(diff['priorityCollisions'], [])
+
+        diff = diff_rules(desired, current, keep_extra=True)
+        self.assertEqual(diff['removed'], [])
+        self.assertEqual(diff['priorityCollisions'],
+                         [{'direction': 'Inbound', 'priority': 4000, 'rules': ['deny-all', 'legacy']}])
+
+    def test_nsg_apply_load_rule_set(self):
+        import os
+        import tempfile
+        from azure.cli.command_modules.network._nsg_apply import load_rule_set
+        fd, path = tempfile.mkstemp(suffix='.yaml')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as f:
+            f.write('rules:\n- name: allow-https\n  priority: 100\n  destinationPortRanges: [443]\n'
+                    '- name: Allow-Https\n  priority: 110\n')
+        with self.assertRaisesRegexp(CLIError, 'more than one rule named allow-https'):
+            load_rule_set(path)
+        with open(path, 'w') as f:
+            f.write('[{"name": "allow-https", "priority": 100, "destinationPortRanges": [443]}]')
+        self.assertEqual([r['destination_port_ranges'] for r in load_rule_set(path)], [['443']])
+
+    def _mock_nsg(self, rules):
+        def _rule(data):
+            rule = mock.MagicMock()
+            rule.name = data['name']
+            rule.as_dict.return_value = data
+            return rule
+
+        nsg = mock.MagicMock()
+        nsg.name = 'nsg1'
+        nsg.etag = 'W/"1"'
+        nsg.security_rules = [_rule(r) for r in rules]
+        return nsg
+
+    def test_nsg_apply_single_update(self):
+        from azure.cli.command_modules.network import _nsg_apply
+        cmd = mock.MagicMock()
+        cmd.get_models.return_value = lambda **kwargs: kwargs
+        client = mock.MagicMock()
+        current = [dict(self.RULES[0]), {'name': 'legacy', 'priority': 200}]
+        client.network_security_groups.get.return_value = self._mock_nsg(current)
+        desired = self._current(self.RULES)
+        with mock.patch('azure.cli.command_modules.network._client_factory.network_client_factory',
+                        return_value=client):
+            result = _nsg_apply.apply_rule_set(cmd, 'rg', 'nsg1', desired, check=True)
+            self.assertEqual((result['added'], result['removed']), (['allow-ssh', 'deny-all'], ['legacy']))
+            self.assertFalse(client.network_security_groups.create_or_update.called)
+
+            _nsg_apply.apply_rule_set(cmd, 'rg', 'nsg1', desired)
+        client.network_security_groups.create_or_update.assert_called_once()
+        args, kwargs = client.network_security_groups.create_or_update.call_args
+        self.assertEqual(kwargs['custom_headers'], {'If-Match': 'W/"1"'})
+        rules = args[2].security_rules
+        self.assertEqual(len(rules), 3)
+        # the unchanged rule is sent as it was read
+        self.assertEqual(rules[0].name, 'allow-https')
+        self.assertEqual(rules[1]['source_address_prefix'], '10.0.0.0/8')
+        self.assertEqual(rules[2]['access'], 'Deny')
+
+    def test_nsg_apply_bulk_check(self):
+        from azure.cli.command_modules.network import _nsg_apply
+        clients = {'nsg1': self._mock_nsg(self.RULES), 'nsg2': self._mock_nsg(self.RULES[:1])}
+        client = mock.MagicMock()
+        client.network_security_groups.get.side_effect = lambda rg, name: clients[name]
+        args_list = [{'cmd': mock.MagicMock(), 'resource_group_name': 'rg', 'network_security_group_name': name,
+                      'rule_set': 'rules.json', 'check': True, 'keep_extra': False, 'max_parallel': 2}
+                     for name in ['nsg1', 'nsg2']]
+        with mock.patch('azure.cli.command_modules.network._client_factory.network_client_factory',
+                        return_value=client), \
+                mock.patch.object(_nsg_apply, 'load_rule_set', return_value=self._current(self.RULES)):
+            summary = _nsg_apply.apply_rule_set_bulk(args_list, ['id1', 'id2'])
+        self.assertEqual(len(summary['succeeded']), 1)
+        self.assertEqual([f['id'] for f in summary['failed']], ['id2'])
+        self.assertEqual(summary['failed'][0]['diff']['added'], ['allow-ssh', 'deny-all'])
+        self.assertFalse(client.network_security_groups.create_or_update.called)
+
+
+class TestFlowEvaluation(unittest.TestCase):
+
+    NSG_ID = '/subscriptions/00000000-0000-0000-0000-000000000000/resourceGroups/rg/providers/' \
+             'Microsoft.Network/networkSecurityGroups/{}'
+
+    def _snapshot(self, service_tags=None):
+        import os
+        from azure.cli.command_modules.network._flow_eval import NetworkSnapshot, load_snapshot_file
+        path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'flow_eval_snapshot.json')
+        return NetworkSnapshot(load_snapshot_file(path), service_tags)
+
+    def test_flow_evaluation_nsg_order_and_priority(self):
+        snapshot = self._snapshot()
+        # allowed by the subnet NSG, then decided by the NIC NSG
+        result = snapshot.evaluate_flow('Inbound', 'Tcp', '10.0.1.4:443', '203.0.113.7:*')
+        self.assertEqual(dict(result), {'access': 'Allow', 'ruleName': 'securityRules/allow-https',
+                                        'networkSecurityGroup': self.NSG_ID.format('nic-nsg')})
+        # the subnet NSG denies first, with its default rule
+        result = snapshot.evaluate_flow('Inbound', 'Tcp', '10.0.1.4:22', '203.0.113.7:50000', nic='web-nic')
+        self.assertEqual((result['access'], result['ruleName'], result['networkSecurityGroup']),
+                         ('Deny', 'defaultSecurityRules/DenyAllInBound', self.NSG_ID.format('subnet-nsg')))
+        # members of the application security group are denied by the NIC NSG
+        result = snapshot.evaluate_flow('Inbound', 'Tcp', '10.0.1.4:443', '10.0.2.4:*')
+        self.assertEqual((result['access'], result['ruleName']), ('Deny', 'securityRules/deny-https-from-app'))
+        # outbound traffic is evaluated by the NIC NSG first; the peered network is part of VirtualNetwork
+        result = snapshot.evaluate_flow('Outbound', 'Tcp', '10.0.1.4:*', '10.1.0.4:5050')
+        self.assertEqual((result['access'], result['ruleName']), ('Deny', 'securityRules/deny-sql'))
+        result = snapshot.evaluate_flow('Outbound', 'Icmp', '10.0.1.4', '10.1.0.4')
+        self.assertEqual((result['access'], result['ruleName']), ('Deny', 'securityRules/deny-sql'))
+        result = snapshot.evaluate_flow('Outbound', 'Udp', '10.0.1.4:*', '10.1.0.4:53')
+        self.assertEqual((result['access'], result['ruleName']), ('Allow', 'defaultSecurityRules/AllowVnetOutBound'))
+        # a NIC without NSGs allows everything
+        result = snapshot.evaluate_flow('Inbound', 'Tcp', '10.0.2.4:22', '203.0.113.7:*')
+        self.assertEqual((result['access'], result['ruleName']), ('Allow', None))
+
+    def test_flow_evaluation_service_tags(self):
+        with self.assertRaisesRegexp(CLIError, "Service tag 'Storage'"):
+            self._snapshot().evaluate_flow('Outbound', 'Tcp', '10.0.1.4:*', '52.239.1.1:443')
+        snapshot = self._snapshot({'storage': ['52.239.0.0/16']})
+        result = snapshot.evaluate_flow('Outbound', 'Tcp', '10.0.1.4:*', '52.239.1.1:443')
+        self.assertEqual((result['access'], result['ruleName']), ('Allow', 'securityRules/allow-storage'))
+        result = snapshot.evaluate_flow('Outbound', 'Tcp', '10.0.1.4:*', '198.51.100.1:443')
+        self.assertEqual((result['access'], result['ruleName']),
+                         ('Allow', 'defaultSecurityRules/AllowInternetOutBound'))
+        result = snapshot.evaluate_flow('Outbound', 'Tcp', '10.0.1.4:*', '192.168.0.1:443')
+        self.assertEqual((result['access'], result['ruleName']), ('Deny', 'defaultSecurityRules/DenyAllOutBound'))
+
+    def test_flow_evaluation_next_hop(self):
+        snapshot = self._snapshot()
+
+        def _next_hop(source, destination):
+            result = snapshot.next_hop(source, destination)
+            return result['nextHopType'], result['nextHopIpAddress'], result['addressPrefix']
+
+        # user routes replace the system route with the same prefix, and the longest prefix wins
+        self.assertEqual(_next_hop('10.0.1.4', '8.8.8.8'), ('VirtualAppliance', '10.0.0.4', '0.0.0.0/0'))
+        self.assertEqual(_next_hop('10.0.1.4', '10.0.2.9'), ('VnetLocal', None, '10.0.0.0/16'))
+        self.assertEqual(_next_hop('10.0.1.4', '10.1.5.9'), ('VirtualNetworkGateway', None, '10.1.5.0/24'))
+        self.assertEqual(_next_hop('10.0.1.4', '10.1.0.9'), ('VNetPeering', None, '10.1.0.0/16'))
+        self.assertEqual(snapshot.next_hop('10.0.1.4', '8.8.8.8')['routeName'], 'to-firewall')
+        # a subnet without a route table uses the system routes
+        self.assertEqual(_next_hop('10.0.2.4', '8.8.8.8'), ('Internet', None, '0.0.0.0/0'))
+        self.assertEqual(_next_hop('10.0.2.4', '192.168.1.1'), ('None', None, '192.168.0.0/16'))
+        self.assertEqual(snapshot.next_hop('10.0.2.4', '8.8.8.8')['routeTableId'], 'System Route')
+        with self.assertRaisesRegexp(CLIError, 'No NIC of the snapshot has the address 10.0.3.4'):
+            snapshot.next_hop('10.0.3.4', '8.8.8.8')
+
+    def test_flow_evaluation_batch(self):
+        import os
+        import tempfile
+        from azure.cli.command_modules.network._flow_eval import evaluate_flows, load_flows
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as f:
+            f.write('direction,local,remote\nInbound,10.0.1.4:443,203.0.113.7:*\nOutbound,10.0.1.4:*,10.1.0.4:1433\n'
+                    'Inbound,10.0.9.9:22,203.0.113.7:*\n,10.0.1.4:22,203.0.113.7:*\n')
+        results = evaluate_flows(self._snapshot().evaluate_flow, load_flows(path), {'protocol': 'Tcp'},
+                                 ['nic', 'direction', 'protocol', 'local', 'remote'])
+        self.assertEqual([r.get('access') for r in results], ['Allow', 'Deny', None, None])
+        self.assertEqual(results[0]['protocol'], 'Tcp')
+        self.assertIn('10.0.9.9', results[2]['error'])
+        self.assertEqual(results[3]['error'], 'The flow has no direction.')
+
+
+class TestFlowLogAnalysis(unittest.TestCase):
+
+    NSG_ID = '/SUBSCRIPTIONS/00000000-0000-0000-0000-000000000000/RESOURCEGROUPS/RG/PROVIDERS/' \
+             'MICROSOFT.NETWORK/NETWORKSECURITYGROUPS/{}'
+
+    def _record(self, nsg, version, rules):
+        return {'time': '2019-03-01T10:01:00.0000000Z', 'category': 'NetworkSecurityGroupFlowEvent',
+                'resourceId': self.NSG_ID.format(nsg), 'operationName': 'NetworkSecurityGroupFlowEvents',
+                'properties': {'Version': version, 'flows': [
+                    {'rule': rule, 'flows': [{'mac': '000D3AF87856', 'flowTuples': tuples}]}
+                    for rule, tuples in rules]}}
+
+    def _write_blob(self, directory, nsg, hour, records):
+        import json
+        import os
+        path = os.path.join(directory, 'resourceId=', *(self.NSG_ID.format(nsg).strip('/').split('/') + [
+            'y=2019', 'm=03', 'd=01', 'h={:02d}'.format(hour), 'm=00', 'macAddress=000D3AF87856']))
+        os.makedirs(path)
+        with open(os.path.join(path, 'PT1H.json'), 'w') as f:
+            json.dump({'records': records}, f)
+        return path
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        # 2019-03-01T10:00:00Z is 1551434400
+        self._write_blob(self.directory, 'NSG1', 10, [
+            self._record('NSG1', 2, [
+                ('UserRule_allow-https', ['1551434460,203.0.113.7,10.0.0.4,50000,443,T,I,A,E,10,1000,8,5000',
+                                          '1551434470,203.0.113.7,10.0.0.4,50001,443,T,I,A,B,,,,']),
+                ('DefaultRule_DenyAllInBound', ['1551434480,198.51.100.1,10.0.0.4,40000,22,T,I,D,B,,,,'])]),
+            self._record('NSG1', 2, [
+                ('UserRule_allow-https', ['1551434520,198.51.100.1,10.0.0.4,50002,443,T,I,A,E,1,100,1,100']),
+                ('DefaultRule_DenyAllInBound', ['1551434530,198.51.100.1,10.0.0.4,40001,3389,T,I,D,B,,,,',
+                                                '1551438000,198.51.100.2,10.0.0.4,40002,22,U,I,D,B,,,,'])])])
+        self._write_blob(self.directory, 'NSG2', 11, [
+            self._record('NSG2', 1, [('DefaultRule_DenyAllInBound', ['1551438060,192.0.2.1,10.0.1.4,1,22,T,I,D'])])])
+
+    def test_flow_log_iter_records_in_small_chunks(self):
+        import json
+        from azure.cli.command_modules.network._flow_log import LocalBlobSource, iter_records
+        source = LocalBlobSource(self.directory)
+        name = [n for n in source.list_blobs() if 'NSG1' in n][0]
+        with open(os.path.join(self.directory, *name.split('/'))) as f:
+            expected = json.load(f)['records']
+        self.assertEqual(list(iter_records(source.read_chunks(name, chunk_size=7))), expected)
+        with self.assertRaisesRegexp(CLIError, 'incomplete'):
+            list(iter_records([b'{"records": [{"time": "x"}, {"ti']))
+
+    def test_flow_log_reports(self):
+        from azure.cli.command_modules.network._flow_log import (LocalBlobSource, list_flow_log_blobs,
+                                                                 analyze_flow_logs)
+        source = LocalBlobSource(self.directory)
+        start, end = 1551434400, 1551441600
+        blobs = list_flow_log_blobs(source, start, end)
+        self.assertEqual(len(blobs), 2)
+        analysis = analyze_flow_logs(source, blobs, start, end, max_parallel=2)
+        self.assertEqual(dict(analysis.report()), {'blobs': 2, 'records': 3, 'flows': 7, 'allowed': 3,
+                                                   'denied': 4, 'bytes': 6200})
+        self.assertEqual([dict(r) for r in analysis.report('top-talkers', top=2)], [
+            {'sourceIp': '203.0.113.7', 'flows': 2, 'bytes': 6000},
+            {'sourceIp': '198.51.100.1', 'flows': 3, 'bytes': 200}])
+        self.assertEqual([dict(r) for r in analysis.report('denied')], [
+            {'rule': 'DefaultRule_DenyAllInBound', 'flows': 4}])
+        self.assertEqual(dict(analysis.report('bytes', top=1)[0]), {
+            'sourceIp': '203.0.113.7', 'destIp': '10.0.0.4', 'destPort': 443, 'protocol': 'Tcp', 'flows': 2,
+            'bytes': 6000})
+
+        # the flows of 11:00 and later are excluded, and the NSG is matched by name
+        blobs = list_flow_log_blobs(source, start, 1551438000, nsg='nsg1')
+        self.assertEqual(len(blobs), 1)
+        self.assertEqual(analyze_flow_logs(source, blobs, start, 1551438000).report()['flows'], 5)
+
+    def test_flow_log_ndjson(self):
+        import json
+        from six import StringIO
+        from azure.cli.command_modules.network._flow_log import (LocalBlobSource, list_flow_log_blobs,
+                                                                 analyze_flow_logs, write_ndjson)
+        source = LocalBlobSource(self.directory)
+        stream = StringIO()
+        blobs = list_flow_log_blobs(source, 1551438000, 1551441600, nsg=self.NSG_ID.format('NSG2'))
+        analyze_flow_logs(source, blobs, 1551438000, 1551441600, emit=write_ndjson(stream))
+        flows = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(flows, [{
+            'time': '2019-03-01T11:01:00Z', 'nsg': self.NSG_ID.format('NSG2'), 'rule': 'DefaultRule_DenyAllInBound',
+            'mac': '000D3AF87856', 'sourceIp': '192.0.2.1', 'destIp': '10.0.1.4', 'sourcePort': 1, 'destPort': 22,
+            'protocol': 'Tcp', 'direction': 'Inbound', 'decision': 'Deny', 'state': None, 'packetsSent': 0,
+            'bytesSent': 0, 'packetsReceived': 0, 'bytesReceived': 0}])
+
+    def test_flow_log_lists_hours_concurrently(self):
+        from azure.cli.command_modules.network._flow_log import get_blob_prefixes, list_flow_log_blobs
+        nsg_id = self.NSG_ID.format('NSG1').lower()
+        prefixes = get_blob_prefixes(nsg_id, 1551434400 + 1800, 1551441600)
+        self.assertEqual([p[-22:] for p in prefixes], ['y=2019/m=03/d=01/h=10/', 'y=2019/m=03/d=01/h=11/'])
+        self.assertTrue(prefixes[0].startswith('resourceId=' + self.NSG_ID.format('NSG1') + '/'))
+
+        source = mock.MagicMock()
+        source.list_blobs.side_effect = lambda prefix: [prefix + 'm=00/macAddress=000D3AF87856/PT1H.json',
+                                                        prefix + 'm=00/other.txt']
+        blobs = list_flow_log_blobs(source, 1551434400 + 1800, 1551441600, nsg=nsg_id, max_parallel=2)
+        self.assertEqual(blobs, [p + 'm=00/macAddress=000D3AF87856/PT1H.json' for p in prefixes])
+        self.assertEqual(source.list_blobs.call_count, 2)
+
+    def test_flow_log_storage_listing_uses_prefixes(self):
+        from azure.cli.command_modules.network._flow_log import (LocalBlobSource, StorageBlobSource,
+                                                                 list_flow_log_blobs)
+        local = LocalBlobSource(self.directory)
+        names = sorted(local.list_blobs())
+        calls = []
+
+        def _list_blobs(container, prefix=None, delimiter=None):
+            calls.append((prefix, delimiter))
+            if delimiter:
+                children = set(prefix + n[len(prefix):].split('/', 1)[0] + '/' for n in names
+                               if n.startswith(prefix) and '/' in n[len(prefix):])
+                return [_Model(name=c) for c in sorted(children)]
+            return [_Model(name=n) for n in names if n.startswith(prefix)]
+
+        service = mock.MagicMock()
+        service.list_blobs.side_effect = _list_blobs
+        blobs = list_flow_log_blobs(StorageBlobSource(service), 1551434400, 1551438000)
+        self.assertEqual(blobs, [n for n in names if 'h=10' in n])
+        # the NSGs are found level by level, then only the hours of the range are listed
+        self.assertTrue(all(p for p, _ in calls))
+        self.assertEqual(sorted(p for p, d in calls if not d), sorted(
+            'resourceId={}/y=2019/m=03/d=01/h=10/'.format(self.NSG_ID.format(n)) for n in ['NSG1', 'NSG2']))
+        self.assertEqual(list_flow_log_blobs(StorageBlobSource(service), 1551434400, 1551441600, nsg='nsg2'),
+                         [n for n in names if 'NSG2' in n])
+
+
+class _Model(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class TestDnsZoneExport(unittest.TestCase):
+
+    def _record_set(self, name, record_type, ttl=3600, **properties):
+        return _Model(name=name, type='Microsoft.Network/dnszones/' + record_type, ttl=ttl, **properties)
+
+    def setUp(self):
+        self.record_sets = [
+            self._record_set('www', 'A', arecords=[_Model(ipv4_address='10.0.0.2'), _Model(ipv4_address='10.0.0.1')]),
+            self._record_set('@', 'NS', ttl=172800, ns_records=[_Model(nsdname='ns2.example.net.'),
+                                                                _Model(nsdname='ns1.example.net.')]),
+            self._record_set('api.eu', 'CNAME', cname_record=_Model(cname='eu.example.net')),
+            self._record_set('@', 'SOA', soa_record=_Model(
+                host='ns1.example.net', email='admin.contoso.com', serial_number=1, refresh_time=3600,
+                retry_time=300, expire_time=2419200, minimum_ttl=300)),
+            self._record_set('api', 'TXT', txt_records=[_Model(value=['v=1'])]),
+            self._record_set('@', 'MX', mx_records=[_Model(preference=10, exchange='mail.contoso.com.')]),
+            self._record_set('empty', 'A', arecords=[]),
+            self._record_set('API', 'A', arecords=[_Model(ipv4_address='10.0.1.1')])
+        ]
+
+    def _export(self, record_sets, **kwargs):
+        from six import StringIO
+        from azure.cli.command_modules.network._zone_export import export_zone_file
+        client = mock.MagicMock()
+        client.record_sets.list_by_dns_zone.return_value = iter(record_sets)
+        client.record_sets.list_by_type.side_effect = lambda rg, zone, record_type: iter(
+            [r for r in record_sets if r.type.endswith('/' + record_type)])
+        client.record_sets.get.return_value = record_sets[3]
+        stream = StringIO()
+        count = export_zone_file(client, 'rg', 'contoso.com', stream, **kwargs)
+        # the date of the export is the only line which differs
+        lines = [line for line in stream.getvalue().splitlines() if 'Date and time' not in line]
+        return count, [line for line in lines if line.strip()], client
+
+    def test_dns_zone_export_canonical_order(self):
+        import random
+        count, lines, _ = self._export(self.record_sets)
+        self.assertEqual(count, 7)
+        self.assertEqual(lines[3:], [
+            '$TTL 300',
+            '$ORIGIN contoso.com.',
+            '@ 3600 IN SOA ns1.example.net. admin.contoso.com. (',
+            '              1 ; serial',
+            '              3600 ; refresh',
+            '              300 ; retry',
+            '              2419200 ; expire',
+            '              300 ; minimum',
+            '              )',
+            '  172800 IN NS ns1.example.net.',
+            '  172800 IN NS ns2.example.net.',
+            '  3600 IN MX 10 mail.contoso.com.',
+            'API 3600 IN A 10.0.1.1',
+            'api 3600 IN TXT "v=1"',
+            'api.eu 3600 IN CNAME eu.example.net.',
+            'www 3600 IN A 10.0.0.1',
+            '    3600 IN A 10.0.0.2'])
+        shuffled = list(self.record_sets)
+        random.Random(1).shuffle(shuffled)
+        self.assertEqual(self._export(shuffled)[1], lines)
+
+    def test_dns_zone_export_external_sort(self):
+        from azure.cli.command_modules.network._zone_export import ZoneSorter
+        record_sets = self.record_sets + [
+            self._record_set('host{}'.format(i), 'A', arecords=[_Model(ipv4_address='10.1.0.{}'.format(i))])
+            for i in range(50)]
+        _, expected, _ = self._export(record_sets)
+        with mock.patch.object(ZoneSorter, '_spill', autospec=True, side_effect=ZoneSorter._spill) as spill:
+            _, lines, _ = self._export(record_sets, max_in_memory=8)
+        self.assertEqual(spill.call_count, 8)
+        self.assertEqual(lines, expected)
+
+    def test_dns_zone_export_filters(self):
+        count, lines, client = self._export(self.record_sets, record_types=['A', 'cname'], name_prefix='Api')
+        self.assertEqual(count, 2)
+        self.assertEqual(lines[3:], ['$TTL 300', '$ORIGIN contoso.com.', 'API 3600 IN A 10.0.1.1',
+                                     'api.eu 3600 IN CNAME eu.example.net.'])
+        self.assertEqual([c[0][2] for c in client.record_sets.list_by_type.call_args_list], ['A', 'CNAME'])
+        client.record_sets.get.assert_called_once_with('rg', 'contoso.com', '@', 'SOA')
+
+    def test_dns_zone_export_parses(self):
+        from azure.cli.command_modules.network.zone_file import parse_zone_file
+        _, lines, _ = self._export(self.record_sets)
+        zone = parse_zone_file('\n'.join(lines), 'contoso.com')
+        self.assertEqual(sorted(r['ip'] for r in zone['www.contoso.com.']['a']), ['10.0.0.1', '10.0.0.2'])
+        self.assertEqual(zone['api.eu.contoso.com.']['cname']['alias'], 'eu.example.net.')
+
+    def test_dns_zone_export_prefetch_raises_listing_errors(self):
+        from azure.cli.command_modules.network._zone_export import prefetch
+
+        def _pages():
+            yield 1
+            yield 2
+            raise CLIError('page 2 failed')
+
+        items = []
+        with self.assertRaisesRegexp(CLIError, 'page 2 failed'):
+            for item in prefetch(_pages(), size=1):
+                items.append(item)
+        self.assertEqual(items, [1, 2])
+
+    def test_dns_zone_export_prefetch_stops_when_consumer_fails(self):
+        import threading
+        from azure.cli.command_modules.network._zone_export import prefetch
+        listed = []
+
+        def _pages():
+            for i in range(100):
+                listed.append(i)
+                yield i
+
+        threads = threading.active_count()
+        with self.assertRaisesRegexp(CLIError, 'write failed'):
+            for _ in prefetch(_pages(), size=2):
+                raise CLIError('write failed')
+        # the producer is joined, blocked on the full queue no longer
+        self.assertEqual(threading.active_count(), threads)
+        self.assertLess(len(listed), 100)
+
+        listing = prefetch(_pages(), size=2)
+        next(listing)
+        listing.close()
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_dns_zone_export_spf(self):
+        record_sets = self.record_sets + [
+            self._record_set('mail', 'SPF', txt_records=[_Model(value=['v=spf1 -all'])])]
+        count, lines, _ = self._export(record_sets)
+        self.assertEqual(count, 8)
+        self.assertIn('mail 3600 IN SPF "v=spf1 -all"', lines)
+
+        count, lines, client = self._export(record_sets, record_types=['spf'])
+        self.assertEqual(count, 1)
+        self.assertEqual(lines[-1], 'mail 3600 IN SPF "v=spf1 -all"')
+        client.record_sets.list_by_type.assert_called_once_with('rg', 'contoso.com', 'SPF')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -124,5 +124,9 @@ def process_txt(io, data, name, print_name=False):
     return process_rr(io, _quote_field(data, 'txt'), 'TXT', 'txt', name, print_name)
 
 
+def process_spf(io, data, name, print_name=False):
+    return process_rr(io, _quote_field(data, 'txt'), 'SPF', 'txt', name, print_name)
+
+
 def process_srv(io, data, name, print_name=False):
     return process_rr(io, data, 'SRV', ['priority', 'weight', 'port', 'target'], name, print_name)
@@ -0,0 +1,158 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Ordering and running the deletion of many resources.
+
+Resources are grouped into layers. The layers are deleted one after the other and the resources of a layer
+concurrently. A resource is placed after every resource that may depend on it, judging by its type (virtual
+machines before their disks and network interfaces, network interfaces before virtual networks, ...) and by its
+ID (child resources before their parents).
+"""
+
+import re
+from collections import OrderedDict
+
+from knack.log import get_logger
+
+from msrestazure.tools import parse_resource_id
+
+logger = get_logger(__name__)
+
+# resource types by the order they are deleted in; types which are not listed are deleted first
+DELETE_ORDER = [
+    ['microsoft.compute/virtualmachines', 'microsoft.compute/virtualmachinescalesets', 'microsoft.web/sites',
+     'microsoft.containerservice/managedclusters', 'microsoft.containerinstance/containergroups',
+     'microsoft.network/connections', 'microsoft.network/privateendpoints'],
+    ['microsoft.compute/disks', 'microsoft.compute/availabilitysets', 'microsoft.network/networkinterfaces',
+     'microsoft.web/serverfarms'],
+    ['microsoft.network/loadbalancers', 'microsoft.network/applicationgateways',
+     'microsoft.network/virtualnetworkgateways', 'microsoft.network/azurefirewalls',
+     'microsoft.network/bastionhosts'],
+    ['microsoft.network/virtualnetworks', 'microsoft.network/publicipaddresses'],
+    ['microsoft.network/networksecuritygroups', 'microsoft.network/routetables',
+     'microsoft.network/applicationsecuritygroups', 'microsoft.network/publicipprefixes',
+     'microsoft.network/ddosprotectionplans']
+]
+_TYPE_LAYERS = {t: index for index, types in enumerate(DELETE_ORDER) for t in types}
+
+# error codes of requests refused because another resource still refers to the one being deleted
+_DEPENDENCY_ERROR_RE = re.compile(r'InUse|\bin use\b|Referenced|Dependent|CannotBeDeleted|CannotDelete|'
+                                  r'AnotherOperationInProgress', re.IGNORECASE)
+
+
+def get_resource_type(resource_id):
+    """ Returns the full type of a resource ID in lower case, e.g. 'microsoft.network/virtualnetworks/subnets'. """
+    parts = parse_resource_id(resource_id)
+    if not parts.get('type'):
+        return ''
+    resource_type = [parts.get('namespace', ''), parts['type']]
+    level = 1
+    while parts.get('child_type_{}'.format(level)):
+        resource_type.append(parts['child_type_{}'.format(level)])
+        level += 1
+    return '/'.join(resource_type).lower()
+
+
+def _get_type_rank(resource_type):
+    # child resources without an entry of their own rank with their closest listed ancestor type
+    parts = resource_type.split('/')
+    for length in range(len(parts), 1, -1):
+        rank = _TYPE_LAYERS.get('/'.join(parts[:length]))
+        if rank is not None:
+            return rank
+    return 0
+
+
+def plan_deletion(resource_ids):
+    """ Returns the resource IDs grouped into layers to be deleted in order.
+
+    A resource goes into a later layer than every resource of a lower type rank and than its own descendants. """
+    ranks = {rid: _get_type_rank(get_resource_type(rid)) for rid in resource_ids}
+    lowered = {rid: rid.lower().rstrip('/') for rid in resource_ids}
+    layers = {}
+    base = 0
+    for rank in sorted(set(ranks.values())):
+        # deepest first, so that the descendants of a resource have their layers before it is placed
+        members = sorted([r for r in resource_ids if ranks[r] == rank], key=lambda r: lowered[r].count('/'),
+                         reverse=True)
+        for rid in members:
+            children = [layers[r] for r in members if r in layers and lowered[r].startswith(lowered[rid] + '/')]
+            layers[rid] = max([base] + [layer + 1 for layer in children])
+        base = max(layers[r] for r in members) + 1
+
+    plan = OrderedDict((layer, []) for layer in sorted(set(layers.values())))
+    for rid in resource_ids:
+        plan[layers[rid]].append(rid)
+    return list(plan.values())
+
+
+def is_dependency_error(ex):
+    """ Whether a delete failed because other resources still depend on the resource, so it may succeed once they
+    are gone. """
+    status_code = getattr(ex, 'status_code', None) or getattr(getattr(ex, 'response', None), 'status_code', None)
+    if status_code == 409:
+        return True
+    error = getattr(ex, 'error', None)
+    code = getattr(error, 'error', None) or getattr(error, 'code', None) or ''
+    return bool(_DEPENDENCY_ERROR_RE.search(code or '') or _DEPENDENCY_ERROR_RE.search(str(ex)))
+
+
+def _start_deletes(resource_ids, delete, executor):
+    futures = OrderedDict((rid, executor.submit(delete, rid)) for rid in resource_ids)
+    started, failed = OrderedDict(), OrderedDict()
+    for rid, future in futures.items():
+        try:
+            started[rid] = future.result()
+            logger.debug("deleting %s", rid)
+        except Exception as ex:  # pylint: disable=broad-except
+            failed[rid] = ex
+    return started, failed
+
+
+def _wait_for_deletes(started, cli_ctx):
+    """ Polls the long running operations of a layer together and returns their results and errors. """
+    from azure.cli.core.wait import wait_all
+    pollers = {rid: op for rid, op in started.items() if callable(getattr(op, 'done', None))}
+    if pollers:
+        wait_all(list(pollers), lambda pending: {rid: pollers[rid].done() for rid in pending}, interval=2,
+                 max_interval=10, backoff=1.5, cli_ctx=cli_ctx, message='Deleting')
+    results, failed = [], OrderedDict()
+    for rid, operation in started.items():
+        try:
+            results.append(operation.result() if rid in pollers else operation)
+        except Exception as ex:  # pylint: disable=broad-except
+            failed[rid] = ex
+    return results, failed
+
+
+def delete_in_layers(layers, delete, max_parallel=10, cli_ctx=None):
+    """ Deletes the layers of a plan in order, each layer with up to max_parallel concurrent requests.
+
+    A resource whose delete failed because of a dependency is retried with the next layer, and after the last
+    layer for as long as every retry round deletes something. Returns the results of the deletes and an
+    OrderedDict mapping the resources which could not be deleted to their errors.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    results, errors = [], OrderedDict()
+    retry = []
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        index = 0
+        while index < len(layers) or retry:
+            batch = retry + (layers[index] if index < len(layers) else [])
+            started, failed = _start_deletes(batch, delete, executor)
+            layer_results, layer_failed = _wait_for_deletes(started, cli_ctx)
+            failed.update(layer_failed)
+            results.extend(layer_results)
+            index += 1
+            # past the last layer, retrying only makes sense while something still gets deleted
+            can_retry = index < len(layers) or len(failed) < len(batch)
+            retry = []
+            for rid, ex in failed.items():
+                if can_retry and is_dependency_error(ex):
+                    logger.info("Deleting %s failed because of a dependency, retrying later: %s", rid, ex)
+                    retry.append(rid)
+                else:
+                    errors[rid] = ex
+    return results, errors
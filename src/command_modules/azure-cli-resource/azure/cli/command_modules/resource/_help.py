@@ -886,6 +886,11 @@ examples:
 helps['resource delete'] = """
 type: command
 short-summary: Delete a resource.
+long-summary: >
+    Resources given with --ids are deleted in layers, each layer concurrently. Resources which may depend on
+    others are deleted first, e.g. virtual machines before their disks and network interfaces, network interfaces
+    before virtual networks and child resources before their parents. Deletes refused because another resource
+    still depends on the resource are retried after the next layer.
 examples:
   - name: Delete a virtual machine named 'MyVm'.
     text: >
@@ -896,6 +901,9 @@ examples:
   - name: Delete a subnet using a resource identifier.
     text: >
         az resource delete --ids /subscriptions/0b1f6471-1bf0-4dda-aec3-111111111111/resourceGroups/MyResourceGroup/providers/Microsoft.Network/virtualNetworks/MyVnet/subnets/MySubnet
+  - name: Show the order in which all resources of a resource group would be deleted.
+    text: >
+        az resource delete --ids $(az resource list -g MyResourceGroup --query [].id -o tsv) --dry-run
 """
 
 helps['resource invoke-action'] = """
@@ -59,6 +59,10 @@ def load_arguments(self, _):
     with self.argument_context('resource list') as c:
         c.argument('name', resource_name_type)
 
+    with self.argument_context('resource delete') as c:
+        c.argument('dry_run', action='store_true', help='Show the order in which the resources would be deleted without deleting them.')
+        c.argument('max_parallel', type=int, help='Maximum number of resources deleted concurrently.')
+
     with self.argument_context('resource move') as c:
         c.argument('ids', nargs='+')
 
@@ -829,55 +829,75 @@ def show_resource(cmd, resource_ids=None, resource_group_name=None,
 # pylint: disable=unused-argument
 def delete_resource(cmd, resource_ids=None, resource_group_name=None,
                     resource_provider_namespace=None, parent_resource_path=None, resource_type=None,
-                    resource_name=None, api_version=None):
+                    resource_name=None, api_version=None, dry_run=False, max_parallel=10):
     """
     Deletes the given resource(s).
     This function allows deletion of ids with dependencies on one another.
-    This is done with multiple passes through the given ids.
+    The ids are deleted in layers ordered by resource type and parent/child relationship, each layer
+    concurrently. Deletes refused because of a dependency are retried with later layers.
     """
-    parsed_ids = _get_parsed_resource_ids(resource_ids) or [_create_parsed_id(resource_group_name,
-                                                                              resource_provider_namespace,
-                                                                              parent_resource_path,
-                                                                              resource_type,
-                                                                              resource_name)]
-    to_be_deleted = [(_get_rsrc_util_from_parsed_id(cmd.cli_ctx, id_dict, api_version), id_dict)
-                     for id_dict in parsed_ids]
-
-    results = []
+    import threading
     from msrestazure.azure_exceptions import CloudError
-    while to_be_deleted:
-        logger.debug("Start new loop to delete resources.")
-        operations = []
-        failed_to_delete = []
-        for rsrc_utils, id_dict in to_be_deleted:
-            try:
-                operations.append(rsrc_utils.delete())
-                resource = resource_dict_to_id(**id_dict) if id_dict.get("subscription") else resource_name
-                logger.debug("deleting %s", resource)
-            except CloudError as e:
-                # request to delete failed, add parsed id dict back to queue
-                id_dict['exception'] = str(e)
-                failed_to_delete.append((rsrc_utils, id_dict))
-        to_be_deleted = failed_to_delete
-
-        # stop deleting if none deletable
-        if not operations:
-            break
+    from azure.cli.command_modules.resource._delete_planner import plan_deletion, delete_in_layers, get_resource_type
+    if max_parallel < 1:
+        raise CLIError('--max-parallel must be greater than 0.')
+    if resource_ids:
+        targets = OrderedDict((id_dict['resource_id'], id_dict) for id_dict in _get_parsed_resource_ids(resource_ids))
+    else:
+        id_dict = _create_parsed_id(resource_group_name, resource_provider_namespace, parent_resource_path,
+                                    resource_type, resource_name)
+        targets = OrderedDict([(_build_resource_id(cmd.cli_ctx, id_dict), id_dict)])
 
-        # all operations return result before next pass
-        for operation in operations:
-            results.append(operation.result())
+    plan = plan_deletion(list(targets))
+    if dry_run:
+        return [OrderedDict([('layer', index + 1), ('resources', layer)]) for index, layer in enumerate(plan)]
 
-    if to_be_deleted:
+    rcf = _resource_client_factory(cmd.cli_ctx)
+    api_versions = {}
+    # the resources of a layer are deleted on a pool of threads, which share the resolved api-versions
+    api_versions_lock = threading.Lock()
+
+    def _delete(rid):
+        id_dict = targets[rid]
+        version = api_version
+        if version is None and id_dict.get('resource_id'):
+            # resolving the api-version costs a request, so do it once per resource type
+            type_key = get_resource_type(rid)
+            with api_versions_lock:
+                if type_key not in api_versions:
+                    # pylint: disable=protected-access
+                    api_versions[type_key] = _ResourceUtils._resolve_api_version_by_id(rcf, rid)
+                version = api_versions[type_key]
+        return _get_rsrc_util_from_parsed_id(cmd.cli_ctx, id_dict, version).delete()
+
+    results, errors = delete_in_layers(plan, _delete, max_parallel=max_parallel, cli_ctx=cmd.cli_ctx)
+
+    if errors:
+        # errors raised before any request was sent, e.g. an unknown resource type, are reported as they are
+        client_errors = [ex for ex in errors.values() if not isinstance(ex, CloudError)]
+        if client_errors and len(errors) == 1:
+            raise client_errors[0]
         error_msg_builder = ['Some resources failed to be deleted:']
-        for _, id_dict in to_be_deleted:
-            logger.debug(id_dict['exception'])
-            error_msg_builder.append(resource_dict_to_id(**id_dict))
+        for rid, ex in errors.items():
+            logger.debug(str(ex))
+            error_msg_builder.append(rid)
         raise CLIError(os.linesep.join(error_msg_builder))
 
     return _single_or_collection(results)
 
 
+def _build_resource_id(cli_ctx, parsed_id):
+    from azure.cli.core.commands.client_factory import get_subscription_id
+    namespace = parsed_id.get('resource_namespace')
+    parent = parsed_id.get('resource_parent')
+    resource_type = parsed_id.get('resource_type') or ''
+    if resource_type and not namespace and not parent and '/' in resource_type:
+        namespace, resource_type = resource_type.split('/', 1)
+    return '/subscriptions/{}/resourceGroups/{}/providers/{}/{}{}/{}'.format(
+        get_subscription_id(cli_ctx), parsed_id.get('resource_group'), namespace,
+        parent + '/' if parent else '', resource_type, parsed_id.get('resource_name'))
+
+
 # pylint: unused-argument
 def update_resource(cmd, parameters, resource_ids=None,
                     resource_group_name=None, resource_provider_namespace=None,
@@ -306,5 +306,91 @@ class TestCustom(unittest.TestCase):
         self.assertTrue(str(list(results.keys())) in param_alpha_order)
 
 
+class _FakePoller(object):
+    def __init__(self, error=None):
+        self.error = error
+
+    def done(self):
+        return True
+
+    def result(self):
+        if self.error:
+            raise self.error
+
+
+class _InUseError(Exception):
+    status_code = 400
+
+    def __init__(self):
+        super(_InUseError, self).__init__('InUseSubnetCannotBeDeleted: Subnet default is in use')
+
+
+class TestDeletePlanner(unittest.TestCase):
+    PREFIX = '/subscriptions/sub/resourceGroups/rg/providers/'
+
+    def _ids(self, *paths):
+        return [self.PREFIX + p for p in paths]
+
+    def test_plan_deletion_orders_by_type_and_parent(self):
+        from azure.cli.command_modules.resource._delete_planner import plan_deletion
+        vnet, subnet, nic, vm, disk, nsg, other = self._ids(
+            'Microsoft.Network/virtualNetworks/vnet', 'Microsoft.Network/virtualNetworks/vnet/subnets/default',
+            'Microsoft.Network/networkInterfaces/nic', 'Microsoft.Compute/virtualMachines/vm',
+            'Microsoft.Compute/disks/disk', 'Microsoft.Network/networkSecurityGroups/nsg', 'Microsoft.Foo/bars/bar')
+        self.assertEqual(plan_deletion([nsg, vnet, subnet, disk, nic, other, vm]),
+                         [[other, vm], [disk, nic], [subnet], [vnet], [nsg]])
+
+    def test_delete_in_layers_retries_dependency_failures_only(self):
+        from azure.cli.command_modules.resource._delete_planner import delete_in_layers
+        attempts = {}
+
+        def _delete(rid):
+            attempts[rid] = attempts.get(rid, 0) + 1
+            if rid == 'subnet' and attempts[rid] == 1:
+                return _FakePoller(_InUseError())
+            if rid == 'broken':
+                raise ValueError('bad request')
+            if rid == 'stuck':
+                raise _InUseError()
+            return _FakePoller()
+
+        results, errors = delete_in_layers([['subnet', 'broken', 'stuck'], ['vnet']], _delete, max_parallel=2)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(attempts, {'subnet': 2, 'broken': 1, 'stuck': 3, 'vnet': 1})
+        self.assertEqual(list(errors), ['broken', 'stuck'])
+
+    def test_delete_resource_dry_run(self):
+        from azure.cli.command_modules.resource.custom import delete_resource
+        vm, nic = self._ids('Microsoft.Compute/virtualMachines/vm', 'Microsoft.Network/networkInterfaces/nic')
+        plan = delete_resource(mock.MagicMock(), resource_ids=[nic, vm], dry_run=True)
+        self.assertEqual(plan, [{'layer': 1, 'resources': [vm]}, {'layer': 2, 'resources': [nic]}])
+
+    def test_delete_resource_resolves_api_version_once(self):
+        import time
+        from azure.cli.command_modules.resource import custom
+        vms = self._ids(*['Microsoft.Compute/virtualMachines/vm{}'.format(i) for i in range(4)])
+        versions = []
+
+        def _resolve(*_):
+            # slow enough for the deletes of the layer to ask at the same time
+            time.sleep(0.05)
+            versions.append('2018-06-01')
+            return '2018-06-01'
+
+        def _get_util(_, id_dict, version):
+            util = mock.MagicMock()
+            util.delete.return_value = _FakePoller()
+            util.version = version
+            return util
+
+        with mock.patch.object(custom, '_resource_client_factory'), \
+                mock.patch.object(custom._ResourceUtils, '_resolve_api_version_by_id', side_effect=_resolve), \
+                mock.patch.object(custom, '_get_rsrc_util_from_parsed_id', side_effect=_get_util) as get_util:
+            custom.delete_resource(mock.MagicMock(), resource_ids=vms, max_parallel=4)
+
+        self.assertEqual(versions, ['2018-06-01'])
+        self.assertEqual([c[0][2] for c in get_util.call_args_list], ['2018-06-01'] * 4)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,98 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Local cache of role definition names and graph principals shown by `az role assignment list`.
+
+Entries expire after `role.cache_ttl` seconds (1 hour by default, 0 disables the cache). Role assignment and
+role definition changes made through the CLI invalidate the affected entries.
+"""
+
+import json
+import os
+import threading
+import time
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+ROLE_CACHE_FILE_NAME = 'roleResolutionCache.json'
+DEFAULT_ROLE_CACHE_TTL = 3600
+
+ROLE_DEFINITIONS = 'roleDefinitions'
+PRINCIPALS = 'principals'
+
+_lock = threading.Lock()
+
+
+def _get_cache_path(cli_ctx):
+    return os.path.join(cli_ctx.config.config_dir, ROLE_CACHE_FILE_NAME)
+
+
+def _get_cache_ttl(cli_ctx):
+    try:
+        return cli_ctx.config.getint('role', 'cache_ttl', fallback=DEFAULT_ROLE_CACHE_TTL)
+    except ValueError:
+        return DEFAULT_ROLE_CACHE_TTL
+
+
+def _load(cli_ctx):
+    try:
+        with open(_get_cache_path(cli_ctx)) as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, IOError, ValueError):
+        return {}
+
+
+def _save(cli_ctx, data):
+    from azure.cli.core.util import write_json_atomic
+    try:
+        write_json_atomic(_get_cache_path(cli_ctx), data)
+    except (OSError, IOError) as ex:
+        logger.debug("Unable to save the role resolution cache: %s", ex)
+
+
+def get_cached_values(cli_ctx, section, keys):
+    """ Returns a dict with the cached value of each key that is present and has not expired. """
+    ttl = _get_cache_ttl(cli_ctx)
+    if ttl <= 0:
+        return {}
+    with _lock:
+        entries = _load(cli_ctx).get(section, {})
+    now = time.time()
+    result = {}
+    for key in keys:
+        entry = entries.get(key.lower())
+        if entry and now - entry['time'] < ttl:
+            result[key] = entry['value']
+    return result
+
+
+def set_cached_values(cli_ctx, section, values):
+    ttl = _get_cache_ttl(cli_ctx)
+    if ttl <= 0 or not values:
+        return
+    now = time.time()
+    with _lock:
+        data = _load(cli_ctx)
+        entries = {k: v for k, v in data.get(section, {}).items() if now - v['time'] < ttl}
+        entries.update({k.lower(): {'value': v, 'time': now} for k, v in values.items()})
+        data[section] = entries
+        _save(cli_ctx, data)
+
+
+def invalidate_cached_values(cli_ctx, section, keys=None):
+    """ Drops the given keys from a section of the cache, or the whole section if no keys are given. """
+    with _lock:
+        data = _load(cli_ctx)
+        if section not in data:
+            return
+        if keys is None:
+            del data[section]
+        else:
+            for key in keys:
+                data[section].pop(key.lower(), None)
+        _save(cli_ctx, data)
@@ -268,7 +268,9 @@ helps['role assignment delete'] = """
 helps['role assignment list'] = """
     type: command
     short-summary: List role assignments.
-    long-summary: By default, only assignments scoped to subscription will be displayed. To view assignments scoped by resource or group, use `--all`.
+    long-summary: >
+        By default, only assignments scoped to subscription will be displayed. To view assignments scoped by resource or group, use `--all`.
+        Role definition and principal names are cached locally for an hour. Set `cache_ttl` in the `[role]` section of the CLI configuration file to change the lifetime in seconds, or to 0 to disable the cache. Use `--no-resolve` to skip resolving names altogether.
 """
 helps['role assignment list-changelogs'] = """
     type: command
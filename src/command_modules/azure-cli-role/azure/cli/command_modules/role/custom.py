@@ -31,11 +31,15 @@ from azure.graphrbac.models import (ApplicationCreateParameters, ApplicationUpda
                                     ServicePrincipalCreateParameters, RequiredResourceAccess, AppRole,
                                     ResourceAccess, GroupCreateParameters, CheckGroupMembershipParameters)
 
+from ._cache import get_cached_values, set_cached_values, invalidate_cached_values, ROLE_DEFINITIONS, PRINCIPALS
 from ._client_factory import _auth_client_factory, _graph_client_factory
 from ._multi_api_adaptor import MultiAPIAdaptor
 
 logger = get_logger(__name__)
 
+# the number of graph batches of 1000 objects looked up concurrently when resolving principal names
+_GRAPH_LOOKUP_WORKERS = 8
+
 # pylint: disable=too-many-lines
 
 
@@ -101,7 +105,9 @@ def _create_update_role_definition(cmd, role_definition, for_update):
     if not for_update and 'assignableScopes' not in role_definition:
         raise CLIError("please provide 'assignableScopes'")
 
-    return worker.create_role_definition(definitions_client, role_name, role_id, role_definition)
+    result = worker.create_role_definition(definitions_client, role_name, role_id, role_definition)
+    invalidate_cached_values(cmd.cli_ctx, ROLE_DEFINITIONS)
+    return result
 
 
 def delete_role_definition(cmd, name, resource_group_name=None, scope=None,
@@ -112,6 +118,8 @@ def delete_role_definition(cmd, name, resource_group_name=None, scope=None,
     roles = _search_role_definitions(cmd.cli_ctx, definitions_client, name, scope, custom_role_only)
     for r in roles:
         definitions_client.delete(role_definition_id=r.name, scope=scope)
+    if roles:
+        invalidate_cached_values(cmd.cli_ctx, ROLE_DEFINITIONS, [r.id for r in roles])
 
 
 def _search_role_definitions(cli_ctx, definitions_client, name, scope, custom_role_only=False):
@@ -143,17 +151,19 @@ def _create_role_assignment(cli_ctx, role, assignee, resource_group_name=None, s
     role_id = _resolve_role_id(role, scope, definitions_client)
     object_id = _resolve_object_id(cli_ctx, assignee) if resolve_assignee else assignee
     worker = MultiAPIAdaptor(cli_ctx)
-    return worker.create_role_assignment(assignments_client, _gen_guid(), role_id, object_id, scope)
+    result = worker.create_role_assignment(assignments_client, _gen_guid(), role_id, object_id, scope)
+    invalidate_cached_values(cli_ctx, PRINCIPALS, [object_id])
+    return result
 
 
 def list_role_assignments(cmd, assignee=None, role=None, resource_group_name=None,
                           scope=None, include_inherited=False,
-                          show_all=False, include_groups=False, include_classic_administrators=False):
+                          show_all=False, include_groups=False, include_classic_administrators=False,
+                          no_resolve=False):
     '''
     :param include_groups: include extra assignments to the groups of which the user is a
     member(transitively).
     '''
-    graph_client = _graph_client_factory(cmd.cli_ctx)
     factory = _auth_client_factory(cmd.cli_ctx, scope)
     assignments_client = factory.role_assignments
     definitions_client = factory.role_definitions
@@ -177,13 +187,29 @@ def list_role_assignments(cmd, assignee=None, role=None, resource_group_name=Non
     if not results:
         return []
 
+    if not no_resolve:
+        _resolve_assignment_names(cmd.cli_ctx, definitions_client, scope, results)
+
+    for r in results:
+        if not r.get('additionalProperties'):  # remove the useless "additionalProperties"
+            r.pop('additionalProperties', None)
+    return results
+
+
+def _resolve_assignment_names(cli_ctx, definitions_client, scope, results):
     # 1. fill in logic names to get things understandable.
     # (it's possible that associated roles and principals were deleted, and we just do nothing.)
     # 2. fill in role names
-    role_defs = list(definitions_client.list(
-        scope=scope or ('/subscriptions/' + definitions_client.config.subscription_id)))
-    worker = MultiAPIAdaptor(cmd.cli_ctx)
-    role_dics = {i.id: worker.get_role_property(i, 'role_name') for i in role_defs}
+    worker = MultiAPIAdaptor(cli_ctx)
+    role_def_ids = set(worker.get_role_property(i, 'roleDefinitionId')
+                       for i in results if not i.get('roleDefinitionName'))
+    role_dics = get_cached_values(cli_ctx, ROLE_DEFINITIONS, role_def_ids)
+    if role_def_ids - set(role_dics):
+        role_defs = list(definitions_client.list(
+            scope=scope or ('/subscriptions/' + definitions_client.config.subscription_id)))
+        listed = {i.id: worker.get_role_property(i, 'role_name') for i in role_defs}
+        set_cached_values(cli_ctx, ROLE_DEFINITIONS, listed)
+        role_dics.update(listed)
     for i in results:
         if not i.get('roleDefinitionName'):
             if role_dics.get(worker.get_role_property(i, 'roleDefinitionId')):
@@ -195,25 +221,27 @@ def list_role_assignments(cmd, assignee=None, role=None, resource_group_name=Non
     # fill in principal names
     principal_ids = set(worker.get_role_property(i, 'principalId')
                         for i in results if worker.get_role_property(i, 'principalId'))
-
-    if principal_ids:
+    principal_dics = get_cached_values(cli_ctx, PRINCIPALS, principal_ids)
+    unresolved = principal_ids - set(principal_dics)
+    if unresolved:
         try:
-            principals = _get_object_stubs(graph_client, principal_ids)
-            principal_dics = {i.object_id: _get_displayable_name(i) for i in principals}
-
-            for i in [r for r in results if not r.get('principalName')]:
-                i['principalName'] = ''
-                if principal_dics.get(worker.get_role_property(i, 'principalId')):
-                    worker.set_role_property(i, 'principalName',
-                                             principal_dics[worker.get_role_property(i, 'principalId')])
+            principals = _get_object_stubs(_graph_client_factory(cli_ctx), unresolved,
+                                           max_workers=_GRAPH_LOOKUP_WORKERS)
+            resolved = {i.object_id: {'type': i.object_type, 'displayName': i.display_name,
+                                      'name': _get_displayable_name(i)} for i in principals}
+            # remember principals missing from the graph too, so deleted ones are not looked up every time
+            resolved.update({i: None for i in unresolved if i not in resolved})
+            set_cached_values(cli_ctx, PRINCIPALS, resolved)
+            principal_dics.update(resolved)
         except (CloudError, GraphErrorException) as ex:
             # failure on resolving principal due to graph permission should not fail the whole thing
             logger.info("Failed to resolve graph object information per error '%s'", ex)
 
-    for r in results:
-        if not r.get('additionalProperties'):  # remove the useless "additionalProperties"
-            r.pop('additionalProperties', None)
-    return results
+    for i in [r for r in results if not r.get('principalName')]:
+        i['principalName'] = ''
+        if principal_dics.get(worker.get_role_property(i, 'principalId')):
+            worker.set_role_property(i, 'principalName',
+                                     principal_dics[worker.get_role_property(i, 'principalId')]['name'])
 
 
 def _get_assignment_events(cli_ctx, start_time=None, end_time=None):
@@ -414,8 +442,8 @@ def delete_role_assignments(cmd, ids=None, assignee=None, role=None,
     if ids:
         if assignee or role or resource_group_name or scope or include_inherited:
             raise CLIError('When assignment ids are used, other parameter values are not required')
-        for i in ids:
-            assignments_client.delete_by_id(i)
+        deleted = [assignments_client.delete_by_id(i) for i in ids]
+        _invalidate_assignment_principals(cmd.cli_ctx, deleted)
         return
 
     scope = _build_role_scope(resource_group_name, scope,
@@ -427,10 +455,17 @@ def delete_role_assignments(cmd, ids=None, assignee=None, role=None,
     if assignments:
         for a in assignments:
             assignments_client.delete_by_id(a.id)
+        _invalidate_assignment_principals(cmd.cli_ctx, assignments)
     else:
         raise CLIError('No matched assignments were found to delete')
 
 
+def _invalidate_assignment_principals(cli_ctx, assignments):
+    worker = MultiAPIAdaptor(cli_ctx)
+    principal_ids = [worker.get_role_property(a, 'principal_id') for a in assignments if a]
+    invalidate_cached_values(cli_ctx, PRINCIPALS, [i for i in principal_ids if i])
+
+
 def _search_role_assignments(cli_ctx, assignments_client, definitions_client,
                              scope, assignee, role, include_inherited, include_groups):
     assignee_object_id = None
@@ -1517,14 +1552,20 @@ def _is_guid(guid):
     return False
 
 
-def _get_object_stubs(graph_client, assignees):
+def _get_object_stubs(graph_client, assignees, max_workers=1):
     from azure.graphrbac.models import GetObjectsParameters
-    result = []
     assignees = list(assignees)  # callers could pass in a set
-    for i in range(0, len(assignees), 1000):
-        params = GetObjectsParameters(include_directory_object_references=True, object_ids=assignees[i:i + 1000])
-        result += list(graph_client.objects.get_objects_by_object_ids(params))
-    return result
+
+    def _get_batch(batch):
+        params = GetObjectsParameters(include_directory_object_references=True, object_ids=batch)
+        return list(graph_client.objects.get_objects_by_object_ids(params))
+
+    batches = [assignees[i:i + 1000] for i in range(0, len(assignees), 1000)]
+    if max_workers > 1 and len(batches) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+            return list(itertools.chain.from_iterable(executor.map(_get_batch, batches)))
+    return list(itertools.chain.from_iterable(_get_batch(b) for b in batches))
 
 
 def _get_owner_url(cli_ctx, owner_object_id):
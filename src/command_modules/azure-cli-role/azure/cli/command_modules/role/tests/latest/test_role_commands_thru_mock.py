@@ -4,6 +4,7 @@
 # --------------------------------------------------------------------------------------------
 import json
 import os
+import shutil
 import tempfile
 import unittest
 import uuid
@@ -11,11 +12,13 @@ import mock
 
 from azure.cli.core.mock import DummyCli
 
-from azure.mgmt.authorization.models import RoleDefinition, RoleAssignmentCreateParameters
-from azure.graphrbac.models import (Application, ServicePrincipal, GraphErrorException,
+from azure.mgmt.authorization.models import RoleDefinition, RoleAssignment, RoleAssignmentCreateParameters
+from azure.graphrbac.models import (Application, ServicePrincipal, User, GraphErrorException,
                                     ApplicationUpdateParameters, GetObjectsParameters)
 from azure.cli.command_modules.role.custom import (create_role_definition,
                                                    update_role_definition,
+                                                   list_role_assignments,
+                                                   delete_role_assignments,
                                                    create_service_principal_for_rbac,
                                                    reset_service_principal_credential,
                                                    update_application, _try_x509_pem,
@@ -399,6 +402,58 @@ class TestRoleMocked(unittest.TestCase):
             args, _ = call
             self.assertEqual(args[0].object_ids, group)
 
+    def test_get_object_stubs_concurrently(self):
+        graph_client = mock.MagicMock()
+        graph_client.objects.get_objects_by_object_ids.side_effect = lambda params: params.object_ids[:1]
+
+        result = _get_object_stubs(graph_client, range(2500), max_workers=4)
+
+        self.assertEqual(graph_client.objects.get_objects_by_object_ids.call_count, 3)
+        self.assertEqual(result, [0, 1000, 2000])  # batch results are kept in order
+
+    @mock.patch('azure.cli.command_modules.role._cache._get_cache_path', autospec=True)
+    @mock.patch('azure.cli.command_modules.role.custom._graph_client_factory', autospec=True)
+    @mock.patch('azure.cli.command_modules.role.custom._auth_client_factory', autospec=True)
+    def test_list_role_assignments_caches_names(self, auth_client_mock, graph_client_mock, cache_path_mock):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        cache_path_mock.return_value = os.path.join(cache_dir, 'roleResolutionCache.json')
+        user_id = '11111111-2222-3333-4444-555555555555'
+        role_id = self.default_scope + '/providers/Microsoft.Authorization/roleDefinitions/role1'
+        assignment = RoleAssignment(scope=self.default_scope, role_definition_id=role_id, principal_id=user_id)
+        assignment.id = self.default_scope + '/providers/Microsoft.Authorization/roleAssignments/a1'
+        role_def = RoleDefinition(role_name='Reader')
+        role_def.id = role_id
+
+        faked_auth_client = mock.MagicMock()
+        auth_client_mock.return_value = faked_auth_client
+        faked_auth_client.role_definitions.config.subscription_id = self.subscription_id
+        faked_auth_client.role_assignments.list_for_scope.return_value = [assignment]
+        faked_auth_client.role_assignments.delete_by_id.return_value = assignment
+        faked_auth_client.role_definitions.list.return_value = [role_def]
+        user = User(display_name='John', user_principal_name='john@contoso.com')
+        user.object_id = user_id
+        graph_client_mock.return_value.objects.get_objects_by_object_ids.return_value = [user]
+        cmd = mock.MagicMock()
+        cmd.cli_ctx = DummyCli()
+
+        for _ in range(2):
+            result = list_role_assignments(cmd)
+            self.assertEqual(result[0]['principalName'], 'john@contoso.com')
+            self.assertEqual(result[0]['roleDefinitionName'], 'Reader')
+        # the second listing is served from the cache
+        self.assertEqual(faked_auth_client.role_definitions.list.call_count, 1)
+        self.assertEqual(graph_client_mock.return_value.objects.get_objects_by_object_ids.call_count, 1)
+
+        result = list_role_assignments(cmd, no_resolve=True)
+        self.assertNotIn('principalName', result[0])
+
+        # deleting an assignment through the CLI drops its principal from the cache
+        delete_role_assignments(cmd, ids=[assignment.id])
+        list_role_assignments(cmd)
+        self.assertEqual(graph_client_mock.return_value.objects.get_objects_by_object_ids.call_count, 2)
+        self.assertEqual(faked_auth_client.role_definitions.list.call_count, 1)
+
 
 class FakedError(object):  # pylint: disable=too-few-public-methods
     def __init__(self, message):
@@ -392,20 +392,21 @@ def cli_rules_update(instance,
 
 
 def cli_migration_start(client, resource_group_name, namespace_name, target_namespace, post_migration_name):
-    import time
+    from azure.cli.core.wait import wait_until, is_transient_error
 
     client.create_and_start_migration(resource_group_name, namespace_name, target_namespace, post_migration_name)
-    getresponse = client.get(resource_group_name, namespace_name)
+
+    def _get_migration():
+        return client.get(resource_group_name, namespace_name)
 
     # pool till Provisioning state is succeeded
-    while getresponse.provisioning_state != 'Succeeded':
-        time.sleep(30)
-        getresponse = client.get(resource_group_name, namespace_name)
+    migration = wait_until(_get_migration, lambda m: m.provisioning_state == 'Succeeded',
+                           interval=10, backoff=1.5, max_interval=30, jitter=0.1, retry_on=is_transient_error)
 
     # poll on the 'pendingReplicationOperationsCount' to be 0 or none
-    while getresponse.pending_replication_operations_count != 0 and getresponse.pending_replication_operations_count is not None:
-        time.sleep(30)
-        getresponse = client.get(resource_group_name, namespace_name)
+    if migration.pending_replication_operations_count:
+        wait_until(_get_migration, lambda m: not m.pending_replication_operations_count,
+                   interval=10, backoff=1.5, max_interval=30, jitter=0.1, retry_on=is_transient_error)
 
     return client.get(resource_group_name, namespace_name)
 
@@ -1551,28 +1551,26 @@ def _create_self_signed_key_vault_certificate(cli_ctx, vault_base_url, certifica
         vault_base_url, certificate_name, certificate_policy, cert_attrs, tags)
 
     # otherwise loop until the certificate creation is complete
-    while True:
-        check = client.get_certificate_operation(
-            vault_base_url, certificate_name)
-        if check.status != 'inProgress':
-            logger.info("Long-running operation 'keyvault certificate create' finished with result %s.",
-                        check)
-            break
+    from azure.cli.core.wait import wait_until, is_transient_error
+    try:
+        check = wait_until(lambda: client.get_certificate_operation(vault_base_url, certificate_name),
+                           lambda operation: operation.status != 'inProgress',
+                           interval=2, backoff=2, max_interval=10, retry_on=is_transient_error,
+                           message='Creating certificate')
+    except KeyboardInterrupt:
+        logger.info("Long-running operation wait cancelled.")
+        raise
+    except Exception as client_exception:
+        message = getattr(client_exception, 'message', client_exception)
+        import json
         try:
-            time.sleep(10)
-        except KeyboardInterrupt:
-            logger.info("Long-running operation wait cancelled.")
-            raise
-        except Exception as client_exception:
-            message = getattr(client_exception, 'message', client_exception)
-            import json
-            try:
-                message = str(message) + ' ' + json.loads(
-                    client_exception.response.text)['error']['details'][0]['message']   # pylint: disable=no-member
-            except:  # pylint: disable=bare-except
-                pass
-
-            raise CLIError('{}'.format(message))
+            message = str(message) + ' ' + json.loads(
+                client_exception.response.text)['error']['details'][0]['message']   # pylint: disable=no-member
+        except:  # pylint: disable=bare-except
+            pass
+
+        raise CLIError('{}'.format(message))
+    logger.info("Long-running operation 'keyvault certificate create' finished with result %s.", check)
 
     pem_output_folder = None
     if certificate_output_folder is not None:
@@ -3,8 +3,6 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-import json
-
 from knack.util import CLIError
 
 from azure.cli.core.commands.parameters import get_one_of_subscription_locations
@@ -29,60 +27,24 @@ def _get_thread_count():
     return 5  # don't increase too much till https://github.com/Azure/msrestazure-for-python/issues/6 is fixed
 
 
-def load_images_thru_services(cli_ctx, publisher, offer, sku, location):
-    from concurrent.futures import ThreadPoolExecutor, as_completed
-    all_images = []
-    client = _compute_client_factory(cli_ctx)
+def load_images_thru_services(cli_ctx, publisher, offer, sku, location, fuzzy=False, refresh=False):
+    from ._image_catalog import MarketplaceImageCatalog
     if location is None:
         location = get_one_of_subscription_locations(cli_ctx)
-
-    def _load_images_from_publisher(publisher):
-        offers = client.virtual_machine_images.list_offers(location, publisher)
-        if offer:
-            offers = [o for o in offers if _matched(offer, o.name)]
-        for o in offers:
-            skus = client.virtual_machine_images.list_skus(location, publisher, o.name)
-            if sku:
-                skus = [s for s in skus if _matched(sku, s.name)]
-            for s in skus:
-                images = client.virtual_machine_images.list(location, publisher, o.name, s.name)
-                for i in images:
-                    all_images.append({
-                        'publisher': publisher,
-                        'offer': o.name,
-                        'sku': s.name,
-                        'version': i.name})
-
-    publishers = client.virtual_machine_images.list_publishers(location)
-    if publisher:
-        publishers = [p for p in publishers if _matched(publisher, p.name)]
-
-    publisher_num = len(publishers)
-    if publisher_num > 1:
-        with ThreadPoolExecutor(max_workers=_get_thread_count()) as executor:
-            tasks = [executor.submit(_load_images_from_publisher, p.name) for p in publishers]
-            for t in as_completed(tasks):
-                t.result()  # don't use the result but expose exceptions from the threads
-    elif publisher_num == 1:
-        _load_images_from_publisher(publishers[0].name)
-
-    return all_images
+    catalog = MarketplaceImageCatalog(cli_ctx, location, refresh=refresh, max_parallel=_get_thread_count())
+    catalog.crawl(publisher, offer, sku, fuzzy=fuzzy)
+    return catalog.list_images(publisher, offer, sku, fuzzy=fuzzy)
 
 
-def load_images_from_aliases_doc(cli_ctx, publisher=None, offer=None, sku=None):
-    import requests
+def load_images_from_aliases_doc(cli_ctx, publisher=None, offer=None, sku=None, fuzzy=False):
     from azure.cli.core.cloud import CloudEndpointNotSetException
-    from azure.cli.core.util import should_disable_connection_verify
+    from ._image_catalog import get_alias_doc, name_matches
     try:
         target_url = cli_ctx.cloud.endpoints.vm_image_alias_doc
     except CloudEndpointNotSetException:
         raise CLIError("'endpoint_vm_image_alias_doc' isn't configured. Please invoke 'az cloud update' to configure "
                        "it or use '--all' to retrieve images from server")
-    # under hack mode(say through proxies with unsigned cert), opt out the cert verification
-    response = requests.get(target_url, verify=(not should_disable_connection_verify()))
-    if response.status_code != 200:
-        raise CLIError("Failed to retrieve image alias doc '{}'. Error: '{}'".format(target_url, response))
-    dic = json.loads(response.content.decode())
+    dic = get_alias_doc(cli_ctx, target_url)
     try:
         all_images = []
         result = (dic['outputs']['aliases']['value'])
@@ -96,9 +58,9 @@ def load_images_from_aliases_doc(cli_ctx, publisher=None, offer=None, sku=None):
                     'version': vv['version']
                 })
 
-        all_images = [i for i in all_images if (_matched(publisher, i['publisher']) and
-                                                _matched(offer, i['offer']) and
-                                                _matched(sku, i['sku']))]
+        all_images = [i for i in all_images if (name_matches(publisher, i['publisher'], fuzzy) and
+                                                name_matches(offer, i['offer'], fuzzy) and
+                                                name_matches(sku, i['sku'], fuzzy))]
         return all_images
     except KeyError:
         raise CLIError('Could not retrieve image list from {}'.format(target_url))
@@ -123,3 +123,23 @@ def transform_vm_encryption_show_table_output(result):
         return OrderedDict([("status", status_dict.get("displayStatus", "N/A")),
                             ("message", status_dict.get("message", "N/A"))])
     return result
+
+
+def transform_vmss_instance_summary(result):
+    from collections import OrderedDict
+    rows = []
+    for summary in result if isinstance(result, list) else [result]:
+        offending = summary['offendingInstances']
+        row = OrderedDict()
+        row['Name'] = summary['name']
+        row['ResourceGroup'] = summary['resourceGroup']
+        row['Instances'] = summary['instances']
+        row['Running'] = summary['powerStates'].get('running', 0)
+        row['NotRunning'] = len(offending['notRunning'])
+        row['ProvisioningFailed'] = len(offending['provisioningFailed'])
+        row['Provisioning'] = len(offending['provisioning'])
+        row['OutdatedModel'] = len(offending['outdatedModel'])
+        row['Unhealthy'] = len(offending['unhealthy'])
+        row['FailedExtensions'] = len(set(i for ids in offending['failedExtensions'].values() for i in ids))
+        rows.append(row)
+    return rows
@@ -307,6 +307,20 @@ helps['vmss get-instance-view'] = """
 
 """
 
+helps['vmss get-instance-summary'] = """
+    type: command
+    short-summary: Summarize the power, provisioning, model, extension and health states of the instances of scale sets.
+    long-summary: >
+        The instances are counted by power state, provisioning state, whether the latest model is applied, extension
+        status, health state, fault domain and update domain. The IDs of instances which are not running, failed or
+        are still provisioning, run an outdated model, are unhealthy or have failing extensions are listed.
+    examples:
+        - name: Summarize the instances of a scale set.
+          text: az vmss get-instance-summary -g MyResourceGroup -n MyScaleSet
+        - name: Summarize every scale set in a resource group, reading 8 of them at a time.
+          text: az vmss get-instance-summary -g MyResourceGroup --max-parallel 8 -o table
+"""
+
 helps['vmss list'] = """
     type: command
     short-summary: List VMSS.
@@ -809,6 +823,10 @@ helps['vm image list'] = """
     parameters:
         - name: --all
           short-summary: Retrieve image list from live Azure service rather using an offline image list
+          long-summary: >
+            The images are kept in a local catalog per location, which is used for a day before the matching
+            publishers, offers and SKUs are listed again. An interrupted listing continues where it stopped
+            when the command is run again.
         - name: --offer -f
           short-summary: Image offer name, partial name is accepted
         - name: --publisher -p
@@ -822,6 +840,8 @@ helps['vm image list'] = """
           text: az vm image list -f CentOS
         - name: List all CentOS images.
           text: az vm image list -f CentOS --all
+        - name: List all Ubuntu Server images, tolerating a typo in the offer name.
+          text: az vm image list -f UbuntuSevrer --fuzzy --all
 """
 
 helps['vm image list-offers'] = """
@@ -1161,10 +1181,15 @@ helps['vm list-vm-resize-options'] = """
 helps['vm list-skus'] = """
     type: command
     short-summary: Get details for compute-related resource SKUs.
-    long-summary: This command incorporates subscription level restriction, offering the most accurate information.
+    long-summary: >
+        This command incorporates subscription level restriction, offering the most accurate information.
+        The SKUs are kept in a local catalog per cloud and subscription, which is also used to validate the
+        sizes of `az vm create` and `az vmss create`, and is downloaded again after a day or with `--refresh`.
     examples:
         - name: List all SKUs in the West US region.
           text: az vm list-skus -l westus
+        - name: Refresh the local catalog and list the SKUs in the West US region.
+          text: az vm list-skus -l westus --refresh
         - name: List all available vm sizes in the East US2 region which support availability zone.
           text: az vm list-skus -l eastus2 --zone
         - name: List all available vm sizes in the East US2 region which support availability zone with name like "standard_ds1...".
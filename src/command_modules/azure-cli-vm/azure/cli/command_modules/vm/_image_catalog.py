@@ -0,0 +1,218 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Local copies of the VM image alias document and of the marketplace image tree.
+
+The alias document is kept in the config directory with its ETag. It is used without a request for
+`vm.image_catalog_ttl` seconds (1 day by default) and revalidated afterwards. When the document can't be
+downloaded the last copy is used, or for the public clouds the copy shipped with the module.
+
+The marketplace tree of a location (publisher -> offer -> SKU -> versions) is filled in as `az vm image list --all`
+needs it: only the branches matching the filters are listed, every node remembers when its children were listed
+and branches younger than the TTL are not listed again. The tree is saved periodically while crawling, so an
+interrupted crawl resumes where it stopped.
+"""
+
+import json
+import os
+import threading
+import time
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+logger = get_logger(__name__)
+
+IMAGE_ALIAS_DOC_FILE_NAME = 'vmImageAliasDoc.json'
+IMAGE_CATALOG_DIR_NAME = 'vmImageCatalog'
+DEFAULT_IMAGE_CATALOG_TTL = 86400
+BUNDLED_ALIAS_DOC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aliases.json')
+CHECKPOINT_INTERVAL = 5
+
+_lock = threading.Lock()
+
+
+def _get_cache_ttl(cli_ctx):
+    try:
+        return cli_ctx.config.getint('vm', 'image_catalog_ttl', fallback=DEFAULT_IMAGE_CATALOG_TTL)
+    except ValueError:
+        return DEFAULT_IMAGE_CATALOG_TTL
+
+
+def _load_json(file_path):
+    try:
+        with open(file_path) as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else None
+    except (OSError, IOError, ValueError):
+        return None
+
+
+def _save_json(file_path, data):
+    from azure.cli.core.util import write_json_atomic
+    try:
+        write_json_atomic(file_path, data)
+    except (OSError, IOError) as ex:
+        logger.debug("Unable to save '%s': %s", file_path, ex)
+
+
+def name_matches(pattern, name, fuzzy=False):
+    """ Whether a name contains the pattern, case insensitively. With fuzzy, a name or one of its '-', '_' or '.'
+    separated parts that is close to the pattern matches too, so that small typos are tolerated. """
+    import difflib
+    import re
+    if not pattern:
+        return True  # empty pattern means wildcard-match
+    pattern, name = pattern.lower(), name.lower()
+    if pattern in name:
+        return True
+    return bool(fuzzy and difflib.get_close_matches(pattern, [name] + re.split(r'[-_.]', name), n=1, cutoff=0.75))
+
+
+# region alias document
+def _is_public_alias_doc(url):
+    from azure.cli.core.cloud import AZURE_PUBLIC_CLOUD
+    return url == AZURE_PUBLIC_CLOUD.endpoints.vm_image_alias_doc
+
+
+def _download_alias_doc(url, etag=None):
+    """ Returns (status code, ETag, document). The document is None when the server answers 304. """
+    import requests
+    from azure.cli.core.util import should_disable_connection_verify
+    headers = {'If-None-Match': etag} if etag else {}
+    # under hack mode(say through proxies with unsigned cert), opt out the cert verification
+    response = requests.get(url, headers=headers, timeout=30, verify=(not should_disable_connection_verify()))
+    if response.status_code == 304:
+        return 304, etag, None
+    if response.status_code != 200:
+        raise CLIError("Failed to retrieve image alias doc '{}'. Error: '{}'".format(url, response))
+    return 200, response.headers.get('ETag'), json.loads(response.content.decode())
+
+
+def get_alias_doc(cli_ctx, url):
+    """ Returns the alias document at url from the local copy, revalidating it once it has expired. """
+    cache_path = os.path.join(cli_ctx.config.config_dir, IMAGE_ALIAS_DOC_FILE_NAME)
+    ttl = _get_cache_ttl(cli_ctx)
+    with _lock:
+        cached = _load_json(cache_path)
+        if cached and cached.get('url') != url:
+            cached = None
+        if cached and ttl > 0 and time.time() - cached.get('time', 0) < ttl:
+            return cached['doc']
+        try:
+            status, etag, doc = _download_alias_doc(url, cached.get('etag') if cached else None)
+        except Exception as ex:  # pylint: disable=broad-except
+            if cached:
+                logger.warning("Unable to refresh the image alias doc, using the copy from %s: %s",
+                               time.strftime('%Y-%m-%d', time.localtime(cached.get('time', 0))), ex)
+                return cached['doc']
+            if _is_public_alias_doc(url):
+                logger.warning("Unable to retrieve the image alias doc, using the copy shipped with the CLI: %s", ex)
+                with open(BUNDLED_ALIAS_DOC) as f:
+                    return json.load(f)
+            raise
+        if status == 304:
+            doc = cached['doc']
+        if ttl > 0:
+            _save_json(cache_path, {'url': url, 'etag': etag, 'time': time.time(), 'doc': doc})
+        return doc
+# endregion
+
+
+# region marketplace images
+class MarketplaceImageCatalog(object):
+    """ The partially crawled image tree of a location. Every node is a dict whose 'time' tells when its children
+    were listed; the children are under 'publishers', 'offers', 'skus' or, for SKUs, 'versions'. """
+
+    def __init__(self, cli_ctx, location, client=None, refresh=False, max_parallel=None):
+        from ._actions import _get_thread_count
+        self.cli_ctx = cli_ctx
+        self.location = location
+        self.refresh = refresh
+        self.max_parallel = max_parallel or _get_thread_count()
+        self.ttl = _get_cache_ttl(cli_ctx)
+        self.file_path = os.path.join(cli_ctx.config.config_dir, IMAGE_CATALOG_DIR_NAME,
+                                      '{}-{}.json'.format(cli_ctx.cloud.name, location).lower())
+        self.tree = (_load_json(self.file_path) if self.ttl > 0 else None) or {}
+        self._client = client
+        self._crawl_start = time.time()
+        self._last_save = time.time()
+        self._tree_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from ._client_factory import _compute_client_factory
+            self._client = _compute_client_factory(self.cli_ctx).virtual_machine_images
+        return self._client
+
+    def _is_fresh(self, node, key):
+        if key not in node:
+            return False
+        if self.refresh:
+            # listed by this run already, e.g. before resuming an interrupted branch
+            return node.get('time', 0) >= self._crawl_start
+        return self.ttl > 0 and time.time() - node.get('time', 0) < self.ttl
+
+    def _list_children(self, node, key, list_names, *args):
+        """ Lists the children of a node unless they are fresh. Known children keep their own subtrees. """
+        if not self._is_fresh(node, key):
+            names = [x.name for x in list_names(self.location, *args)]
+            with self._tree_lock:
+                known = node.get(key, {})
+                node[key] = {n: known.get(n, {}) for n in names}
+                node['time'] = time.time()
+        return node[key]
+
+    def _crawl_publisher(self, publisher, node, offer, sku, fuzzy):
+        offers = self._list_children(node, 'offers', self.client.list_offers, publisher)
+        for offer_name, offer_node in list(offers.items()):
+            if not name_matches(offer, offer_name, fuzzy):
+                continue
+            skus = self._list_children(offer_node, 'skus', self.client.list_skus, publisher, offer_name)
+            for sku_name, sku_node in list(skus.items()):
+                if name_matches(sku, sku_name, fuzzy):
+                    self._list_children(sku_node, 'versions', self.client.list, publisher, offer_name, sku_name)
+        self._checkpoint()
+
+    def _checkpoint(self, force=False):
+        if self.ttl <= 0:
+            return
+        with self._tree_lock:
+            if force or time.time() - self._last_save >= CHECKPOINT_INTERVAL:
+                _save_json(self.file_path, self.tree)
+                self._last_save = time.time()
+
+    def crawl(self, publisher=None, offer=None, sku=None, fuzzy=False):
+        """ Lists the parts of the tree matching the filters which are missing or have expired. """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        publishers = self._list_children(self.tree, 'publishers', self.client.list_publishers)
+        matched = [(name, node) for name, node in publishers.items() if name_matches(publisher, name, fuzzy)]
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+                tasks = [executor.submit(self._crawl_publisher, name, node, offer, sku, fuzzy)
+                         for name, node in matched]
+                for t in as_completed(tasks):
+                    t.result()  # don't use the result but expose exceptions from the threads
+        finally:
+            # whatever was listed is kept, so that running the command again resumes the crawl
+            self._checkpoint(force=True)
+
+    def list_images(self, publisher=None, offer=None, sku=None, fuzzy=False):
+        """ Returns the images of the local tree matching the filters, without any request. """
+        images = []
+        for publisher_name, publisher_node in sorted(self.tree.get('publishers', {}).items()):
+            if not name_matches(publisher, publisher_name, fuzzy):
+                continue
+            for offer_name, offer_node in sorted(publisher_node.get('offers', {}).items()):
+                if not name_matches(offer, offer_name, fuzzy):
+                    continue
+                for sku_name, sku_node in sorted(offer_node.get('skus', {}).items()):
+                    if not name_matches(sku, sku_name, fuzzy):
+                        continue
+                    images.extend({'publisher': publisher_name, 'offer': offer_name, 'sku': sku_name,
+                                   'version': v} for v in sku_node.get('versions', {}))
+        return images
+# endregion
@@ -228,6 +228,8 @@ def load_arguments(self, _):
 
     with self.argument_context('vm image list') as c:
         c.argument('image_location', get_location_type(self.cli_ctx))
+        c.argument('fuzzy', arg_type=get_three_state_flag(), help='Also match names close to the given publisher, offer or sku names, tolerating typos.')
+        c.argument('refresh', arg_type=get_three_state_flag(), help="With '--all', list the matching images from the service again instead of reading the local image catalog.")
 
     with self.argument_context('vm image show') as c:
         c.argument('skus', options_list=['--sku', '-s'])
@@ -269,6 +271,8 @@ def load_arguments(self, _):
         c.argument('show_all', options_list=['--all'], arg_type=get_three_state_flag(),
                    help="show all information including vm sizes not available under the current subscription")
         c.argument('resource_type', options_list=['--resource-type', '-r'], help='resource types e.g. "availabilitySets", "snapshots", "disk", etc')
+        c.argument('refresh', arg_type=get_three_state_flag(),
+                   help="download the SKUs again instead of reading the local catalog, which is kept for the number of seconds given by the 'vm.sku_cache_ttl' configuration setting (default 86400, 0 disables it)")
 
     with self.argument_context('vm restart') as c:
         c.argument('force', action='store_true', help='Force the VM to restart by redeploying it. Use if the VM is unresponsive.')
@@ -291,6 +295,11 @@ def load_arguments(self, _):
             for dest in scaleset_name_aliases:
                 c.argument(dest, vmss_name_type, id_part=None)  # due to instance-ids parameter
 
+    with self.argument_context('vmss get-instance-summary') as c:
+        c.argument('vm_scale_set_names', options_list=['--name', '-n'], nargs='+', id_part=None,
+                   help='Space-separated names or IDs of scale sets. If omitted, every scale set in the resource group, or in the subscription without --resource-group, is summarized.')
+        c.argument('max_parallel', type=int, help='The maximum number of scale sets whose instances are read at the same time.')
+
     with self.argument_context('vmss create') as c:
         VMPriorityTypes = self.get_models('VirtualMachinePriorityTypes', resource_type=ResourceType.MGMT_COMPUTE)
         VirtualMachineEvictionPolicyTypes = self.get_models('VirtualMachineEvictionPolicyTypes', resource_type=ResourceType.MGMT_COMPUTE)
@@ -0,0 +1,153 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Local catalog of the compute resource SKUs available to a subscription.
+
+The catalog is the `resource_skus.list()` response of one cloud and subscription, stored once per SKU together
+with an index of location -> resource type -> name -> positions, so the VM and VMSS create validators and the
+filters of `az vm list-skus` find a size without downloading and scanning every SKU. It expires after
+`vm.sku_cache_ttl` seconds (1 day by default, 0 disables it) and is refreshed by `az vm list-skus --refresh`
+or after a deployment is rejected because a size is not available.
+"""
+
+import json
+import os
+import threading
+import time
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+SKU_CATALOG_DIR_NAME = 'skuCatalog'
+DEFAULT_SKU_CACHE_TTL = 86400
+
+_lock = threading.Lock()
+
+
+def _get_catalog_path(cli_ctx):
+    from azure.cli.core.commands.client_factory import get_subscription_id
+    file_name = '{}-{}.json'.format(cli_ctx.cloud.name, get_subscription_id(cli_ctx)).lower()
+    return os.path.join(cli_ctx.config.config_dir, SKU_CATALOG_DIR_NAME, file_name)
+
+
+def _get_cache_ttl(cli_ctx):
+    try:
+        return cli_ctx.config.getint('vm', 'sku_cache_ttl', fallback=DEFAULT_SKU_CACHE_TTL)
+    except ValueError:
+        return DEFAULT_SKU_CACHE_TTL
+
+
+def _download_skus(cli_ctx):
+    from ._client_factory import _compute_client_factory
+    return list(_compute_client_factory(cli_ctx).resource_skus.list())
+
+
+def build_sku_catalog(skus):
+    """ Returns the serialized SKUs with their index. A name can occur more than once in a location, e.g. the disk
+    SKUs of every size, so the index maps it to a list of positions. """
+    catalog = {'time': time.time(), 'skus': [], 'index': {}}
+    for position, sku in enumerate(skus):
+        data = sku.serialize(keep_readonly=True)
+        catalog['skus'].append(data)
+        resource_type = (data.get('resourceType') or '').lower()
+        name = (data.get('name') or '').lower()
+        for location in data.get('locations') or []:
+            by_type = catalog['index'].setdefault(location.lower(), {})
+            by_type.setdefault(resource_type, {}).setdefault(name, []).append(position)
+    return catalog
+
+
+def _load_catalog(cli_ctx, ttl):
+    try:
+        with open(_get_catalog_path(cli_ctx)) as f:
+            catalog = json.load(f)
+    except (OSError, IOError, ValueError):
+        return None
+    if not isinstance(catalog, dict) or time.time() - catalog.get('time', 0) >= ttl:
+        return None
+    return catalog
+
+
+def _save_catalog(cli_ctx, catalog):
+    from azure.cli.core.util import write_json_atomic
+    try:
+        write_json_atomic(_get_catalog_path(cli_ctx), catalog)
+    except (OSError, IOError) as ex:
+        logger.debug("Unable to save the SKU catalog: %s", ex)
+
+
+def get_sku_catalog(cli_ctx, refresh=False):
+    """ Returns the catalog of the current subscription, downloading it if it is missing, expired or refresh is
+    requested. """
+    ttl = _get_cache_ttl(cli_ctx)
+    with _lock:
+        catalog = None if refresh or ttl <= 0 else _load_catalog(cli_ctx, ttl)
+        if catalog is None:
+            logger.info("Downloading the resource SKUs of the subscription")
+            catalog = build_sku_catalog(_download_skus(cli_ctx))
+            if ttl > 0:
+                _save_catalog(cli_ctx, catalog)
+    return catalog
+
+
+def invalidate_sku_catalog(cli_ctx):
+    with _lock:
+        try:
+            os.remove(_get_catalog_path(cli_ctx))
+        except (OSError, IOError):
+            pass
+
+
+def _deserialize(cli_ctx, catalog, positions):
+    from azure.cli.core.profiles import get_sdk, ResourceType
+    ResourceSku = get_sdk(cli_ctx, ResourceType.MGMT_COMPUTE, 'ResourceSku', mod='models',
+                          operation_group='resource_skus')
+    return [ResourceSku.deserialize(catalog['skus'][p]) for p in positions]
+
+
+def list_cached_skus(cli_ctx, location=None, resource_type=None, refresh=False):
+    """ Returns the SKUs offered in a location, or everywhere, optionally of one resource type only. """
+    catalog = get_sku_catalog(cli_ctx, refresh=refresh)
+    if not location:
+        resource_type = resource_type.lower() if resource_type else None
+        positions = [p for p, data in enumerate(catalog['skus'])
+                     if not resource_type or (data.get('resourceType') or '').lower() == resource_type]
+    else:
+        by_type = catalog['index'].get(location.lower(), {})
+        types = [resource_type.lower()] if resource_type else list(by_type)
+        positions = sorted(p for t in types for ps in by_type.get(t, {}).values() for p in ps)
+    return _deserialize(cli_ctx, catalog, positions)
+
+
+def find_cached_sku(cli_ctx, location, resource_type, name):
+    """ Returns the SKU of a resource type with the given name in a location, or None. """
+    catalog = get_sku_catalog(cli_ctx)
+    positions = catalog['index'].get(location.lower(), {}).get(resource_type.lower(), {}).get(name.lower())
+    return _deserialize(cli_ctx, catalog, positions[:1])[0] if positions else None
+
+
+def is_sku_not_available_error(ex):
+    inner_error = getattr(getattr(ex, 'inner_exception', None), 'error', None)
+    text = ' '.join(str(x) for x in [ex, getattr(inner_error, 'code', None), getattr(inner_error, 'message', None)])
+    return 'SkuNotAvailable' in text
+
+
+def get_sku_aware_exception_handler(cli_ctx):
+    """ Returns an exception handler for template based create commands which refreshes the SKU catalog when ARM
+    rejects a size as not available, since the catalog may still list it. """
+    from azure.cli.core.commands.arm import handle_template_based_exception
+
+    def _handler(ex):
+        if is_sku_not_available_error(ex) and _get_cache_ttl(cli_ctx) > 0:
+            try:
+                get_sku_catalog(cli_ctx, refresh=True)
+                logger.warning("The requested size is not available. The local SKU catalog has been refreshed; "
+                               "run 'az vm list-skus' to find the sizes offered in the location.")
+            except Exception as refresh_ex:  # pylint: disable=broad-except
+                logger.debug("Unable to refresh the SKU catalog: %s", refresh_ex)
+                invalidate_sku_catalog(cli_ctx)
+        handle_template_based_exception(ex)
+    return _handler
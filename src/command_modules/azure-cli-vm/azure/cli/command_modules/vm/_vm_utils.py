@@ -114,17 +114,9 @@ def get_key_vault_base_url(cli_ctx, vault_name):
     return 'https://{}{}'.format(vault_name, suffix)
 
 
-def list_sku_info(cli_ctx, location=None):
-    from ._client_factory import _compute_client_factory
-
-    def _match_location(l, locations):
-        return next((x for x in locations if x.lower() == l.lower()), None)
-
-    client = _compute_client_factory(cli_ctx)
-    result = client.resource_skus.list()
-    if location:
-        result = [r for r in result if _match_location(location, r.locations)]
-    return result
+def list_sku_info(cli_ctx, location=None, resource_type=None, refresh=False):
+    from ._sku_cache import list_cached_skus
+    return list_cached_skus(cli_ctx, location, resource_type=resource_type, refresh=refresh)
 
 
 def normalize_disk_info(image_data_disks_num=0,
@@ -0,0 +1,153 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Summaries of the instances of scale sets.
+
+The instances are read page by page with their instance views and folded into counters as they arrive, so a
+summary needs memory for the counters and the IDs of the offending instances only, however large the scale set.
+"""
+
+from collections import OrderedDict
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+logger = get_logger(__name__)
+
+_SUCCEEDED = 'succeeded'
+_RUNNING = 'running'
+_HEALTHY = 'healthy'
+
+
+def _get_status(statuses, prefix):
+    """ Returns the part after the prefix of the first status code starting with it, e.g. 'running' for
+    'PowerState/running'. """
+    code = next((s.code for s in statuses or [] if s.code and s.code.startswith(prefix)), None)
+    return code[len(prefix):] if code else None
+
+
+def _increment(counters, key):
+    key = 'unknown' if key is None else str(key)
+    counters[key] = counters.get(key, 0) + 1
+
+
+class VmssInstanceSummary(object):  # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, resource_group_name, vm_scale_set_name):
+        self.resource_group_name = resource_group_name
+        self.vm_scale_set_name = vm_scale_set_name
+        self.instances = 0
+        self.power_states = {}
+        self.provisioning_states = {}
+        self.latest_model_applied = {}
+        self.health_states = {}
+        self.extensions = {}
+        self.fault_domains = {}
+        self.update_domains = {}
+        self.not_running = []
+        self.provisioning_failed = []
+        self.provisioning = []
+        self.outdated_model = []
+        self.unhealthy = []
+        self.failed_extensions = {}
+
+    def add(self, vm):
+        """ Folds an instance, listed with its instance view, into the summary. """
+        instance_id = vm.instance_id
+        view = vm.instance_view
+        self.instances += 1
+
+        power_state = _get_status(view.statuses if view else None, 'PowerState/')
+        _increment(self.power_states, power_state)
+        if power_state != _RUNNING:
+            self.not_running.append(instance_id)
+
+        provisioning_state = vm.provisioning_state
+        _increment(self.provisioning_states, provisioning_state)
+        if provisioning_state and provisioning_state.lower() == 'failed':
+            self.provisioning_failed.append(instance_id)
+        elif provisioning_state and provisioning_state.lower() != _SUCCEEDED:
+            self.provisioning.append(instance_id)
+
+        _increment(self.latest_model_applied, vm.latest_model_applied)
+        if vm.latest_model_applied is False:
+            self.outdated_model.append(instance_id)
+
+        if view is None:
+            return
+        _increment(self.fault_domains, view.platform_fault_domain)
+        _increment(self.update_domains, view.platform_update_domain)
+
+        vm_health = getattr(view, 'vm_health', None)
+        if vm_health is not None:
+            health_state = _get_status([vm_health.status] if vm_health.status else None, 'HealthState/')
+            _increment(self.health_states, health_state)
+            if health_state != _HEALTHY:
+                self.unhealthy.append(instance_id)
+
+        for extension in view.extensions or []:
+            state = _get_status(extension.statuses, 'ProvisioningState/')
+            _increment(self.extensions.setdefault(extension.name, {}), state)
+            failed = any(s.level and str(getattr(s.level, 'value', s.level)).lower() == 'error'
+                         for s in extension.statuses or [])
+            if failed or (state and state.lower() == 'failed'):
+                self.failed_extensions.setdefault(extension.name, []).append(instance_id)
+
+    def result(self):
+        def _sorted(counters):
+            return OrderedDict(sorted(counters.items()))
+
+        def _ids(instance_ids):
+            return sorted(instance_ids, key=lambda i: (len(i or ''), i))
+
+        result = OrderedDict([
+            ('name', self.vm_scale_set_name),
+            ('resourceGroup', self.resource_group_name),
+            ('instances', self.instances),
+            ('powerStates', _sorted(self.power_states)),
+            ('provisioningStates', _sorted(self.provisioning_states)),
+            ('latestModelApplied', _sorted(self.latest_model_applied)),
+            ('healthStates', _sorted(self.health_states)),
+            ('extensions', OrderedDict((n, _sorted(c)) for n, c in sorted(self.extensions.items()))),
+            ('faultDomains', _sorted(self.fault_domains)),
+            ('updateDomains', _sorted(self.update_domains)),
+            ('offendingInstances', OrderedDict([
+                ('notRunning', _ids(self.not_running)),
+                ('provisioningFailed', _ids(self.provisioning_failed)),
+                ('provisioning', _ids(self.provisioning)),
+                ('outdatedModel', _ids(self.outdated_model)),
+                ('unhealthy', _ids(self.unhealthy)),
+                ('failedExtensions', OrderedDict((n, _ids(i)) for n, i in sorted(self.failed_extensions.items())))
+            ]))
+        ])
+        return result
+
+
+def summarize_vmss_instances(client, resource_group_name, vm_scale_set_name):
+    summary = VmssInstanceSummary(resource_group_name, vm_scale_set_name)
+    for vm in client.virtual_machine_scale_set_vms.list(resource_group_name, vm_scale_set_name,
+                                                        expand='instanceView'):
+        summary.add(vm)
+    return summary.result()
+
+
+def summarize_many_vmss_instances(client, scale_sets, max_parallel=4):
+    """ Summarizes the (resource group, name) pairs of scale_sets, reading up to max_parallel of them at once.
+    Scale sets which fail are reported and skipped unless every one of them fails. """
+    from concurrent.futures import ThreadPoolExecutor
+    if max_parallel < 1:
+        raise CLIError('--max-parallel must be greater than 0.')
+    results, errors = [], []
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        futures = [((rg, name), executor.submit(summarize_vmss_instances, client, rg, name)) for rg, name in scale_sets]
+        for (rg, name), future in futures:
+            try:
+                results.append(future.result())
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.warning("Failed to summarize the instances of scale set '%s' in '%s': %s", name, rg, ex)
+                errors.append(ex)
+    if errors and not results:
+        raise errors[0]
+    return results
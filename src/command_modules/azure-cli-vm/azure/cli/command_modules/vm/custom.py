@@ -716,14 +716,12 @@ def get_vm_details(cmd, resource_group_name, vm_name):
     return result
 
 
-def list_skus(cmd, location=None, size=None, zone=None, show_all=None, resource_type=None):
+def list_skus(cmd, location=None, size=None, zone=None, show_all=None, resource_type=None, refresh=None):
     from ._vm_utils import list_sku_info
-    result = list_sku_info(cmd.cli_ctx, location)
+    result = list_sku_info(cmd.cli_ctx, location, resource_type=resource_type, refresh=refresh)
     if not show_all:
         result = [x for x in result if not [y for y in (x.restrictions or [])
                                             if y.reason_code == 'NotAvailableForSubscription']]
-    if resource_type:
-        result = [x for x in result if x.resource_type.lower() == resource_type.lower()]
     if size:
         result = [x for x in result if x.resource_type == 'virtualMachines' and size.lower() in x.name.lower()]
     if zone:
@@ -1306,17 +1304,18 @@ def remove_vm_identity(cmd, resource_group_name, vm_name, identities=None):
 
 # region VirtualMachines Images
 def list_vm_images(cmd, image_location=None, publisher_name=None, offer=None, sku=None,
-                   all=False):  # pylint: disable=redefined-builtin
+                   all=False, fuzzy=None, refresh=None):  # pylint: disable=redefined-builtin
     load_thru_services = all
 
     if load_thru_services:
         if not publisher_name and not offer and not sku:
-            logger.warning("You are retrieving all the images from server which could take more than a minute. "
-                           "To shorten the wait, provide '--publisher', '--offer' or '--sku'. Partial name search "
-                           "is supported.")
-        all_images = load_images_thru_services(cmd.cli_ctx, publisher_name, offer, sku, image_location)
+            logger.warning("You are retrieving all the images which could take several minutes unless they are "
+                           "in the local image catalog. To shorten the wait, provide '--publisher', '--offer' or "
+                           "'--sku'. Partial name search is supported.")
+        all_images = load_images_thru_services(cmd.cli_ctx, publisher_name, offer, sku, image_location,
+                                               fuzzy=fuzzy, refresh=refresh)
     else:
-        all_images = load_images_from_aliases_doc(cmd.cli_ctx, publisher_name, offer, sku)
+        all_images = load_images_from_aliases_doc(cmd.cli_ctx, publisher_name, offer, sku, fuzzy=fuzzy)
         logger.warning(
             'You are viewing an offline list of images, use --all to retrieve an up-to-date list')
 
@@ -2148,6 +2147,25 @@ def get_vmss_instance_view(cmd, resource_group_name, vm_scale_set_name, instance
     return client.virtual_machine_scale_sets.get_instance_view(resource_group_name, vm_scale_set_name)
 
 
+def get_vmss_instance_summary(cmd, resource_group_name=None, vm_scale_set_names=None, max_parallel=4):
+    from msrestazure.tools import is_valid_resource_id, parse_resource_id
+    from ._vmss_summary import summarize_many_vmss_instances
+    scale_sets = []
+    for name in vm_scale_set_names or []:
+        if is_valid_resource_id(name):
+            parts = parse_resource_id(name)
+            scale_sets.append((parts['resource_group'], parts['name']))
+        elif resource_group_name:
+            scale_sets.append((resource_group_name, name))
+        else:
+            raise CLIError('usage error: --resource-group is required for scale set names which are not IDs.')
+    if not vm_scale_set_names:
+        scale_sets = [(parse_resource_id(v.id)['resource_group'], v.name)
+                      for v in list_vmss(cmd, resource_group_name)]
+    result = summarize_many_vmss_instances(_compute_client_factory(cmd.cli_ctx), scale_sets, max_parallel)
+    return result[0] if vm_scale_set_names and len(vm_scale_set_names) == 1 else result
+
+
 def list_vmss(cmd, resource_group_name=None):
     client = _compute_client_factory(cmd.cli_ctx)
     if resource_group_name:
@@ -3,6 +3,7 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import os
 import unittest
 import mock
 
@@ -444,6 +445,119 @@ class TestVMBootLog(unittest.TestCase):
             get_sdk_mock.assert_called_with(cli_ctx_mock, ResourceType.DATA_STORAGE, 'blob.blockblobservice#BlockBlobService')
 
 
+class TestSkuCatalog(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        import shutil
+        self.cli_ctx = DummyCli()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        ResourceSku = get_sdk(self.cli_ctx, ResourceType.MGMT_COMPUTE, 'ResourceSku', mod='models',
+                              operation_group='resource_skus')
+        self.skus = [ResourceSku.deserialize(s) for s in [
+            {'resourceType': 'virtualMachines', 'name': 'Standard_DS1_v2', 'locations': ['eastus2'],
+             'locationInfo': [{'location': 'eastus2', 'zones': ['1', '2']}]},
+            {'resourceType': 'virtualMachines', 'name': 'Standard_A0', 'locations': ['westus'],
+             'restrictions': [{'type': 'Location', 'values': ['westus'], 'reasonCode': 'NotAvailableForSubscription'}]},
+            {'resourceType': 'disks', 'name': 'Premium_LRS', 'size': 'P4', 'locations': ['westus']},
+            {'resourceType': 'disks', 'name': 'Premium_LRS', 'size': 'P6', 'locations': ['westus']}]]
+        patcher = mock.patch('azure.cli.command_modules.vm._sku_cache._get_catalog_path',
+                             return_value=os.path.join(self.temp_dir, 'catalog.json'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('azure.cli.command_modules.vm._sku_cache._download_skus', return_value=self.skus)
+        self.download_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sku_catalog_lookups_use_index(self):
+        from azure.cli.command_modules.vm._sku_cache import find_cached_sku, list_cached_skus
+        sku = find_cached_sku(self.cli_ctx, 'EastUS2', 'virtualmachines', 'standard_ds1_v2')
+        self.assertEqual(sku.name, 'Standard_DS1_v2')
+        self.assertEqual(sku.location_info[0].zones, ['1', '2'])
+        self.assertIsNone(find_cached_sku(self.cli_ctx, 'westus', 'virtualMachines', 'Standard_DS1_v2'))
+        self.assertEqual([s.size for s in list_cached_skus(self.cli_ctx, 'westus', resource_type='Disks')],
+                         ['P4', 'P6'])
+        self.assertEqual(len(list_cached_skus(self.cli_ctx)), 4)
+        self.assertEqual(self.download_mock.call_count, 1)
+
+        list_cached_skus(self.cli_ctx, refresh=True)
+        self.assertEqual(self.download_mock.call_count, 2)
+
+    def test_sku_catalog_expires(self):
+        import json
+        from azure.cli.command_modules.vm._sku_cache import get_sku_catalog, DEFAULT_SKU_CACHE_TTL
+        catalog = get_sku_catalog(self.cli_ctx)
+        catalog['time'] -= DEFAULT_SKU_CACHE_TTL
+        with open(os.path.join(self.temp_dir, 'catalog.json'), 'w') as f:
+            json.dump(catalog, f)
+        get_sku_catalog(self.cli_ctx)
+        self.assertEqual(self.download_mock.call_count, 2)
+
+    def test_sku_not_available_refreshes_catalog(self):
+        from azure.cli.command_modules.vm._sku_cache import get_sku_catalog, get_sku_aware_exception_handler
+        get_sku_catalog(self.cli_ctx)
+        handler = get_sku_aware_exception_handler(self.cli_ctx)
+        with self.assertRaises(CLIError):
+            handler(Exception("The requested size for resource 'vm1' is currently not available. (SkuNotAvailable)"))
+        self.assertEqual(self.download_mock.call_count, 2)
+        with self.assertRaises(CLIError):
+            handler(Exception('Quota exceeded'))
+        self.assertEqual(self.download_mock.call_count, 2)
+
+
+class TestVmssInstanceSummary(unittest.TestCase):
+
+    @staticmethod
+    def _vm(instance_id, power_state='running', provisioning_state='Succeeded', latest=True, fault_domain=0,
+            health='healthy', extension_state='succeeded'):
+        status = mock.MagicMock(code='PowerState/' + power_state)
+        extension = mock.MagicMock(statuses=[mock.MagicMock(code='ProvisioningState/' + extension_state,
+                                                            level='Error' if extension_state == 'failed' else 'Info')])
+        extension.name = 'CustomScript'
+        view = mock.MagicMock(statuses=[mock.MagicMock(code='ProvisioningState/succeeded'), status],
+                              platform_fault_domain=fault_domain, platform_update_domain=fault_domain,
+                              extensions=[extension])
+        view.vm_health.status.code = 'HealthState/' + health
+        return mock.MagicMock(instance_id=instance_id, instance_view=view, provisioning_state=provisioning_state,
+                              latest_model_applied=latest)
+
+    def test_vmss_instance_summary_counts_and_offenders(self):
+        from azure.cli.command_modules.vm._vmss_summary import summarize_many_vmss_instances
+        client = mock.MagicMock()
+        vms = [self._vm('0'), self._vm('10', power_state='stopped', fault_domain=1),
+               self._vm('2', provisioning_state='Updating', latest=False), self._vm('3', health='unhealthy'),
+               self._vm('4', provisioning_state='Failed', extension_state='failed', fault_domain=1)]
+
+        def _list(resource_group_name, vm_scale_set_name, expand):
+            self.assertEqual(expand, 'instanceView')
+            if vm_scale_set_name == 'broken':
+                raise CLIError('not found')
+            return iter(vms)
+
+        client.virtual_machine_scale_set_vms.list.side_effect = _list
+        result = summarize_many_vmss_instances(client, [('rg', 'vmss1'), ('rg', 'broken')], max_parallel=2)
+
+        self.assertEqual(len(result), 1)
+        summary = result[0]
+        self.assertEqual(summary['instances'], 5)
+        self.assertEqual(summary['powerStates'], {'running': 4, 'stopped': 1})
+        self.assertEqual(summary['provisioningStates'], {'Failed': 1, 'Succeeded': 3, 'Updating': 1})
+        self.assertEqual(summary['latestModelApplied'], {'False': 1, 'True': 4})
+        self.assertEqual(summary['faultDomains'], {'0': 3, '1': 2})
+        self.assertEqual(summary['extensions'], {'CustomScript': {'failed': 1, 'succeeded': 4}})
+        offending = summary['offendingInstances']
+        self.assertEqual(offending['notRunning'], ['10'])
+        self.assertEqual(offending['provisioningFailed'], ['4'])
+        self.assertEqual(offending['provisioning'], ['2'])
+        self.assertEqual(offending['outdatedModel'], ['2'])
+        self.assertEqual(offending['unhealthy'], ['3'])
+        self.assertEqual(offending['failedExtensions'], {'CustomScript': ['4']})
+
+        with self.assertRaises(CLIError):
+            summarize_many_vmss_instances(client, [('rg', 'broken')])
+
+
 class FakedVM(object):  # pylint: disable=too-few-public-methods
     def __init__(self, nics=None, disks=None, os_disk=None):
         self.network_profile = NetworkProfile(network_interfaces=nics)
@@ -4,6 +4,7 @@
 # --------------------------------------------------------------------------------------------
 
 import os.path
+import time
 import unittest
 import mock
 
@@ -26,19 +27,27 @@ def _get_test_cmd():
     return cmd
 
 
+def _load_test_alias_doc():
+    import json
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aliases.json')
+    with open(file_path, 'r') as test_file:
+        return json.load(test_file)
+
+
 class TestVMImage(unittest.TestCase):
-    @mock.patch('azure.cli.command_modules.vm.custom.urlopen', autospec=True)
-    def test_read_images_from_alias_doc(self, mock_urlopen):
+
+    def setUp(self):
+        import tempfile
+        import shutil
+        self.config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.config_dir)
+
+    @mock.patch('azure.cli.command_modules.vm._image_catalog._download_alias_doc', autospec=True)
+    def test_read_images_from_alias_doc(self, mock_download):
         from azure.cli.command_modules.vm.custom import list_vm_images
         cmd = _get_test_cmd()
-        file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
-                                 'aliases.json')
-        with open(file_path, 'r') as test_file:
-            test_data = test_file.read().encode()
-
-        mock_read = mock.MagicMock()
-        mock_read.read.return_value = test_data
-        mock_urlopen.return_value = mock_read
+        cmd.cli_ctx.config.config_dir = self.config_dir
+        mock_download.return_value = (200, '"1"', _load_test_alias_doc())
 
         # action
         images = list_vm_images(cmd)
@@ -69,6 +78,77 @@ class TestVMImage(unittest.TestCase):
         with self.assertRaises(CLIError):
             load_images_from_aliases_doc(cli_ctx)
 
+    @mock.patch('azure.cli.command_modules.vm._image_catalog._download_alias_doc', autospec=True)
+    def test_alias_doc_is_revalidated_with_etag(self, mock_download):
+        from azure.cli.command_modules.vm._image_catalog import get_alias_doc, DEFAULT_IMAGE_CATALOG_TTL
+        cli_ctx = DummyCli()
+        cli_ctx.config.config_dir = self.config_dir
+        doc = _load_test_alias_doc()
+        mock_download.return_value = (200, '"1"', doc)
+        self.assertEqual(get_alias_doc(cli_ctx, 'https://aliases'), doc)
+        self.assertEqual(get_alias_doc(cli_ctx, 'https://aliases'), doc)
+        mock_download.assert_called_once_with('https://aliases', None)
+
+        # once expired, the local copy is revalidated and kept when the server answers 304
+        with mock.patch('time.time', return_value=time.time() + DEFAULT_IMAGE_CATALOG_TTL):
+            mock_download.return_value = (304, '"1"', None)
+            self.assertEqual(get_alias_doc(cli_ctx, 'https://aliases'), doc)
+            mock_download.assert_called_with('https://aliases', '"1"')
+
+            # or used as is when the server can't be reached
+            mock_download.side_effect = IOError('offline')
+            self.assertEqual(get_alias_doc(cli_ctx, 'https://aliases'), doc)
+
+    @mock.patch('azure.cli.command_modules.vm._image_catalog._download_alias_doc', autospec=True)
+    def test_alias_doc_falls_back_to_bundled_copy(self, mock_download):
+        from azure.cli.core.cloud import AZURE_PUBLIC_CLOUD
+        from azure.cli.command_modules.vm._image_catalog import get_alias_doc
+        cli_ctx = DummyCli()
+        cli_ctx.config.config_dir = self.config_dir
+        mock_download.side_effect = IOError('offline')
+        doc = get_alias_doc(cli_ctx, AZURE_PUBLIC_CLOUD.endpoints.vm_image_alias_doc)
+        self.assertIn('UbuntuLTS', doc['outputs']['aliases']['value']['Linux'])
+        with self.assertRaises(IOError):
+            get_alias_doc(cli_ctx, 'https://private.cloud/aliases.json')
+
+    def test_image_catalog_crawls_matching_branches_and_resumes(self):
+        from azure.cli.command_modules.vm._image_catalog import MarketplaceImageCatalog
+
+        def _names(*names):
+            from collections import namedtuple
+            return [namedtuple('Resource', 'name')(n) for n in names]
+
+        client = mock.MagicMock()
+        client.list_publishers.return_value = _names('Canonical', 'OpenLogic')
+        client.list_offers.side_effect = lambda location, publisher: _names(*{
+            'Canonical': ['UbuntuServer'], 'OpenLogic': ['CentOS']}[publisher])
+        client.list_skus.side_effect = lambda location, publisher, offer: _names(*{
+            'UbuntuServer': ['16.04-LTS', '18.04-LTS'], 'CentOS': ['7.5']}[offer])
+        client.list.side_effect = lambda location, publisher, offer, sku: _names('1.0.0', '1.0.1')
+        cli_ctx = DummyCli()
+        cli_ctx.config.config_dir = self.config_dir
+
+        catalog = MarketplaceImageCatalog(cli_ctx, 'westus', client=client)
+        catalog.crawl(offer='UbuntuSevrer', fuzzy=True)
+        images = catalog.list_images(offer='UbuntuSevrer', fuzzy=True)
+        self.assertEqual(sorted(set(i['sku'] for i in images)), ['16.04-LTS', '18.04-LTS'])
+        self.assertEqual(len(images), 4)
+        # CentOS wasn't asked for, so its SKUs were never listed
+        self.assertEqual(client.list_skus.call_count, 1)
+
+        # a new run reads the saved tree and only lists what is missing
+        catalog = MarketplaceImageCatalog(cli_ctx, 'westus', client=client)
+        catalog.crawl(publisher='OpenLogic')
+        self.assertEqual(client.list_publishers.call_count, 1)
+        self.assertEqual(client.list_offers.call_count, 2)
+        self.assertEqual([i['version'] for i in catalog.list_images(sku='7.5')], ['1.0.0', '1.0.1'])
+        self.assertEqual(len(catalog.list_images()), 6)
+
+        catalog = MarketplaceImageCatalog(cli_ctx, 'westus', client=client, refresh=True)
+        catalog.crawl(publisher='OpenLogic')
+        self.assertEqual(client.list_publishers.call_count, 2)
+        self.assertEqual(client.list_offers.call_count, 3)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -64,6 +64,7 @@ setup(
         'azure.cli.command_modules',
         'azure.cli.command_modules.vm',
     ],
+    package_data={'azure.cli.command_modules.vm': ['aliases.json']},
     install_requires=DEPENDENCIES,
     cmdclass=cmdclass
 )